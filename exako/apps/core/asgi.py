@@ -0,0 +1,82 @@
+"""
+Handler ASGI com envio de arquivos sem cópia.
+
+As respostas de core.http.file_response trazem em response.sendfile o
+arquivo e o trecho a enviar. Quando o servidor anuncia as extensões ASGI
+http.response.pathsend ou http.response.zerocopysend, o corpo é entregue ao
+servidor (que usa sendfile) em vez de ser lido em partes pelo Python. Sem
+essas extensões, a resposta segue pelo caminho normal do Django.
+"""
+
+import contextvars
+import os
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIHandler
+
+PATHSEND = 'http.response.pathsend'
+ZEROCOPYSEND = 'http.response.zerocopysend'
+
+extensions = contextvars.ContextVar('asgi_extensions', default=None)
+
+
+class SendfileASGIHandler(ASGIHandler):
+    async def handle(self, scope, receive, send):
+        token = extensions.set(scope.get('extensions') or {})
+        try:
+            await super().handle(scope, receive, send)
+        finally:
+            extensions.reset(token)
+
+    async def send_response(self, response, send):
+        sendfile = getattr(response, 'sendfile', None)
+        available = extensions.get() or {}
+        if sendfile is None or not ({PATHSEND, ZEROCOPYSEND} & available.keys()):
+            return await super().send_response(response, send)
+
+        file, offset, count = sendfile
+        path = getattr(file, 'name', None)
+        whole_file = (
+            isinstance(path, str)
+            and os.path.isabs(path)
+            and offset == 0
+            and count == os.path.getsize(path)
+        )
+        if PATHSEND in available and whole_file:
+            body = {'type': PATHSEND, 'path': path}
+        elif ZEROCOPYSEND in available:
+            body = {
+                'type': ZEROCOPYSEND,
+                'file': file,
+                'offset': offset,
+                'count': count,
+            }
+        else:
+            return await super().send_response(response, send)
+
+        try:
+            await send(
+                {
+                    'type': 'http.response.start',
+                    'status': response.status_code,
+                    'headers': self.response_headers(response),
+                }
+            )
+            await send(body)
+        finally:
+            # Fecha o arquivo e envia request_finished mesmo se send() falhar.
+            # O handle() do Django fecha a resposta de novo ao final; a segunda
+            # chamada não deve repetir o sinal.
+            await sync_to_async(response.close)()
+            response.close = lambda: None
+
+    def response_headers(self, response):
+        headers = [
+            (header.encode('ascii'), value.encode('latin1'))
+            for header, value in response.items()
+        ]
+        for cookie in response.cookies.values():
+            headers.append(
+                (b'Set-Cookie', cookie.output(header='').encode('ascii').strip())
+            )
+        return headers
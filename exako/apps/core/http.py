@@ -0,0 +1,206 @@
+"""
+Respostas de arquivo com ETag, cache e requisições parciais (Range).
+
+Somente um intervalo por requisição é atendido; pedidos com vários
+intervalos recebem o arquivo inteiro, como a RFC 9110 permite.
+
+serve_file() é a camada usada para /media/ e /static/: atrás de um proxy
+(FILE_ACCEL) apenas indica ao nginx (X-Accel-Redirect) ou ao Apache/lighttpd
+(X-Sendfile) qual arquivo enviar; sem proxy, responde com file_response(),
+preferindo as cópias pré-comprimidas .br/.gz quando o cliente as aceita.
+As respostas de file_response() guardam em response.sendfile o arquivo e o
+trecho a enviar, que o handler ASGI de core.asgi transmite sem cópia.
+"""
+
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import (
+    get_conditional_response,
+    patch_cache_control,
+    patch_vary_headers,
+)
+from django.utils.http import quote_etag
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+# Nomes com hash do conteúdo: os do manifesto de estáticos (nome.<md5 12>.ext)
+# e os endereçados por sha256, como as variantes de imagem e os áudios.
+IMMUTABLE_RE = re.compile(r'\.[0-9a-f]{12}\.|[0-9a-f]{64}')
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+ENCODINGS = [('br', '.br'), ('gzip', '.gz')]
+CHUNK_SIZE = 64 * 1024
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def parse_range(header: str, size: int) -> tuple[int, int] | None:
+    """
+    Converte o cabeçalho Range em (início, fim), inclusivos. Retorna None
+    quando o cabeçalho não é um intervalo único de bytes.
+    """
+    match = RANGE_RE.match(header.strip())
+    if match is None or match.groups() == ('', ''):
+        return None
+
+    start, end = match.groups()
+    if not start:
+        # bytes=-N: os últimos N bytes.
+        if int(end) == 0:
+            raise RangeNotSatisfiable
+        return max(size - int(end), 0), size - 1
+
+    start = int(start)
+    end = min(int(end), size - 1) if end else size - 1
+    if start >= size or end < start:
+        raise RangeNotSatisfiable
+    return start, end
+
+
+def _read(file, start, length):
+    file.seek(start)
+    while length > 0:
+        chunk = file.read(min(CHUNK_SIZE, length))
+        if not chunk:
+            break
+        length -= len(chunk)
+        yield chunk
+
+
+def _finish(response, etag, max_age, immutable):
+    response['ETag'] = etag
+    response['Accept-Ranges'] = 'bytes'
+    if immutable:
+        patch_cache_control(response, public=True, max_age=max_age, immutable=True)
+    else:
+        patch_cache_control(response, public=True, max_age=max_age)
+    return response
+
+
+def file_response(
+    request, file, size, content_type, etag, max_age, immutable: bool = True
+):
+    """
+    Serve file (aberto em modo binário) com ETag, Cache-Control público (e
+    imutável, com immutable) por max_age segundos e suporte a Range e If-Range.
+    """
+    etag = quote_etag(etag)
+    max_age = int(max_age)
+    not_modified = get_conditional_response(request, etag=etag)
+    if not_modified is not None:
+        file.close()
+        return _finish(not_modified, etag, max_age, immutable)
+
+    byte_range = None
+    range_header = request.headers.get('Range')
+    if_range = request.headers.get('If-Range')
+    if range_header and (if_range is None or if_range == etag):
+        try:
+            byte_range = parse_range(range_header, size)
+        except RangeNotSatisfiable:
+            file.close()
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return _finish(response, etag, max_age, immutable)
+
+    if byte_range is None:
+        response = FileResponse(file, content_type=content_type)
+        response['Content-Length'] = size
+        response.sendfile = (file, 0, size)
+        return _finish(response, etag, max_age, immutable)
+
+    start, end = byte_range
+    response = StreamingHttpResponse(
+        _read(file, start, end - start + 1), status=206, content_type=content_type
+    )
+    response._resource_closers.append(file.close)
+    response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    response['Content-Length'] = end - start + 1
+    response.sendfile = (file, start, end - start + 1)
+    return _finish(response, etag, max_age, immutable)
+
+
+def _accel_response(path, internal_url, content_type):
+    response = HttpResponse(content_type=content_type)
+    if settings.FILE_ACCEL == 'x-accel-redirect':
+        response['X-Accel-Redirect'] = internal_url
+    else:
+        response['X-Sendfile'] = path
+    return response
+
+
+def _accepted_encodings(header: str) -> set[str]:
+    """Encodings de Accept-Encoding com q maior que zero."""
+    accepted = set()
+    for item in header.split(','):
+        encoding, *params = (part.strip() for part in item.split(';'))
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if encoding and quality > 0:
+            accepted.add(encoding.lower())
+    return accepted
+
+
+def _encoded(request, path):
+    """Cópia pré-comprimida de path aceita pelo cliente: (caminho, encoding)."""
+    accepted = _accepted_encodings(request.headers.get('Accept-Encoding', ''))
+    for encoding, suffix in ENCODINGS:
+        if encoding in accepted and os.path.isfile(path + suffix):
+            return path + suffix, encoding
+    return path, None
+
+
+def serve_file(request, path, document_root, max_age, accel_prefix):
+    """
+    Serve o arquivo path de document_root. Nomes com hash do conteúdo
+    (IMMUTABLE_RE) recebem cache imutável de um ano; os demais, max_age
+    segundos.
+    Com X-Accel-Redirect, o nginx recebe accel_prefix + path, que deve ser
+    uma location internal apontando para document_root.
+    """
+    try:
+        full_path = safe_join(document_root, path)
+    except SuspiciousFileOperation:
+        raise Http404('file not found.')
+    if not os.path.isfile(full_path):
+        raise Http404('file not found.')
+
+    content_type = mimetypes.guess_type(full_path)[0] or 'application/octet-stream'
+    immutable = IMMUTABLE_RE.search(os.path.basename(path)) is not None
+    max_age = IMMUTABLE_MAX_AGE if immutable else int(max_age)
+    stat = os.stat(full_path)
+    etag = f'{stat.st_mtime_ns:x}-{stat.st_size:x}'
+
+    if settings.FILE_ACCEL:
+        response = _accel_response(full_path, accel_prefix + path, content_type)
+        return _finish(response, quote_etag(etag), max_age, immutable)
+
+    file_path, encoding = _encoded(request, full_path)
+    if encoding is not None:
+        etag = f'{etag}-{encoding}'
+    response = file_response(
+        request,
+        open(file_path, 'rb'),
+        size=os.path.getsize(file_path),
+        content_type=content_type,
+        etag=etag,
+        max_age=max_age,
+        immutable=immutable,
+    )
+    if encoding is not None and response.status_code != 304:
+        response['Content-Encoding'] = encoding
+    if os.path.isfile(full_path + '.gz') or os.path.isfile(full_path + '.br'):
+        patch_vary_headers(response, ['Accept-Encoding'])
+    return response
@@ -0,0 +1,95 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.core.management.base import BaseCommand, CommandError
+
+
+def _percentile_index(values, percentile):
+    return min(len(values) - 1, len(values) * percentile // 100)
+
+
+class Command(BaseCommand):
+    help = (
+        'Dispara requisições concorrentes contra uma URL e informa a vazão e '
+        'as latências. Serve para comparar o mesmo endpoint servido por WSGI '
+        '(gunicorn exako.wsgi) e por ASGI (uvicorn exako.asgi:application).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('url', help='URL completa do endpoint.')
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=1000,
+            help='Quantidade total de requisições.',
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=50,
+            help='Quantidade de requisições simultâneas.',
+        )
+        parser.add_argument(
+            '--header',
+            action='append',
+            default=[],
+            help='Cabeçalho extra no formato "Nome: valor". Pode se repetir.',
+        )
+        parser.add_argument(
+            '--timeout',
+            type=float,
+            default=30,
+            help='Tempo limite de cada requisição, em segundos.',
+        )
+
+    def handle(self, *args, **options):
+        headers = {}
+        for header in options['header']:
+            name, separator, value = header.partition(':')
+            if not separator:
+                raise CommandError(f'invalid header {header!r}.')
+            headers[name.strip()] = value.strip()
+
+        count = options['requests']
+        concurrency = max(1, min(options['concurrency'], count))
+        url, timeout = options['url'], options['timeout']
+        sessions = {}
+
+        def fetch(_):
+            # Uma sessão por thread, para reaproveitar as conexões.
+            session = sessions.setdefault(threading.get_ident(), requests.Session())
+            started = time.perf_counter()
+            try:
+                response = session.get(url, headers=headers, timeout=timeout)
+                ok = response.status_code < 400
+            except requests.RequestException:
+                ok = False
+            return ok, time.perf_counter() - started
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            results = list(executor.map(fetch, range(count)))
+        elapsed = time.perf_counter() - started
+        for session in sessions.values():
+            session.close()
+
+        latencies = sorted(latency for ok, latency in results if ok)
+        errors = count - len(latencies)
+        self.stdout.write(
+            f'{count} requisições, concorrência {concurrency}: '
+            f'{count / elapsed:.1f} req/s, {errors} erros'
+        )
+        if latencies:
+            self.stdout.write(
+                ', '.join(
+                    f'{label} {latencies[index] * 1000:.1f} ms'
+                    for label, index in [
+                        ('p50', _percentile_index(latencies, 50)),
+                        ('p95', _percentile_index(latencies, 95)),
+                        ('p99', _percentile_index(latencies, 99)),
+                        ('máx', len(latencies) - 1),
+                    ]
+                )
+            )
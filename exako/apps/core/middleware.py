@@ -1,13 +1,15 @@
-from threading import local
+from contextvars import ContextVar
 
-_thread_locals = local()
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+_request = ContextVar('request', default=None)
 
 
 def get_current_request():
     """
-    returns the HttpRequest object for this thread
+    returns the HttpRequest object for the current context
     """
-    return getattr(_thread_locals, 'request', None)
+    return _request.get()
 
 
 def get_current_user():
@@ -18,14 +20,32 @@ def get_current_user():
         return getattr(request, 'user', None)
 
 
-class ThreadLocalMiddleware(object):
+class RequestContextMiddleware:
     """
-    Middleware to add the HttpRequest to thread local storage
+    Middleware to add the HttpRequest to the current context. Under ASGI,
+    sync views run in a copy of the context, so they see the same request.
     """
 
+    sync_capable = True
+    async_capable = True
+
     def __init__(self, get_response):
         self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
 
     def __call__(self, request):
-        _thread_locals.request = request
-        return self.get_response(request)
\ No newline at end of file
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = _request.set(request)
+        try:
+            return self.get_response(request)
+        finally:
+            _request.reset(token)
+
+    async def __acall__(self, request):
+        token = _request.set(request)
+        try:
+            return await self.get_response(request)
+        finally:
+            _request.reset(token)
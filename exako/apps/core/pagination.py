@@ -0,0 +1,24 @@
+from typing import Any
+
+from django.db.models import QuerySet
+from ninja.pagination import PageNumberPagination
+
+
+class AsyncPageNumberPagination(PageNumberPagination):
+    """
+    PageNumberPagination para views assíncronas. O django-ninja percorre a
+    página com um for comum, o que consulta o banco dentro do event loop;
+    aqui a página já é carregada com o ORM assíncrono.
+    """
+
+    async def apaginate_queryset(
+        self,
+        queryset: QuerySet,
+        pagination: PageNumberPagination.Input,
+        **params: Any,
+    ) -> Any:
+        result = await super().apaginate_queryset(queryset, pagination, **params)
+        items = result['items']
+        if isinstance(items, QuerySet):
+            result['items'] = [item async for item in items]
+        return result
@@ -0,0 +1,196 @@
+"""
+Leitura dos modelos do dicionário nas réplicas.
+
+ReplicaRouter envia as leituras dos modelos de DATABASE_REPLICA_MODELS para
+uma réplica saudável quando a requisição atual (core.middleware) é GET ou
+HEAD. O restante vai para o primário: escritas, leituras fora de uma
+requisição (comandos e jobs), dentro de transações ou de use_primary(), e as
+requisições de quem escreveu nos últimos DATABASE_REPLICA_STICKY segundos,
+marcadas por PrimaryPinMiddleware com um cookie e, para usuários
+autenticados, uma chave no cache.
+
+Cada processo verifica as réplicas a cada DATABASE_REPLICA_CHECK_INTERVAL
+segundos; as que não respondem ou estão com atraso de replicação maior que
+DATABASE_REPLICA_MAX_LAG segundos ficam de fora até a próxima verificação.
+"""
+
+import logging
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+from exako.apps.core.middleware import get_current_request
+
+logger = logging.getLogger(__name__)
+
+SAFE_METHODS = ['GET', 'HEAD']
+PIN_COOKIE = 'exako_primary'
+PIN_KEY = 'db:primary:{user_id}'
+# Com o WAL receiver conectado ao primário e sem WAL pendente, a réplica está
+# em dia, mesmo que o primário esteja ocioso e pg_last_xact_replay_timestamp()
+# seja antigo. Sem o WAL receiver não há como saber o atraso (NULL). O status
+# só é visível com pg_read_all_stats; sem esse papel, basta o receiver existir.
+LAG_SQL = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN NOT EXISTS (
+            SELECT 1 FROM pg_stat_wal_receiver
+            WHERE coalesce(status, 'streaming') = 'streaming'
+        ) THEN NULL
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+    END
+"""
+
+_primary = ContextVar('primary', default=False)
+_health = {}
+
+
+@contextmanager
+def use_primary():
+    """Lê do primário dentro do bloco, mesmo em requisições GET."""
+    token = _primary.set(True)
+    try:
+        yield
+    finally:
+        _primary.reset(token)
+
+
+def lag(alias) -> float:
+    """Atraso de replicação de alias, em segundos; infinito se desconhecido."""
+    with connections[alias].cursor() as cursor:
+        cursor.execute(LAG_SQL)
+        replica_lag = cursor.fetchone()[0]
+    return float('inf') if replica_lag is None else float(replica_lag)
+
+
+def is_healthy(alias) -> bool:
+    now = time.monotonic()
+    checked_at, healthy = _health.get(alias, (None, False))
+    if (
+        checked_at is not None
+        and now - checked_at < settings.DATABASE_REPLICA_CHECK_INTERVAL
+    ):
+        return healthy
+
+    try:
+        replica_lag = lag(alias)
+    except DatabaseError:
+        logger.warning('Replica %s is unavailable.', alias, exc_info=True)
+        connections[alias].close()
+        healthy = False
+    else:
+        healthy = replica_lag <= settings.DATABASE_REPLICA_MAX_LAG
+        if not healthy:
+            logger.warning('Replica %s is %.1fs behind.', alias, replica_lag)
+    _health[alias] = (now, healthy)
+    return healthy
+
+
+def healthy_replicas() -> list[str]:
+    return [alias for alias in settings.DATABASE_REPLICAS if is_healthy(alias)]
+
+
+def _pin_key(user):
+    return PIN_KEY.format(user_id=user.pk)
+
+
+def _user(request):
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return user
+    return None
+
+
+def is_pinned(request) -> bool:
+    """Indica se o cliente escreveu há menos de DATABASE_REPLICA_STICKY segundos."""
+    if PIN_COOKIE in request.COOKIES:
+        return True
+    user = _user(request)
+    return user is not None and cache.get(_pin_key(user)) is not None
+
+
+def pin(request, response):
+    """Mantém as leituras do cliente no primário por DATABASE_REPLICA_STICKY."""
+    sticky = int(settings.DATABASE_REPLICA_STICKY)
+    response.set_cookie(PIN_COOKIE, '1', max_age=sticky, httponly=True, samesite='Lax')
+    user = _user(request)
+    if user is not None:
+        cache.set(_pin_key(user), True, timeout=sticky)
+
+
+def _request_replica(request):
+    # Uma escolha por requisição: todas as leituras veem a mesma réplica.
+    if not hasattr(request, '_db_replica'):
+        replica = DEFAULT_DB_ALIAS
+        if request.method in SAFE_METHODS and not is_pinned(request):
+            replicas = healthy_replicas()
+            if replicas:
+                replica = random.choice(replicas)
+        request._db_replica = replica
+    return request._db_replica
+
+
+def _replicated(model) -> bool:
+    models = settings.DATABASE_REPLICA_MODELS
+    return model._meta.app_label in models or model._meta.label in models
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if not settings.DATABASE_REPLICAS or not _replicated(model):
+            return None
+        request = get_current_request()
+        if request is None or _primary.get():
+            return None
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return None
+        return _request_replica(request)
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # As réplicas têm os mesmos dados do primário.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
+
+
+class PrimaryPinMiddleware:
+    """
+    Depois de requisições que podem escrever (POST, PUT, PATCH, DELETE),
+    mantém as leituras do cliente no primário, para que ele veja as próprias
+    alterações mesmo com as réplicas atrasadas.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        response = self.get_response(request)
+        if settings.DATABASE_REPLICAS and request.method not in SAFE_METHODS:
+            pin(request, response)
+        return response
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        if settings.DATABASE_REPLICAS and request.method not in SAFE_METHODS:
+            await sync_to_async(pin)(request, response)
+        return response
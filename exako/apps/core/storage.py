@@ -0,0 +1,51 @@
+"""
+Armazenamento dos arquivos estáticos para produção.
+
+Além dos nomes com hash do ManifestStaticFilesStorage (que o {% static %}
+dos templates resolve pelo manifesto), collectstatic grava ao lado de cada
+arquivo de texto uma cópia .gz e, com o pacote brotli instalado, uma .br.
+core.http.serve_file envia essas cópias aos clientes que as aceitam.
+"""
+
+import gzip
+import os
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE = {'.css', '.js', '.map', '.svg', '.html', '.txt', '.json', '._hs'}
+MIN_SIZE = 256
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    def post_process(self, paths, dry_run=False, **options):
+        processed = []
+        for name, hashed_name, result in super().post_process(
+            paths, dry_run, **options
+        ):
+            if hashed_name and not isinstance(result, Exception):
+                processed.extend([name, hashed_name])
+            yield name, hashed_name, result
+        if not dry_run:
+            for name in dict.fromkeys(processed):
+                self.compress(name)
+
+    def compress(self, name):
+        if os.path.splitext(name)[1] not in COMPRESSIBLE:
+            return
+        path = self.path(name)
+        with open(path, 'rb') as file:
+            data = file.read()
+        if len(data) < MIN_SIZE:
+            return
+        compressed = {'.gz': gzip.compress(data, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            compressed['.br'] = brotli.compress(data)
+        for suffix, content in compressed.items():
+            if len(content) < len(data):
+                with open(path + suffix, 'wb') as file:
+                    file.write(content)
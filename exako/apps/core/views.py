@@ -1,3 +1,44 @@
-from django.shortcuts import render
+import os
 
-# Create your views here.
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.http import Http404
+from django.views.decorators.http import require_safe
+
+from exako.apps.core.http import serve_file
+
+
+@require_safe
+def media(request, path):
+    return serve_file(
+        request,
+        path,
+        document_root=settings.MEDIA_ROOT,
+        max_age=settings.MEDIA_MAX_AGE,
+        accel_prefix=settings.MEDIA_ACCEL_PREFIX,
+    )
+
+
+@require_safe
+def static(request, path):
+    if settings.DEBUG:
+        # Sem collectstatic: procura o arquivo nos diretórios de origem.
+        found = finders.find(path)
+        if not found:
+            raise Http404('file not found.')
+        return serve_file(
+            request,
+            os.path.basename(found),
+            document_root=os.path.dirname(found),
+            max_age=0,
+            accel_prefix=settings.STATIC_ACCEL_PREFIX,
+        )
+    if settings.STATIC_ROOT is None:
+        raise Http404('file not found.')
+    return serve_file(
+        request,
+        path,
+        document_root=settings.STATIC_ROOT,
+        max_age=settings.STATIC_MAX_AGE,
+        accel_prefix=settings.STATIC_ACCEL_PREFIX,
+    )
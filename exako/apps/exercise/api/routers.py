@@ -1,18 +1,23 @@
+from operator import itemgetter
 from random import random
+from uuid import UUID
 
+from django.conf import settings
 from django.db import IntegrityError
+from django.http import HttpResponse
+from django.utils.cache import patch_cache_control
 from ninja import Field, Query, Router
 from ninja.errors import HttpError
 from ninja.pagination import PageNumberPagination, paginate
 
 from exako.apps.core import schema as core_schema
 from exako.apps.core.permissions import is_admin, permission_required
-from exako.apps.exercise import exercises
+from exako.apps.exercise import bulk, exercises, scheduler, speech
 from exako.apps.exercise.api import schema
 from exako.apps.exercise.constants import ExerciseSubType, ExerciseType
-from exako.apps.exercise.models import Exercise
+from exako.apps.exercise.models import Exercise, TermCoverage
 from exako.apps.term.constants import Language, Level
-from exako.apps.user.auth.token import AuthBearer
+from exako.apps.user.auth.token import AsyncAuthBearer, AuthBearer
 
 exercise_router = Router(tags=['Exercício'], auth=AuthBearer())
 
@@ -161,7 +166,7 @@ exercise_router = Router(tags=['Exercício'], auth=AuthBearer())
                                 term=1,
                                 additional_content={
                                     'distractors': {'term': [1, 3, 5, 7, 8, 9, 11, 12]},
-                                    'connections': {'term': [1, 5, 7, 9]},
+                                    'connections': {'term': [2, 4, 6, 10]},
                                 },
                             ),
                         },
@@ -179,6 +184,39 @@ def create_exercise(request, ExerciseSchema: schema.ExerciseSchema):
         raise HttpError(status_code=409, message='exercise already exists.')
 
 
+@exercise_router.post(
+    path='/bulk',
+    response={
+        200: list[schema.ExerciseBulkStatus],
+        401: core_schema.NotAuthenticated,
+        403: core_schema.PermissionDenied,
+    },
+    summary='Criar vários exercícios de uma vez.',
+    description='Endpoint para criar exercícios em lote. Cada exercício é validado com as mesmas regras da criação individual e o resultado informa, na ordem enviada, se o exercício foi criado, se já existia ou por que é inválido.',
+)
+@permission_required([is_admin])
+def create_exercise_bulk(request, batch: schema.ExerciseBulkCreate):
+    return bulk.create_exercises(batch.exercises)
+
+
+@exercise_router.get(
+    path='/coverage',
+    response={
+        200: list[schema.TermCoverageView],
+        401: core_schema.NotAuthenticated,
+        403: core_schema.PermissionDenied,
+    },
+    summary='Consulta os recursos dos termos para a criação de exercícios.',
+    description='Endpoint para listar, por termo, a pronúncia, o áudio, a imagem, a quantidade de exemplos, de rimas com áudio e de definições e os tipos de exercício que já existem. Com ready_for, retorna apenas os termos prontos para o tipo de exercício informado e que ainda não o têm.',
+)
+@paginate(PageNumberPagination)
+@permission_required([is_admin])
+def list_term_coverage(request, filters: schema.TermCoverageFilter = Query()):
+    return filters.filter(
+        TermCoverage.objects.select_related('term').order_by('term_id')
+    )
+
+
 @exercise_router.get(
     path='/',
     response={200: list[schema.ExerciseView]},
@@ -197,6 +235,16 @@ def list_exercise(
         default=None, description='Filtrar por conjunto de cartas.'
     ),
     seed: float | None = Query(default_factory=random, le=1, ge=0),
+    difficulty_min: float | None = Query(
+        default=None, description='Filtrar pela dificuldade calibrada mínima.'
+    ),
+    difficulty_max: float | None = Query(
+        default=None, description='Filtrar pela dificuldade calibrada máxima.'
+    ),
+    order_by_difficulty: bool = Query(
+        default=False,
+        description='Ordenar do exercício mais fácil para o mais difícil, segundo a dificuldade calibrada.',
+    ),
 ):
     return Exercise.objects.list(
         language=language,
@@ -205,9 +253,73 @@ def list_exercise(
         cardset_id=cardset_id,
         seed=seed,
         user=request.user,
+        difficulty_min=difficulty_min,
+        difficulty_max=difficulty_max,
+        order_by_difficulty=order_by_difficulty,
     )
 
 
+@exercise_router.get(
+    path='/due',
+    response={200: list[schema.ExerciseView], 401: core_schema.NotAuthenticated},
+    summary='Consulta os próximos exercícios para revisão.',
+    description='Endpoint para retornar os exercícios cuja revisão já venceu, ordenados pela data de vencimento, conforme o agendamento de repetição espaçada do usuário.',
+)
+def due_exercises(request, limit: int = Query(default=20, ge=1, le=100)):
+    return scheduler.due(request.user, limit)
+
+
+@exercise_router.get(
+    path='/types',
+    response={200: list[schema.ExerciseTypeView]},
+    summary='Consulta os textos de cada tipo de exercício.',
+    description='Endpoint para retornar o título, as descrições, o modelo de cabeçalho e o ícone de cada tipo de exercício. Esses textos não mudam entre exercícios do mesmo tipo e podem ser guardados em cache pelo cliente, que então pode pedir os exercícios no modo compacto.',
+    auth=None,
+)
+def list_exercise_types(request, response: HttpResponse):
+    patch_cache_control(
+        response, public=True, max_age=int(settings.EXERCISE_TYPES_CACHE_TIMEOUT)
+    )
+    return sorted(
+        (exercise.metadata() for exercise in exercises.exercises_map),
+        key=itemgetter('type'),
+    )
+
+
+@exercise_router.post(
+    path='/check/batch',
+    response={
+        200: list[schema.ExerciseBatchResponse],
+        401: core_schema.NotAuthenticated,
+        404: core_schema.NotFound,
+    },
+    summary='Corrigir várias respostas de uma vez.',
+    description='Endpoint para corrigir as respostas de uma sessão de exercícios em uma única requisição. Os resultados são retornados na mesma ordem das respostas. Exercícios de fala devem ser corrigidos individualmente.',
+)
+def check_batch(request, batch: schema.ExerciseBatchCheck):
+    return exercises.check_batch(request.user, batch.model_dump()['answers'])
+
+
+@exercise_router.get(
+    path='/speech/{job_id}',
+    response={
+        200: schema.SpeechJobView,
+        401: core_schema.NotAuthenticated,
+        404: core_schema.NotFound,
+    },
+    url_name='speech_job',
+    summary='Consulta a correção de um exercício de fala.',
+    description='Endpoint para acompanhar a correção de uma resposta de exercício de fala, criada pelo check de speak-term ou speak-sentence. Com wait, a resposta espera até a correção terminar ou até wait segundos.',
+    auth=AsyncAuthBearer(),
+)
+async def speech_job(
+    request,
+    job_id: UUID,
+    wait: float = Query(default=0, ge=0, le=settings.EXERCISE_SPEECH_MAX_WAIT),
+):
+    return await speech.wait(job_id, request.user, timeout=wait)
+
+
 exercises.OrderSentenceExercise.as_endpoint(
     router=exercise_router,
     path='/order-sentence/{exercise_id}',
@@ -1,11 +1,15 @@
-from typing import Any
+from datetime import datetime
+from typing import Any, Literal
+from uuid import UUID
 
+from django.db.models import Q
 from django.forms import model_to_dict
 from django.urls import reverse_lazy
-from ninja import Field, Schema
+from ninja import Field, FilterSchema, Schema
 from pydantic import computed_field, field_validator, model_validator
 
-from exako.apps.exercise.constants import ExerciseSubType, ExerciseType
+from exako.apps.exercise import coverage
+from exako.apps.exercise.constants import ExerciseSubType, ExerciseType, SpeechJobStatus
 from exako.apps.term.constants import Language
 
 
@@ -111,14 +115,9 @@ class TermMChoiceSchema(ExerciseSchemaBase):
     def validate_distractors(self):
         _validate_sub_exercise_type(self)
         sub_type = self.additional_content['sub_type']
+        # Sem distratores de term, o exercício usa os candidatos do termo.
         if sub_type == ExerciseSubType.TERM:
-            if (
-                'distractors' not in self.additional_content
-                or 'term' not in self.additional_content['distractors']
-            ):
-                raise ValueError(
-                    'invalid distractors format, exercise needs term distractors to form the alternatives.'
-                )
+            self.additional_content.setdefault('distractors', {}).setdefault('term', [])
         else:
             if (
                 'distractors' not in self.additional_content
@@ -193,19 +192,15 @@ class TermImageMChoiceTextSchema(ExerciseSchemaBase):
     term: int
     term_image: int
     additional_content: dict = Field(
+        default_factory=dict,
         examples=[{'distractors': {'term': [1, 3, 5, 7]}}],
+        description='Sem distratores, o exercício usa os candidatos do termo.',
     )
 
     @field_validator('additional_content')
     @classmethod
     def validate_distractors(cls, additional_content: dict) -> dict:
-        if (
-            'distractors' not in additional_content
-            or 'term' not in additional_content['distractors']
-        ):
-            raise ValueError(
-                'invalid distractors format, exercise needs distractors to form the alternatives.'
-            )
+        additional_content.setdefault('distractors', {}).setdefault('term', [])
         if not isinstance(additional_content['distractors']['term'], list):
             raise ValueError('invalid distractors format, it should be a id list.')
         return additional_content
@@ -220,18 +215,13 @@ class TermConnectionSchema(ExerciseSchemaBase):
                 'connections': {'term': [1, 5, 7, 9]},
             }
         ],
+        description='Sem distratores, o exercício usa os candidatos do termo.',
     )
 
     @field_validator('additional_content')
     @classmethod
     def validate_distractors(cls, additional_content: dict) -> dict:
-        if (
-            'distractors' not in additional_content
-            or 'term' not in additional_content['distractors']
-        ):
-            raise ValueError(
-                'invalid distractors format, exercise needs distractors to form the connections.'
-            )
+        additional_content.setdefault('distractors', {}).setdefault('term', [])
         if not isinstance(additional_content['distractors']['term'], list):
             raise ValueError('invalid distractors format, it should be a id list.')
 
@@ -250,7 +240,7 @@ class TermConnectionSchema(ExerciseSchemaBase):
 
         if len(connections.intersection(distractors)) > 0:
             raise ValueError('intersection between connection and distractors list.')
-            
+
         return additional_content
 
 
@@ -293,6 +283,71 @@ class ExerciseSchemaView(ExerciseSchemaBase):
     id: int
 
 
+class ExerciseBulkCreate(Schema):
+    exercises: list[dict[str, Any]] = Field(
+        min_length=1,
+        max_length=1000,
+        description='Exercícios no mesmo formato aceito pela criação individual.',
+    )
+
+
+class ExerciseBulkStatus(Schema):
+    index: int
+    status: Literal['created', 'exists', 'invalid']
+    id: int | None = None
+    detail: str | None = None
+
+
+class TermCoverageView(Schema):
+    term_id: int
+    expression: str = Field(alias='term.expression')
+    language: Language
+    has_pronunciation: bool
+    has_audio: bool
+    has_image: bool
+    example_count: int
+    rhyme_with_audio_count: int
+    definition_count: int
+    exercise_types: list[ExerciseType]
+    updated_at: datetime
+
+
+class TermCoverageFilter(FilterSchema):
+    language: Language | None = None
+    has_pronunciation: bool | None = None
+    has_audio: bool | None = None
+    has_image: bool | None = None
+    min_examples: int | None = Field(default=None, q='example_count__gte')
+    min_rhymes_with_audio: int | None = Field(
+        default=None, q='rhyme_with_audio_count__gte'
+    )
+    min_definitions: int | None = Field(default=None, q='definition_count__gte')
+    exercise_type: ExerciseType | None = Field(
+        default=None, description='Termos que já têm exercícios deste tipo.'
+    )
+    ready_for: ExerciseType | None = Field(
+        default=None,
+        description='Termos com os recursos necessários para este tipo de exercício e que ainda não o têm.',
+    )
+
+    @field_validator('ready_for')
+    @classmethod
+    def validate_ready_for(cls, ready_for: ExerciseType | None) -> ExerciseType | None:
+        if ready_for is not None and ready_for not in coverage.READY:
+            raise ValueError('ready_for supports only exercise types based on a term.')
+        return ready_for
+
+    def filter_exercise_type(self, exercise_type: ExerciseType | None) -> Q:
+        if exercise_type is None:
+            return Q()
+        return Q(exercise_types__contains=[exercise_type])
+
+    def filter_ready_for(self, ready_for: ExerciseType | None) -> Q:
+        if ready_for is None:
+            return Q()
+        return coverage.ready_for(ready_for)
+
+
 class ExerciseView(Schema):
     id: int
     type: ExerciseType
@@ -327,11 +382,78 @@ class ExerciseResponse(Schema):
     feedback: str
 
 
+class SpeechJobView(Schema):
+    id: UUID
+    exercise_id: int
+    status: SpeechJobStatus
+    score: float | None = None
+    result: ExerciseResponse | None = Field(
+        default=None,
+        description='Correção da resposta, disponível quando status for done.',
+    )
+    error: str
+    created_at: datetime
+    queue_time: float | None = Field(
+        default=None, description='Segundos entre o envio e o início da correção.'
+    )
+    scoring_time: float | None = Field(
+        default=None, description='Segundos gastos na correção.'
+    )
+
+    @computed_field(description='Usada para consultar o andamento da correção.')
+    @property
+    def url(self) -> str:
+        return str(reverse_lazy('api-1.0.0:speech_job', kwargs={'job_id': self.id}))
+
+
+class ExerciseBatchAnswer(Schema):
+    type: ExerciseType
+    exercise_id: int
+    answer: dict = Field(examples=[{'term_id': 1}])
+    time_to_answer: int = Field(gt=0)
+
+    @field_validator('type')
+    @classmethod
+    def validate_type(cls, type: ExerciseType) -> ExerciseType:
+        if type in [ExerciseType.SPEAK_TERM, ExerciseType.SPEAK_SENTENCE]:
+            raise ValueError('speak exercises must be checked individually.')
+        return type
+
+
+class ExerciseBatchCheck(Schema):
+    answers: list[ExerciseBatchAnswer] = Field(min_length=1, max_length=100)
+
+
+class ExerciseBatchResponse(ExerciseResponse):
+    type: ExerciseType
+    exercise_id: int
+
+
+class ExerciseTypeView(Schema):
+    type: ExerciseType
+    title: str
+    short_description: str
+    description: str
+    header_template: str = Field(
+        description='Modelo do cabeçalho; os campos entre chaves são preenchidos em cada exercício.',
+    )
+    icon: str | None = Field(default=None, examples=['fa-headphones'])
+
+
 class ExerciseBaseView(Schema):
+    type: ExerciseType | None = Field(
+        default=None, description='Presente somente no modo compacto.'
+    )
     header: str = Field(examples=['Cabeçalho do exercício'])
-    title: str = Field(examples=['Título do exercício'])
-    description: str = Field(
-        examples=['Descrição e instruções de como jogar o exercício.']
+    title: str | None = Field(
+        default=None,
+        examples=['Título do exercício'],
+        description='Omitido no modo compacto.',
+    )
+    description: str | None = Field(
+        default=None,
+        examples=['Descrição e instruções de como jogar o exercício.'],
+        description='Omitido no modo compacto.',
     )
 
 
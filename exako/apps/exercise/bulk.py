@@ -0,0 +1,406 @@
+"""
+Criação de exercícios em lote.
+
+A criação individual valida cada exercício no pre_save com várias consultas
+(distratores, rimas, destaques). Aqui os objetos referenciados por todo o lote,
+inclusive os ids de distratores e conexões e os candidatos a distratores dos
+termos, são carregados com uma consulta por modelo, as exigências de rima e
+de destaque são verificadas com consultas agrupadas e os exercícios válidos
+são inseridos com um único bulk_create.
+Se outra requisição criar algum deles nesse meio tempo, esse item passa a
+exists e os demais são inseridos de novo, sem falhar o lote inteiro.
+"""
+
+from collections import defaultdict
+
+from django.db import IntegrityError, models, transaction
+from ninja.errors import HttpError
+from pydantic import ValidationError
+
+from exako.apps.exercise import coverage, relations
+from exako.apps.exercise.api import schema
+from exako.apps.exercise.constants import ExerciseSubType, ExerciseType
+from exako.apps.exercise.exercises import update_answer_keys
+from exako.apps.exercise.models import DistractorCandidate, Exercise
+from exako.apps.exercise.validators import validate_exercise_references
+from exako.apps.term.constants import TermLexicalType
+from exako.apps.term.models import (
+    Term,
+    TermDefinition,
+    TermExample,
+    TermExampleLink,
+    TermImage,
+    TermLexical,
+    TermPronunciation,
+)
+
+CREATED = 'created'
+EXISTS = 'exists'
+INVALID = 'invalid'
+
+RELATED_MODELS = {
+    'term': Term.objects.all(),
+    'term_example': TermExample.objects.all(),
+    'term_pronunciation': TermPronunciation.objects.all(),
+    'term_lexical': TermLexical.objects.select_related('term', 'term_value_ref'),
+    'term_definition': TermDefinition.objects.select_related('term'),
+    'term_image': TermImage.objects.select_related('term'),
+}
+
+# Tipos que completam os distratores com os candidatos do termo.
+CANDIDATE_TYPES = {
+    ExerciseType.TERM_MCHOICE,
+    ExerciseType.TERM_IMAGE_MCHOICE_TEXT,
+    ExerciseType.TERM_CONNECTION,
+}
+
+MCHOICE_MIN_DISTRACTORS = 3
+CONNECTION_MIN_DISTRACTORS = 8
+CONNECTION_MIN_CONNECTIONS = 4
+
+
+def _id_list(additional_content, key, field):
+    ids = ((additional_content or {}).get(key) or {}).get(field) or []
+    return [pk for pk in ids if isinstance(pk, int)]
+
+
+def _referenced_ids(data):
+    """Ids por campo referenciados pelo exercício, incluindo os distratores."""
+    ids = defaultdict(set)
+    for field in RELATED_MODELS:
+        if data[field] is not None:
+            ids[field].add(data[field])
+    for key in ['distractors', 'connections']:
+        for field in RELATED_MODELS:
+            ids[field].update(_id_list(data['additional_content'], key, field))
+    return ids
+
+
+def _language(obj):
+    return obj.language if hasattr(obj, 'language') else obj.term.language
+
+
+def _filter_language(related, field, ids, language):
+    objects = related[field]
+    return [
+        pk
+        for pk in dict.fromkeys(ids)
+        if pk in objects and _language(objects[pk]) == language
+    ]
+
+
+def _unique_keys(data):
+    """Chaves das restrições únicas de Exercise que se aplicam a data."""
+    keys = set()
+    for constraint in Exercise._meta.constraints:
+        condition = dict(constraint.condition.children)
+        if int(condition['type']) != int(data['type']):
+            continue
+        values = tuple(str(data[field]) for field in constraint.fields)
+        # Postgres não considera NULL nas restrições únicas.
+        if 'None' not in values:
+            keys.add((constraint.name, values))
+    return keys
+
+
+def _existing_keys(items):
+    query = models.Q()
+    for data in items:
+        for constraint in Exercise._meta.constraints:
+            if int(dict(constraint.condition.children)['type']) != int(data['type']):
+                continue
+            if any(data[field] is None for field in constraint.fields):
+                continue
+            query |= models.Q(**{field: data[field] for field in constraint.fields})
+    if not query:
+        return set()
+
+    keys = set()
+    fields = ['type', 'language', *RELATED_MODELS]
+    for data in Exercise.objects.filter(query).values(*fields):
+        keys |= _unique_keys(data)
+    return keys
+
+
+def _rhyme_counts(term_ids):
+    return dict(
+        TermLexical.objects.filter(
+            term_id__in=term_ids,
+            type=TermLexicalType.RHYME,
+            term_value_ref_id__in=TermPronunciation.objects.filter(
+                audio_file__isnull=False,
+            ).values('term_id'),
+        )
+        .values('term_id')
+        .annotate(count=models.Count('id'))
+        .values_list('term_id', 'count')
+    )
+
+
+def _highlights(term_example_ids):
+    links = set()
+    for term_example_id, term_id, term_lexical_id in TermExampleLink.objects.filter(
+        term_example_id__in=term_example_ids
+    ).values_list('term_example_id', 'term_id', 'term_lexical_id'):
+        links.add((term_example_id, 'term', term_id))
+        links.add((term_example_id, 'term_lexical', term_lexical_id))
+    return links
+
+
+def _distractor_candidates(term_ids):
+    candidates = defaultdict(list)
+    if not term_ids:
+        return candidates
+    for term_id, candidate_id in DistractorCandidate.objects.filter(
+        term_id__in=term_ids
+    ).values_list('term_id', 'candidate_id'):
+        candidates[term_id].append(candidate_id)
+    return candidates
+
+
+def _validate_distractors(exercise, related, candidates):
+    """
+    Como validators._relation_ids: nos tipos que completam a lista com os
+    candidatos do termo (exclude não é None), eles contam para minimum.
+    """
+    additional_content = exercise.additional_content
+    exercise_type = int(exercise.type)
+
+    def filter_ids(key, field, language, minimum=0, message=None, exclude=None):
+        ids = _filter_language(
+            related, field, _id_list(additional_content, key, field), language
+        )
+        available = len(ids)
+        if exclude is not None:
+            available += len(set(candidates[exercise.term_id]).difference(ids, exclude))
+        if available < minimum:
+            raise HttpError(status_code=422, message=message)
+        if ids or field in (additional_content.get(key) or {}):
+            additional_content.setdefault(key, {})[field] = ids
+        return ids
+
+    mchoice_message = 'exercise needs at least 3 additional_content[distractors] to form the alternatives.'
+    if exercise_type == ExerciseType.ORDER_SENTENCE:
+        if 'term' in ((additional_content or {}).get('distractors') or {}):
+            filter_ids('distractors', 'term', exercise.term_example.language)
+    elif exercise_type == ExerciseType.TERM_MCHOICE:
+        if additional_content['sub_type'] == ExerciseSubType.TERM:
+            filter_ids(
+                'distractors',
+                'term',
+                exercise.term.language,
+                MCHOICE_MIN_DISTRACTORS,
+                mchoice_message,
+                exclude=(),
+            )
+        else:
+            filter_ids(
+                'distractors',
+                'term_lexical',
+                exercise.term_lexical.term.language,
+                MCHOICE_MIN_DISTRACTORS,
+                mchoice_message,
+            )
+    elif exercise_type == ExerciseType.TERM_DEFINITION_MCHOICE:
+        filter_ids(
+            'distractors',
+            'term_definition',
+            exercise.term_definition.term.language,
+            MCHOICE_MIN_DISTRACTORS,
+            mchoice_message,
+        )
+    elif exercise_type == ExerciseType.TERM_IMAGE_MCHOICE:
+        filter_ids(
+            'distractors',
+            'term_image',
+            exercise.term_image.term.language,
+            MCHOICE_MIN_DISTRACTORS,
+            mchoice_message,
+        )
+    elif exercise_type == ExerciseType.TERM_IMAGE_MCHOICE_TEXT:
+        filter_ids(
+            'distractors',
+            'term',
+            exercise.term.language,
+            MCHOICE_MIN_DISTRACTORS,
+            mchoice_message,
+            exclude=(),
+        )
+    elif exercise_type == ExerciseType.TERM_CONNECTION:
+        connections = filter_ids(
+            'connections',
+            'term',
+            exercise.term.language,
+            CONNECTION_MIN_CONNECTIONS,
+            'exercise needs at least 4 additional_content[connections] to form the connections.',
+        )
+        filter_ids(
+            'distractors',
+            'term',
+            exercise.term.language,
+            CONNECTION_MIN_DISTRACTORS,
+            'exercise needs at least 8 additional_content[distractors] to form the connections.',
+            exclude=connections,
+        )
+
+
+def _validate_rhymes(exercise, rhyme_counts):
+    if rhyme_counts.get(exercise.term_id, 0) < 3:
+        raise HttpError(
+            status_code=422,
+            message='mchoice exercises need to have at least 3 TermLexicalType.RHYME objects to form the alternatives.',
+        )
+
+
+def _validate_highlight(exercise, highlights):
+    sub_type = exercise.additional_content['sub_type']
+    if sub_type == ExerciseSubType.TERM_LEXICAL_VALUE:
+        link = ('term_lexical', exercise.term_lexical_id)
+    elif sub_type == ExerciseSubType.TERM_LEXICAL_TERM_REF:
+        link = ('term', exercise.term_lexical.term_value_ref_id)
+    else:
+        link = ('term', exercise.term_id)
+
+    if (exercise.term_example_id, *link) not in highlights:
+        raise HttpError(
+            status_code=422,
+            message='term mchoice exercise need term_example with highlight link.',
+        )
+
+
+def _build_exercise(data, related):
+    exercise = Exercise(
+        type=data['type'],
+        language=data['language'],
+        additional_content=data['additional_content'],
+    )
+    for field in RELATED_MODELS:
+        pk = data[field]
+        if pk is None:
+            continue
+        if pk not in related[field]:
+            raise HttpError(status_code=404, message=f'{field} {pk} does not exist.')
+        setattr(exercise, field, related[field][pk])
+    return exercise
+
+
+def _drop_existing(parsed, exercises, results) -> int:
+    """
+    Tira de exercises os que já existem no banco ou se repetem no lote,
+    marcando-os como exists. Retorna quantos foram tirados.
+    """
+    dropped = 0
+    seen = _existing_keys([parsed[index] for index in exercises])
+    for index in list(exercises):
+        keys = _unique_keys(parsed[index])
+        if keys & seen:
+            results[index].update(status=EXISTS, detail='exercise already exists.')
+            del exercises[index]
+            dropped += 1
+        seen |= keys
+    return dropped
+
+
+def _insert(exercises):
+    exercises = list(exercises)
+    with transaction.atomic():
+        Exercise.objects.bulk_create(exercises)
+        relations.sync(exercise.id for exercise in exercises)
+        coverage.refresh(
+            exercise.term_id for exercise in exercises if exercise.term_id is not None
+        )
+        update_answer_keys(
+            Exercise.objects.filter(id__in=[exercise.id for exercise in exercises])
+        )
+
+
+def create_exercises(items):
+    """
+    Valida e cria os exercícios de items. Retorna, na mesma ordem, o status de
+    cada item: created, exists (já existe no banco ou repetido no lote) ou
+    invalid, com o motivo em detail.
+    """
+    results = [{'index': index} for index in range(len(items))]
+
+    parsed = {}
+    for index, item in enumerate(items):
+        try:
+            parsed[index] = schema.ExerciseSchema.model_validate(item).model_dump(
+                mode='json'
+            )
+        except ValidationError as error:
+            results[index].update(
+                status=INVALID,
+                detail='; '.join(detail['msg'] for detail in error.errors()),
+            )
+
+    ids = defaultdict(set)
+    for data in parsed.values():
+        for field, field_ids in _referenced_ids(data).items():
+            ids[field] |= field_ids
+    related = {
+        field: queryset.in_bulk(ids[field]) if ids[field] else {}
+        for field, queryset in RELATED_MODELS.items()
+    }
+
+    candidates = _distractor_candidates(
+        [
+            data['term']
+            for data in parsed.values()
+            if data['type'] in CANDIDATE_TYPES and data['term'] in related['term']
+        ]
+    )
+
+    exercises = {}
+    for index, data in parsed.items():
+        try:
+            exercise = _build_exercise(data, related)
+            validate_exercise_references(ExerciseType(data['type']), exercise=exercise)
+            _validate_distractors(exercise, related, candidates)
+        except HttpError as error:
+            results[index].update(status=INVALID, detail=str(error))
+        else:
+            exercises[index] = exercise
+
+    rhyme_counts = _rhyme_counts(
+        [
+            exercise.term_id
+            for exercise in exercises.values()
+            if exercise.type == ExerciseType.LISTEN_TERM_MCHOICE
+        ]
+    )
+    highlights = _highlights(
+        [
+            exercise.term_example_id
+            for exercise in exercises.values()
+            if exercise.type == ExerciseType.TERM_MCHOICE
+        ]
+    )
+    for index, exercise in list(exercises.items()):
+        try:
+            if exercise.type == ExerciseType.LISTEN_TERM_MCHOICE:
+                _validate_rhymes(exercise, rhyme_counts)
+            elif exercise.type == ExerciseType.TERM_MCHOICE:
+                _validate_highlight(exercise, highlights)
+        except HttpError as error:
+            results[index].update(status=INVALID, detail=str(error))
+            del exercises[index]
+
+    _drop_existing(parsed, exercises, results)
+    while exercises:
+        try:
+            _insert(exercises.values())
+        except IntegrityError:
+            # Outra requisição pode ter criado alguns dos exercícios depois da
+            # verificação: esses passam a exists e o restante é inserido de
+            # novo. Sem nenhum exercício novo no banco, o erro é outro.
+            for exercise in exercises.values():
+                exercise.pk = None
+            if not _drop_existing(parsed, exercises, results):
+                raise HttpError(status_code=409, message='exercise already exists.')
+        else:
+            break
+
+    for index, exercise in exercises.items():
+        results[index].update(status=CREATED, id=exercise.id)
+    return results
@@ -0,0 +1,193 @@
+"""
+Calibração da dificuldade dos exercícios a partir do histórico de respostas.
+
+O modelo é o de Rasch: a chance de o usuário u acertar o exercício e é
+sigmoid(habilidade[u] - dificuldade[e]). O histórico é lido em blocos de
+chunk_size respostas, convertidos em arrays do NumPy, e cada bloco é somado
+por exercício e por usuário com np.bincount. A memória usada depende apenas
+do número de exercícios e de usuários, não do tamanho do histórico. Cada
+passada pelo histórico aplica um passo de Newton a todos os parâmetros, com
+uma priori normal que mantém estáveis os exercícios e usuários com poucas
+respostas.
+
+Na primeira passada também é montado um histograma logarítmico de
+time_to_answer por exercício, de onde saem os percentis 50 e 90.
+"""
+
+from itertools import islice
+
+import numpy as np
+from django.db import connection, transaction
+from django.db.models import FloatField, Max, Q, Value
+from django.db.models.fields.json import KeyTextTransform
+from django.db.models.functions import Cast, Coalesce
+
+from exako.apps.exercise.models import Exercise, ExerciseHistory, UserProgress
+from exako.apps.user.models import User
+
+EPOCHS = 10
+MIN_ANSWERS = 20
+PRIOR = 1.0
+MAX_STEP = 1.0
+TIME_BINS = 64
+TIME_EDGES = np.geomspace(1, 10**5, TIME_BINS + 1)
+
+UPDATE_EXERCISES_SQL = f"""
+    UPDATE {Exercise._meta.db_table} e
+    SET difficulty = v.difficulty,
+        time_to_answer_p50 = v.p50,
+        time_to_answer_p90 = v.p90
+    FROM unnest(%s::bigint[], %s::float8[], %s::float8[], %s::float8[])
+        AS v(id, difficulty, p50, p90)
+    WHERE e.id = v.id
+"""
+
+UPDATE_USERS_SQL = f"""
+    UPDATE {UserProgress._meta.db_table} p
+    SET ability = v.ability
+    FROM unnest(%s::bigint[], %s::float8[]) AS v(user_id, ability)
+    WHERE p.user_id = v.user_id
+"""
+
+
+def _sigmoid(x):
+    return 1 / (1 + np.exp(-x))
+
+
+def _chunks(chunk_size):
+    """Percorre o histórico em blocos de arrays (exercício, usuário, acerto, tempo)."""
+    time_to_answer = Cast(KeyTextTransform('time_to_answer', 'request'), FloatField())
+    rows = (
+        ExerciseHistory.objects.order_by()
+        .values_list(
+            'exercise_id', 'user_id', 'correct', Coalesce(time_to_answer, Value(0.0))
+        )
+        .iterator(chunk_size=chunk_size)
+    )
+    while chunk := list(islice(rows, chunk_size)):
+        array = np.array(chunk, dtype=np.float64)
+        yield (
+            array[:, 0].astype(np.int64),
+            array[:, 1].astype(np.int64),
+            array[:, 2],
+            array[:, 3],
+        )
+
+
+def _percentile(histogram, q):
+    """Percentil q de cada linha de histogram, no centro geométrico da faixa."""
+    cumulative = histogram.cumsum(axis=1)
+    total = cumulative[:, -1]
+    index = (cumulative < q * total[:, None]).sum(axis=1).clip(max=TIME_BINS - 1)
+    values = np.sqrt(TIME_EDGES[index] * TIME_EDGES[index + 1])
+    return np.where(total > 0, values, np.nan)
+
+
+def _nullable(values):
+    return [None if np.isnan(value) else float(value) for value in values]
+
+
+def fit(chunk_size=100_000, epochs=EPOCHS):
+    """
+    Estima a dificuldade de cada exercício e a habilidade de cada usuário.
+    Retorna (dificuldade, habilidade, respostas por exercício, respostas por
+    usuário, histograma de tempos), indexados pelo id.
+    """
+    n_exercises = (Exercise.objects.aggregate(max_id=Max('id'))['max_id'] or 0) + 1
+    n_users = (User.objects.aggregate(max_id=Max('id'))['max_id'] or 0) + 1
+    difficulty = np.zeros(n_exercises)
+    ability = np.zeros(n_users)
+    exercise_answers = np.zeros(n_exercises, dtype=np.int64)
+    user_answers = np.zeros(n_users, dtype=np.int64)
+    times = np.zeros(n_exercises * TIME_BINS, dtype=np.uint32)
+
+    for epoch in range(epochs):
+        exercise_gradient = np.zeros(n_exercises)
+        exercise_weight = np.zeros(n_exercises)
+        user_gradient = np.zeros(n_users)
+        user_weight = np.zeros(n_users)
+
+        for exercise_ids, user_ids, corrects, time_to_answer in _chunks(chunk_size):
+            p = _sigmoid(ability[user_ids] - difficulty[exercise_ids])
+            residual = corrects - p
+            weight = p * (1 - p)
+            user_gradient += np.bincount(user_ids, residual, n_users)
+            user_weight += np.bincount(user_ids, weight, n_users)
+            exercise_gradient -= np.bincount(exercise_ids, residual, n_exercises)
+            exercise_weight += np.bincount(exercise_ids, weight, n_exercises)
+
+            if epoch == 0:
+                exercise_answers += np.bincount(exercise_ids, minlength=n_exercises)
+                user_answers += np.bincount(user_ids, minlength=n_users)
+                timed = time_to_answer > 0
+                bins = np.searchsorted(TIME_EDGES, time_to_answer[timed], side='right')
+                bins = (bins - 1).clip(0, TIME_BINS - 1)
+                times += np.bincount(
+                    exercise_ids[timed] * TIME_BINS + bins,
+                    minlength=n_exercises * TIME_BINS,
+                ).astype(np.uint32)
+
+        ability += np.clip(
+            (user_gradient - PRIOR * ability) / (user_weight + PRIOR),
+            -MAX_STEP,
+            MAX_STEP,
+        )
+        difficulty += np.clip(
+            (exercise_gradient - PRIOR * difficulty) / (exercise_weight + PRIOR),
+            -MAX_STEP,
+            MAX_STEP,
+        )
+
+    # 0 passa a ser a dificuldade média dos exercícios calibrados.
+    calibrated = exercise_answers >= MIN_ANSWERS
+    if calibrated.any():
+        shift = difficulty[calibrated].mean()
+        difficulty -= shift
+        ability -= shift
+
+    return (
+        difficulty,
+        ability,
+        exercise_answers,
+        user_answers,
+        times.reshape(n_exercises, TIME_BINS),
+    )
+
+
+def calibrate(chunk_size=100_000, epochs=EPOCHS, batch_size=10_000) -> dict:
+    """
+    Calibra os exercícios e usuários com fit() e grava difficulty,
+    time_to_answer_p50 e time_to_answer_p90 em Exercise e ability em
+    UserProgress. Exercícios com menos de MIN_ANSWERS respostas ficam sem
+    dificuldade. Retorna a quantidade de exercícios e usuários calibrados.
+    """
+    difficulty, ability, exercise_answers, user_answers, times = fit(chunk_size, epochs)
+    difficulty = np.where(exercise_answers >= MIN_ANSWERS, difficulty, np.nan)
+    p50 = _percentile(times, 0.5)
+    p90 = _percentile(times, 0.9)
+    exercise_ids = np.flatnonzero(exercise_answers)
+    user_ids = np.flatnonzero(user_answers)
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        Exercise.objects.filter(
+            Q(difficulty__isnull=False) | Q(time_to_answer_p50__isnull=False)
+        ).update(difficulty=None, time_to_answer_p50=None, time_to_answer_p90=None)
+        for start in range(0, len(exercise_ids), batch_size):
+            ids = exercise_ids[start : start + batch_size]
+            cursor.execute(
+                UPDATE_EXERCISES_SQL,
+                [
+                    ids.tolist(),
+                    _nullable(difficulty[ids]),
+                    _nullable(p50[ids]),
+                    _nullable(p90[ids]),
+                ],
+            )
+        for start in range(0, len(user_ids), batch_size):
+            ids = user_ids[start : start + batch_size]
+            cursor.execute(UPDATE_USERS_SQL, [ids.tolist(), ability[ids].tolist()])
+
+    return {
+        'exercises': int(np.count_nonzero(~np.isnan(difficulty))),
+        'users': len(user_ids),
+    }
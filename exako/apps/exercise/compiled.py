@@ -0,0 +1,113 @@
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from exako.apps.core.replicas import use_primary
+
+COMPILED_KEY = 'exercise:compiled:{exercise_id}'
+DEPENDENCY_KEY = 'exercise:dependency:{label}:{pk}'
+PARENT_FIELDS = ['term', 'term_example', 'term_lexical', 'term_definition']
+
+
+def _dependency_key(model, pk):
+    return DEPENDENCY_KEY.format(label=model._meta.label_lower, pk=pk)
+
+
+def _dependency_versions(keys):
+    versions = cache.get_many(keys)
+    missing = [key for key in keys if key not in versions]
+    if not missing:
+        return versions
+    for key in missing:
+        cache.add(key, uuid4().hex, timeout=None)
+    return cache.get_many(keys)
+
+
+def touch(instance):
+    """
+    Invalida os payloads compilados que dependem de instance ou de algum dos
+    objetos aos quais ela pertence (term, term_example, term_lexical...).
+    """
+    keys = [_dependency_key(type(instance), instance.pk)]
+    for field in instance._meta.concrete_fields:
+        if field.name not in PARENT_FIELDS or not field.is_relation:
+            continue
+        pk = getattr(instance, field.attname)
+        if pk is not None:
+            keys.append(_dependency_key(field.related_model, pk))
+
+    _bump(keys)
+
+
+def touch_many(model, pks):
+    """Invalida os payloads compilados que dependem dos objetos pks de model."""
+    _bump([_dependency_key(model, pk) for pk in pks])
+
+
+def _bump(keys):
+    transaction.on_commit(
+        lambda: cache.set_many({key: uuid4().hex for key in keys}, timeout=None)
+    )
+
+
+def get_or_compile(exercise_id, compile_func):
+    """
+    Retorna o payload compilado do exercício, compilando novamente somente
+    quando alguma das dependências registradas foi alterada.
+
+    compile_func deve retornar uma tupla (payload, dependencies), onde
+    dependencies é uma lista de pares (Model, pk).
+    """
+    key = COMPILED_KEY.format(exercise_id=exercise_id)
+    compiled = cache.get(key)
+    if compiled is not None:
+        versions = cache.get_many(list(compiled['dependencies']))
+        if versions == compiled['dependencies']:
+            return compiled['payload']
+
+    # Compilado a partir de uma réplica atrasada, o payload ficaria em cache
+    # com as versões novas das dependências.
+    with use_primary():
+        payload, dependencies = compile_func()
+    keys = list({_dependency_key(model, pk) for model, pk in dependencies})
+    cache.set(
+        key,
+        {'payload': payload, 'dependencies': _dependency_versions(keys)},
+        timeout=settings.EXERCISE_COMPILED_TIMEOUT,
+    )
+    return payload
+
+
+async def _adependency_versions(keys):
+    versions = await cache.aget_many(keys)
+    missing = [key for key in keys if key not in versions]
+    if not missing:
+        return versions
+    for key in missing:
+        await cache.aadd(key, uuid4().hex, timeout=None)
+    return await cache.aget_many(keys)
+
+
+async def aget_or_compile(exercise_id, compile_func):
+    """
+    Versão assíncrona de get_or_compile(), para compile_func assíncrona.
+    compile_func só é chamada quando o payload precisa ser compilado.
+    """
+    key = COMPILED_KEY.format(exercise_id=exercise_id)
+    compiled = await cache.aget(key)
+    if compiled is not None:
+        versions = await cache.aget_many(list(compiled['dependencies']))
+        if versions == compiled['dependencies']:
+            return compiled['payload']
+
+    with use_primary():
+        payload, dependencies = await compile_func()
+    keys = list({_dependency_key(model, pk) for model, pk in dependencies})
+    await cache.aset(
+        key,
+        {'payload': payload, 'dependencies': await _adependency_versions(keys)},
+        timeout=settings.EXERCISE_COMPILED_TIMEOUT,
+    )
+    return payload
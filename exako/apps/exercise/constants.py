@@ -1,4 +1,4 @@
-from django.db.models import IntegerChoices
+from django.db.models import IntegerChoices, TextChoices
 from django.utils.translation import gettext as _
 
 
@@ -44,6 +44,13 @@ class ExerciseSubType(IntegerChoices):
     TERM_LEXICAL_TERM_REF = 2, _('Term Lexical Term Reference')
 
 
+class SpeechJobStatus(TextChoices):
+    PENDING = 'pending', _('Pending')
+    RUNNING = 'running', _('Running')
+    DONE = 'done', _('Done')
+    FAILED = 'failed', _('Failed')
+
+
 ORDER_SENTENCE_HEADER = _('Reordene as palavras para formar a frase correta.')
 LISTEN_TERM_HEADER = _('Ouça o termo e digite exatamente o que você ouviu.')
 LISTEN_SENTENCE_HEADER = _('Ouça a frase e digite exatamente o que você ouviu.')
@@ -68,4 +75,6 @@ TERM_CONNECTION_HEADER = _(
 
 CORRECT_FEEDBACK = _('Parabéns, você acertou!')
 INCORRECT_FEEDBACK = _('Você errou!')
-INCORRECT_FEEDBACK_CORRECT_ANSWER = _('Você errou, a resposta correta era: {answer}.')
\ No newline at end of file
+INCORRECT_FEEDBACK_CORRECT_ANSWER = _('Você errou, a resposta correta era: {answer}.')
+
+ANSWER_NORMALIZATION_VERSION = 1
@@ -0,0 +1,143 @@
+"""
+Cobertura dos termos para a criação de exercícios.
+
+TermCoverage guarda, por termo, os recursos exigidos pelas validações dos
+exercícios (pronúncia com áudio, imagem, exemplos com destaque, rimas com
+áudio e definições) e os tipos de exercício que já existem sobre ele. As
+linhas são recalculadas por refresh() a cada alteração, de forma que a busca
+pelos termos prontos para um tipo de exercício é um filtro sobre uma única
+tabela.
+"""
+
+from django.db import connection, models
+
+from exako.apps.exercise.constants import ExerciseType
+from exako.apps.exercise.models import Exercise, TermCoverage
+from exako.apps.term.constants import TermLexicalType
+from exako.apps.term.models import (
+    Term,
+    TermDefinition,
+    TermExampleLink,
+    TermImage,
+    TermLexical,
+    TermPronunciation,
+)
+
+TABLES = {
+    'coverage': TermCoverage._meta.db_table,
+    'exercise': Exercise._meta.db_table,
+    'term': Term._meta.db_table,
+    'link': TermExampleLink._meta.db_table,
+    'lexical': TermLexical._meta.db_table,
+    'pronunciation': TermPronunciation._meta.db_table,
+    'definition': TermDefinition._meta.db_table,
+    'image': TermImage._meta.db_table,
+}
+
+COLUMNS = [
+    'language',
+    'has_pronunciation',
+    'has_audio',
+    'has_image',
+    'example_count',
+    'rhyme_with_audio_count',
+    'definition_count',
+    'exercise_types',
+    'updated_at',
+]
+
+REFRESH_SQL = f"""
+    INSERT INTO {TABLES['coverage']} (term_id, {', '.join(COLUMNS)})
+    SELECT
+        t.id,
+        t.language,
+        EXISTS (SELECT 1 FROM {TABLES['pronunciation']} p WHERE p.term_id = t.id),
+        EXISTS (
+            SELECT 1 FROM {TABLES['pronunciation']} p
+            WHERE p.term_id = t.id AND p.audio_file IS NOT NULL
+        ),
+        EXISTS (SELECT 1 FROM {TABLES['image']} i WHERE i.term_id = t.id),
+        (
+            SELECT count(DISTINCT l.term_example_id) FROM {TABLES['link']} l
+            WHERE l.term_id = t.id
+        ),
+        (
+            SELECT count(*) FROM {TABLES['lexical']} x
+            JOIN {TABLES['pronunciation']} p
+                ON p.term_id = x.term_value_ref_id AND p.audio_file IS NOT NULL
+            WHERE x.term_id = t.id AND x.type = %(rhyme)s
+        ),
+        (SELECT count(*) FROM {TABLES['definition']} d WHERE d.term_id = t.id),
+        ARRAY(
+            SELECT DISTINCT e.type::integer FROM {TABLES['exercise']} e
+            WHERE e.term_id = t.id ORDER BY 1
+        ),
+        now()
+    FROM {TABLES['term']} t
+    WHERE t.id = ANY(%(ids)s)
+    ON CONFLICT (term_id) DO UPDATE SET
+        {', '.join(f'{column} = EXCLUDED.{column}' for column in COLUMNS)}
+"""
+
+# Recursos mínimos de um termo para cada tipo de exercício criado a partir
+# dele, de acordo com exercise.validators.
+READY = {
+    ExerciseType.LISTEN_TERM: models.Q(has_audio=True),
+    ExerciseType.LISTEN_TERM_MCHOICE: models.Q(
+        has_audio=True, rhyme_with_audio_count__gte=3
+    ),
+    ExerciseType.SPEAK_TERM: models.Q(has_audio=True),
+    ExerciseType.TERM_MCHOICE: models.Q(example_count__gte=1),
+    ExerciseType.TERM_DEFINITION_MCHOICE: models.Q(definition_count__gte=1),
+    ExerciseType.TERM_IMAGE_MCHOICE: models.Q(has_image=True, has_audio=True),
+    ExerciseType.TERM_IMAGE_MCHOICE_TEXT: models.Q(has_image=True),
+}
+
+
+def refresh(term_ids, rhymes=False) -> int:
+    """
+    Recalcula a cobertura dos termos em term_ids. Com rhymes, recalcula
+    também os termos que têm rimas apontando para term_ids.
+    """
+    term_ids = set(term_ids)
+    if rhymes and term_ids:
+        term_ids.update(
+            TermLexical.objects.filter(
+                type=TermLexicalType.RHYME, term_value_ref_id__in=term_ids
+            ).values_list('term_id', flat=True)
+        )
+    if not term_ids:
+        return 0
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            REFRESH_SQL,
+            {'ids': list(term_ids), 'rhyme': str(TermLexicalType.RHYME.value)},
+        )
+        return cursor.rowcount
+
+
+def refresh_exercises(exercise_ids) -> int:
+    """Recalcula a cobertura dos termos dos exercícios em exercise_ids."""
+    return refresh(
+        Exercise.objects.filter(id__in=list(exercise_ids), term__isnull=False)
+        .values_list('term_id', flat=True)
+        .distinct()
+    )
+
+
+def refresh_all(chunk_size=1000) -> int:
+    """Recalcula a cobertura de todos os termos."""
+    count, last_id = 0, 0
+    term_ids = Term.objects.order_by('id').values_list('id', flat=True)
+    while chunk := list(term_ids.filter(id__gt=last_id)[:chunk_size]):
+        count += refresh(chunk)
+        last_id = chunk[-1]
+    return count
+
+
+def ready_for(exercise_type: ExerciseType) -> models.Q:
+    """Termos com os recursos de exercise_type e ainda sem esse exercício."""
+    return READY.get(exercise_type, models.Q()) & ~models.Q(
+        exercise_types__contains=[exercise_type]
+    )
@@ -0,0 +1,202 @@
+"""
+Candidatos a distratores por termo.
+
+Para cada termo são reunidos, no mesmo idioma, os termos ortograficamente mais
+parecidos (distância de trigramas do pg_trgm, pelo índice GiST de Term) e os
+termos com definições da mesma classe gramatical e do mesmo nível. Cada
+candidato recebe uma pontuação, a similaridade somada a um bônus por classe
+gramatical e por nível em comum, e os melhores ficam gravados em
+DistractorCandidate. O gerador de exercícios e a compilação retiram os
+distratores dessa tabela.
+
+Alterações em termos e definições agendam, com schedule(), o recálculo do
+termo e dos seus vizinhos depois do commit, em segundo plano quando
+EXERCISE_DISTRACTORS_ASYNC está ligado, fora da requisição que salvou o termo.
+"""
+
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+
+from exako.apps.exercise import compiled
+from exako.apps.exercise.models import DistractorCandidate
+from exako.apps.term.constants import Language
+from exako.apps.term.models import Term, TermDefinition
+
+logger = logging.getLogger(__name__)
+
+CANDIDATES = 12
+POOL_SIZE = 4 * CANDIDATES
+PART_OF_SPEECH_WEIGHT = 0.5
+LEVEL_WEIGHT = 0.25
+
+TABLES = {
+    'candidate': DistractorCandidate._meta.db_table,
+    'term': Term._meta.db_table,
+    'definition': TermDefinition._meta.db_table,
+}
+
+REFRESH_SQL = f"""
+    INSERT INTO {TABLES['candidate']} (term_id, candidate_id, score, rank)
+    SELECT root.id, ranked.id, ranked.score, ranked.rank
+    FROM (
+        SELECT id, language, lower(expression) AS expression
+        FROM {TABLES['term']}
+        WHERE id = ANY(%(ids)s)
+    ) root
+    CROSS JOIN LATERAL (
+        SELECT scored.id, scored.score,
+            row_number() OVER (ORDER BY scored.score DESC, scored.id) AS rank
+        FROM (
+            SELECT pool.id,
+                similarity(lower(pool.expression), root.expression)
+                + CASE WHEN EXISTS (
+                    SELECT 1 FROM {TABLES['definition']} d
+                    JOIN {TABLES['definition']} rd
+                        ON rd.part_of_speech = d.part_of_speech
+                    WHERE d.term_id = pool.id AND rd.term_id = root.id
+                ) THEN %(part_of_speech_weight)s ELSE 0 END
+                + CASE WHEN EXISTS (
+                    SELECT 1 FROM {TABLES['definition']} d
+                    JOIN {TABLES['definition']} rd ON rd.level = d.level
+                    WHERE d.term_id = pool.id AND rd.term_id = root.id
+                ) THEN %(level_weight)s ELSE 0 END AS score
+            FROM (
+                (
+                    SELECT n.id, n.expression FROM {TABLES['term']} n
+                    WHERE n.language = root.language AND n.id <> root.id
+                    ORDER BY lower(n.expression) <-> root.expression
+                    LIMIT %(pool)s
+                )
+                UNION
+                (
+                    SELECT n.id, n.expression FROM {TABLES['term']} n
+                    JOIN {TABLES['definition']} d ON d.term_id = n.id
+                    JOIN {TABLES['definition']} rd
+                        ON rd.term_id = root.id
+                        AND rd.part_of_speech = d.part_of_speech
+                        AND rd.level = d.level
+                    WHERE n.language = root.language AND n.id <> root.id
+                    ORDER BY lower(n.expression) <-> root.expression
+                    LIMIT %(pool)s
+                )
+            ) pool
+        ) scored
+        ORDER BY scored.score DESC, scored.id
+        LIMIT %(size)s
+    ) ranked
+"""
+
+
+def refresh(term_ids, reciprocal=False) -> int:
+    """
+    Recalcula os candidatos dos termos em term_ids. Com reciprocal, recalcula
+    também os candidatos dos novos candidatos, que passam a considerar os
+    termos de term_ids. Retorna a quantidade de candidatos gravados.
+    """
+    term_ids = list(term_ids)
+    if not term_ids:
+        return 0
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {TABLES["candidate"]} WHERE term_id = ANY(%s)', [term_ids]
+        )
+        cursor.execute(
+            REFRESH_SQL,
+            {
+                'ids': term_ids,
+                'pool': POOL_SIZE,
+                'size': CANDIDATES,
+                'part_of_speech_weight': PART_OF_SPEECH_WEIGHT,
+                'level_weight': LEVEL_WEIGHT,
+            },
+        )
+        count = cursor.rowcount
+    # Os payloads completados por complete_distractors() dependem dos
+    # candidatos do termo.
+    compiled.touch_many(DistractorCandidate, term_ids)
+
+    if reciprocal:
+        neighbours = (
+            DistractorCandidate.objects.filter(term_id__in=term_ids)
+            .exclude(candidate_id__in=term_ids)
+            .values_list('candidate_id', flat=True)
+            .distinct()
+        )
+        count += refresh(neighbours)
+    return count
+
+
+_executor = None
+
+
+def get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        # Um único worker: recálculos simultâneos dos mesmos vizinhos
+        # disputariam as mesmas linhas de DistractorCandidate.
+        _executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix='exercise-distractors'
+        )
+    return _executor
+
+
+def _refresh_safely(term_id):
+    try:
+        refresh([term_id], reciprocal=True)
+    except Exception:
+        logger.exception('Failed to refresh distractors of term %s.', term_id)
+
+
+def _run(term_id):
+    try:
+        _refresh_safely(term_id)
+    finally:
+        close_old_connections()
+
+
+def schedule(term_id):
+    """
+    Recalcula os candidatos de term_id e dos seus vizinhos depois do commit,
+    em segundo plano, ou logo após o commit quando EXERCISE_DISTRACTORS_ASYNC
+    está desligado.
+    """
+    if not settings.EXERCISE_DISTRACTORS_ASYNC:
+        transaction.on_commit(lambda: _refresh_safely(term_id))
+        return
+    transaction.on_commit(lambda: get_executor().submit(_run, term_id))
+
+
+def refresh_all(languages=None, chunk_size=1000) -> int:
+    """Recalcula os candidatos de todos os termos dos idiomas pedidos."""
+    count = 0
+    for language in languages or Language.values:
+        term_ids = Term.objects.filter(language=language).order_by('id')
+        last_id = 0
+        while chunk := list(
+            term_ids.filter(id__gt=last_id).values_list('id', flat=True)[:chunk_size]
+        ):
+            count += refresh(chunk)
+            last_id = chunk[-1]
+    return count
+
+
+def complete_distractors(term_id, distractors, minimum, exclude=()) -> dict:
+    """
+    Completa distractors (id -> expressão) com os melhores candidatos de
+    term_id até que haja pelo menos minimum distratores.
+    """
+    missing = minimum - len(distractors)
+    if missing <= 0:
+        return distractors
+
+    candidates = (
+        DistractorCandidate.objects.filter(term_id=term_id)
+        .exclude(candidate_id__in=[*distractors, *exclude])
+        .order_by('rank')
+        .values_list('candidate_id', 'candidate__expression')[:missing]
+    )
+    return {**distractors, **dict(candidates)}
@@ -1,24 +1,52 @@
+import hashlib
+import hmac
+import json
 import re
 import string
 from abc import ABC, abstractmethod
 from functools import cached_property
-from random import randint, sample, shuffle
-
-from django.db.models import OuterRef, Subquery
-from django.db.models.functions import Random
-from django.shortcuts import get_object_or_404, render
+from random import Random
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.postgres.expressions import ArraySubquery
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+from django.db.models import OuterRef, Q, Subquery
+from django.http import Http404, HttpResponse
+from django.shortcuts import aget_object_or_404, get_object_or_404, render
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
 from django.utils.translation import gettext as _
-from ninja import Field, File, Router, Schema, UploadedFile
+from ninja import Field, File, Query, Router, Schema, UploadedFile
+from ninja.errors import ValidationError
+from pydantic import BaseModel
+from pydantic import ValidationError as PydanticValidationError
 from pydantic import create_model
 
 from exako.apps.core.schema import NotAuthenticated, NotFound
-from exako.apps.exercise import constants
-from exako.apps.exercise.api.schema import ExerciseResponse
+from exako.apps.exercise import (
+    compiled,
+    constants,
+    history,
+    progress,
+    recent,
+    scheduler,
+    speech,
+)
+from exako.apps.exercise.api.schema import ExerciseResponse, SpeechJobView
 from exako.apps.exercise.constants import ExerciseSubType, ExerciseType
+from exako.apps.exercise.distractors import complete_distractors
+from exako.apps.exercise.models import DistractorCandidate
 from exako.apps.exercise.models import Exercise as ExerciseModel
-from exako.apps.exercise.models import ExerciseHistory
+from exako.apps.exercise.models import (
+    ExerciseAnswerKey,
+    ExerciseConnection,
+    ExerciseHistory,
+)
 from exako.apps.term.constants import TermLexicalType
 from exako.apps.term.models import (
+    PronunciationAudio,
     Term,
     TermDefinition,
     TermExampleLink,
@@ -26,41 +54,185 @@ from exako.apps.term.models import (
     TermLexical,
     TermPronunciation,
 )
+from exako.apps.user.auth.token import AsyncAuthBearer
 from exako.apps.user.models import User
 
 
-def _shuffle_dict(dict_):
+def _shuffle_dict(dict_, random: Random):
     dict_ = list(dict_.items())
-    shuffle(dict_)
+    random.shuffle(dict_)
     return dict(dict_)
 
 
+def _sample(population, k: int, random: Random) -> list:
+    """
+    Sorteia até k itens. O conjunto compilado pode ter menos itens que o
+    esperado, por exemplo depois da remoção de um termo.
+    """
+    population = list(population)
+    return random.sample(population, min(k, len(population)))
+
+
 def _camel_to_snake(name):
     pattern = re.compile(r'(?<!^)(?<![A-Z])(?=[A-Z])')
     return pattern.sub('_', name).lower()
 
 
+_PUNCTUATION_TABLE = str.maketrans('', '', string.punctuation)
+
+
 def _normalize_text(text):
-    return text.lower().translate(str.maketrans('', '', string.punctuation)).strip()
+    return text.lower().translate(_PUNCTUATION_TABLE).strip()
+
+
+def _hash_answer(normalized_answer):
+    value = json.dumps(normalized_answer, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(value.encode()).hexdigest()
+
+
+def _etag(payload):
+    value = json.dumps(payload, sort_keys=True, cls=DjangoJSONEncoder)
+    return quote_etag(hashlib.md5(value.encode()).hexdigest())
+
+
+EXERCISE_BASE_FIELDS = (
+    'id',
+    'type',
+    'language',
+    'level',
+    'additional_content',
+    'term',
+    'term_example',
+    'term_pronunciation',
+    'term_lexical',
+    'term_definition',
+    'term_image',
+)
+
+ANSWER_KEY_FIELDS = (
+    'type',
+    'correct_answer',
+    'normalized_answer',
+    'answer_hash',
+    'exercise__type',
+    'exercise__language',
+    'exercise__level',
+)
 
 
 class Exercise(ABC):
     html_template: str
+    header_template: str
     exercise: ExerciseModel
     exercise_type: ExerciseType
     title: str
     description: str
     short_description: str
+    answer_field: str
+    select_related: tuple[str, ...] = ()
+    only: tuple[str, ...] = ()
+    seed: int | None = None
+    check_responses: dict = {200: ExerciseResponse}
+    answer_schema: type[BaseModel] | None = None
 
-    def __init__(self, exercise_id: int):
-        self.exercise = get_object_or_404(
-            ExerciseModel,
-            id=exercise_id,
-            type=self.exercise_type,
+    def __init__(self, exercise_id: int, seed: int | None = None):
+        self.exercise = get_object_or_404(self.get_queryset(), id=exercise_id)
+        self.seed = seed
+
+    @classmethod
+    async def aload(cls, exercise_id: int, seed: int | None = None):
+        """
+        Versão assíncrona do construtor. Carrega o exercício e o payload
+        compilado sem bloquear o event loop; depois disso build() não faz
+        consultas ao banco.
+        """
+        instance = cls.__new__(cls)
+        instance.exercise = await aget_object_or_404(cls.get_queryset(), id=exercise_id)
+        instance.seed = seed
+        instance.__dict__['compiled'] = await compiled.aget_or_compile(
+            instance.exercise.id,
+            sync_to_async(instance._compile_with_dependencies),
         )
+        return instance
 
-    def render_template(self, request, **extra):
-        build = self.build()
+    @cached_property
+    def random(self) -> Random:
+        """
+        Gerador usado em todos os sorteios do build(). Com o mesmo seed e o
+        mesmo conteúdo, o build() retorna sempre o mesmo payload.
+        """
+        return Random(self.seed)
+
+    @classmethod
+    def from_model(cls, exercise: ExerciseModel):
+        instance = cls.__new__(cls)
+        instance.exercise = exercise
+        return instance
+
+    @classmethod
+    def from_answer_key(cls, exercise_id: int):
+        """
+        Instancia o exercício somente com a chave de resposta, suficiente para
+        check(). Exercícios sem chave são carregados por completo e a chave é
+        gerada nesse momento.
+        """
+        answer_key = (
+            ExerciseAnswerKey.objects.filter(
+                exercise_id=exercise_id,
+                type=cls.exercise_type,
+                normalization_version=constants.ANSWER_NORMALIZATION_VERSION,
+            )
+            .select_related('exercise')
+            .only(*ANSWER_KEY_FIELDS)
+            .first()
+        )
+        if answer_key is None:
+            instance = cls(exercise_id)
+            instance.answer_key.save()
+            return instance
+        return cls.with_answer_key(answer_key)
+
+    @classmethod
+    def with_answer_key(cls, answer_key: ExerciseAnswerKey):
+        if ExerciseAnswerKey.exercise.is_cached(answer_key):
+            exercise = answer_key.exercise
+        else:
+            exercise = ExerciseModel(id=answer_key.exercise_id, type=cls.exercise_type)
+        instance = cls.from_model(exercise)
+        instance.__dict__['answer_key'] = answer_key
+        instance.__dict__['correct_answer'] = answer_key.correct_answer
+        return instance
+
+    @classmethod
+    def get_queryset(cls):
+        """
+        Carrega o exercício com as relações usadas por build() e check() em uma
+        única consulta, conforme select_related/only declarados em cada tipo.
+        """
+        return (
+            ExerciseModel.objects.filter(type=cls.exercise_type)
+            .select_related(*cls.select_related)
+            .only(*EXERCISE_BASE_FIELDS, *cls.only)
+        )
+
+    @classmethod
+    def metadata(cls) -> dict:
+        """
+        Textos fixos do tipo de exercício, servidos uma única vez pelo
+        endpoint de tipos em vez de repetidos em cada build().
+        """
+        return {
+            'type': cls.exercise_type,
+            'title': cls.title,
+            'short_description': cls.short_description,
+            'description': cls.description,
+            'header_template': cls.header_template,
+            'icon': constants.exercises_emoji_map.get(cls.exercise_type),
+        }
+
+    def render_template(self, request, build=None, **extra):
+        if build is None:
+            build = self.build()
         response = {
             key: value
             for key, value in build.items()
@@ -72,6 +244,30 @@ class Exercise(ABC):
             context={**build, **extra, 'response': response},
         )
 
+    def compile(self) -> tuple[dict, list]:
+        """
+        Calcula a parte do build() que não depende de sorteio: conjuntos de
+        alternativas, textos e URLs. Retorna o payload e a lista de pares
+        (Model, pk) dos quais ele depende.
+        """
+        return {}, []
+
+    def _compile_with_dependencies(self) -> tuple[dict, list]:
+        payload, dependencies = self.compile()
+        dependencies.append((ExerciseModel, self.exercise.id))
+        dependencies.extend(
+            (field.related_model, getattr(self.exercise, field.attname))
+            for field in ExerciseModel._meta.concrete_fields
+            if field.is_relation and getattr(self.exercise, field.attname)
+        )
+        return payload, dependencies
+
+    @cached_property
+    def compiled(self) -> dict:
+        return compiled.get_or_compile(
+            self.exercise.id, self._compile_with_dependencies
+        )
+
     @abstractmethod
     def build(self) -> dict:
         pass
@@ -81,9 +277,46 @@ class Exercise(ABC):
     def correct_answer(self):
         pass
 
-    @abstractmethod
+    @staticmethod
+    def normalize_answer(answer):
+        return str(answer)
+
+    @cached_property
+    def answer_key(self) -> ExerciseAnswerKey:
+        normalized_answer = self.normalize_answer(self.correct_answer)
+        return ExerciseAnswerKey(
+            exercise_id=self.exercise.id,
+            type=self.exercise_type,
+            correct_answer=self.correct_answer,
+            normalized_answer=normalized_answer,
+            answer_hash=_hash_answer(normalized_answer),
+            normalization_version=constants.ANSWER_NORMALIZATION_VERSION,
+        )
+
     def assert_answer(self, answer: dict) -> bool:
-        pass
+        normalized_answer = self.normalize_answer(answer[self.answer_field])
+        return hmac.compare_digest(
+            _hash_answer(normalized_answer), self.answer_key.answer_hash
+        )
+
+    @classmethod
+    def rescore_sql(cls) -> tuple[str, str] | None:
+        """
+        Condição e resultado em SQL equivalentes a assert_answer, sobre a
+        resposta h.response do histórico e a chave k.normalized_answer, usados
+        por rescore_history() em um UPDATE ... FROM. None quando a correção só
+        é exata em Python.
+        """
+        if cls.normalize_answer is _normalize_text:
+            # O lower() do Postgres depende do LC_CTYPE do banco e o btrim()
+            # não remove todos os espaços Unicode que str.strip() remove: as
+            # respostas em texto livre são corrigidas em Python.
+            return None
+        return (
+            f"h.response ? '{cls.answer_field}'",
+            f"COALESCE(h.response ->> '{cls.answer_field}' "
+            f"= k.normalized_answer #>> '{{}}', false)",
+        )
 
     def get_correct_feedback(self):
         return constants.CORRECT_FEEDBACK
@@ -97,40 +330,88 @@ class Exercise(ABC):
             'correct': correct,
             'correct_answer': self.correct_answer,
         }
-        ExerciseHistory.objects.create(
+        history.record(
             exercise=self.exercise,
             user=user,
             correct=correct,
             response={**answer, **check_response},
             request=exercise_request,
         )
+        answers = [
+            {
+                'exercise': self.exercise,
+                'correct': correct,
+                'time_to_answer': exercise_request.get('time_to_answer'),
+            }
+        ]
+        progress.update(user, answers)
+        scheduler.review(user, answers)
+        recent.add(user, [self.exercise.id])
         feedback = self.get_correct_feedback if correct else self.get_incorrect_feedback
-        check_response.update(feedback=feedback)
+        check_response.update(feedback=feedback())
         return check_response
 
     @classmethod
     def _generate_build_endpoint(cls, exercise_schema: type[Schema]):
-        def build_endpoint(request, exercise_id: int):
-            exercise = cls(exercise_id)
-            return exercise_schema(**exercise.build())
+        async def build_endpoint(
+            request,
+            response: HttpResponse,
+            exercise_id: int,
+            compact: bool = Query(
+                default=False,
+                description='Omitir o título e a descrição, informando apenas o tipo do exercício. Os textos de cada tipo estão em /types.',
+            ),
+            seed: int | None = Query(
+                default=None,
+                ge=0,
+                description='Com o mesmo seed, o exercício é montado sempre da mesma forma e a resposta pode ser guardada em cache.',
+            ),
+        ):
+            exercise = await cls.aload(exercise_id, seed=seed)
+            build = exercise.build()
+            if compact:
+                del build['title'], build['description']
+                build['type'] = cls.exercise_type
+            # O dict mantém somente os campos preenchidos para exclude_unset.
+            payload = exercise_schema(**build).model_dump(exclude_unset=True)
+            if seed is None:
+                return payload
+
+            etag = _etag(payload)
+            not_modified = get_conditional_response(request, etag=etag)
+            if not_modified is not None:
+                not_modified['ETag'] = etag
+                return not_modified
+            response['ETag'] = etag
+            # O endpoint exige autenticação: somente o cache do cliente guarda
+            # a resposta, nunca um cache compartilhado.
+            patch_cache_control(
+                response,
+                private=True,
+                max_age=int(settings.EXERCISE_BUILD_CACHE_TIMEOUT),
+            )
+            return payload
 
         return build_endpoint
 
     @classmethod
-    def _generate_check_endpoint(cls, CheckSchema: type[Schema], **answer_fields):
+    def _generate_answer_schema(cls, **answer_fields) -> type[BaseModel]:
         field_definitions = dict()
         for field, field_info in answer_fields.items():
             if not isinstance(field_info, tuple):
                 field_info = (field_info, ...)
             field_definitions[field] = field_info
-        AnswerSchema = create_model(
+        return create_model(
             f'AnswerSchema{cls.__name__}',
             **field_definitions,
         )
+
+    @classmethod
+    def _generate_check_endpoint(cls, CheckSchema: type[Schema]):
         CheckSchema = create_model(
             f'CheckSchema{cls.__name__}',
             __base__=CheckSchema,
-            answer=(AnswerSchema, ...),
+            answer=(cls.answer_schema, ...),
         )
 
         def check_endpoint(
@@ -138,7 +419,7 @@ class Exercise(ABC):
             exercise_id: int,
             answer: CheckSchema,  # pyright: ignore[reportInvalidTypeForm]
         ):
-            exercise = cls(exercise_id)
+            exercise = cls.from_answer_key(exercise_id)
             return ExerciseResponse(
                 **exercise.check(
                     request.user,
@@ -168,6 +449,8 @@ class Exercise(ABC):
             description=cls.description,
             url_name=_camel_to_snake(cls.__name__),
             operation_id=cls.__name__,
+            exclude_unset=True,
+            auth=AsyncAuthBearer(),
         )(cls._generate_build_endpoint(ExerciseSchema))
 
         CheckSchema = create_model(
@@ -176,24 +459,31 @@ class Exercise(ABC):
             **{
                 name: (field.annotation, field)
                 for name, field in ExerciseSchema.model_fields.items()
-                if name not in {'title', 'description'}
+                if name not in {'type', 'title', 'description'}
             },
         )
+        # Também usado pelo check_batch para validar cada resposta do lote.
+        cls.answer_schema = cls._generate_answer_schema(**answer_fields)
         router.post(
             path=path,
             response={
-                200: ExerciseResponse,
+                **cls.check_responses,
                 401: NotAuthenticated,
                 404: NotFound,
             },
             url_name=f'check_{_camel_to_snake(cls.__name__)}',
             operation_id=f'check_{cls.__name__}',
-        )(cls._generate_check_endpoint(CheckSchema, **answer_fields))
+        )(cls._generate_check_endpoint(CheckSchema))
 
 
 class OrderSentenceExercise(Exercise):
     exercise_type = ExerciseType.ORDER_SENTENCE
     html_template = 'exercise/exercises/order_sentence.html'
+    header_template = constants.ORDER_SENTENCE_HEADER
+    answer_field = 'sentence'
+    normalize_answer = staticmethod(_normalize_text)
+    select_related = ('term_example',)
+    only = ('term_example__example',)
     title = _('Reordenar frases')
     short_description = _('Aprenda a estruturar frases corretamente')
     description = _("""
@@ -205,38 +495,42 @@ class OrderSentenceExercise(Exercise):
         2. O usuário deve tentar reordenar as palavras da frase para formar uma frase lógica.
     """)
 
+    def compile(self) -> tuple[dict, list]:
+        distractors = dict(
+            self.exercise.distractors.filter(term__isnull=False).values_list(
+                'term_id', 'term__expression'
+            )
+        )
+        return (
+            {'distractors': list(distractors.values())},
+            [(Term, id_) for id_ in distractors],
+        )
+
     def _get_distractors(self, min_distractors=0):
-        distractors_dict = self.exercise.additional_content.get('distractors', {})
-        distractors_list = distractors_dict.get('term', [])
-        number_of_distractors = randint(min_distractors, len(distractors_list))
-        distractors = list(sample(distractors_list, number_of_distractors))
-        return list(
-            Term.objects.filter(id__in=distractors).values_list('expression', flat=True)
+        distractors_list = self.compiled['distractors']
+        number_of_distractors = self.random.randint(
+            min(min_distractors, len(distractors_list)), len(distractors_list)
         )
+        return list(self.random.sample(distractors_list, number_of_distractors))
 
     def build(self) -> dict:
         sentence = self.correct_answer
         sentence_parts = sentence.split()
 
         sentence_parts += self._get_distractors()
-        shuffle(sentence_parts)
+        self.random.shuffle(sentence_parts)
 
         return {
             'sentence': sentence_parts,
             'title': self.title,
             'description': self.description,
-            'header': constants.ORDER_SENTENCE_HEADER,
+            'header': self.header_template,
         }
 
     @cached_property
     def correct_answer(self):
         return self.exercise.term_example.example
 
-    def assert_answer(self, answer: dict) -> bool:
-        sentence = _normalize_text(answer['sentence'])
-        correct_answer = _normalize_text(self.correct_answer)
-        return sentence == correct_answer
-
     def get_incorrect_feedback(self):
         return constants.INCORRECT_FEEDBACK_CORRECT_ANSWER.format(
             answer=self.correct_answer
@@ -246,6 +540,21 @@ class OrderSentenceExercise(Exercise):
 class ListenTermExercise(Exercise):
     exercise_type = ExerciseType.LISTEN_TERM
     html_template = 'exercise/exercises/listen.html'
+    header_template = constants.LISTEN_TERM_HEADER
+    answer_field = 'expression'
+    normalize_answer = staticmethod(_normalize_text)
+    select_related = (
+        'term',
+        'term_pronunciation',
+        'term_lexical__term_value_ref',
+    )
+    only = (
+        'term__expression',
+        'term_pronunciation__audio_file',
+        'term_pronunciation__audio',
+        'term_lexical__value',
+        'term_lexical__term_value_ref__expression',
+    )
     title = _('Escutar termo')
     short_description = _('Aprimore sua compreensão auditiva')
     description = _("""
@@ -261,10 +570,10 @@ class ListenTermExercise(Exercise):
 
     def build(self) -> dict:
         return {
-            'audio_file': self.exercise.term_pronunciation.audio_file,
+            'audio_file': self.exercise.term_pronunciation.audio_url,
             'title': self.title,
             'description': self.description,
-            'header': constants.LISTEN_TERM_HEADER,
+            'header': self.header_template,
         }
 
     @cached_property
@@ -278,11 +587,6 @@ class ListenTermExercise(Exercise):
             text = self.exercise.term.expression
         return text
 
-    def assert_answer(self, answer: dict) -> bool:
-        sentence = _normalize_text(answer['expression'])
-        correct_answer = _normalize_text(self.correct_answer)
-        return sentence == correct_answer
-
     def get_incorrect_feedback(self):
         return constants.INCORRECT_FEEDBACK_CORRECT_ANSWER.format(
             answer=self.correct_answer
@@ -292,6 +596,14 @@ class ListenTermExercise(Exercise):
 class ListenTermMChoiceExercise(Exercise):
     exercise_type = ExerciseType.LISTEN_TERM_MCHOICE
     html_template = 'exercise/exercises/listen_mchoice.html'
+    header_template = constants.LISTEN_MCHOICE_HEADER
+    answer_field = 'term_id'
+    select_related = ('term', 'term_pronunciation')
+    only = (
+        'term__expression',
+        'term_pronunciation__audio_file',
+        'term_pronunciation__audio',
+    )
     title = _('Escutar termos similares')
     short_description = _('Diferencie termos semelhantes pela audição')
     description = _("""
@@ -305,53 +617,58 @@ class ListenTermMChoiceExercise(Exercise):
         3. Selecione a alternativa que corresponde ao termo pronunciado.
     """)
 
-    def build(self) -> dict:
-        choices = dict()
-        choices[self.correct_answer] = self.exercise.term_pronunciation.audio_file
-        choices_rhymes = (
-            TermLexical.objects.filter(
+    def compile(self) -> tuple[dict, list]:
+        pronunciations = TermPronunciation.objects.filter(
+            term_id=OuterRef('term_value_ref_id')
+        )
+        rhymes = {
+            term_id: PronunciationAudio.url_for(audio_id) if audio_id else audio_file
+            for term_id, audio_file, audio_id in TermLexical.objects.filter(
                 term_id=self.exercise.term_id,
                 type=TermLexicalType.RHYME,
                 term_value_ref__isnull=False,
             )
-            .select_related('term_value_ref')
-            .annotate(random_order=Random())
             .annotate(
-                audio_file=Subquery(
-                    TermPronunciation.objects.filter(
-                        term_id=OuterRef('term_value_ref_id')
-                    ).values('audio_file')
-                )
-            )
-            .order_by('random_order')[:3]
-            .values_list(
-                'term_value_ref_id',
-                'audio_file',
+                audio_file=Subquery(pronunciations.values('audio_file')),
+                audio_id=Subquery(pronunciations.values('audio_id')),
             )
+            .values_list('term_value_ref_id', 'audio_file', 'audio_id')
+        }
+        return {'rhymes': rhymes}, [(Term, id_) for id_ in rhymes]
+
+    def build(self) -> dict:
+        choices = dict()
+        choices[self.correct_answer] = self.exercise.term_pronunciation.audio_url
+        rhymes = self.compiled['rhymes']
+        choices.update(
+            {term_id: rhymes[term_id] for term_id in _sample(rhymes, 3, self.random)}
         )
-        choices.update({term_id: audio_file for term_id, audio_file in choices_rhymes})
-        choices = _shuffle_dict(choices)
+        choices = _shuffle_dict(choices, self.random)
 
         return {
             'choices': choices,
             'title': self.title,
             'description': self.description,
-            'header': constants.LISTEN_MCHOICE_HEADER.format(
-                term=self.exercise.term.expression
-            ),
+            'header': self.header_template.format(term=self.exercise.term.expression),
         }
 
     @cached_property
     def correct_answer(self):
         return self.exercise.term_id
 
-    def assert_answer(self, answer: dict) -> bool:
-        return answer['term_id'] == self.correct_answer
-
 
 class ListenSentenceExercise(Exercise):
     exercise_type = ExerciseType.LISTEN_SENTENCE
     html_template = 'exercise/exercises/listen.html'
+    header_template = constants.LISTEN_SENTENCE_HEADER
+    answer_field = 'sentence'
+    normalize_answer = staticmethod(_normalize_text)
+    select_related = ('term_example', 'term_pronunciation')
+    only = (
+        'term_example__example',
+        'term_pronunciation__audio_file',
+        'term_pronunciation__audio',
+    )
     title = _('Escutar frase')
     short_description = _('Melhore sua compreensão de frases')
     description = _("""
@@ -367,21 +684,16 @@ class ListenSentenceExercise(Exercise):
 
     def build(self) -> dict:
         return {
-            'audio_file': self.exercise.term_pronunciation.audio_file,
+            'audio_file': self.exercise.term_pronunciation.audio_url,
             'title': self.title,
             'description': self.description,
-            'header': constants.LISTEN_SENTENCE_HEADER,
+            'header': self.header_template,
         }
 
     @cached_property
     def correct_answer(self):
         return self.exercise.term_example.example
 
-    def assert_answer(self, answer: dict) -> bool:
-        sentence = _normalize_text(answer['sentence'])
-        correct_answer = _normalize_text(self.correct_answer)
-        return sentence == correct_answer
-
     def get_incorrect_feedback(self):
         return constants.INCORRECT_FEEDBACK_CORRECT_ANSWER.format(
             answer=self.correct_answer
@@ -391,6 +703,22 @@ class ListenSentenceExercise(Exercise):
 class SpeakTermExercise(Exercise):
     exercise_type = ExerciseType.SPEAK_TERM
     html_template = 'exercise/exercises/speak.html'
+    header_template = constants.SPEAK_TERM_HEADER
+    answer_field = 'audio'
+    check_responses = {202: SpeechJobView}
+    select_related = (
+        'term',
+        'term_pronunciation',
+        'term_lexical__term_value_ref',
+    )
+    only = (
+        'term__expression',
+        'term_pronunciation__audio_file',
+        'term_pronunciation__audio',
+        'term_pronunciation__phonetic',
+        'term_lexical__value',
+        'term_lexical__term_value_ref__expression',
+    )
     title = _('Falar termo')
     short_description = _('Pratique a pronúncia correta de termos')
     description = _("""
@@ -406,11 +734,11 @@ class SpeakTermExercise(Exercise):
 
     def build(self) -> dict:
         return {
-            'audio_file': self.exercise.term_pronunciation.audio_file,
+            'audio_file': self.exercise.term_pronunciation.audio_url,
             'phonetic': self.exercise.term_pronunciation.phonetic,
             'title': self.title,
             'description': self.description,
-            'header': constants.SPEAK_TERM_HEADER.format(term=self.correct_answer),
+            'header': self.header_template.format(term=self.correct_answer),
         }
 
     @cached_property
@@ -425,28 +753,30 @@ class SpeakTermExercise(Exercise):
         return text
 
     def assert_answer(self, answer: dict) -> bool:
-        # TODO: SpeechToText API
-        return True
+        return answer['score'] >= settings.EXERCISE_SPEECH_THRESHOLD
 
-    def check(self, user: User, answer: dict, exercise_request: dict) -> dict:
-        answer.pop('audio')  # TODO: SpeechToText API
-        return super().check(user, answer, exercise_request)
+    @classmethod
+    def rescore_sql(cls) -> tuple[str, str]:
+        return (
+            "jsonb_typeof(h.response -> 'score') = 'number'",
+            "(h.response ->> 'score')::float8 "
+            f'>= {float(settings.EXERCISE_SPEECH_THRESHOLD)}',
+        )
 
     @classmethod
-    def _generate_check_endpoint(cls, CheckSchema: type[Schema], **answer_fields):
+    def _generate_check_endpoint(cls, CheckSchema: type[Schema]):
         def check_endpoint(
             request,
             exercise_id: int,
             answer: CheckSchema,  # pyright: ignore[reportInvalidTypeForm]
             audio: UploadedFile = File(...),
         ):
-            exercise = cls(exercise_id)
-            return ExerciseResponse(
-                **exercise.check(
-                    user=request.user,
-                    answer={'audio': audio},
-                    exercise_request=answer.model_dump(),
-                )
+            exercise = cls.from_answer_key(exercise_id)
+            return 202, speech.submit(
+                exercise,
+                user=request.user,
+                audio=audio,
+                exercise_request=answer.model_dump(),
             )
 
         return check_endpoint
@@ -455,6 +785,16 @@ class SpeakTermExercise(Exercise):
 class SpeakSentenceExercise(Exercise):
     exercise_type = ExerciseType.SPEAK_SENTENCE
     html_template = 'exercise/exercises/speak.html'
+    header_template = constants.SPEAK_SENTENCE_HEADER
+    answer_field = 'audio'
+    check_responses = {202: SpeechJobView}
+    select_related = ('term_example', 'term_pronunciation')
+    only = (
+        'term_example__example',
+        'term_pronunciation__audio_file',
+        'term_pronunciation__audio',
+        'term_pronunciation__phonetic',
+    )
     title = _('Falar frase')
     short_description = _('Aperfeiçoe sua pronúncia de frases')
     description = _("""
@@ -470,13 +810,11 @@ class SpeakSentenceExercise(Exercise):
 
     def build(self) -> dict:
         return {
-            'audio_file': self.exercise.term_pronunciation.audio_file,
+            'audio_file': self.exercise.term_pronunciation.audio_url,
             'phonetic': self.exercise.term_pronunciation.phonetic,
             'title': self.title,
             'description': self.description,
-            'header': constants.SPEAK_SENTENCE_HEADER.format(
-                sentence=self.correct_answer
-            ),
+            'header': self.header_template.format(sentence=self.correct_answer),
         }
 
     @cached_property
@@ -484,28 +822,30 @@ class SpeakSentenceExercise(Exercise):
         return self.exercise.term_example.example
 
     def assert_answer(self, answer: dict) -> bool:
-        # TODO: SpeechToText API
-        return True
+        return answer['score'] >= settings.EXERCISE_SPEECH_THRESHOLD
 
-    def check(self, user: User, answer: dict, exercise_request: dict) -> dict:
-        answer.pop('audio')  # TODO: SpeechToText API
-        return super().check(user, answer, exercise_request)
+    @classmethod
+    def rescore_sql(cls) -> tuple[str, str]:
+        return (
+            "jsonb_typeof(h.response -> 'score') = 'number'",
+            "(h.response ->> 'score')::float8 "
+            f'>= {float(settings.EXERCISE_SPEECH_THRESHOLD)}',
+        )
 
     @classmethod
-    def _generate_check_endpoint(cls, CheckSchema: type[Schema], **answer_fields):
+    def _generate_check_endpoint(cls, CheckSchema: type[Schema]):
         def check_endpoint(
             request,
             exercise_id: int,
             answer: CheckSchema,  # pyright: ignore[reportInvalidTypeForm]
             audio: UploadedFile = File(...),
         ):
-            exercise = cls(exercise_id)
-            return ExerciseResponse(
-                **exercise.check(
-                    user=request.user,
-                    answer={'audio': audio},
-                    exercise_request=answer.model_dump(),
-                )
+            exercise = cls.from_answer_key(exercise_id)
+            return 202, speech.submit(
+                exercise,
+                user=request.user,
+                audio=audio,
+                exercise_request=answer.model_dump(),
             )
 
         return check_endpoint
@@ -514,6 +854,15 @@ class SpeakSentenceExercise(Exercise):
 class TermMChoiceExercise(Exercise):
     exercise_type = ExerciseType.TERM_MCHOICE
     html_template = 'exercise/exercises/multiple_choice.html'
+    header_template = constants.TERM_MCHOICE_HEADER
+    answer_field = 'term_id'
+    select_related = ('term', 'term_example', 'term_lexical__term_value_ref')
+    only = (
+        'term__expression',
+        'term_example__example',
+        'term_lexical__value',
+        'term_lexical__term_value_ref__expression',
+    )
     title = _('Completar a frase')
     short_description = _('Teste sua compreensão contextual')
     description = _("""
@@ -527,30 +876,54 @@ class TermMChoiceExercise(Exercise):
         3. Escolha a alternativa que completa corretamente a frase.
     """)
 
-    def _get_distractors(self):
+    def compile(self) -> tuple[dict, list]:
         is_term_lexical = self.exercise.additional_content.get('sub_type') in [
             ExerciseSubType.TERM_LEXICAL_TERM_REF,
             ExerciseSubType.TERM_LEXICAL_VALUE,
         ]
-        distractor_key = 'term_lexical' if is_term_lexical else 'term'
-        distractor_list = self.exercise.additional_content.get('distractors')[
-            distractor_key
-        ]
-        distractors = sample(distractor_list, 3)
-
+        dependencies = []
         if is_term_lexical:
-            return {
-                id_: value or expression
-                for id_, value, expression in TermLexical.objects.select_related(
-                    'term_value_ref'
-                )
-                .filter(id__in=distractors)
-                .values_list('id', 'value', 'term_value_ref__expression')
-            }
+            distractors = dict()
+            for (
+                id_,
+                value,
+                term_value_ref_id,
+                expression,
+            ) in self.exercise.distractors.filter(
+                term_lexical__isnull=False
+            ).values_list(
+                'term_lexical_id',
+                'term_lexical__value',
+                'term_lexical__term_value_ref_id',
+                'term_lexical__term_value_ref__expression',
+            ):
+                distractors[id_] = value or expression
+                dependencies.append((TermLexical, id_))
+                if term_value_ref_id is not None:
+                    dependencies.append((Term, term_value_ref_id))
         else:
-            return dict(
-                Term.objects.filter(id__in=distractors).values_list('id', 'expression')
+            distractors = complete_distractors(
+                self.exercise.term_id,
+                dict(
+                    self.exercise.distractors.filter(term__isnull=False).values_list(
+                        'term_id', 'term__expression'
+                    )
+                ),
+                minimum=3,
             )
+            dependencies.extend((Term, id_) for id_ in distractors)
+            dependencies.append((DistractorCandidate, self.exercise.term_id))
+
+        if self.exercise.term_lexical and self.exercise.term_lexical.term_value_ref_id:
+            dependencies.append((Term, self.exercise.term_lexical.term_value_ref_id))
+        return (
+            {'distractors': distractors, 'sentence': self._mask_sentence()},
+            dependencies,
+        )
+
+    def _get_distractors(self):
+        distractors = self.compiled['distractors']
+        return {id_: distractors[id_] for id_ in _sample(distractors, 3, self.random)}
 
     def _correct_choice(self):
         sub_type = self.exercise.additional_content.get('sub_type')
@@ -588,13 +961,11 @@ class TermMChoiceExercise(Exercise):
         choices = dict()
         choices.update(self._correct_choice())
         choices.update(self._get_distractors())
-        choices = _shuffle_dict(choices)
+        choices = _shuffle_dict(choices, self.random)
         return {
             'title': self.title,
             'description': self.description,
-            'header': constants.TERM_MCHOICE_HEADER.format(
-                sentence=self._mask_sentence()
-            ),
+            'header': self.header_template.format(sentence=self.compiled['sentence']),
             'choices': choices,
         }
 
@@ -609,13 +980,14 @@ class TermMChoiceExercise(Exercise):
             text_id = self.exercise.term_id
         return text_id
 
-    def assert_answer(self, answer: dict) -> bool:
-        return answer['term_id'] == self.correct_answer
-
 
 class TermDefinitionMChoiceExercise(Exercise):
     exercise_type = ExerciseType.TERM_DEFINITION_MCHOICE
     html_template = 'exercise/exercises/multiple_choice.html'
+    header_template = constants.TERM_DEFINITION_MCHOICE_HEADER
+    answer_field = 'term_definition_id'
+    select_related = ('term', 'term_definition')
+    only = ('term__expression', 'term_definition__definition')
     title = _('Identificar significado')
     short_description = _('Aprenda a associar termos às suas definições')
     description = _("""
@@ -629,29 +1001,31 @@ class TermDefinitionMChoiceExercise(Exercise):
         3. Selecione a definição que corresponde corretamente ao termo.
     """)
 
-    def _get_distractors(self):
-        distractors_list = self.exercise.additional_content.get('distractors')[
-            'term_definition'
-        ]
-        distractors = list(sample(distractors_list, 3))
-        return dict(
-            TermDefinition.objects.filter(id__in=distractors).values_list(
-                'id', 'definition'
+    def compile(self) -> tuple[dict, list]:
+        distractors = dict(
+            self.exercise.distractors.filter(term_definition__isnull=False).values_list(
+                'term_definition_id', 'term_definition__definition'
             )
         )
+        return (
+            {'distractors': distractors},
+            [(TermDefinition, id_) for id_ in distractors],
+        )
+
+    def _get_distractors(self):
+        distractors = self.compiled['distractors']
+        return {id_: distractors[id_] for id_ in _sample(distractors, 3, self.random)}
 
     def build(self) -> dict:
         choices = dict()
         choices[self.correct_answer] = self.exercise.term_definition.definition
         choices.update(self._get_distractors())
-        choices = _shuffle_dict(choices)
+        choices = _shuffle_dict(choices, self.random)
 
         return {
             'title': self.title,
             'description': self.description,
-            'header': constants.TERM_DEFINITION_MCHOICE_HEADER.format(
-                term=self.exercise.term.expression
-            ),
+            'header': self.header_template.format(term=self.exercise.term.expression),
             'choices': choices,
         }
 
@@ -659,13 +1033,20 @@ class TermDefinitionMChoiceExercise(Exercise):
     def correct_answer(self):
         return self.exercise.term_definition_id
 
-    def assert_answer(self, answer: dict) -> bool:
-        return answer['term_definition_id'] == self.correct_answer
-
 
 class TermImageMChoiceExercise(Exercise):
     exercise_type = ExerciseType.TERM_IMAGE_MCHOICE
     html_template = 'exercise/exercises/image_mchoice.html'
+    header_template = constants.TERM_IMAGE_MCHOICE_HEADER
+    answer_field = 'term_id'
+    select_related = ('term_image', 'term_pronunciation')
+    only = (
+        'term',
+        'term_image__image',
+        'term_image__variants',
+        'term_pronunciation__audio_file',
+        'term_pronunciation__audio',
+    )
     title = _('Identificar imagem')
     short_description = _('Relacione termos com suas imagens')
     description = _("""
@@ -678,27 +1059,39 @@ class TermImageMChoiceExercise(Exercise):
         3. Escolha a imagem que corresponde ao termo descrito no áudio.
     """)
 
+    def compile(self) -> tuple[dict, list]:
+        term_images = (
+            TermImage.objects.filter(exercise_distractors__exercise=self.exercise)
+            .order_by('exercise_distractors__position')
+            .only('term', 'image', 'variants')
+        )
+        width = settings.TERM_IMAGE_CHOICE_WIDTH
+        return (
+            {
+                'distractors': {
+                    image.term_id: image.variant_url(width) for image in term_images
+                }
+            },
+            [(TermImage, image.id) for image in term_images],
+        )
+
     def _get_distractors(self):
-        distractors_list = self.exercise.additional_content.get('distractors')[
-            'term_image'
-        ]
-        distractors = list(sample(distractors_list, 3))
-        return {
-            term.term_id: term.image.url
-            for term in TermImage.objects.filter(id__in=distractors)
-        }
+        distractors = self.compiled['distractors']
+        return {id_: distractors[id_] for id_ in _sample(distractors, 3, self.random)}
 
     def build(self) -> dict:
         choices = dict()
-        choices[self.correct_answer] = self.exercise.term_image.image.url
+        choices[self.correct_answer] = self.exercise.term_image.variant_url(
+            settings.TERM_IMAGE_CHOICE_WIDTH
+        )
         choices.update(self._get_distractors())
-        choices = _shuffle_dict(choices)
+        choices = _shuffle_dict(choices, self.random)
 
         return {
             'title': self.title,
             'description': self.description,
-            'header': constants.TERM_IMAGE_MCHOICE_HEADER,
-            'audio_file': self.exercise.term_pronunciation.audio_file,
+            'header': self.header_template,
+            'audio_file': self.exercise.term_pronunciation.audio_url,
             'choices': choices,
         }
 
@@ -706,13 +1099,14 @@ class TermImageMChoiceExercise(Exercise):
     def correct_answer(self):
         return self.exercise.term_id
 
-    def assert_answer(self, answer: dict) -> bool:
-        return answer['term_id'] == self.correct_answer
-
 
 class TermImageMChoiceTextExercise(Exercise):
     exercise_type = ExerciseType.TERM_IMAGE_MCHOICE_TEXT
     html_template = 'exercise/exercises/image_mchoice_text.html'
+    header_template = constants.TERM_IMAGE_MCHOICE_TEXT_HEADER
+    answer_field = 'term_id'
+    select_related = ('term', 'term_image')
+    only = ('term__expression', 'term_image__image', 'term_image__variants')
     title = _('Identificar imagem')
     short_description = _('Associe imagens aos seus termos')
     description = _("""
@@ -726,24 +1120,36 @@ class TermImageMChoiceTextExercise(Exercise):
         3. Escolha o termo que corresponde corretamente à imagem.
     """)
 
-    def _get_distractors(self):
-        distractors_list = self.exercise.additional_content.get('distractors')['term']
-        distractors = list(sample(distractors_list, 3))
-        return dict(
-            Term.objects.filter(id__in=distractors).values_list('id', 'expression')
+    def compile(self) -> tuple[dict, list]:
+        distractors = complete_distractors(
+            self.exercise.term_id,
+            dict(
+                self.exercise.distractors.filter(term__isnull=False).values_list(
+                    'term_id', 'term__expression'
+                )
+            ),
+            minimum=3,
         )
+        return {'distractors': distractors}, [
+            *[(Term, id_) for id_ in distractors],
+            (DistractorCandidate, self.exercise.term_id),
+        ]
+
+    def _get_distractors(self):
+        distractors = self.compiled['distractors']
+        return {id_: distractors[id_] for id_ in _sample(distractors, 3, self.random)}
 
     def build(self) -> dict:
         choices = dict()
         choices[self.correct_answer] = self.exercise.term.expression
         choices.update(self._get_distractors())
-        choices = _shuffle_dict(choices)
+        choices = _shuffle_dict(choices, self.random)
 
         return {
-            'image': self.exercise.term_image.image.url,
+            'image': self.exercise.term_image.variant_url(settings.TERM_IMAGE_WIDTH),
             'title': self.title,
             'description': self.description,
-            'header': constants.TERM_IMAGE_MCHOICE_TEXT_HEADER,
+            'header': self.header_template,
             'choices': choices,
         }
 
@@ -751,13 +1157,14 @@ class TermImageMChoiceTextExercise(Exercise):
     def correct_answer(self):
         return self.exercise.term_id
 
-    def assert_answer(self, answer: dict) -> bool:
-        return answer['term_id'] == self.correct_answer
-
 
 class TermConnectionExercise(Exercise):
     exercise_type = ExerciseType.TERM_CONNECTION
     html_template = 'exercise/exercises/term_connection.html'
+    header_template = constants.TERM_CONNECTION_HEADER
+    answer_field = 'choices'
+    select_related = ('term',)
+    only = ('term__expression',)
     title = _('Conexões com termo')
     short_description = _('Descubra relações entre termos')
     description = _("""
@@ -771,32 +1178,85 @@ class TermConnectionExercise(Exercise):
         4. Evite selecionar as opções que têm relação com o termo.
     """)
 
-    def build(self) -> dict:
-        distractors_list = self.exercise.additional_content.get('distractors')['term']
-        connections_list = self.exercise.additional_content.get('connections')['term']
-        choice_ids = list(sample(distractors_list, 8))
-        choice_ids.extend(sample(connections_list, 4))
+    def compile(self) -> tuple[dict, list]:
+        connection_ids = self.correct_answer
+        terms = dict(
+            Term.objects.filter(
+                Q(id__in=connection_ids)
+                | Q(exercise_distractors__exercise_id=self.exercise.id)
+            )
+            .order_by('exercise_distractors__position')
+            .values_list('id', 'expression')
+        )
+        connections = {id_: terms[id_] for id_ in connection_ids if id_ in terms}
+        distractors = complete_distractors(
+            self.exercise.term_id,
+            {id_: terms[id_] for id_ in terms if id_ not in connections},
+            minimum=8,
+            exclude=connections,
+        )
+        return (
+            {'distractors': distractors, 'connections': connections},
+            [
+                *[(Term, id_) for id_ in [*distractors, *connections]],
+                (DistractorCandidate, self.exercise.term_id),
+            ],
+        )
 
-        choices = dict(
-            Term.objects.filter(id__in=choice_ids).values_list('id', 'expression')
+    def build(self) -> dict:
+        distractors = self.compiled['distractors']
+        connections = self.compiled['connections']
+        choices = {
+            id_: distractors[id_] for id_ in _sample(distractors, 8, self.random)
+        }
+        choices.update(
+            {id_: connections[id_] for id_ in _sample(connections, 4, self.random)}
         )
-        choices = _shuffle_dict(choices)
+        choices = _shuffle_dict(choices, self.random)
 
         return {
             'title': self.title,
             'description': self.description,
-            'header': constants.TERM_CONNECTION_HEADER.format(
-                term=self.exercise.term.expression
-            ),
+            'header': self.header_template.format(term=self.exercise.term.expression),
             'choices': choices,
         }
 
+    @classmethod
+    def get_queryset(cls):
+        return (
+            super()
+            .get_queryset()
+            .annotate(
+                connection_ids=ArraySubquery(
+                    ExerciseConnection.objects.filter(exercise=OuterRef('pk'))
+                    .order_by('position')
+                    .values('term_id')
+                )
+            )
+        )
+
     @cached_property
     def correct_answer(self):
-        return self.exercise.additional_content.get('connections')['term']
+        return self.exercise.connection_ids
+
+    @staticmethod
+    def normalize_answer(answer):
+        return sorted(answer)
 
     def assert_answer(self, answer: dict) -> bool:
-        return all([choice in self.correct_answer for choice in answer['choices']])
+        connections = set(self.answer_key.normalized_answer)
+        choices = answer['choices']
+        return len(set(choices)) == len(choices) and set(choices) <= connections
+
+    @classmethod
+    def rescore_sql(cls) -> tuple[str, str]:
+        choices = "(h.response -> 'choices')"
+        return (
+            f"jsonb_typeof({choices}) = 'array'",
+            f'k.normalized_answer @> {choices} AND ('
+            f'SELECT count(DISTINCT choice) = count(*) '
+            f'FROM jsonb_array_elements({choices}) choice)',
+        )
 
 
 exercises_map = {
@@ -812,3 +1272,231 @@ exercises_map = {
     TermImageMChoiceTextExercise,
     TermConnectionExercise,
 }
+
+
+def get_exercise_class(exercise_type):
+    return next(
+        (
+            exercise
+            for exercise in exercises_map
+            if exercise.exercise_type == int(exercise_type)
+        ),
+        None,
+    )
+
+
+def _save_answer_keys(answer_keys):
+    ExerciseAnswerKey.objects.bulk_create(
+        answer_keys,
+        update_conflicts=True,
+        unique_fields=['exercise'],
+        update_fields=[
+            'type',
+            'correct_answer',
+            'normalized_answer',
+            'answer_hash',
+            'normalization_version',
+        ],
+    )
+
+
+def update_answer_keys(queryset, batch_size=1000):
+    exercise_types = list(queryset.order_by().values_list('type', flat=True).distinct())
+    for exercise_type in exercise_types:
+        exercise_class = get_exercise_class(exercise_type)
+        exercise_query = exercise_class.get_queryset().filter(
+            id__in=queryset.values('id')
+        )
+        answer_keys = []
+        for exercise in exercise_query.iterator(chunk_size=batch_size):
+            answer_keys.append(exercise_class.from_model(exercise).answer_key)
+            if len(answer_keys) >= batch_size:
+                _save_answer_keys(answer_keys)
+                answer_keys = []
+        _save_answer_keys(answer_keys)
+
+
+RESCORE_SQL = """
+    UPDATE {history} h SET correct = {result}
+    FROM {answer_key} k
+    WHERE k.exercise_id = h.exercise_id
+        AND k.type = %s
+        AND h.id IN ({ids})
+        AND {condition}
+        AND h.correct IS DISTINCT FROM ({result})
+    RETURNING h.user_id
+"""
+
+
+def _rescore_sql(exercise_class, queryset) -> tuple[int, set]:
+    condition, result = exercise_class.rescore_sql()
+    ids, params = queryset.order_by().values('id').query.sql_with_params()
+    sql = RESCORE_SQL.format(
+        history=ExerciseHistory._meta.db_table,
+        answer_key=ExerciseAnswerKey._meta.db_table,
+        ids=ids,
+        condition=condition,
+        result=result,
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [str(exercise_class.exercise_type.value), *params])
+        user_ids = [user_id for (user_id,) in cursor.fetchall()]
+    return len(user_ids), set(user_ids)
+
+
+def _rescore_python(queryset, batch_size) -> tuple[int, set]:
+    histories = queryset.select_related('exercise__answer_key').only(
+        'correct',
+        'response',
+        'user_id',
+        'exercise__type',
+        'exercise__answer_key__correct_answer',
+        'exercise__answer_key__normalized_answer',
+        'exercise__answer_key__answer_hash',
+    )
+    changed, count, user_ids = [], 0, set()
+    for item in histories.iterator(chunk_size=batch_size):
+        try:
+            answer_key = item.exercise.answer_key
+        except ExerciseAnswerKey.DoesNotExist:
+            continue
+        exercise_class = get_exercise_class(item.exercise.type)
+        exercise = exercise_class.with_answer_key(answer_key)
+        try:
+            correct = exercise.assert_answer(item.response)
+        except (KeyError, TypeError, AttributeError):
+            continue
+        if correct == item.correct:
+            continue
+
+        item.correct = correct
+        changed.append(item)
+        user_ids.add(item.user_id)
+        if len(changed) >= batch_size:
+            count += ExerciseHistory.objects.bulk_update(changed, ['correct'])
+            changed = []
+    count += ExerciseHistory.objects.bulk_update(changed, ['correct'])
+    return count, user_ids
+
+
+@transaction.atomic
+def rescore_history(queryset, batch_size=1000):
+    """
+    Corrige novamente as respostas do histórico com as chaves de resposta
+    atuais e recalcula o progresso dos usuários afetados. Cada tipo é
+    corrigido com um UPDATE ... FROM sobre ExerciseAnswerKey (rescore_sql);
+    só os tipos de texto livre, sem equivalente exato em SQL, passam pelo
+    assert_answer em Python. Retorna a quantidade de registros alterados.
+    """
+    count, user_ids, python_types = 0, set(), []
+    for exercise_class in exercises_map:
+        if exercise_class.rescore_sql() is None:
+            python_types.append(exercise_class.exercise_type)
+            continue
+        changed, changed_users = _rescore_sql(exercise_class, queryset)
+        count += changed
+        user_ids |= changed_users
+
+    if python_types:
+        changed, changed_users = _rescore_python(
+            queryset.filter(exercise__type__in=python_types), batch_size
+        )
+        count += changed
+        user_ids |= changed_users
+
+    if user_ids:
+        progress.rebuild(user_ids, batch_size=batch_size)
+    return count
+
+
+@transaction.atomic
+def check_batch(user: User, answers: list[dict]) -> list[dict]:
+    """
+    Corrige uma lista de respostas de uma vez: carrega as chaves de resposta
+    em uma consulta, corrige na ordem recebida e grava todo o histórico em um
+    único bulk_create.
+    """
+    exercise_ids = {answer['exercise_id'] for answer in answers}
+    answer_keys = _get_answer_keys(exercise_ids)
+    missing = exercise_ids - answer_keys.keys()
+    if missing:
+        update_answer_keys(ExerciseModel.objects.filter(id__in=missing))
+        answer_keys.update(_get_answer_keys(missing))
+
+    results, histories = [], []
+    for index, answer in enumerate(answers):
+        answer_key = answer_keys.get(answer['exercise_id'])
+        if answer_key is None or int(answer_key.type) != answer['type']:
+            raise Http404(f'exercise {answer["exercise_id"]} not found.')
+
+        exercise_class = get_exercise_class(answer['type'])
+        answer['answer'] = _validate_answer(exercise_class, answer, index)
+        exercise = exercise_class.with_answer_key(answer_key)
+        correct = exercise.assert_answer(answer['answer'])
+        check_response = {
+            'correct': correct,
+            'correct_answer': exercise.correct_answer,
+        }
+        histories.append(
+            ExerciseHistory(
+                exercise=exercise.exercise,
+                user=user,
+                correct=correct,
+                response={**answer['answer'], **check_response},
+                request={'time_to_answer': answer['time_to_answer']},
+            )
+        )
+        feedback = (
+            exercise.get_correct_feedback
+            if correct
+            else exercise.get_incorrect_feedback
+        )
+        results.append(
+            {
+                'type': answer['type'],
+                'exercise_id': answer['exercise_id'],
+                'feedback': feedback(),
+                **check_response,
+            }
+        )
+
+    ExerciseHistory.objects.bulk_create(histories)
+    reviewed = [
+        {
+            'exercise': history.exercise,
+            'correct': history.correct,
+            'time_to_answer': history.request['time_to_answer'],
+        }
+        for history in histories
+    ]
+    progress.update(user, reviewed)
+    scheduler.review(user, reviewed)
+    recent.add(user, [answer['exercise_id'] for answer in answers])
+    return results
+
+
+def _validate_answer(exercise_class, answer: dict, index: int) -> dict:
+    """
+    Valida a resposta com o mesmo AnswerSchema do check individual do tipo.
+    """
+    AnswerSchema = exercise_class.answer_schema
+    try:
+        return AnswerSchema.model_validate(answer['answer']).model_dump()
+    except PydanticValidationError as error:
+        location = ('body', 'batch', 'answers', index, 'answer')
+        errors = error.errors(include_url=False, include_context=False)
+        raise ValidationError(
+            [{**detail, 'loc': (*location, *detail['loc'])} for detail in errors]
+        )
+
+
+def _get_answer_keys(exercise_ids) -> dict:
+    answer_keys = (
+        ExerciseAnswerKey.objects.filter(
+            exercise_id__in=exercise_ids,
+            normalization_version=constants.ANSWER_NORMALIZATION_VERSION,
+        )
+        .select_related('exercise')
+        .only(*ANSWER_KEY_FIELDS)
+    )
+    return {answer_key.exercise_id: answer_key for answer_key in answer_keys}
@@ -0,0 +1,404 @@
+"""
+Geração automática de exercícios a partir dos termos cadastrados.
+
+Cada tipo de exercício é descrito por um SELECT que encontra, direto no banco,
+todas as combinações válidas para um intervalo de ids da tabela raiz (termos
+ou exemplos) de um idioma. As linhas são inseridas com
+INSERT ... ON CONFLICT DO NOTHING, de forma que exercícios já existentes são
+ignorados pelas restrições únicas de Exercise e a geração pode ser repetida.
+Os distratores e conexões dos exercícios inseridos são copiados para as
+tabelas de relação por relations.sync().
+"""
+
+from dataclasses import dataclass
+from multiprocessing import get_context
+
+from django.db import connection, connections, transaction
+
+from exako.apps.exercise import coverage, relations
+from exako.apps.exercise.constants import ExerciseSubType, ExerciseType
+from exako.apps.exercise.models import DistractorCandidate, Exercise
+from exako.apps.term.constants import Language, TermLexicalType
+from exako.apps.term.models import (
+    Term,
+    TermDefinition,
+    TermExample,
+    TermExampleLink,
+    TermImage,
+    TermLexical,
+    TermPronunciation,
+)
+
+TABLES = {
+    'exercise': Exercise._meta.db_table,
+    'candidate': DistractorCandidate._meta.db_table,
+    'term': Term._meta.db_table,
+    'example': TermExample._meta.db_table,
+    'link': TermExampleLink._meta.db_table,
+    'lexical': TermLexical._meta.db_table,
+    'pronunciation': TermPronunciation._meta.db_table,
+    'definition': TermDefinition._meta.db_table,
+    'image': TermImage._meta.db_table,
+}
+
+INSERT_COLUMNS = (
+    'type',
+    'language',
+    'level',
+    'term_id',
+    'term_example_id',
+    'term_pronunciation_id',
+    'term_lexical_id',
+    'term_definition_id',
+    'term_image_id',
+    'additional_content',
+)
+
+CONNECTION_LEXICAL_TYPES = [
+    str(TermLexicalType.SYNONYM.value),
+    str(TermLexicalType.ANTONYM.value),
+    str(TermLexicalType.IDIOM.value),
+]
+
+
+def _neighbour_ids(table, pivot, size, join='', where=''):
+    """
+    Array com até size ids de table vizinhos de pivot no mesmo idioma.
+    Usar os vizinhos pela chave primária mantém a busca em uma varredura
+    curta do índice, sem ORDER BY random() sobre a tabela inteira.
+    """
+    select = f'SELECT n.id FROM {table} n {join} WHERE {where}'
+    return f"""
+        (SELECT array_agg(v.id) FROM (
+            ({select} AND n.id > {pivot} ORDER BY n.id LIMIT {size})
+            UNION ALL
+            ({select} AND n.id < {pivot} ORDER BY n.id DESC LIMIT {size})
+            LIMIT {size}
+        ) v)
+    """
+
+
+def _neighbours(table, pivot, size, join='', where='', alias='distractors'):
+    return f"""
+        LEFT JOIN LATERAL (
+            SELECT {_neighbour_ids(table, pivot, size, join, where)} AS ids
+        ) {alias} ON true
+    """
+
+
+def _term_distractors(pivot, language, size, exclude='', alias='distractors'):
+    """
+    LATERAL com os até size melhores candidatos a distratores do termo pivot
+    (DistractorCandidate). Termos ainda sem candidatos usam os vizinhos pela
+    chave primária.
+    """
+    candidates = f"""
+        (SELECT array_agg(c.candidate_id ORDER BY c.rank) FROM (
+            SELECT c.candidate_id, c.rank
+            FROM {TABLES['candidate']} c
+            JOIN {TABLES['term']} t ON t.id = c.candidate_id
+            WHERE c.term_id = {pivot} AND t.language = {language}
+                {exclude.format(id='c.candidate_id')}
+            ORDER BY c.rank
+            LIMIT {size}
+        ) c)
+    """
+    neighbours = _neighbour_ids(
+        TABLES['term'],
+        pivot,
+        size,
+        where=f'n.language = {language} {exclude.format(id="n.id")}',
+    )
+    return f"""
+        LEFT JOIN LATERAL (
+            SELECT COALESCE({candidates}, {neighbours}) AS ids
+        ) {alias} ON true
+    """
+
+
+@dataclass(frozen=True)
+class Generator:
+    exercise_type: ExerciseType
+    root: str
+    select: str
+
+    def sql(self) -> str:
+        columns = ', '.join(INSERT_COLUMNS)
+        return f"""
+            INSERT INTO {TABLES['exercise']} ({columns})
+            {self.select}
+                AND root.language = %(language)s
+                AND root.id >= %(start)s AND root.id < %(end)s
+            ON CONFLICT DO NOTHING
+            RETURNING id
+        """
+
+
+GENERATORS = [
+    Generator(
+        ExerciseType.ORDER_SENTENCE,
+        'example',
+        f"""
+        SELECT %(type)s, root.language, root.level, NULL, root.id, NULL, NULL,
+            NULL, NULL,
+            jsonb_build_object('distractors', jsonb_build_object(
+                'term', to_jsonb(COALESCE(distractors.ids, '{{}}'))
+            ))
+        FROM {TABLES['example']} root
+        LEFT JOIN LATERAL (
+            SELECT array_agg(l.term_id ORDER BY l.id) AS ids
+            FROM {TABLES['link']} l
+            WHERE l.term_example_id = root.id AND l.term_id IS NOT NULL
+        ) linked ON true
+        {
+            _term_distractors(
+                'linked.ids[1]',
+                'root.language',
+                6,
+                exclude='AND {id} <> ALL(COALESCE(linked.ids, ARRAY[]::bigint[]))',
+            )
+        }
+        WHERE true
+        """,
+    ),
+    Generator(
+        ExerciseType.LISTEN_TERM,
+        'term',
+        f"""
+        SELECT %(type)s, root.language, NULL, root.id, NULL, p.id, NULL, NULL,
+            NULL, jsonb_build_object('sub_type', {ExerciseSubType.TERM.value})
+        FROM {TABLES['term']} root
+        JOIN {TABLES['pronunciation']} p ON p.term_id = root.id
+        WHERE p.audio_file IS NOT NULL
+        """,
+    ),
+    Generator(
+        ExerciseType.SPEAK_TERM,
+        'term',
+        f"""
+        SELECT %(type)s, root.language, NULL, root.id, NULL, p.id, NULL, NULL,
+            NULL, jsonb_build_object('sub_type', {ExerciseSubType.TERM.value})
+        FROM {TABLES['term']} root
+        JOIN {TABLES['pronunciation']} p ON p.term_id = root.id
+        WHERE p.audio_file IS NOT NULL
+        """,
+    ),
+    Generator(
+        ExerciseType.LISTEN_SENTENCE,
+        'example',
+        f"""
+        SELECT %(type)s, root.language, root.level, NULL, root.id, p.id, NULL,
+            NULL, NULL, NULL
+        FROM {TABLES['example']} root
+        JOIN {TABLES['pronunciation']} p ON p.term_example_id = root.id
+        WHERE p.audio_file IS NOT NULL
+        """,
+    ),
+    Generator(
+        ExerciseType.SPEAK_SENTENCE,
+        'example',
+        f"""
+        SELECT %(type)s, root.language, root.level, NULL, root.id, p.id, NULL,
+            NULL, NULL, NULL
+        FROM {TABLES['example']} root
+        JOIN {TABLES['pronunciation']} p ON p.term_example_id = root.id
+        WHERE true
+        """,
+    ),
+    Generator(
+        ExerciseType.LISTEN_TERM_MCHOICE,
+        'term',
+        f"""
+        SELECT %(type)s, root.language, NULL, root.id, NULL, p.id, NULL, NULL,
+            NULL, NULL
+        FROM {TABLES['term']} root
+        JOIN {TABLES['pronunciation']} p ON p.term_id = root.id
+        WHERE p.audio_file IS NOT NULL
+            AND (
+                SELECT COUNT(*) FROM {TABLES['lexical']} l
+                JOIN {TABLES['pronunciation']} rp
+                    ON rp.term_id = l.term_value_ref_id
+                    AND rp.audio_file IS NOT NULL
+                WHERE l.term_id = root.id
+                    AND l.type = '{TermLexicalType.RHYME.value}'
+            ) >= 3
+        """,
+    ),
+    Generator(
+        ExerciseType.TERM_MCHOICE,
+        'term',
+        f"""
+        SELECT %(type)s, root.language, e.level, root.id, e.id, NULL, NULL,
+            NULL, NULL,
+            jsonb_build_object(
+                'sub_type', {ExerciseSubType.TERM.value},
+                'distractors', jsonb_build_object('term', to_jsonb(distractors.ids))
+            )
+        FROM {TABLES['term']} root
+        JOIN {TABLES['link']} k ON k.term_id = root.id
+        JOIN {TABLES['example']} e
+            ON e.id = k.term_example_id AND e.language = root.language
+        {_term_distractors('root.id', 'root.language', 6)}
+        WHERE cardinality(distractors.ids) >= 3
+        """,
+    ),
+    Generator(
+        ExerciseType.TERM_DEFINITION_MCHOICE,
+        'term',
+        f"""
+        SELECT %(type)s, root.language, d.level, root.id, NULL, NULL, NULL,
+            d.id, NULL,
+            jsonb_build_object('distractors', jsonb_build_object(
+                'term_definition', to_jsonb(distractors.ids)
+            ))
+        FROM {TABLES['term']} root
+        JOIN {TABLES['definition']} d ON d.term_id = root.id
+        {
+            _neighbours(
+                TABLES['definition'],
+                'd.id',
+                6,
+                join=f"JOIN {TABLES['term']} nt ON nt.id = n.term_id",
+                where='nt.language = root.language AND n.term_id <> root.id',
+            )
+        }
+        WHERE cardinality(distractors.ids) >= 3
+        """,
+    ),
+    Generator(
+        ExerciseType.TERM_IMAGE_MCHOICE,
+        'term',
+        f"""
+        SELECT %(type)s, root.language, NULL, root.id, NULL, p.id, NULL, NULL,
+            i.id,
+            jsonb_build_object('distractors', jsonb_build_object(
+                'term_image', to_jsonb(distractors.ids)
+            ))
+        FROM {TABLES['term']} root
+        JOIN {TABLES['image']} i ON i.term_id = root.id
+        JOIN {TABLES['pronunciation']} p ON p.term_id = root.id
+        {
+            _neighbours(
+                TABLES['image'],
+                'i.id',
+                6,
+                join=f"JOIN {TABLES['term']} nt ON nt.id = n.term_id",
+                where='nt.language = root.language',
+            )
+        }
+        WHERE p.audio_file IS NOT NULL AND cardinality(distractors.ids) >= 3
+        """,
+    ),
+    Generator(
+        ExerciseType.TERM_IMAGE_MCHOICE_TEXT,
+        'term',
+        f"""
+        SELECT %(type)s, root.language, NULL, root.id, NULL, NULL, NULL, NULL,
+            i.id,
+            jsonb_build_object('distractors', jsonb_build_object(
+                'term', to_jsonb(distractors.ids)
+            ))
+        FROM {TABLES['term']} root
+        JOIN {TABLES['image']} i ON i.term_id = root.id
+        {_term_distractors('root.id', 'root.language', 6)}
+        WHERE cardinality(distractors.ids) >= 3
+        """,
+    ),
+    Generator(
+        ExerciseType.TERM_CONNECTION,
+        'term',
+        f"""
+        SELECT %(type)s, root.language, NULL, root.id, NULL, NULL, NULL, NULL,
+            NULL,
+            jsonb_build_object(
+                'distractors', jsonb_build_object('term', to_jsonb(distractors.ids)),
+                'connections', jsonb_build_object('term', to_jsonb(connections.ids))
+            )
+        FROM {TABLES['term']} root
+        LEFT JOIN LATERAL (
+            SELECT array_agg(DISTINCT l.term_value_ref_id) AS ids
+            FROM {TABLES['lexical']} l
+            WHERE l.term_id = root.id
+                AND l.term_value_ref_id IS NOT NULL
+                AND l.type IN ({', '.join(f"'{type}'" for type in CONNECTION_LEXICAL_TYPES)})
+        ) connections ON true
+        {
+            _term_distractors(
+                'root.id',
+                'root.language',
+                12,
+                exclude='AND {id} <> ALL(COALESCE(connections.ids, ARRAY[]::bigint[]))',
+            )
+        }
+        WHERE cardinality(connections.ids) >= 4 AND cardinality(distractors.ids) >= 8
+        """,
+    ),
+]
+
+
+def get_generator(exercise_type) -> Generator:
+    return next(
+        generator
+        for generator in GENERATORS
+        if generator.exercise_type == int(exercise_type)
+    )
+
+
+def generate(exercise_type, language, start, end) -> int:
+    """Gera os exercícios de um tipo para o intervalo [start, end) da tabela raiz."""
+    generator = get_generator(exercise_type)
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            generator.sql(),
+            {
+                'type': str(generator.exercise_type.value),
+                'language': language,
+                'start': start,
+                'end': end,
+            },
+        )
+        exercise_ids = [exercise_id for (exercise_id,) in cursor.fetchall()]
+        relations.sync(exercise_ids)
+        coverage.refresh_exercises(exercise_ids)
+    return len(exercise_ids)
+
+
+def _generate_task(task) -> int:
+    return generate(*task)
+
+
+def tasks(exercise_types, languages, chunk_size):
+    """Divide o trabalho em intervalos de ids por tipo de exercício e idioma."""
+    with connection.cursor() as cursor:
+        for exercise_type in exercise_types:
+            root = TABLES[get_generator(exercise_type).root]
+            for language in languages:
+                cursor.execute(
+                    f'SELECT MIN(id), MAX(id) FROM {root} WHERE language = %s',
+                    [language],
+                )
+                first, last = cursor.fetchone()
+                if first is None:
+                    continue
+                for start in range(first, last + 1, chunk_size):
+                    yield (exercise_type, language, start, start + chunk_size)
+
+
+def run(exercise_types=None, languages=None, workers=1, chunk_size=10000) -> int:
+    """
+    Gera os exercícios de todos os tipos e idiomas pedidos. Com workers > 1
+    os intervalos são distribuídos entre processos, cada um com sua própria
+    conexão com o banco.
+    """
+    exercise_types = exercise_types or [
+        generator.exercise_type for generator in GENERATORS
+    ]
+    languages = languages or Language.values
+    work = list(tasks(exercise_types, languages, chunk_size))
+    if workers <= 1:
+        return sum(_generate_task(task) for task in work)
+
+    # Os processos filhos não podem herdar as conexões abertas pelo pai.
+    connections.close_all()
+    with get_context('fork').Pool(workers) as pool:
+        return sum(pool.imap_unordered(_generate_task, work))
@@ -0,0 +1,213 @@
+import atexit
+import json
+import logging
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from queue import Empty, Full, Queue
+
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections
+
+from exako.apps.exercise.models import ExerciseHistory
+
+logger = logging.getLogger(__name__)
+
+
+class HistoryRecorder:
+    """
+    Grava o histórico de respostas em segundo plano. As respostas ficam em uma
+    fila limitada e são inseridas em lote por uma thread quando o lote enche
+    ou quando flush_interval expira. Se o banco falhar, o lote é salvo no
+    arquivo spill_path e reenviado no próximo flush bem sucedido; ao encerrar
+    o processo, o que resta na fila também vai para spill_path.
+
+    As respostas que ainda estão na fila se perdem se o processo morrer sem
+    encerrar normalmente: no máximo max_size respostas ou flush_interval
+    segundos de respostas.
+    """
+
+    def __init__(
+        self,
+        spill_path: Path,
+        max_size: int = 10000,
+        batch_size: int = 500,
+        flush_interval: float = 1.0,
+        put_timeout: float = 0.5,
+    ):
+        self.spill_path = Path(spill_path)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.put_timeout = put_timeout
+        self.queue = Queue(maxsize=max_size)
+        self.stats = {
+            'flushed': 0,
+            'flush_errors': 0,
+            'flush_latency': 0.0,
+            'spilled': 0,
+            'replayed': 0,
+            'overflow': 0,
+            'dropped': 0,
+        }
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def metrics(self) -> dict:
+        return {**self.stats, 'queue_depth': self.queue.qsize()}
+
+    def _count(self, stat: str, value: int = 1):
+        with self._lock:
+            self.stats[stat] += value
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            if self._thread is not None:
+                logger.error('Exercise history recorder thread died, restarting.')
+            else:
+                atexit.register(self.close)
+            self._thread = threading.Thread(
+                target=self._run, name='exercise-history-recorder', daemon=True
+            )
+            self._thread.start()
+
+    def record(self, history: ExerciseHistory):
+        self.start()
+        try:
+            self.queue.put(history, timeout=self.put_timeout)
+        except Full:
+            # Backpressure: com a fila cheia a requisição espera pelo banco.
+            self._count('overflow')
+            self.flush([history])
+
+    def flush(self, batch: list[ExerciseHistory]):
+        if not batch:
+            return
+        started = time.monotonic()
+        try:
+            ExerciseHistory.objects.bulk_create(batch)
+        except DatabaseError:
+            logger.exception('Failed to flush %d exercise histories.', len(batch))
+            self._count('flush_errors')
+            self._spill(batch)
+            return
+
+        with self._lock:
+            self.stats['flushed'] += len(batch)
+            self.stats['flush_latency'] = time.monotonic() - started
+        logger.debug('Exercise history flush: %s', self.metrics())
+        self.replay()
+
+    def replay(self):
+        with self._lock:
+            if not self.spill_path.exists():
+                return
+            lines = self.spill_path.read_text().splitlines()
+            self.spill_path.unlink()
+
+        batch = [self._deserialize(line) for line in lines if line]
+        try:
+            ExerciseHistory.objects.bulk_create(batch, batch_size=self.batch_size)
+        except DatabaseError:
+            logger.exception('Failed to replay %d exercise histories.', len(batch))
+            self._spill(batch, count=False)
+            return
+        self._count('replayed', len(batch))
+
+    def close(self):
+        """
+        Salva em spill_path o que resta na fila, sem depender do banco durante
+        o encerramento. O próximo processo reenvia essas respostas.
+        """
+        batch = []
+        while True:
+            try:
+                batch.append(self.queue.get_nowait())
+            except Empty:
+                break
+        if batch:
+            self._spill(batch)
+
+    def _run(self):
+        try:
+            self.replay()
+        except Exception:
+            logger.exception('Failed to replay spilled exercise histories.')
+        while True:
+            batch = self._collect()
+            try:
+                self.flush(batch)
+            except Exception:
+                # Um erro inesperado não pode encerrar a thread: o lote é
+                # descartado e as próximas respostas continuam sendo gravadas.
+                logger.exception('Dropped %d exercise histories.', len(batch))
+                self._count('dropped', len(batch))
+            finally:
+                close_old_connections()
+
+    def _collect(self) -> list[ExerciseHistory]:
+        batch = [self.queue.get()]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(self.queue.get(timeout=timeout))
+            except Empty:
+                break
+        return batch
+
+    def _spill(self, batch: list[ExerciseHistory], count: bool = True):
+        with self._lock:
+            with self.spill_path.open('a') as spill:
+                for history in batch:
+                    spill.write(self._serialize(history) + '\n')
+        if count:
+            self._count('spilled', len(batch))
+
+    @staticmethod
+    def _serialize(history: ExerciseHistory) -> str:
+        return json.dumps(
+            {
+                'exercise_id': history.exercise_id,
+                'user_id': history.user_id,
+                'created_at': history.created_at.isoformat(),
+                'correct': history.correct,
+                'response': history.response,
+                'request': history.request,
+            }
+        )
+
+    @staticmethod
+    def _deserialize(line: str) -> ExerciseHistory:
+        data = json.loads(line)
+        data['created_at'] = datetime.fromisoformat(data['created_at'])
+        return ExerciseHistory(**data)
+
+
+_recorder = None
+
+
+def get_recorder() -> HistoryRecorder:
+    global _recorder
+    if _recorder is None:
+        _recorder = HistoryRecorder(
+            spill_path=settings.EXERCISE_HISTORY_SPILL_PATH,
+            max_size=settings.EXERCISE_HISTORY_QUEUE_SIZE,
+            batch_size=settings.EXERCISE_HISTORY_BATCH_SIZE,
+            flush_interval=settings.EXERCISE_HISTORY_FLUSH_INTERVAL,
+            put_timeout=settings.EXERCISE_HISTORY_PUT_TIMEOUT,
+        )
+    return _recorder
+
+
+def record(**fields):
+    history = ExerciseHistory(**fields)
+    if settings.EXERCISE_HISTORY_WRITE_BEHIND:
+        get_recorder().record(history)
+    else:
+        history.save()
+    return history
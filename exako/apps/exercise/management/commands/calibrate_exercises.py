@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from exako.apps.exercise import calibration
+
+
+class Command(BaseCommand):
+    help = (
+        'Calibra a dificuldade dos exercícios e a habilidade dos usuários a '
+        'partir do histórico de respostas.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=100_000)
+        parser.add_argument('--epochs', type=int, default=calibration.EPOCHS)
+
+    def handle(self, *args, **options):
+        result = calibration.calibrate(
+            chunk_size=options['chunk_size'], epochs=options['epochs']
+        )
+        self.stdout.write(
+            f'{result["exercises"]} exercícios e {result["users"]} usuários calibrados.'
+        )
@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+
+from exako.apps.exercise import generator
+from exako.apps.term.constants import Language
+
+
+class Command(BaseCommand):
+    help = 'Gera todos os exercícios válidos a partir dos termos cadastrados.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--type',
+            type=int,
+            action='append',
+            choices=[item.exercise_type.value for item in generator.GENERATORS],
+            dest='exercise_types',
+            help='Tipo de exercício a gerar. Pode ser repetido; padrão: todos.',
+        )
+        parser.add_argument(
+            '--language',
+            action='append',
+            choices=Language.values,
+            dest='languages',
+            help='Idioma a gerar. Pode ser repetido; padrão: todos.',
+        )
+        parser.add_argument('--workers', type=int, default=1)
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=10000,
+            help='Quantidade de ids da tabela raiz processados por tarefa.',
+        )
+
+    def handle(self, *args, **options):
+        created = generator.run(
+            exercise_types=options['exercise_types'],
+            languages=options['languages'],
+            workers=options['workers'],
+            chunk_size=options['chunk_size'],
+        )
+        self.stdout.write(f'{created} exercícios criados.')
@@ -0,0 +1,57 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from exako.apps.exercise import partitions
+
+
+class Command(BaseCommand):
+    help = (
+        'Cria as partições mensais do histórico de respostas e arquiva as '
+        'partições antigas em arquivos compactados.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--ahead',
+            type=int,
+            default=3,
+            help='Quantidade de meses futuros com partição criada.',
+        )
+        parser.add_argument(
+            '--archive-after',
+            type=int,
+            default=None,
+            help='Arquivar partições com mais de N meses completos.',
+        )
+        parser.add_argument(
+            '--archive-dir', default=settings.EXERCISE_HISTORY_ARCHIVE_DIR
+        )
+
+    def handle(self, *args, **options):
+        current = partitions.month_start(timezone.now().date())
+        month = min(filter(None, [partitions.oldest_default_month(), current]))
+        last = current
+        for _ in range(options['ahead']):
+            last = partitions.next_month(last)
+
+        while month <= last:
+            if partitions.create_partition(month):
+                self.stdout.write(
+                    f'Partição {partitions.partition_name(month)} criada.'
+                )
+            month = partitions.next_month(month)
+
+        if options['archive_after'] is None:
+            return
+
+        limit = current
+        for _ in range(options['archive_after']):
+            limit = partitions.month_start(limit - timedelta(days=1))
+        for month in sorted(partitions.list_partitions()):
+            if month >= limit:
+                break
+            path = partitions.archive_partition(month, options['archive_dir'])
+            self.stdout.write(f'Partição arquivada em {path}.')
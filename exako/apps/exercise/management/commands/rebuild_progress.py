@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from exako.apps.exercise import progress
+
+
+class Command(BaseCommand):
+    help = 'Recalcula os contadores de progresso dos usuários a partir do histórico.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        progress.rebuild(batch_size=options['batch_size'])
+        self.stdout.write('Progresso recalculado.')
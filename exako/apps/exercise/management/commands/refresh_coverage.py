@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from exako.apps.exercise import coverage
+
+
+class Command(BaseCommand):
+    help = 'Recalcula a cobertura de todos os termos para a criação de exercícios.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1000,
+            help='Quantidade de termos recalculados por consulta.',
+        )
+
+    def handle(self, *args, **options):
+        count = coverage.refresh_all(chunk_size=options['chunk_size'])
+        self.stdout.write(f'Cobertura de {count} termos recalculada.')
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from exako.apps.exercise import distractors
+from exako.apps.term.constants import Language
+
+
+class Command(BaseCommand):
+    help = 'Recalcula os candidatos a distratores de todos os termos.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--language',
+            action='append',
+            choices=Language.values,
+            dest='languages',
+            help='Idioma a recalcular. Pode ser repetido; padrão: todos.',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1000,
+            help='Quantidade de termos recalculados por transação.',
+        )
+
+    def handle(self, *args, **options):
+        count = distractors.refresh_all(
+            languages=options['languages'],
+            chunk_size=options['chunk_size'],
+        )
+        self.stdout.write(f'{count} candidatos a distratores gravados.')
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+
+from exako.apps.exercise.constants import ANSWER_NORMALIZATION_VERSION
+from exako.apps.exercise.exercises import rescore_history, update_answer_keys
+from exako.apps.exercise.models import Exercise, ExerciseHistory
+
+
+class Command(BaseCommand):
+    help = (
+        'Recalcula as chaves de resposta dos exercícios e, opcionalmente, '
+        'corrige novamente o histórico de respostas.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Recalcular todas as chaves, não apenas as ausentes ou desatualizadas.',
+        )
+        parser.add_argument(
+            '--history',
+            action='store_true',
+            help='Corrigir novamente o histórico com as chaves atuais.',
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        exercises = Exercise.objects.all()
+        if not options['all']:
+            exercises = exercises.exclude(
+                answer_key__normalization_version=ANSWER_NORMALIZATION_VERSION
+            )
+        update_answer_keys(exercises, batch_size=options['batch_size'])
+        self.stdout.write('Chaves de resposta atualizadas.')
+
+        if options['history']:
+            count = rescore_history(
+                ExerciseHistory.objects.all(), batch_size=options['batch_size']
+            )
+            self.stdout.write(f'{count} respostas corrigidas novamente.')
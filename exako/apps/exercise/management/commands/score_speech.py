@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from exako.apps.exercise import speech
+
+
+class Command(BaseCommand):
+    help = 'Corrige os exercícios de fala que ainda estão pendentes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--older-than',
+            type=float,
+            default=60,
+            help='Corrigir apenas os jobs criados há mais desses segundos.',
+        )
+
+    def handle(self, *args, **options):
+        count = speech.process_pending(older_than=options['older_than'])
+        self.stdout.write(f'{count} correções de fala processadas.')
@@ -0,0 +1,21 @@
+# Generated by Django 5.0.14 on 2026-10-18 22:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exercise', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='exercise',
+            name='level',
+            field=models.CharField(blank=True, choices=[('A1', 'Beginner'), ('A2', 'Elementary'), ('B1', 'Intermediate'), ('B2', 'Upper Intermediate'), ('C1', 'Advanced'), ('C2', 'Master')], max_length=50, null=True),
+        ),
+        migrations.DeleteModel(
+            name='ExerciseLevel',
+        ),
+    ]
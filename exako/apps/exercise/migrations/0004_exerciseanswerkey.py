@@ -0,0 +1,28 @@
+# Generated by Django 5.0.14 on 2026-10-18 22:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exercise', '0003_exercise_level_delete_exerciselevel'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExerciseAnswerKey',
+            fields=[
+                ('exercise', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='answer_key', serialize=False, to='exercise.exercise')),
+                ('type', models.CharField(choices=[(0, 'Order sentence'), (1, 'Listen term'), (2, 'Listen term mulitple choice'), (3, 'Listen sentence'), (4, 'Speak term'), (5, 'Speak sentence'), (6, 'Mulitple choice term'), (7, 'Multiple choice term definition'), (8, 'Term image multiple choice'), (9, 'Term text image multiple choice'), (10, 'Term connection'), (12, 'Random')], max_length=50)),
+                ('correct_answer', models.JSONField()),
+                ('normalized_answer', models.JSONField()),
+                ('answer_hash', models.CharField(max_length=64)),
+                ('normalization_version', models.PositiveSmallIntegerField()),
+            ],
+            options={
+                'indexes': [models.Index(fields=['normalization_version'], name='answer_key_version_idx')],
+            },
+        ),
+    ]
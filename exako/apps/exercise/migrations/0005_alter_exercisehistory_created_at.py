@@ -0,0 +1,19 @@
+# Generated by Django 5.0.14 on 2026-10-18 22:43
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exercise', '0004_exerciseanswerkey'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='exercisehistory',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
@@ -0,0 +1,99 @@
+from django.db import migrations, models
+
+COLUMNS = 'id, created_at, correct, response, request, exercise_id, user_id'
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exercise', '0005_alter_exercisehistory_created_at'),
+        ('user', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            f"""
+            ALTER TABLE exercise_exercisehistory RENAME TO exercise_exercisehistory_old;
+            ALTER INDEX exercise_exercisehistory_exercise_id_1a19728d RENAME TO exercise_exercisehistory_old_exercise_id;
+            ALTER INDEX exercise_exercisehistory_user_id_6dbccdf7 RENAME TO exercise_exercisehistory_old_user_id;
+            ALTER INDEX exercise_exercisehistory_pkey RENAME TO exercise_exercisehistory_old_pkey;
+            ALTER TABLE exercise_exercisehistory_old RENAME CONSTRAINT exercise_exercisehis_exercise_id_1a19728d_fk_exercise_ TO exercise_exercisehistory_old_exercise_id_fk;
+            ALTER TABLE exercise_exercisehistory_old RENAME CONSTRAINT exercise_exercisehistory_user_id_6dbccdf7_fk_user_user_id TO exercise_exercisehistory_old_user_id_fk;
+
+            CREATE TABLE exercise_exercisehistory (
+                id bigint GENERATED BY DEFAULT AS IDENTITY,
+                created_at timestamp with time zone NOT NULL,
+                correct boolean NOT NULL,
+                response jsonb NULL,
+                request jsonb NULL,
+                exercise_id bigint NOT NULL,
+                user_id bigint NOT NULL,
+                CONSTRAINT exercise_exercisehistory_pkey PRIMARY KEY (id, created_at),
+                CONSTRAINT exercise_exercisehis_exercise_id_1a19728d_fk_exercise_
+                    FOREIGN KEY (exercise_id) REFERENCES exercise_exercise (id)
+                    DEFERRABLE INITIALLY DEFERRED,
+                CONSTRAINT exercise_exercisehistory_user_id_6dbccdf7_fk_user_user_id
+                    FOREIGN KEY (user_id) REFERENCES user_user (id)
+                    DEFERRABLE INITIALLY DEFERRED
+            ) PARTITION BY RANGE (created_at);
+            CREATE TABLE exercise_exercisehistory_default
+                PARTITION OF exercise_exercisehistory DEFAULT;
+            CREATE INDEX exercise_exercisehistory_exercise_id_1a19728d
+                ON exercise_exercisehistory (exercise_id);
+            CREATE INDEX exercise_exercisehistory_user_id_6dbccdf7
+                ON exercise_exercisehistory (user_id);
+
+            INSERT INTO exercise_exercisehistory ({COLUMNS})
+                SELECT {COLUMNS} FROM exercise_exercisehistory_old;
+            SELECT setval(
+                pg_get_serial_sequence('exercise_exercisehistory', 'id'),
+                COALESCE((SELECT MAX(id) FROM exercise_exercisehistory), 0) + 1,
+                false
+            );
+            DROP TABLE exercise_exercisehistory_old;
+            """,
+            reverse_sql=f"""
+            ALTER TABLE exercise_exercisehistory RENAME TO exercise_exercisehistory_old;
+            ALTER INDEX exercise_exercisehistory_exercise_id_1a19728d RENAME TO exercise_exercisehistory_old_exercise_id;
+            ALTER INDEX exercise_exercisehistory_user_id_6dbccdf7 RENAME TO exercise_exercisehistory_old_user_id;
+            ALTER INDEX exercise_exercisehistory_pkey RENAME TO exercise_exercisehistory_old_pkey;
+            ALTER TABLE exercise_exercisehistory_old RENAME CONSTRAINT exercise_exercisehis_exercise_id_1a19728d_fk_exercise_ TO exercise_exercisehistory_old_exercise_id_fk;
+            ALTER TABLE exercise_exercisehistory_old RENAME CONSTRAINT exercise_exercisehistory_user_id_6dbccdf7_fk_user_user_id TO exercise_exercisehistory_old_user_id_fk;
+
+            CREATE TABLE exercise_exercisehistory (
+                id bigint GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+                created_at timestamp with time zone NOT NULL,
+                correct boolean NOT NULL,
+                response jsonb NULL,
+                request jsonb NULL,
+                exercise_id bigint NOT NULL,
+                user_id bigint NOT NULL,
+                CONSTRAINT exercise_exercisehis_exercise_id_1a19728d_fk_exercise_
+                    FOREIGN KEY (exercise_id) REFERENCES exercise_exercise (id)
+                    DEFERRABLE INITIALLY DEFERRED,
+                CONSTRAINT exercise_exercisehistory_user_id_6dbccdf7_fk_user_user_id
+                    FOREIGN KEY (user_id) REFERENCES user_user (id)
+                    DEFERRABLE INITIALLY DEFERRED
+            );
+            CREATE INDEX exercise_exercisehistory_exercise_id_1a19728d
+                ON exercise_exercisehistory (exercise_id);
+            CREATE INDEX exercise_exercisehistory_user_id_6dbccdf7
+                ON exercise_exercisehistory (user_id);
+
+            INSERT INTO exercise_exercisehistory ({COLUMNS})
+                SELECT {COLUMNS} FROM exercise_exercisehistory_old;
+            SELECT setval(
+                pg_get_serial_sequence('exercise_exercisehistory', 'id'),
+                COALESCE((SELECT MAX(id) FROM exercise_exercisehistory), 0) + 1,
+                false
+            );
+            DROP TABLE exercise_exercisehistory_old;
+            """,
+        ),
+        migrations.AddIndex(
+            model_name='exercisehistory',
+            index=models.Index(
+                fields=['user', 'created_at'], name='history_user_created_idx'
+            ),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.0.14 on 2026-10-18 22:54
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exercise', '0006_partition_exercisehistory'),
+        ('user', '0002_remove_user_bio_remove_user_job_title_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserProgress',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='exercise_progress', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('current_streak', models.PositiveIntegerField(default=0)),
+                ('best_streak', models.PositiveIntegerField(default=0)),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('correct', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ExerciseProgress',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('type', models.CharField(choices=[(0, 'Order sentence'), (1, 'Listen term'), (2, 'Listen term mulitple choice'), (3, 'Listen sentence'), (4, 'Speak term'), (5, 'Speak sentence'), (6, 'Mulitple choice term'), (7, 'Multiple choice term definition'), (8, 'Term image multiple choice'), (9, 'Term text image multiple choice'), (10, 'Term connection'), (12, 'Random')], max_length=50)),
+                ('language', models.CharField(choices=[('pt-BR', 'Portuguese Brazil'), ('en-US', 'English USA'), ('de', 'Deutsch'), ('fr', 'Francês'), ('es', 'Espanhol'), ('it', 'Italiano'), ('zh', 'Chinese'), ('ja', 'Japonês'), ('ru', 'Russo')], max_length=50)),
+                ('level', models.CharField(blank=True, choices=[('A1', 'Beginner'), ('A2', 'Elementary'), ('B1', 'Intermediate'), ('B2', 'Upper Intermediate'), ('C1', 'Advanced'), ('C2', 'Master')], max_length=50, null=True)),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('correct', models.PositiveIntegerField(default=0)),
+                ('time_to_answer_sum', models.PositiveBigIntegerField(default=0)),
+                ('time_to_answer_count', models.PositiveIntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='exerciseprogress',
+            constraint=models.UniqueConstraint(fields=('user', 'type', 'language', 'level'), name='unique_exercise_progress', nulls_distinct=False),
+        ),
+    ]
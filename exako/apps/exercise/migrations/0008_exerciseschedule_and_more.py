@@ -0,0 +1,37 @@
+# Generated by Django 5.0.14 on 2026-10-18 22:57
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exercise', '0007_userprogress_exerciseprogress_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExerciseSchedule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('due_at', models.DateTimeField()),
+                ('last_review', models.DateTimeField()),
+                ('interval', models.PositiveIntegerField(default=0)),
+                ('ease', models.FloatField(default=2.5)),
+                ('repetitions', models.PositiveIntegerField(default=0)),
+                ('lapses', models.PositiveIntegerField(default=0)),
+                ('exercise', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='exercise.exercise')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'due_at'], name='schedule_user_due_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='exerciseschedule',
+            constraint=models.UniqueConstraint(fields=('user', 'exercise'), name='unique_exercise_schedule'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.0.14 on 2026-10-18 23:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exercise', '0008_exerciseschedule_and_more'),
+        ('term', '0003_term_term_expression_trgm_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DistractorCandidate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField()),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('candidate', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='term.term')),
+                ('term', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='distractor_candidates', to='term.term')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['term', 'rank'], name='distractor_term_rank_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='distractorcandidate',
+            constraint=models.UniqueConstraint(fields=('term', 'candidate'), name='unique_distractor_candidate'),
+        ),
+    ]
@@ -0,0 +1,176 @@
+# Generated by Django 5.0.14 on 2026-10-18 23:16
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+BACKFILL_TARGETS = [
+    ('exercise_exercisedistractor', 'distractors', 'term', 'term_term'),
+    ('exercise_exercisedistractor', 'distractors', 'term_lexical', 'term_termlexical'),
+    (
+        'exercise_exercisedistractor',
+        'distractors',
+        'term_definition',
+        'term_termdefinition',
+    ),
+    ('exercise_exercisedistractor', 'distractors', 'term_image', 'term_termimage'),
+    ('exercise_exerciseconnection', 'connections', 'term', 'term_term'),
+]
+
+
+def _backfill_sql(table, key, field, target):
+    items = f"e.additional_content -> '{key}' -> '{field}'"
+    return f"""
+        INSERT INTO {table} (exercise_id, position, {field}_id)
+        SELECT e.id, item.position - 1, target.id
+        FROM exercise_exercise e
+        CROSS JOIN LATERAL jsonb_array_elements_text(
+            CASE jsonb_typeof({items}) WHEN 'array' THEN {items} ELSE '[]' END
+        ) WITH ORDINALITY AS item(value, position)
+        JOIN {target} target ON target.id = CASE
+            WHEN item.value ~ '^[0-9]{{1,18}}$' THEN item.value::bigint
+        END;
+    """
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('exercise', '0009_distractorcandidate_and_more'),
+        ('term', '0003_term_term_expression_trgm_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExerciseConnection',
+            fields=[
+                (
+                    'id',
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name='ID',
+                    ),
+                ),
+                ('position', models.PositiveSmallIntegerField()),
+                (
+                    'exercise',
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name='connections',
+                        to='exercise.exercise',
+                    ),
+                ),
+                (
+                    'term',
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name='exercise_connections',
+                        to='term.term',
+                    ),
+                ),
+            ],
+            options={
+                'ordering': ['position'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ExerciseDistractor',
+            fields=[
+                (
+                    'id',
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name='ID',
+                    ),
+                ),
+                ('position', models.PositiveSmallIntegerField()),
+                (
+                    'exercise',
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name='distractors',
+                        to='exercise.exercise',
+                    ),
+                ),
+                (
+                    'term',
+                    models.ForeignKey(
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name='exercise_distractors',
+                        to='term.term',
+                    ),
+                ),
+                (
+                    'term_definition',
+                    models.ForeignKey(
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name='exercise_distractors',
+                        to='term.termdefinition',
+                    ),
+                ),
+                (
+                    'term_image',
+                    models.ForeignKey(
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name='exercise_distractors',
+                        to='term.termimage',
+                    ),
+                ),
+                (
+                    'term_lexical',
+                    models.ForeignKey(
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name='exercise_distractors',
+                        to='term.termlexical',
+                    ),
+                ),
+            ],
+            options={
+                'ordering': ['position'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='exercisedistractor',
+            constraint=models.CheckConstraint(
+                check=models.Q(
+                    models.Q(
+                        ('term__isnull', False),
+                        ('term_definition__isnull', True),
+                        ('term_image__isnull', True),
+                        ('term_lexical__isnull', True),
+                    ),
+                    models.Q(
+                        ('term__isnull', True),
+                        ('term_definition__isnull', True),
+                        ('term_image__isnull', True),
+                        ('term_lexical__isnull', False),
+                    ),
+                    models.Q(
+                        ('term__isnull', True),
+                        ('term_definition__isnull', False),
+                        ('term_image__isnull', True),
+                        ('term_lexical__isnull', True),
+                    ),
+                    models.Q(
+                        ('term__isnull', True),
+                        ('term_definition__isnull', True),
+                        ('term_image__isnull', False),
+                        ('term_lexical__isnull', True),
+                    ),
+                    _connector='OR',
+                ),
+                name='exercise_distractor_single_target',
+            ),
+        ),
+        migrations.RunSQL(
+            [_backfill_sql(*target) for target in BACKFILL_TARGETS],
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
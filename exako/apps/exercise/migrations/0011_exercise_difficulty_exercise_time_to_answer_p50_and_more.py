@@ -0,0 +1,38 @@
+# Generated by Django 5.0.14 on 2026-10-18 23:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exercise', '0010_exerciseconnection_exercisedistractor_and_more'),
+        ('term', '0003_term_term_expression_trgm_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='exercise',
+            name='difficulty',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='exercise',
+            name='time_to_answer_p50',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='exercise',
+            name='time_to_answer_p90',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='userprogress',
+            name='ability',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='exercise',
+            index=models.Index(fields=['language', 'difficulty'], name='exercise_language_diff_idx'),
+        ),
+    ]
@@ -0,0 +1,71 @@
+# Generated by Django 5.0.14 on 2026-10-18 23:30
+
+import django.contrib.postgres.fields
+import django.contrib.postgres.indexes
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+BACKFILL_SQL = """
+    INSERT INTO exercise_termcoverage (
+        term_id, language, has_pronunciation, has_audio, has_image,
+        example_count, rhyme_with_audio_count, definition_count,
+        exercise_types, updated_at
+    )
+    SELECT
+        t.id,
+        t.language,
+        EXISTS (SELECT 1 FROM term_termpronunciation p WHERE p.term_id = t.id),
+        EXISTS (
+            SELECT 1 FROM term_termpronunciation p
+            WHERE p.term_id = t.id AND p.audio_file IS NOT NULL
+        ),
+        EXISTS (SELECT 1 FROM term_termimage i WHERE i.term_id = t.id),
+        (
+            SELECT count(DISTINCT l.term_example_id) FROM term_termexamplelink l
+            WHERE l.term_id = t.id
+        ),
+        (
+            SELECT count(*) FROM term_termlexical x
+            JOIN term_termpronunciation p
+                ON p.term_id = x.term_value_ref_id AND p.audio_file IS NOT NULL
+            WHERE x.term_id = t.id AND x.type = '4'
+        ),
+        (SELECT count(*) FROM term_termdefinition d WHERE d.term_id = t.id),
+        ARRAY(
+            SELECT DISTINCT e.type::integer FROM exercise_exercise e
+            WHERE e.term_id = t.id ORDER BY 1
+        ),
+        now()
+    FROM term_term t;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exercise', '0011_exercise_difficulty_exercise_time_to_answer_p50_and_more'),
+        ('term', '0003_term_term_expression_trgm_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TermCoverage',
+            fields=[
+                ('term', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='coverage', serialize=False, to='term.term')),
+                ('language', models.CharField(choices=[('pt-BR', 'Portuguese Brazil'), ('en-US', 'English USA'), ('de', 'Deutsch'), ('fr', 'Francês'), ('es', 'Espanhol'), ('it', 'Italiano'), ('zh', 'Chinese'), ('ja', 'Japonês'), ('ru', 'Russo')], max_length=50)),
+                ('has_pronunciation', models.BooleanField(default=False)),
+                ('has_audio', models.BooleanField(default=False)),
+                ('has_image', models.BooleanField(default=False)),
+                ('example_count', models.PositiveIntegerField(default=0)),
+                ('rhyme_with_audio_count', models.PositiveIntegerField(default=0)),
+                ('definition_count', models.PositiveIntegerField(default=0)),
+                ('exercise_types', django.contrib.postgres.fields.ArrayField(base_field=models.IntegerField(), default=list, size=None)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['language', 'term'], name='coverage_language_idx'), django.contrib.postgres.indexes.GinIndex(fields=['exercise_types'], name='coverage_types_idx')],
+            },
+        ),
+        migrations.RunSQL(BACKFILL_SQL, reverse_sql=migrations.RunSQL.noop),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.0.14 on 2026-10-18 23:47
+
+import django.db.models.deletion
+import django.utils.timezone
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exercise', '0012_termcoverage'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SpeechJob',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('type', models.CharField(choices=[(0, 'Order sentence'), (1, 'Listen term'), (2, 'Listen term mulitple choice'), (3, 'Listen sentence'), (4, 'Speak term'), (5, 'Speak sentence'), (6, 'Mulitple choice term'), (7, 'Multiple choice term definition'), (8, 'Term image multiple choice'), (9, 'Term text image multiple choice'), (10, 'Term connection'), (12, 'Random')], max_length=50)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('audio_path', models.CharField(max_length=255)),
+                ('request', models.JSONField(blank=True, null=True)),
+                ('score', models.FloatField(blank=True, null=True)),
+                ('correct', models.BooleanField(blank=True, null=True)),
+                ('correct_answer', models.JSONField(blank=True, null=True)),
+                ('feedback', models.TextField(blank=True, default='')),
+                ('error', models.TextField(blank=True, default='')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('exercise', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='exercise.exercise')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'created_at'], name='speech_job_status_idx')],
+            },
+        ),
+    ]
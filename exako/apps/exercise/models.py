@@ -1,16 +1,28 @@
-from django.db import models
+import copy
+import uuid
+
+from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex
+from django.db import models, transaction
 from django.db.models.base import pre_save
+from django.db.models.signals import post_delete, post_save, pre_delete
 from django.dispatch import receiver
+from django.utils import timezone
 
 from exako.apps.card.models import Card
 from exako.apps.core.models import CustomManager
-from exako.apps.exercise.constants import ExerciseType
-from exako.apps.exercise.validators import validate_exercise
+from exako.apps.exercise import compiled, recent
+from exako.apps.exercise.constants import ExerciseType, SpeechJobStatus
+from exako.apps.exercise.validators import (
+    validate_exercise,
+    validate_exercise_relations,
+)
 from exako.apps.term.constants import Language, Level
 from exako.apps.term.models import (
     Term,
     TermDefinition,
     TermExample,
+    TermExampleLink,
     TermImage,
     TermLexical,
     TermPronunciation,
@@ -19,7 +31,18 @@ from exako.apps.user.models import User
 
 
 class ExerciseManager(CustomManager):
-    def list(self, language, exercise_type, level, cardset_id, seed, user):
+    def list(
+        self,
+        language,
+        exercise_type,
+        level,
+        cardset_id,
+        seed,
+        user,
+        difficulty_min=None,
+        difficulty_max=None,
+        order_by_difficulty=False,
+    ):
         queryset = (
             super()
             .get_queryset()
@@ -41,17 +64,34 @@ class ExerciseManager(CustomManager):
         if level:
             queryset = queryset.filter(level__in=level)
 
+        if difficulty_min is not None:
+            queryset = queryset.filter(difficulty__gte=difficulty_min)
+        if difficulty_max is not None:
+            queryset = queryset.filter(difficulty__lte=difficulty_max)
+
+        seen = recent.seen(user)
+        if seen:
+            queryset = queryset.exclude(id__in=seen)
+
         if cardset_id:
-            exercise_query = Exercise.objects.filter(
-                term__in=Card.objects.filter(
-                    cardset__user=user, cardset_id__in=cardset_id
-                ).values('term')
-            ).annotate(md5_seed=models.Value('0'))
+            exercise_query = (
+                Exercise.objects.filter(
+                    term__in=Card.objects.filter(
+                        cardset__user=user, cardset_id__in=cardset_id
+                    ).values('term')
+                )
+                .exclude(id__in=seen)
+                .annotate(md5_seed=models.Value('0'))
+            )
             queryset = queryset.exclude(
                 id__in=exercise_query.values_list('id', flat=True)
             )
             queryset = queryset.union(exercise_query)
 
+        if order_by_difficulty:
+            return queryset.values('type', 'id', 'difficulty').order_by(
+                models.F('difficulty').asc(nulls_last=True), 'md5_seed'
+            )
         return queryset.values('type', 'id').order_by('md5_seed')
 
 
@@ -104,9 +144,19 @@ class Exercise(models.Model):
         blank=True,
     )
     additional_content = models.JSONField(blank=True, null=True)
+    # Preenchidos por exercise.calibration a partir do histórico de respostas.
+    difficulty = models.FloatField(null=True, blank=True)
+    time_to_answer_p50 = models.FloatField(null=True, blank=True)
+    time_to_answer_p90 = models.FloatField(null=True, blank=True)
     objects = ExerciseManager()
 
     class Meta:
+        indexes = [
+            models.Index(
+                fields=['language', 'difficulty'],
+                name='exercise_language_diff_idx',
+            )
+        ]
         constraints = [
             models.UniqueConstraint(
                 fields=['type', 'language', 'term_example'],
@@ -180,15 +230,152 @@ class Exercise(models.Model):
             ),
         ]
 
+    def save(self, *args, **kwargs):
+        # Os distratores e as conexões são validados no post_save, depois de
+        # copiados para as tabelas de relação; um erro ali desfaz o exercício.
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+
+class ExerciseDistractor(models.Model):
+    """
+    Distrator de um exercício, espelhando additional_content['distractors'].
+    Cada linha aponta para exatamente um objeto, de forma que apagar o objeto
+    remove o distrator e a busca pelos exercícios que usam um objeto é feita
+    pelo índice da chave estrangeira.
+    """
+
+    exercise = models.ForeignKey(
+        Exercise,
+        on_delete=models.CASCADE,
+        related_name='distractors',
+    )
+    position = models.PositiveSmallIntegerField()
+    term = models.ForeignKey(
+        Term,
+        on_delete=models.CASCADE,
+        null=True,
+        related_name='exercise_distractors',
+    )
+    term_lexical = models.ForeignKey(
+        TermLexical,
+        on_delete=models.CASCADE,
+        null=True,
+        related_name='exercise_distractors',
+    )
+    term_definition = models.ForeignKey(
+        TermDefinition,
+        on_delete=models.CASCADE,
+        null=True,
+        related_name='exercise_distractors',
+    )
+    term_image = models.ForeignKey(
+        TermImage,
+        on_delete=models.CASCADE,
+        null=True,
+        related_name='exercise_distractors',
+    )
+
+    class Meta:
+        ordering = ['position']
+        constraints = [
+            models.CheckConstraint(
+                check=(
+                    models.Q(
+                        term__isnull=False,
+                        term_lexical__isnull=True,
+                        term_definition__isnull=True,
+                        term_image__isnull=True,
+                    )
+                    | models.Q(
+                        term__isnull=True,
+                        term_lexical__isnull=False,
+                        term_definition__isnull=True,
+                        term_image__isnull=True,
+                    )
+                    | models.Q(
+                        term__isnull=True,
+                        term_lexical__isnull=True,
+                        term_definition__isnull=False,
+                        term_image__isnull=True,
+                    )
+                    | models.Q(
+                        term__isnull=True,
+                        term_lexical__isnull=True,
+                        term_definition__isnull=True,
+                        term_image__isnull=False,
+                    )
+                ),
+                name='exercise_distractor_single_target',
+            )
+        ]
+
+
+class ExerciseConnection(models.Model):
+    """Conexão de um exercício, espelhando additional_content['connections']."""
+
+    exercise = models.ForeignKey(
+        Exercise,
+        on_delete=models.CASCADE,
+        related_name='connections',
+    )
+    position = models.PositiveSmallIntegerField()
+    term = models.ForeignKey(
+        Term,
+        on_delete=models.CASCADE,
+        related_name='exercise_connections',
+    )
+
+    class Meta:
+        ordering = ['position']
+
+
+class ExerciseAnswerKey(models.Model):
+    """
+    Resposta correta de um exercício já normalizada, usada para corrigir
+    respostas sem carregar o conteúdo do exercício.
+    """
+
+    exercise = models.OneToOneField(
+        Exercise,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='answer_key',
+    )
+    type = models.CharField(max_length=50, choices=ExerciseType.choices)
+    correct_answer = models.JSONField()
+    normalized_answer = models.JSONField()
+    answer_hash = models.CharField(max_length=64)
+    normalization_version = models.PositiveSmallIntegerField()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['normalization_version'],
+                name='answer_key_version_idx',
+            )
+        ]
+
 
 class ExerciseHistory(models.Model):
     exercise = models.ForeignKey(Exercise, on_delete=models.DO_NOTHING)
     user = models.ForeignKey(User, on_delete=models.DO_NOTHING)
-    created_at = models.DateTimeField(auto_now_add=True)
+    created_at = models.DateTimeField(default=timezone.now)
     correct = models.BooleanField()
     response = models.JSONField(blank=True, null=True)
     request = models.JSONField(blank=True, null=True)
 
+    class Meta:
+        # A tabela é particionada por created_at (ver migração 0006 e o
+        # comando partition_history), portanto a chave primária real é
+        # (id, created_at).
+        indexes = [
+            models.Index(
+                fields=['user', 'created_at'],
+                name='history_user_created_idx',
+            )
+        ]
+
     @classmethod
     def get_current_streak(cls, user):
         histories = ExerciseHistory.objects.filter(user=user)
@@ -198,6 +385,201 @@ class ExerciseHistory(models.Model):
         return histories.filter(id__gt=first_invalid_subquery).count()
 
 
+class UserProgress(models.Model):
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='exercise_progress',
+    )
+    current_streak = models.PositiveIntegerField(default=0)
+    best_streak = models.PositiveIntegerField(default=0)
+    total = models.PositiveIntegerField(default=0)
+    correct = models.PositiveIntegerField(default=0)
+    ability = models.FloatField(null=True, blank=True)
+
+    @property
+    def incorrect(self):
+        return self.total - self.correct
+
+    @property
+    def accuracy(self):
+        return self.correct / self.total if self.total else 0
+
+
+class ExerciseProgress(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    type = models.CharField(max_length=50, choices=ExerciseType.choices)
+    language = models.CharField(max_length=50, choices=Language.choices)
+    level = models.CharField(
+        max_length=50,
+        choices=Level.choices,
+        null=True,
+        blank=True,
+    )
+    total = models.PositiveIntegerField(default=0)
+    correct = models.PositiveIntegerField(default=0)
+    time_to_answer_sum = models.PositiveBigIntegerField(default=0)
+    time_to_answer_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'type', 'language', 'level'],
+                name='unique_exercise_progress',
+                nulls_distinct=False,
+            )
+        ]
+
+    @property
+    def accuracy(self):
+        return self.correct / self.total if self.total else 0
+
+    @property
+    def average_time_to_answer(self):
+        if not self.time_to_answer_count:
+            return None
+        return self.time_to_answer_sum / self.time_to_answer_count
+
+
+class ExerciseSchedule(models.Model):
+    """Estado de repetição espaçada (SM-2) de um exercício para um usuário."""
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    exercise = models.ForeignKey(Exercise, on_delete=models.CASCADE)
+    due_at = models.DateTimeField()
+    last_review = models.DateTimeField()
+    interval = models.PositiveIntegerField(default=0)
+    ease = models.FloatField(default=2.5)
+    repetitions = models.PositiveIntegerField(default=0)
+    lapses = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'exercise'],
+                name='unique_exercise_schedule',
+            )
+        ]
+        indexes = [
+            models.Index(fields=['user', 'due_at'], name='schedule_user_due_idx'),
+        ]
+
+
+class DistractorCandidate(models.Model):
+    """
+    Candidatos a distratores de um termo, ordenados por rank. Calculados por
+    exercise.distractors a partir da semelhança ortográfica (pg_trgm), da
+    classe gramatical e do nível das definições, sempre no mesmo idioma.
+    """
+
+    term = models.ForeignKey(
+        Term,
+        on_delete=models.CASCADE,
+        related_name='distractor_candidates',
+    )
+    candidate = models.ForeignKey(Term, on_delete=models.CASCADE, related_name='+')
+    score = models.FloatField()
+    rank = models.PositiveSmallIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['term', 'candidate'],
+                name='unique_distractor_candidate',
+            )
+        ]
+        indexes = [
+            models.Index(fields=['term', 'rank'], name='distractor_term_rank_idx'),
+        ]
+
+
+class TermCoverage(models.Model):
+    """
+    Recursos de um termo usados na criação de exercícios e os tipos de
+    exercício que já existem sobre ele. Mantida por exercise.coverage a cada
+    alteração do termo ou dos objetos ligados a ele.
+    """
+
+    term = models.OneToOneField(
+        Term,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='coverage',
+    )
+    language = models.CharField(max_length=50, choices=Language.choices)
+    has_pronunciation = models.BooleanField(default=False)
+    has_audio = models.BooleanField(default=False)
+    has_image = models.BooleanField(default=False)
+    example_count = models.PositiveIntegerField(default=0)
+    rhyme_with_audio_count = models.PositiveIntegerField(default=0)
+    definition_count = models.PositiveIntegerField(default=0)
+    exercise_types = ArrayField(models.IntegerField(), default=list)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['language', 'term'], name='coverage_language_idx'),
+            GinIndex(fields=['exercise_types'], name='coverage_types_idx'),
+        ]
+
+
+class SpeechJob(models.Model):
+    """
+    Correção de uma resposta de exercício de fala, feita em segundo plano por
+    exercise.speech. O áudio enviado fica em audio_path até ser pontuado e
+    correct, correct_answer e feedback guardam a resposta do check() quando o
+    job termina.
+    """
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    exercise = models.ForeignKey(Exercise, on_delete=models.CASCADE)
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    type = models.CharField(max_length=50, choices=ExerciseType.choices)
+    status = models.CharField(
+        max_length=20,
+        choices=SpeechJobStatus.choices,
+        default=SpeechJobStatus.PENDING,
+    )
+    audio_path = models.CharField(max_length=255)
+    request = models.JSONField(blank=True, null=True)
+    score = models.FloatField(null=True, blank=True)
+    correct = models.BooleanField(null=True, blank=True)
+    correct_answer = models.JSONField(blank=True, null=True)
+    feedback = models.TextField(blank=True, default='')
+    error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(default=timezone.now)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='speech_job_status_idx'),
+        ]
+
+    @property
+    def result(self):
+        if self.status != SpeechJobStatus.DONE:
+            return None
+        return {
+            'correct': self.correct,
+            'correct_answer': self.correct_answer,
+            'feedback': self.feedback,
+        }
+
+    @property
+    def queue_time(self):
+        if self.started_at is None:
+            return None
+        return (self.started_at - self.created_at).total_seconds()
+
+    @property
+    def scoring_time(self):
+        if self.started_at is None or self.finished_at is None:
+            return None
+        return (self.finished_at - self.started_at).total_seconds()
+
+
 class RandomSeed(models.Func):
     function = 'MD5'
     template = '%(function)s(CAST(%(expressions)s AS VARCHAR) || %(seed)s)'
@@ -206,3 +588,108 @@ class RandomSeed(models.Func):
 @receiver(pre_save, sender=Exercise)
 def register_validators(sender, instance, **kwargs):
     validate_exercise(instance.type, exercise=instance)
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def invalidate_compiled_exercises(sender, instance, **kwargs):
+    if sender in [
+        Exercise,
+        Term,
+        TermLexical,
+        TermExample,
+        TermExampleLink,
+        TermPronunciation,
+        TermDefinition,
+        TermImage,
+    ]:
+        compiled.touch(instance)
+
+
+@receiver(post_save, sender=Exercise)
+def sync_exercise_relations(sender, instance, created, **kwargs):
+    # Precisa rodar antes de refresh_exercise_answer_key, que lê as conexões.
+    from exako.apps.exercise import relations
+
+    additional_content = instance.additional_content or {}
+    if (
+        not created
+        or 'distractors' in additional_content
+        or 'connections' in additional_content
+    ):
+        relations.sync([instance.id])
+
+    original = copy.deepcopy(instance.additional_content)
+    validate_exercise_relations(instance.type, exercise=instance)
+    if instance.additional_content != original:
+        Exercise.objects.filter(id=instance.id).update(
+            additional_content=instance.additional_content
+        )
+
+
+@receiver(post_save, sender=Exercise)
+def refresh_exercise_answer_key(sender, instance, **kwargs):
+    from exako.apps.exercise.exercises import update_answer_keys
+
+    update_answer_keys(Exercise.objects.filter(id=instance.id))
+
+
+@receiver(post_save, sender=Term)
+@receiver(post_save, sender=TermExample)
+@receiver(post_save, sender=TermLexical)
+def refresh_term_answer_keys(sender, instance, **kwargs):
+    from exako.apps.exercise.exercises import update_answer_keys
+
+    lookup = {
+        Term: models.Q(term=instance) | models.Q(term_lexical__term_value_ref=instance),
+        TermExample: models.Q(term_example=instance),
+        TermLexical: models.Q(term_lexical=instance),
+    }
+    update_answer_keys(Exercise.objects.filter(lookup[sender]))
+
+
+@receiver(pre_delete, sender=Term)
+def refresh_connection_answer_keys(sender, instance, **kwargs):
+    from exako.apps.exercise.exercises import update_answer_keys
+
+    exercise_ids = list(
+        ExerciseConnection.objects.filter(term=instance).values_list(
+            'exercise_id', flat=True
+        )
+    )
+    if exercise_ids:
+        transaction.on_commit(
+            lambda: update_answer_keys(Exercise.objects.filter(id__in=exercise_ids))
+        )
+
+
+@receiver(post_save, sender=Term)
+@receiver(post_save, sender=TermDefinition)
+@receiver(post_delete, sender=TermDefinition)
+def refresh_term_distractors(sender, instance, **kwargs):
+    from exako.apps.exercise import distractors
+
+    distractors.schedule(instance.id if sender is Term else instance.term_id)
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def refresh_term_coverage(sender, instance, **kwargs):
+    if sender not in [
+        Exercise,
+        Term,
+        TermLexical,
+        TermExampleLink,
+        TermPronunciation,
+        TermDefinition,
+        TermImage,
+    ]:
+        return
+    from exako.apps.exercise import coverage
+
+    term_id = instance.id if sender is Term else instance.term_id
+    if term_id is None:
+        return
+    # O áudio de um termo conta nas rimas dos termos que rimam com ele.
+    rhymes = sender is TermPronunciation
+    transaction.on_commit(lambda: coverage.refresh([term_id], rhymes=rhymes))
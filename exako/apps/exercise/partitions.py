@@ -0,0 +1,119 @@
+import gzip
+import json
+import os
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+from django.db import connection, transaction
+
+from exako.apps.exercise.models import ExerciseHistory
+
+TABLE = ExerciseHistory._meta.db_table
+DEFAULT_PARTITION = f'{TABLE}_default'
+
+
+def month_start(value: date) -> date:
+    return date(value.year, value.month, 1)
+
+
+def next_month(value: date) -> date:
+    return month_start(month_start(value) + timedelta(days=32))
+
+
+def partition_name(month: date) -> str:
+    return f'{TABLE}_p{month:%Y_%m}'
+
+
+def list_partitions() -> dict[date, str]:
+    """Retorna as partições mensais anexadas, indexadas pelo primeiro dia do mês."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT child.relname FROM pg_inherits
+            JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+            JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+            WHERE parent.relname = %s AND child.relname <> %s
+            """,
+            [TABLE, DEFAULT_PARTITION],
+        )
+        names = [name for (name,) in cursor.fetchall()]
+    return {
+        datetime.strptime(name.removeprefix(f'{TABLE}_p'), '%Y_%m').date(): name
+        for name in names
+    }
+
+
+def oldest_default_month() -> date | None:
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT MIN(created_at) FROM {DEFAULT_PARTITION}')
+        (oldest,) = cursor.fetchone()
+    return month_start(oldest) if oldest else None
+
+
+@transaction.atomic
+def create_partition(month: date) -> bool:
+    """
+    Cria a partição do mês. Linhas desse mês que já estejam na partição
+    default são movidas para a nova partição antes de anexá-la.
+    """
+    month = month_start(month)
+    if month in list_partitions():
+        return False
+
+    # Os limites das partições são meses em UTC.
+    name = partition_name(month)
+    start, end = f'{month} 00:00+00', f'{next_month(month)} 00:00+00'
+    bounds = f"created_at >= '{start}' AND created_at < '{end}'"
+    with connection.cursor() as cursor:
+        cursor.execute(f'CREATE TABLE {name} (LIKE {TABLE} INCLUDING DEFAULTS)')
+        cursor.execute(
+            f'INSERT INTO {name} SELECT * FROM {DEFAULT_PARTITION} WHERE {bounds}'
+        )
+        cursor.execute(f'DELETE FROM {DEFAULT_PARTITION} WHERE {bounds}')
+        cursor.execute(
+            f'ALTER TABLE {TABLE} ATTACH PARTITION {name} '
+            f"FOR VALUES FROM ('{start}') TO ('{end}')"
+        )
+    return True
+
+
+@transaction.atomic
+def archive_partition(month: date, directory: Path) -> Path:
+    """
+    Desanexa a partição do mês, grava suas linhas em um arquivo JSON lines
+    compactado com gzip dentro de directory e remove a tabela.
+    """
+    name = partition_name(month_start(month))
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f'{name}.jsonl.gz'
+    tmp_path = path.with_suffix('.tmp')
+
+    with connection.cursor() as cursor:
+        cursor.execute(f'ALTER TABLE {TABLE} DETACH PARTITION {name}')
+    with connection.chunked_cursor() as cursor, gzip.open(tmp_path, 'wt') as archive:
+        cursor.execute(f'SELECT row_to_json(t)::text FROM {name} t ORDER BY t.id')
+        for (row,) in cursor:
+            archive.write(row + '\n')
+    with connection.cursor() as cursor:
+        cursor.execute(f'DROP TABLE {name}')
+    os.replace(tmp_path, path)
+    return path
+
+
+def read_archive(path: Path, user_id=None, start=None, end=None):
+    """
+    Lê um arquivo gerado por archive_partition, retornando instâncias não
+    salvas de ExerciseHistory, opcionalmente filtradas por usuário e período.
+    """
+    with gzip.open(path, 'rt') as archive:
+        for line in archive:
+            data = json.loads(line)
+            data['created_at'] = datetime.fromisoformat(data['created_at'])
+            if user_id is not None and data['user_id'] != user_id:
+                continue
+            if start is not None and data['created_at'] < start:
+                continue
+            if end is not None and data['created_at'] >= end:
+                continue
+            yield ExerciseHistory(**data)
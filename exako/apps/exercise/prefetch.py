@@ -0,0 +1,108 @@
+"""
+Pré-carregamento dos próximos exercícios no fluxo do HTMX.
+
+Enquanto o usuário responde um exercício, o cliente envia os ids dos
+próximos exercícios da listagem para a view de prefetch. Os partials dos
+EXERCISE_PREFETCH_SIZE primeiros são renderizados e guardados no cache por
+usuário, e a resposta traz um <link rel=preload> para cada áudio e imagem
+deles. A view do exercício entrega o partial guardado, se houver, sem montar
+o exercício de novo. Cada partial é entregue uma única vez.
+"""
+
+import mimetypes
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import Http404
+
+from exako.apps.exercise import exercises
+from exako.apps.exercise.api.schema import ExerciseView
+from exako.apps.exercise.constants import exercises_emoji_map
+
+PARTIAL_KEY = 'exercise:partial:{user_id}:{exercise_id}'
+
+
+def _key(user, exercise_id) -> str:
+    return PARTIAL_KEY.format(user_id=user.id, exercise_id=exercise_id)
+
+
+def media(value) -> list[dict]:
+    """Áudios e imagens referenciados em value, no formato de <link rel=preload>."""
+    if isinstance(value, dict):
+        value = list(value.values())
+    if isinstance(value, (list, tuple)):
+        return [item for element in value for item in media(element)]
+    if not isinstance(value, str):
+        return []
+
+    mimetype, _ = mimetypes.guess_type(value.split('?')[0])
+    kind = (mimetype or '').split('/')[0]
+    if kind not in ['audio', 'image']:
+        return []
+    return [{'url': value, 'as': kind}]
+
+
+def render(request, exercise_type: int, exercise_id: int) -> dict | None:
+    """Renderiza o partial do exercício, com os áudios e imagens que ele usa."""
+    exercise_class = exercises.get_exercise_class(exercise_type)
+    if exercise_class is None:
+        return None
+
+    exercise = exercise_class(exercise_id)
+    build = exercise.build()
+    response = exercise.render_template(
+        request,
+        build=build,
+        url=ExerciseView(id=exercise_id, type=exercise_type).url,
+        emoji=exercises_emoji_map.get(exercise.exercise_type),
+    )
+    return {
+        'type': int(exercise_type),
+        'content': response.content.decode(),
+        'media': media(build),
+    }
+
+
+def warm(request, items) -> list[dict]:
+    """
+    Guarda no cache os partials dos primeiros EXERCISE_PREFETCH_SIZE
+    exercícios de items, pares (id, tipo) na ordem da listagem. Retorna os
+    áudios e imagens desses exercícios, sem repetições.
+    """
+    items = list(items)[: settings.EXERCISE_PREFETCH_SIZE]
+    cached = cache.get_many(
+        [_key(request.user, exercise_id) for exercise_id, _ in items]
+    )
+
+    entries = {}
+    for exercise_id, exercise_type in items:
+        key = _key(request.user, exercise_id)
+        if key in cached:
+            entries[key] = cached[key]
+            continue
+        try:
+            entry = render(request, exercise_type, exercise_id)
+        except Http404:
+            continue
+        if entry is not None:
+            entries[key] = entry
+
+    cache.set_many(
+        {key: entry for key, entry in entries.items() if key not in cached},
+        timeout=settings.EXERCISE_PREFETCH_TIMEOUT,
+    )
+    return list(
+        {
+            item['url']: item for entry in entries.values() for item in entry['media']
+        }.values()
+    )
+
+
+def pop(user, exercise_type: int, exercise_id: int) -> str | None:
+    """Retira do cache o partial do exercício, se ele foi pré-carregado."""
+    key = _key(user, exercise_id)
+    entry = cache.get(key)
+    if entry is None or entry['type'] != int(exercise_type):
+        return None
+    cache.delete(key)
+    return entry['content']
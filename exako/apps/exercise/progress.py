@@ -0,0 +1,157 @@
+from collections import defaultdict
+from itertools import groupby
+from operator import itemgetter
+
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, Q, Sum, Value
+from django.db.models.fields.json import KeyTextTransform
+from django.db.models.functions import Cast, Coalesce, Greatest
+
+from exako.apps.exercise.models import ExerciseHistory, ExerciseProgress, UserProgress
+
+
+def _runs(corrects: list[bool]) -> tuple[int, int, int]:
+    """
+    Retorna a sequência de acertos inicial, a maior sequência e a sequência
+    final de uma lista de respostas.
+    """
+    lead = next((i for i, correct in enumerate(corrects) if not correct), None)
+    best = current = 0
+    for correct in corrects:
+        current = current + 1 if correct else 0
+        best = max(best, current)
+    return lead, best, current
+
+
+def _increment(model, lookup: dict, **values):
+    if not model.objects.filter(**lookup).update(**values):
+        model.objects.get_or_create(**lookup)
+        model.objects.filter(**lookup).update(**values)
+
+
+@transaction.atomic
+def update(user, answers: list[dict]):
+    """
+    Atualiza os contadores de progresso do usuário com uma ou mais respostas
+    na ordem em que foram dadas. Cada resposta é um dict com exercise,
+    correct e time_to_answer (opcional).
+    """
+    corrects = [answer['correct'] for answer in answers]
+    lead, best, trail = _runs(corrects)
+    values = {
+        'total': F('total') + len(corrects),
+        'correct': F('correct') + sum(corrects),
+    }
+    if lead is None:
+        values['current_streak'] = F('current_streak') + trail
+        values['best_streak'] = Greatest('best_streak', F('current_streak') + trail)
+    else:
+        values['current_streak'] = Value(trail)
+        values['best_streak'] = Greatest(
+            'best_streak', F('current_streak') + lead, Value(best)
+        )
+    _increment(UserProgress, {'user': user}, **values)
+
+    groups = defaultdict(lambda: [0, 0, 0, 0])
+    for answer in answers:
+        exercise = answer['exercise']
+        group = groups[(exercise.type, exercise.language, exercise.level)]
+        group[0] += 1
+        group[1] += answer['correct']
+        if answer.get('time_to_answer') is not None:
+            group[2] += answer['time_to_answer']
+            group[3] += 1
+
+    # Ordem fixa para que lotes concorrentes travem as linhas na mesma ordem.
+    for (type, language, level), (total, correct, time_sum, time_count) in sorted(
+        groups.items(), key=str
+    ):
+        _increment(
+            ExerciseProgress,
+            {'user': user, 'type': type, 'language': language, 'level': level},
+            total=F('total') + total,
+            correct=F('correct') + correct,
+            time_to_answer_sum=F('time_to_answer_sum') + time_sum,
+            time_to_answer_count=F('time_to_answer_count') + time_count,
+        )
+
+
+USER_COUNTERS = ['current_streak', 'best_streak', 'total', 'correct']
+
+
+@transaction.atomic
+def rebuild(user_ids=None, batch_size: int = 1000):
+    """
+    Recalcula a partir do histórico os contadores de progresso dos usuários
+    em user_ids, ou de todos. Os contadores de UserProgress são zerados e
+    regravados no lugar, preservando a habilidade estimada pela calibração.
+    """
+    users_progress = UserProgress.objects.all()
+    exercises_progress = ExerciseProgress.objects.all()
+    history = ExerciseHistory.objects.all()
+    if user_ids is not None:
+        user_ids = list(user_ids)
+        users_progress = users_progress.filter(user_id__in=user_ids)
+        exercises_progress = exercises_progress.filter(user_id__in=user_ids)
+        history = history.filter(user_id__in=user_ids)
+    users_progress.update(**{field: 0 for field in USER_COUNTERS})
+    exercises_progress.delete()
+
+    time_to_answer = Cast(KeyTextTransform('time_to_answer', 'request'), IntegerField())
+    groups = (
+        history.order_by()
+        .values('user', 'exercise__type', 'exercise__language', 'exercise__level')
+        .annotate(
+            total=Count('id'),
+            correct=Count('id', filter=Q(correct=True)),
+            time_to_answer_sum=Coalesce(Sum(time_to_answer), 0),
+            time_to_answer_count=Count(time_to_answer),
+        )
+    )
+    ExerciseProgress.objects.bulk_create(
+        [
+            ExerciseProgress(
+                user_id=group['user'],
+                type=group['exercise__type'],
+                language=group['exercise__language'],
+                level=group['exercise__level'],
+                total=group['total'],
+                correct=group['correct'],
+                time_to_answer_sum=group['time_to_answer_sum'],
+                time_to_answer_count=group['time_to_answer_count'],
+            )
+            for group in groups
+        ],
+        batch_size=batch_size,
+    )
+
+    def save(users):
+        UserProgress.objects.bulk_create(
+            users,
+            update_conflicts=True,
+            unique_fields=['user'],
+            update_fields=USER_COUNTERS,
+        )
+
+    histories = history.order_by('user', 'created_at', 'id').values_list(
+        'user', 'correct'
+    )
+    users = []
+    for user_id, rows in groupby(
+        histories.iterator(chunk_size=batch_size), key=itemgetter(0)
+    ):
+        corrects = [correct for _, correct in rows]
+        _, best, trail = _runs(corrects)
+        users.append(
+            UserProgress(
+                user_id=user_id,
+                current_streak=trail,
+                best_streak=best,
+                total=len(corrects),
+                correct=sum(corrects),
+            )
+        )
+        if len(users) >= batch_size:
+            save(users)
+            users = []
+    save(users)
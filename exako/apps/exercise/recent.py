@@ -0,0 +1,75 @@
+"""
+Exercícios respondidos recentemente por usuário.
+
+Os ids ficam no cache, divididos em EXERCISE_RECENT_BUCKETS intervalos dentro
+da janela EXERCISE_RECENT_WINDOW. Cada intervalo é um anel de
+EXERCISE_RECENT_LIMIT posições: add() reserva as próximas posições com
+cache.incr() sobre o contador do intervalo e grava um id em cada uma, de forma
+que respostas simultâneas do mesmo usuário não sobrescrevem umas às outras.
+Tudo expira sozinho ao sair da janela, então a listagem exclui os exercícios
+recentes com uma lista de ids, sem consultar ExerciseHistory.
+"""
+
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+RECENT_KEY = 'exercise:recent:{user_id}:{bucket}'
+SLOT_KEY = RECENT_KEY + ':{slot}'
+
+
+def _buckets(now=None) -> range:
+    """Intervalos da janela, do mais antigo ao atual."""
+    size = settings.EXERCISE_RECENT_WINDOW / settings.EXERCISE_RECENT_BUCKETS
+    current = int((time.time() if now is None else now) // size)
+    return range(current - settings.EXERCISE_RECENT_BUCKETS + 1, current + 1)
+
+
+def _reserve(key, count) -> int:
+    """Reserva count posições no contador key e retorna a última."""
+    timeout = settings.EXERCISE_RECENT_WINDOW
+    cache.add(key, 0, timeout=timeout)
+    try:
+        return cache.incr(key, count)
+    except ValueError:
+        # O contador expirou entre o add() e o incr().
+        cache.add(key, 0, timeout=timeout)
+        return cache.incr(key, count)
+
+
+def add(user, exercise_ids):
+    """Marca exercise_ids como respondidos agora pelo usuário."""
+    exercise_ids = list(exercise_ids)[-settings.EXERCISE_RECENT_LIMIT :]
+    if not exercise_ids:
+        return
+    bucket = _buckets()[-1]
+    end = _reserve(RECENT_KEY.format(user_id=user.id, bucket=bucket), len(exercise_ids))
+    start = end - len(exercise_ids)
+    cache.set_many(
+        {
+            SLOT_KEY.format(
+                user_id=user.id,
+                bucket=bucket,
+                slot=position % settings.EXERCISE_RECENT_LIMIT,
+            ): exercise_id
+            for position, exercise_id in enumerate(exercise_ids, start=start)
+        },
+        timeout=settings.EXERCISE_RECENT_WINDOW,
+    )
+
+
+def seen(user) -> set[int]:
+    """Ids dos exercícios respondidos pelo usuário dentro da janela."""
+    if user is None or not user.is_authenticated:
+        return set()
+    keys = {
+        RECENT_KEY.format(user_id=user.id, bucket=bucket): bucket
+        for bucket in _buckets()
+    }
+    slots = [
+        SLOT_KEY.format(user_id=user.id, bucket=keys[key], slot=slot)
+        for key, count in cache.get_many(keys).items()
+        for slot in range(min(count, settings.EXERCISE_RECENT_LIMIT))
+    ]
+    return set(cache.get_many(slots).values())
@@ -0,0 +1,55 @@
+"""
+Tabelas de distratores e conexões dos exercícios.
+
+additional_content continua sendo o formato de entrada da API. sync() copia as
+listas de ids de additional_content['distractors'] e ['connections'] para
+ExerciseDistractor e ExerciseConnection em um INSERT ... SELECT por lista,
+descartando os ids que não existem. A compilação e as chaves de resposta leem
+dessas tabelas.
+"""
+
+from django.db import connection, transaction
+
+from exako.apps.exercise.models import Exercise, ExerciseConnection, ExerciseDistractor
+from exako.apps.term.models import Term, TermDefinition, TermImage, TermLexical
+
+# (tabela de destino, chave em additional_content, lista, modelo referenciado)
+TARGETS = [
+    (ExerciseDistractor, 'distractors', 'term', Term),
+    (ExerciseDistractor, 'distractors', 'term_lexical', TermLexical),
+    (ExerciseDistractor, 'distractors', 'term_definition', TermDefinition),
+    (ExerciseDistractor, 'distractors', 'term_image', TermImage),
+    (ExerciseConnection, 'connections', 'term', Term),
+]
+
+
+def insert_sql(model, key, field, target, where='e.id = ANY(%s)') -> str:
+    items = f"e.additional_content -> '{key}' -> '{field}'"
+    return f"""
+        INSERT INTO {model._meta.db_table} (exercise_id, position, {field}_id)
+        SELECT e.id, item.position - 1, target.id
+        FROM {Exercise._meta.db_table} e
+        CROSS JOIN LATERAL jsonb_array_elements_text(
+            CASE jsonb_typeof({items}) WHEN 'array' THEN {items} ELSE '[]' END
+        ) WITH ORDINALITY AS item(value, position)
+        JOIN {target._meta.db_table} target ON target.id = CASE
+            WHEN item.value ~ '^[0-9]{{1,18}}$' THEN item.value::bigint
+        END
+        WHERE {where}
+    """
+
+
+def sync(exercise_ids):
+    """Recria os distratores e as conexões dos exercícios em exercise_ids."""
+    exercise_ids = list(exercise_ids)
+    if not exercise_ids:
+        return
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        for model in [ExerciseDistractor, ExerciseConnection]:
+            cursor.execute(
+                f'DELETE FROM {model._meta.db_table} WHERE exercise_id = ANY(%s)',
+                [exercise_ids],
+            )
+        for target in TARGETS:
+            cursor.execute(insert_sql(*target), [exercise_ids])
@@ -0,0 +1,85 @@
+from datetime import timedelta
+
+from django.utils import timezone
+
+from exako.apps.exercise.models import ExerciseSchedule
+
+CORRECT_QUALITY = 4
+INCORRECT_QUALITY = 1
+MIN_EASE = 1.3
+
+
+def schedule(state: ExerciseSchedule, quality: int, now):
+    """
+    Aplica uma revisão com nota quality (0 a 5) ao estado, seguindo o
+    algoritmo SM-2.
+    """
+    if quality >= 3:
+        if state.repetitions == 0:
+            state.interval = 1
+        elif state.repetitions == 1:
+            state.interval = 6
+        else:
+            state.interval = round(state.interval * state.ease)
+        state.repetitions += 1
+    else:
+        state.repetitions = 0
+        state.interval = 1
+        state.lapses += 1
+
+    state.ease = max(
+        MIN_EASE,
+        state.ease + 0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02),
+    )
+    state.last_review = now
+    state.due_at = now + timedelta(days=state.interval)
+    return state
+
+
+def review(user, answers: list[dict]):
+    """
+    Atualiza o agendamento dos exercícios respondidos com uma leitura e uma
+    escrita, independente do tamanho do histórico do usuário.
+    """
+    now = timezone.now()
+    exercise_ids = {answer['exercise'].id for answer in answers}
+    # Instâncias sem pk para que novos e existentes sejam gravados no mesmo
+    # INSERT ... ON CONFLICT.
+    states = {
+        values['exercise_id']: ExerciseSchedule(user=user, **values)
+        for values in ExerciseSchedule.objects.filter(
+            user=user, exercise_id__in=exercise_ids
+        ).values('exercise_id', 'interval', 'ease', 'repetitions', 'lapses')
+    }
+    for answer in answers:
+        exercise_id = answer['exercise'].id
+        state = states.setdefault(
+            exercise_id,
+            ExerciseSchedule(user=user, exercise_id=exercise_id),
+        )
+        quality = CORRECT_QUALITY if answer['correct'] else INCORRECT_QUALITY
+        schedule(state, quality, now)
+
+    ExerciseSchedule.objects.bulk_create(
+        states.values(),
+        update_conflicts=True,
+        unique_fields=['user', 'exercise'],
+        update_fields=[
+            'due_at',
+            'last_review',
+            'interval',
+            'ease',
+            'repetitions',
+            'lapses',
+        ],
+    )
+
+
+def due(user, limit: int) -> list[dict]:
+    """Retorna os próximos exercícios vencidos do usuário, do mais antigo ao mais novo."""
+    schedules = (
+        ExerciseSchedule.objects.filter(user=user, due_at__lte=timezone.now())
+        .order_by('due_at')
+        .values_list('exercise_id', 'exercise__type')[:limit]
+    )
+    return [{'id': id, 'type': type} for id, type in schedules]
@@ -0,0 +1,297 @@
+"""
+Correção assíncrona dos exercícios de fala.
+
+O check de SpeakTerm e SpeakSentence grava o áudio enviado em
+EXERCISE_SPEECH_UPLOAD_DIR, cria um SpeechJob e responde na hora com o id do
+job. Um SpeechWorker com EXERCISE_SPEECH_WORKERS threads consome a fila,
+pontua o áudio com o scorer de EXERCISE_SPEECH_SCORER e conclui a correção
+com Exercise.check(). O cliente acompanha o job pelo endpoint de consulta,
+que pode esperar pelo resultado até EXERCISE_SPEECH_MAX_WAIT segundos.
+
+Ao encerrar o processo, a fila é esperada por no máximo
+EXERCISE_SPEECH_SHUTDOWN_TIMEOUT segundos; os jobs que não começaram
+continuam pendentes e são corrigidos pelo comando score_speech, que também
+devolve à fila os jobs em andamento há mais de EXERCISE_SPEECH_RUNNING_TIMEOUT
+segundos, como os de um worker que morreu no meio da correção.
+"""
+
+import asyncio
+import atexit
+import logging
+import threading
+import time
+from datetime import timedelta
+from pathlib import Path
+from queue import Empty, Full, Queue
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from ninja.errors import HttpError
+
+from exako.apps.exercise.constants import SpeechJobStatus
+from exako.apps.exercise.models import SpeechJob
+
+logger = logging.getLogger(__name__)
+
+FINISHED = [SpeechJobStatus.DONE, SpeechJobStatus.FAILED]
+
+
+class StubScorer:
+    """
+    Scorer local, sem reconhecimento de fala: qualquer gravação não vazia
+    recebe a nota máxima.
+    """
+
+    def score(self, audio_path: Path, expected: str, language: str) -> float:
+        return 1.0 if Path(audio_path).stat().st_size else 0.0
+
+
+class SpeechWorker:
+    """
+    Executa handler(job_id) para os jobs da fila em `workers` threads. A fila
+    guarda no máximo max_pending jobs; acima disso submit() recusa o job.
+    """
+
+    def __init__(self, handler, workers: int = 2, max_pending: int = 100):
+        self.handler = handler
+        self.workers = workers
+        self.queue = Queue(maxsize=max_pending)
+        self.stats = {
+            'processed': 0,
+            'failed': 0,
+            'rejected': 0,
+            'running': 0,
+            'latency': 0.0,
+        }
+        self._lock = threading.Lock()
+        self._threads = []
+
+    def metrics(self) -> dict:
+        return {**self.stats, 'queue_depth': self.queue.qsize()}
+
+    def full(self) -> bool:
+        return self.queue.full()
+
+    def start(self):
+        with self._lock:
+            if self._threads:
+                return
+            for index in range(self.workers):
+                thread = threading.Thread(
+                    target=self._run, name=f'exercise-speech-{index}', daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+            atexit.register(
+                self.close, timeout=settings.EXERCISE_SPEECH_SHUTDOWN_TIMEOUT
+            )
+
+    def submit(self, job_id) -> bool:
+        self.start()
+        try:
+            self.queue.put_nowait(job_id)
+        except Full:
+            self.stats['rejected'] += 1
+            return False
+        return True
+
+    def close(self, timeout: float | None = None) -> bool:
+        """
+        Espera a fila esvaziar por até timeout segundos (sem limite com None).
+        Os jobs que ainda não começaram são retirados da fila e continuam
+        pendentes no banco. Retorna False nesse caso.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.queue.all_tasks_done:
+            while self.queue.unfinished_tasks:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    break
+                self.queue.all_tasks_done.wait(remaining)
+            else:
+                return True
+
+        left = 0
+        while True:
+            try:
+                self.queue.get_nowait()
+            except Empty:
+                break
+            self.queue.task_done()
+            left += 1
+        logger.warning('%s speech jobs left pending at shutdown.', left)
+        return False
+
+    def _run(self):
+        while True:
+            job_id = self.queue.get()
+            started = time.monotonic()
+            with self._lock:
+                self.stats['running'] += 1
+            try:
+                self.handler(job_id)
+            except Exception:
+                logger.exception('Failed to score speech job %s.', job_id)
+                self.stats['failed'] += 1
+            else:
+                self.stats['processed'] += 1
+            finally:
+                with self._lock:
+                    self.stats['running'] -= 1
+                self.stats['latency'] = time.monotonic() - started
+                self.queue.task_done()
+                close_old_connections()
+
+
+_worker = None
+
+
+def get_scorer():
+    return import_string(settings.EXERCISE_SPEECH_SCORER)()
+
+
+def get_worker() -> SpeechWorker:
+    global _worker
+    if _worker is None:
+        _worker = SpeechWorker(
+            process,
+            workers=settings.EXERCISE_SPEECH_WORKERS,
+            max_pending=settings.EXERCISE_SPEECH_QUEUE_SIZE,
+        )
+    return _worker
+
+
+def _save_upload(job: SpeechJob, audio) -> Path:
+    """Grava o áudio em disco por partes, sem carregá-lo inteiro na memória."""
+    upload_dir = Path(settings.EXERCISE_SPEECH_UPLOAD_DIR)
+    upload_dir.mkdir(parents=True, exist_ok=True)
+    path = upload_dir / f'{job.id}{Path(audio.name or "").suffix}'
+    with path.open('wb') as file:
+        for chunk in audio.chunks():
+            file.write(chunk)
+    return path
+
+
+def submit(exercise, user, audio, exercise_request: dict) -> SpeechJob:
+    """
+    Cria o job de correção da resposta em audio e o envia para a fila. Sem
+    EXERCISE_SPEECH_ASYNC, o job é corrigido antes de retornar.
+    """
+    if settings.EXERCISE_SPEECH_ASYNC and get_worker().full():
+        raise HttpError(
+            status_code=503, message='speech scoring is busy, try again later.'
+        )
+
+    job = SpeechJob(
+        exercise_id=exercise.exercise.id,
+        user=user,
+        type=exercise.exercise_type,
+        request=exercise_request,
+    )
+    job.audio_path = str(_save_upload(job, audio))
+    job.save()
+
+    if not settings.EXERCISE_SPEECH_ASYNC:
+        try:
+            process(job.id)
+        except Exception:
+            logger.exception('Failed to score speech job %s.', job.id)
+    elif not get_worker().submit(job.id):
+        _finish(job, status=SpeechJobStatus.FAILED, error='speech queue is full.')
+    job.refresh_from_db()
+    return job
+
+
+def _finish(job: SpeechJob, **fields):
+    for field, value in fields.items():
+        setattr(job, field, value)
+    job.finished_at = timezone.now()
+    job.save(update_fields=[*fields, 'finished_at'])
+    Path(job.audio_path).unlink(missing_ok=True)
+
+
+def process(job_id):
+    """Pontua o áudio do job e conclui a correção com Exercise.check()."""
+    from exako.apps.exercise import exercises
+
+    # O UPDATE condicional garante que só um processo corrige cada job.
+    claimed = SpeechJob.objects.filter(
+        id=job_id, status=SpeechJobStatus.PENDING
+    ).update(status=SpeechJobStatus.RUNNING, started_at=timezone.now())
+    if not claimed:
+        return
+    job = SpeechJob.objects.select_related('user').get(id=job_id)
+
+    try:
+        exercise = exercises.get_exercise_class(job.type).from_answer_key(
+            job.exercise_id
+        )
+        score = get_scorer().score(
+            Path(job.audio_path), exercise.correct_answer, exercise.exercise.language
+        )
+        result = exercise.check(job.user, {'score': score}, job.request)
+    except Exception as error:
+        _finish(job, status=SpeechJobStatus.FAILED, error=str(error))
+        raise
+
+    _finish(job, status=SpeechJobStatus.DONE, score=score, **result)
+    logger.info(
+        'Speech job %s scored in %.3fs after %.3fs in queue.',
+        job.id,
+        job.scoring_time,
+        job.queue_time,
+    )
+
+
+async def wait(job_id, user, timeout: float = 0) -> SpeechJob:
+    """
+    Retorna o job do usuário, esperando até timeout segundos que a correção
+    termine. A espera é assíncrona e não ocupa um worker enquanto isso.
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        job = await SpeechJob.objects.filter(id=job_id, user=user).afirst()
+        if job is None:
+            raise HttpError(status_code=404, message='speech job not found.')
+        if job.status in FINISHED or time.monotonic() >= deadline:
+            return job
+        await asyncio.sleep(settings.EXERCISE_SPEECH_POLL_INTERVAL)
+
+
+def reclaim_stale(timeout: float | None = None) -> int:
+    """
+    Volta para pendentes os jobs em andamento há mais de timeout segundos
+    (padrão EXERCISE_SPEECH_RUNNING_TIMEOUT), cujo worker não os concluiu.
+    """
+    if timeout is None:
+        timeout = settings.EXERCISE_SPEECH_RUNNING_TIMEOUT
+    cutoff = timezone.now() - timedelta(seconds=timeout)
+    return SpeechJob.objects.filter(
+        status=SpeechJobStatus.RUNNING, started_at__lte=cutoff
+    ).update(status=SpeechJobStatus.PENDING, started_at=None)
+
+
+def process_pending(older_than: float = 0) -> int:
+    """
+    Corrige no processo atual os jobs pendentes criados há mais de
+    older_than segundos, como os que ficaram na fila de um processo encerrado,
+    e os jobs em andamento abandonados (reclaim_stale).
+    """
+    reclaimed = reclaim_stale()
+    if reclaimed:
+        logger.warning('Reclaimed %s stale speech jobs.', reclaimed)
+
+    cutoff = timezone.now() - timedelta(seconds=older_than)
+    job_ids = list(
+        SpeechJob.objects.filter(
+            status=SpeechJobStatus.PENDING, created_at__lte=cutoff
+        ).values_list('id', flat=True)
+    )
+    for job_id in job_ids:
+        try:
+            process(job_id)
+        except Exception:
+            logger.exception('Failed to score speech job %s.', job_id)
+    return len(job_ids)
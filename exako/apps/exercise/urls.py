@@ -8,6 +8,8 @@ urlpatterns = [
     path('', views.exercise_home, name='home'),
     path('partial/options', views.exercise_options_partial, name='options'),
     path('partial/view/<int:exercise_id>/<int:exercise_type>', views.exercise_view_partial, name='view'),
+    path('partial/prefetch', views.exercise_prefetch_partial, name='prefetch'),
     path('partial/info/', views.exercise_info_partial, name='info'),
+    path('partial/statistics/', views.exercise_statistics_partial, name='statistics'),
     path('test/<int:exercise_id>', views.test_view, name='test'),
 ]
@@ -4,20 +4,31 @@ from ninja.errors import HttpError
 from exako.apps.core.decorators import validate
 from exako.apps.exercise.constants import ExerciseSubType, ExerciseType
 from exako.apps.term.constants import TermLexicalType
-from exako.apps.term.models import (
-    Term,
-    TermDefinition,
-    TermExampleLink,
-    TermImage,
-    TermLexical,
-    TermPronunciation,
-)
+from exako.apps.term.models import TermExampleLink, TermLexical, TermPronunciation
 
 
 @validate
 def validate_exercise(): ...
 
 
+@validate
+def validate_exercise_references():
+    """
+    Validações que dependem apenas dos objetos relacionados ao exercício, sem
+    consultas extras ao banco. Usada pela criação em lote, que carrega esses
+    objetos de uma vez e valida distratores, rimas e destaques por conjunto.
+    """
+
+
+@validate
+def validate_exercise_relations():
+    """
+    Validações dos distratores e das conexões, feitas sobre ExerciseDistractor
+    e ExerciseConnection depois que relations.sync() recria as linhas a partir
+    de additional_content, para que as duas fontes não divirjam.
+    """
+
+
 @validate_exercise.register(
     [
         ExerciseType.LISTEN_TERM,
@@ -25,6 +36,13 @@ def validate_exercise(): ...
         ExerciseType.TERM_MCHOICE,
     ]
 )
+@validate_exercise_references.register(
+    [
+        ExerciseType.LISTEN_TERM,
+        ExerciseType.SPEAK_TERM,
+        ExerciseType.TERM_MCHOICE,
+    ]
+)
 def validate_sub_type_exercise(exercise):
     sub_type = exercise.additional_content['sub_type']
     if (
@@ -56,6 +74,12 @@ def validate_sub_type_exercise(exercise):
         ExerciseType.SPEAK_SENTENCE,
     ]
 )
+@validate_exercise_references.register(
+    [
+        ExerciseType.LISTEN_SENTENCE,
+        ExerciseType.SPEAK_SENTENCE,
+    ]
+)
 def validate_term_example_reference_term_pronunciation(exercise):
     if (
         not exercise.term_pronunciation.term_example_id
@@ -73,6 +97,12 @@ def validate_term_example_reference_term_pronunciation(exercise):
         ExerciseType.TERM_IMAGE_MCHOICE,
     ]
 )
+@validate_exercise_references.register(
+    [
+        ExerciseType.LISTEN_TERM_MCHOICE,
+        ExerciseType.TERM_IMAGE_MCHOICE,
+    ]
+)
 def validate_term_reference_term_pronunciation(exercise):
     if (
         not exercise.term_pronunciation.term_id
@@ -90,6 +120,12 @@ def validate_term_reference_term_pronunciation(exercise):
         ExerciseType.SPEAK_TERM,
     ]
 )
+@validate_exercise_references.register(
+    [
+        ExerciseType.LISTEN_TERM,
+        ExerciseType.SPEAK_TERM,
+    ]
+)
 def validate_term_sub_type_reference_term_pronunciation(exercise):
     if exercise.additional_content['sub_type'] != ExerciseSubType.TERM:
         return
@@ -110,6 +146,12 @@ def validate_term_sub_type_reference_term_pronunciation(exercise):
         ExerciseType.SPEAK_TERM,
     ]
 )
+@validate_exercise_references.register(
+    [
+        ExerciseType.LISTEN_TERM,
+        ExerciseType.SPEAK_TERM,
+    ]
+)
 def validate_term_lexical_value_sub_type_reference_term_pronunciation(exercise):
     if exercise.additional_content['sub_type'] != ExerciseSubType.TERM_LEXICAL_VALUE:
         return
@@ -130,6 +172,12 @@ def validate_term_lexical_value_sub_type_reference_term_pronunciation(exercise):
         ExerciseType.SPEAK_TERM,
     ]
 )
+@validate_exercise_references.register(
+    [
+        ExerciseType.LISTEN_TERM,
+        ExerciseType.SPEAK_TERM,
+    ]
+)
 def validate_term_lexical_ref_sub_type_reference_term_pronunciation(exercise):
     if exercise.additional_content['sub_type'] != ExerciseSubType.TERM_LEXICAL_TERM_REF:
         return
@@ -146,6 +194,7 @@ def validate_term_lexical_ref_sub_type_reference_term_pronunciation(exercise):
 
 
 @validate_exercise.register(ExerciseType.TERM_DEFINITION_MCHOICE)
+@validate_exercise_references.register(ExerciseType.TERM_DEFINITION_MCHOICE)
 def validate_term_reference_term_defintion(exercise):
     if exercise.term_definition.term_id != exercise.term_id:
         raise HttpError(
@@ -160,6 +209,12 @@ def validate_term_reference_term_defintion(exercise):
         ExerciseType.TERM_IMAGE_MCHOICE_TEXT,
     ]
 )
+@validate_exercise_references.register(
+    [
+        ExerciseType.TERM_IMAGE_MCHOICE,
+        ExerciseType.TERM_IMAGE_MCHOICE_TEXT,
+    ]
+)
 def validate_term_reference_term_image(exercise):
     if exercise.term_image.term_id != exercise.term_id:
         raise HttpError(
@@ -177,6 +232,15 @@ def validate_term_reference_term_image(exercise):
         ExerciseType.TERM_IMAGE_MCHOICE,
     ]
 )
+@validate_exercise_references.register(
+    [
+        ExerciseType.LISTEN_SENTENCE,
+        ExerciseType.LISTEN_TERM,
+        ExerciseType.LISTEN_TERM_MCHOICE,
+        ExerciseType.SPEAK_TERM,
+        ExerciseType.TERM_IMAGE_MCHOICE,
+    ]
+)
 def validate_pronunciation_audio_file(exercise):
     if exercise.term_pronunciation.audio_file is None:
         raise HttpError(
@@ -231,127 +295,131 @@ def validate_term_mchoice_exercise_example_highlight(exercise):
         )
 
 
-@validate_exercise.register(ExerciseType.ORDER_SENTENCE)
+def _relation_ids(
+    exercise, key, field, language, minimum=0, message=None, candidates=None
+):
+    """
+    Ids de field nas linhas de exercise.distractors ou exercise.connections
+    (key), na ordem das posições. Remove as linhas de outro idioma ou repetidas
+    e faz additional_content[key][field] espelhar as que restam.
+
+    Com candidates (ids a desconsiderar), os candidatos a distratores do termo
+    do exercício, que o build usa para completar a lista, contam para
+    minimum: a lista enviada pode vir vazia ou nem vir.
+    """
+    relation = getattr(exercise, key)
+    language_lookup = (
+        f'{field}__language' if field == 'term' else f'{field}__term__language'
+    )
+    ids, discarded = [], []
+    for pk, target_id, target_language in relation.filter(
+        **{f'{field}__isnull': False}
+    ).values_list('pk', f'{field}_id', language_lookup):
+        if target_language != language or target_id in ids:
+            discarded.append(pk)
+        else:
+            ids.append(target_id)
+    if discarded:
+        relation.filter(pk__in=discarded).delete()
+
+    available = len(ids)
+    if candidates is not None and len(ids) < minimum:
+        available += exercise.term.distractor_candidates.exclude(
+            candidate_id__in=[*ids, *candidates]
+        )[: minimum - len(ids)].count()
+    if available < minimum:
+        raise HttpError(status_code=422, message=message)
+    if ids or field in (exercise.additional_content.get(key) or {}):
+        exercise.additional_content.setdefault(key, {})[field] = ids
+    return ids
+
+
+MCHOICE_DISTRACTORS_MESSAGE = 'exercise needs at least 3 additional_content[distractors] to form the alternatives.'
+
+
+@validate_exercise_relations.register(ExerciseType.ORDER_SENTENCE)
 def validate_order_sentence_distractors(exercise):
-    if (
-        not exercise.additional_content
-        or 'distractors' not in exercise.additional_content
-        and 'term' not in exercise.additional_content['distractors']
-    ):
+    if 'term' not in ((exercise.additional_content or {}).get('distractors') or {}):
         return
-
-    term_ids = list(
-        Term.objects.filter(
-            id__in=exercise.additional_content['distractors']['term'],
-            language=exercise.term_example.language,
-        ).values_list('id', flat=True)
-    )
-    exercise.additional_content['distractors']['term'] = term_ids
+    _relation_ids(exercise, 'distractors', 'term', exercise.term_example.language)
 
 
-@validate_exercise.register(ExerciseType.TERM_MCHOICE)
+@validate_exercise_relations.register(ExerciseType.TERM_MCHOICE)
 def validate_term_mchoice_distractors(exercise):
-    sub_type = exercise.additional_content['sub_type']
-    is_sub_type_term = sub_type == ExerciseSubType.TERM
-    Model = Term if is_sub_type_term else TermLexical
-    distractor_key = 'term' if is_sub_type_term else 'term_lexical'
-    language = (
-        exercise.term.language
-        if is_sub_type_term
-        else exercise.term_lexical.term.language
-    )
-
-    term_ids = list(
-        Model.objects.filter(
-            id__in=exercise.additional_content['distractors'][distractor_key],
-            language=language,
-        ).values_list('id', flat=True)
-    )
-
-    if len(term_ids) < 3:
-        raise HttpError(
-            status_code=422,
-            message='exercise needs at least 3 additional_content[distractors] to form the alternatives.',
+    if exercise.additional_content['sub_type'] == ExerciseSubType.TERM:
+        _relation_ids(
+            exercise,
+            'distractors',
+            'term',
+            exercise.term.language,
+            3,
+            MCHOICE_DISTRACTORS_MESSAGE,
+            candidates=(),
+        )
+    else:
+        _relation_ids(
+            exercise,
+            'distractors',
+            'term_lexical',
+            exercise.term_lexical.term.language,
+            3,
+            MCHOICE_DISTRACTORS_MESSAGE,
         )
-
-    exercise.additional_content['distractors'][distractor_key] = term_ids
 
 
-@validate_exercise.register(ExerciseType.TERM_DEFINITION_MCHOICE)
+@validate_exercise_relations.register(ExerciseType.TERM_DEFINITION_MCHOICE)
 def validate_term_definition_mchoice_distractors(exercise):
-    definition_ids = list(
-        TermDefinition.objects.filter(
-            id__in=exercise.additional_content['distractors']['term_definition'],
-            language=exercise.term_definition.term.language,
-        ).values_list('id', flat=True)
+    _relation_ids(
+        exercise,
+        'distractors',
+        'term_definition',
+        exercise.term_definition.term.language,
+        3,
+        MCHOICE_DISTRACTORS_MESSAGE,
     )
-    if len(definition_ids) < 3:
-        raise HttpError(
-            status_code=422,
-            message='exercise needs at least 3 additional_content[distractors] to form the alternatives.',
-        )
-    exercise.additional_content['distractors']['term_definition'] = definition_ids
 
 
-@validate_exercise.register(
-    [
-        ExerciseType.TERM_IMAGE_MCHOICE,
-        ExerciseType.TERM_IMAGE_MCHOICE_TEXT,
-    ]
-)
+@validate_exercise_relations.register(ExerciseType.TERM_IMAGE_MCHOICE)
 def validate_term_image_distractors(exercise):
-    is_image_mchoice = exercise.type == ExerciseType.TERM_IMAGE_MCHOICE
-    Model = TermImage if is_image_mchoice else Term
-    distractor_key = 'term_image' if is_image_mchoice else 'term'
-    language = (
-        exercise.term_image.term.language
-        if is_image_mchoice
-        else exercise.term.language
-    )
-
-    term_ids = list(
-        Model.objects.filter(
-            id__in=exercise.additional_content['distractors'][distractor_key],
-            language=language,
-        ).values_list('id', flat=True)
+    _relation_ids(
+        exercise,
+        'distractors',
+        'term_image',
+        exercise.term_image.term.language,
+        3,
+        MCHOICE_DISTRACTORS_MESSAGE,
     )
 
-    if len(term_ids) < 3:
-        raise HttpError(
-            status_code=422,
-            message='exercise needs at least 3 additional_content[distractors] to form the alternatives.',
-        )
 
-    exercise.additional_content['distractors'][distractor_key] = term_ids
+@validate_exercise_relations.register(ExerciseType.TERM_IMAGE_MCHOICE_TEXT)
+def validate_term_image_text_distractors(exercise):
+    _relation_ids(
+        exercise,
+        'distractors',
+        'term',
+        exercise.term.language,
+        3,
+        MCHOICE_DISTRACTORS_MESSAGE,
+        candidates=(),
+    )
 
 
-@validate_exercise.register(ExerciseType.TERM_CONNECTION)
+@validate_exercise_relations.register(ExerciseType.TERM_CONNECTION)
 def validate_term_connection_distractors(exercise):
-    distractors_term_ids = list(
-        Term.objects.filter(
-            id__in=exercise.additional_content['distractors']['term'],
-            language=exercise.term.language,
-        ).values_list('id', flat=True)
+    connections = _relation_ids(
+        exercise,
+        'connections',
+        'term',
+        exercise.term.language,
+        4,
+        'exercise needs at least 4 additional_content[connections] to form the connections.',
     )
-
-    if len(distractors_term_ids) < 8:
-        raise HttpError(
-            status_code=422,
-            message='exercise needs at least 8 additional_content[distractors] to form the connections.',
-        )
-
-    connections_term_ids = list(
-        Term.objects.filter(
-            id__in=exercise.additional_content['connections']['term'],
-            language=exercise.term.language,
-        ).values_list('id', flat=True)
+    _relation_ids(
+        exercise,
+        'distractors',
+        'term',
+        exercise.term.language,
+        8,
+        'exercise needs at least 8 additional_content[distractors] to form the connections.',
+        candidates=connections,
     )
-
-    if len(connections_term_ids) < 4:
-        raise HttpError(
-            status_code=422,
-            message='exercise needs at least 4 additional_content[connections] to form the connections.',
-        )
-
-    exercise.additional_content['distractors']['term'] = distractors_term_ids
-    exercise.additional_content['connections']['term'] = connections_term_ids
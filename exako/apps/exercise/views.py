@@ -1,11 +1,13 @@
+from django.conf import settings
 from django.http import HttpResponse
 from django.shortcuts import render
 from django.utils.translation import gettext as _
+from django.views.decorators.http import conditional_page
 
 from exako.apps.exercise.constants import ExerciseType, exercises_emoji_map
 from exako.apps.exercise.exercises import exercises_map
-from exako.apps.exercise import exercises
-from exako.apps.exercise.models import Exercise, ExerciseHistory
+from exako.apps.exercise import exercises, prefetch
+from exako.apps.exercise.models import Exercise, UserProgress
 from exako.apps.card.models import CardSet
 from exako.apps.term.constants import Language, Level
 from exako.apps.user.auth.decorator import login_required
@@ -26,7 +28,8 @@ def exercise_home(request):
                     ).count(),
                 }
                 for exercise in exercises_map
-            }
+            },
+            'prefetch_size': settings.EXERCISE_PREFETCH_SIZE,
         },
     )
 
@@ -61,19 +64,18 @@ def exercise_options_partial(request):
 
 
 @login_required
+@conditional_page
 def exercise_view_partial(request, exercise_type, exercise_id):
-    exercise_class = next(
-        (
-            exercise
-            for exercise in exercises_map
-            if exercise.exercise_type == exercise_type
-        ),
-        None,
-    )
+    exercise_class = exercises.get_exercise_class(exercise_type)
     if exercise_class is None:
         return HttpResponse(status=400)
-    exercise = exercise_class(exercise_id)
-    print(exercise.correct_answer)
+    content = prefetch.pop(request.user, exercise_type, exercise_id)
+    if content is not None:
+        return HttpResponse(content)
+    seed = request.GET.get('seed')
+    exercise = exercise_class(
+        exercise_id, seed=int(seed) if seed and seed.isdigit() else None
+    )
     return exercise.render_template(
         request,
         url=request.GET.get('url'),
@@ -81,12 +83,39 @@ def exercise_view_partial(request, exercise_type, exercise_id):
     )
 
 
+@login_required
+def exercise_prefetch_partial(request):
+    items = []
+    for item in request.GET.getlist('next'):
+        exercise_id, _, exercise_type = item.partition(':')
+        if exercise_id.isdigit() and exercise_type.isdigit():
+            items.append((int(exercise_id), int(exercise_type)))
+    return render(
+        request,
+        'exercise/partials/exercise_prefetch.html',
+        context={'media': prefetch.warm(request, items)},
+    )
+
+
 @login_required
 def exercise_info_partial(request):
+    progress = UserProgress.objects.filter(user=request.user).first()
     return render(
         request,
         'exercise/partials/exercise_info.html',
-        context={'current_streak': ExerciseHistory.get_current_streak(request.user)},
+        context={'current_streak': progress.current_streak if progress else 0},
+    )
+
+
+@login_required
+def exercise_statistics_partial(request):
+    return render(
+        request,
+        'exercise/partials/exercise_statistics.html',
+        context={
+            'progress': UserProgress.objects.filter(user=request.user).first()
+            or UserProgress(user=request.user),
+        },
     )
 
 
@@ -3,6 +3,7 @@ from ninja import File, Router, UploadedFile
 
 from exako.apps.core import schema as core_schema
 from exako.apps.core.permissions import is_admin, permission_required
+from exako.apps.term import images
 from exako.apps.term.api import schema
 from exako.apps.term.models import TermImage
 from exako.apps.user.auth.token import AuthBearer
@@ -28,7 +29,9 @@ def create_term_image(
     exercise_schema: schema.TermImageSchema,
     image: UploadedFile = File(...),
 ):
-    return 201, TermImage.objects.create(image=image, **exercise_schema.model_dump())
+    term_image = TermImage.objects.create(image=image, **exercise_schema.model_dump())
+    images.schedule(term_image)
+    return 201, term_image
 
 
 @image_router.get(
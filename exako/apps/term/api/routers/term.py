@@ -1,9 +1,11 @@
-from django.shortcuts import get_object_or_404
+from django.http import Http404
+from django.shortcuts import aget_object_or_404
 from ninja import Query, Router
 from ninja.errors import HttpError
-from ninja.pagination import PageNumberPagination, paginate
+from ninja.pagination import paginate
 
 from exako.apps.core import schema as core_schema
+from exako.apps.core.pagination import AsyncPageNumberPagination
 from exako.apps.core.permissions import is_admin, permission_required
 from exako.apps.exercise.api.routers import exercise_router
 from exako.apps.term import constants
@@ -74,12 +76,15 @@ def create_term(request, term_schema: schema.TermSchema):
     summary='Consulta de um termo existente.',
     description='Endpoint utilizado para a consultar um termo, palavra ou expressão específica de um certo idioma.',
 )
-def get_term(
+async def get_term(
     request,
     expression: str,
     language: constants.Language,
 ):
-    return get_object_or_404(Term.objects.get(expression, language))
+    term = await Term.objects.aget(expression, language)
+    if term is None:
+        raise Http404('No Term matches the given query.')
+    return term
 
 
 @term_router.get(
@@ -91,8 +96,8 @@ def get_term(
     summary='Consulta de um termo existente.',
     description='Endpoint utilizado para a consultar um termo, palavra ou expressão específica de um certo idioma.',
 )
-def get_term_id(request, term_id: int):
-    return get_object_or_404(Term, id=term_id)
+async def get_term_id(request, term_id: int):
+    return await aget_object_or_404(Term, id=term_id)
 
 
 @term_router.get(
@@ -101,8 +106,8 @@ def get_term_id(request, term_id: int):
     summary='Procura de termos.',
     description='Endpoint utilizado para procurar um termo, palavra ou expressão específica de um certo idioma de acordo com o valor enviado.',
 )
-@paginate(PageNumberPagination)
-def search_term(
+@paginate(AsyncPageNumberPagination)
+async def search_term(
     request,
     expression: str,
     language: constants.Language,
@@ -116,8 +121,8 @@ def search_term(
     summary='Procura de termos por significados.',
     description='Endpoint utilizado para procurar um termo, palavra ou expressão de um certo idioma pelo seu significado na linguagem de tradução e termo especificados.',
 )
-@paginate(PageNumberPagination)
-def search_reverse(
+@paginate(AsyncPageNumberPagination)
+async def search_reverse(
     request,
     expression: str,
     language: constants.Language,
@@ -136,8 +141,8 @@ def search_reverse(
     summary='Listagem dos termos por ordem alfabética.',
     description='Endpoint utilizado para listar todos os termos de uma linguagem em ordem alfabética.',
 )
-@paginate(PageNumberPagination)
-def term_index(
+@paginate(AsyncPageNumberPagination)
+async def term_index(
     request,
     char: str = Query(pattern=r'^[a-zA-Z]$'),
     language: constants.Language = Query(...),
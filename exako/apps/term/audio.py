@@ -0,0 +1,176 @@
+"""
+Cópia local dos áudios de pronúncia.
+
+TermPronunciation.audio_file é uma URL externa qualquer. cache_pronunciations()
+baixa cada URL uma única vez, identifica o formato pelo conteúdo (e não pela
+extensão da URL), calcula a duração quando o formato permite e grava o
+arquivo em audio/<sha256>.<extensão>. Conteúdos repetidos são guardados uma
+única vez. Os builds dos exercícios passam a usar TermPronunciation.audio_url,
+servida pela view term:audio com Range, ETag e cache longo.
+"""
+
+import hashlib
+import io
+import logging
+import wave
+from collections import defaultdict
+
+import requests
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+
+from exako.apps.term.models import PronunciationAudio, TermPronunciation
+
+logger = logging.getLogger(__name__)
+
+# (assinatura, deslocamento, extensão, content type)
+SIGNATURES = [
+    (b'ID3', 0, 'mp3', 'audio/mpeg'),
+    (b'OggS', 0, 'ogg', 'audio/ogg'),
+    (b'fLaC', 0, 'flac', 'audio/flac'),
+    (b'WAVE', 8, 'wav', 'audio/wav'),
+    (b'ftyp', 4, 'm4a', 'audio/mp4'),
+    (b'\x1a\x45\xdf\xa3', 0, 'webm', 'audio/webm'),
+]
+
+MP3_BITRATES = {
+    1: [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    2: [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+MP3_SAMPLE_RATES = {
+    1: [44100, 48000, 32000],
+    2: [22050, 24000, 16000],
+    2.5: [11025, 12000, 8000],
+}
+
+
+class AudioError(Exception):
+    pass
+
+
+def _is_mp3_frame(data, position=0):
+    return (
+        data[position : position + 1] == b'\xff'
+        and (data[position + 1 : position + 2] or b'\x00')[0] & 0xE0 == 0xE0
+    )
+
+
+def detect(data: bytes) -> tuple[str, str]:
+    """Extensão e content type do áudio em data, pela assinatura do formato."""
+    for signature, offset, extension, content_type in SIGNATURES:
+        if data[offset : offset + len(signature)] == signature:
+            return extension, content_type
+    if _is_mp3_frame(data):
+        return 'mp3', 'audio/mpeg'
+    raise AudioError('unsupported audio format.')
+
+
+def _mp3_duration(data: bytes) -> float | None:
+    """Soma a duração dos quadros MPEG Layer III de data."""
+    position = 0
+    if data[:3] == b'ID3':
+        size = data[6] << 21 | data[7] << 14 | data[8] << 7 | data[9]
+        position = 10 + size
+
+    duration = 0.0
+    while position + 4 <= len(data):
+        if not _is_mp3_frame(data, position):
+            position += 1
+            continue
+        header = data[position + 1 : position + 3]
+        version = {3: 1, 2: 2, 0: 2.5}.get(header[0] >> 3 & 0b11)
+        layer = header[0] >> 1 & 0b11
+        bitrate_index = header[1] >> 4
+        rate_index = header[1] >> 2 & 0b11
+        if version is None or layer != 1 or bitrate_index in [0, 15] or rate_index == 3:
+            position += 1
+            continue
+
+        bitrate = MP3_BITRATES[1 if version == 1 else 2][bitrate_index] * 1000
+        sample_rate = MP3_SAMPLE_RATES[version][rate_index]
+        samples = 1152 if version == 1 else 576
+        padding = header[1] >> 1 & 1
+        position += samples // 8 * bitrate // sample_rate + padding
+        duration += samples / sample_rate
+    return duration or None
+
+
+def duration(data: bytes, extension: str) -> float | None:
+    """Duração em segundos, para WAV e MP3. None nos demais formatos."""
+    if extension == 'wav':
+        try:
+            with wave.open(io.BytesIO(data)) as audio:
+                return audio.getnframes() / audio.getframerate()
+        except (wave.Error, EOFError):
+            return None
+    if extension == 'mp3':
+        return _mp3_duration(data)
+    return None
+
+
+def fetch(url: str) -> bytes:
+    """Baixa url em partes, recusando arquivos maiores que TERM_AUDIO_MAX_SIZE."""
+    data = bytearray()
+    try:
+        with requests.get(
+            url, stream=True, timeout=settings.TERM_AUDIO_FETCH_TIMEOUT
+        ) as response:
+            response.raise_for_status()
+            for chunk in response.iter_content(chunk_size=64 * 1024):
+                data += chunk
+                if len(data) > settings.TERM_AUDIO_MAX_SIZE:
+                    raise AudioError(f'{url} is larger than TERM_AUDIO_MAX_SIZE.')
+    except requests.RequestException as error:
+        raise AudioError(f'could not fetch {url}: {error}') from error
+    return bytes(data)
+
+
+def store(url: str, data: bytes) -> PronunciationAudio:
+    """Grava data no armazenamento, se ainda não houver o mesmo conteúdo."""
+    sha256 = hashlib.sha256(data).hexdigest()
+    audio = PronunciationAudio.objects.filter(sha256=sha256).first()
+    if audio is not None:
+        return audio
+
+    extension, content_type = detect(data)
+    name = f'audio/{sha256[:2]}/{sha256}.{extension}'
+    if not default_storage.exists(name):
+        name = default_storage.save(name, ContentFile(data))
+    return PronunciationAudio.objects.create(
+        sha256=sha256,
+        file=name,
+        source_url=url,
+        content_type=content_type,
+        size=len(data),
+        duration=duration(data, extension),
+    )
+
+
+def cache_pronunciations(queryset=None) -> dict:
+    """
+    Baixa os áudios das pronúncias de queryset que ainda não têm cópia local,
+    uma vez por URL. Retorna a quantidade de pronúncias atualizadas e de
+    URLs que falharam.
+    """
+    if queryset is None:
+        queryset = TermPronunciation.objects.all()
+    pronunciations = defaultdict(list)
+    for pronunciation in queryset.filter(
+        audio_file__isnull=False, audio__isnull=True
+    ).exclude(audio_file=''):
+        pronunciations[pronunciation.audio_file].append(pronunciation)
+
+    result = {'cached': 0, 'failed': 0}
+    for url, items in pronunciations.items():
+        try:
+            audio = store(url, fetch(url))
+        except AudioError:
+            logger.exception('Failed to cache pronunciation audio %s.', url)
+            result['failed'] += 1
+            continue
+        for pronunciation in items:
+            pronunciation.audio = audio
+            pronunciation.save(update_fields=['audio'])
+        result['cached'] += len(items)
+    return result
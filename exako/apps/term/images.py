@@ -0,0 +1,244 @@
+"""
+Variantes redimensionadas das imagens dos termos.
+
+process() gera, para cada largura de TERM_IMAGE_SIZES menor que a original
+(e para a própria largura original, limitada à maior delas), uma variante em
+cada formato de TERM_IMAGE_FORMATS, sem metadados (EXIF, ICC, XMP). Os
+arquivos ficam em term/variants/<sha256>-<largura>.<extensão>.
+
+Imagens repetidas não são processadas de novo: um upload com o mesmo sha256
+de uma imagem já processada passa a usar o arquivo e as variantes da imagem
+existente. Com dhash a no máximo TERM_IMAGE_PHASH_DISTANCE bits de distância,
+o upload mantém o próprio arquivo e só compartilha as variantes. A busca por
+dhash parecido só considera as imagens que têm ao menos uma faixa do hash
+igual (_bands).
+
+Com TERM_IMAGE_ASYNC, schedule() processa a imagem em segundo plano depois
+do commit; os payloads dos exercícios usam a imagem original até lá.
+"""
+
+import hashlib
+import io
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from django.db.models import Q
+from django.db.models.functions import Substr
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from exako.apps.term.models import TermImage
+
+logger = logging.getLogger(__name__)
+
+EXTENSIONS = {'webp': 'webp', 'jpeg': 'jpg'}
+CHUNK_SIZE = 64 * 1024
+
+_executor = None
+
+
+def get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.TERM_IMAGE_WORKERS,
+            thread_name_prefix='term-image',
+        )
+    return _executor
+
+
+def dhash(image: Image.Image) -> str:
+    """Hash perceptual de 64 bits (difference hash), em hexadecimal."""
+    pixels = list(image.convert('L').resize((9, 8), Image.Resampling.LANCZOS).getdata())
+    value = 0
+    for row in range(8):
+        for column in range(8):
+            left, right = pixels[row * 9 + column], pixels[row * 9 + column + 1]
+            value = value << 1 | (left > right)
+    return f'{value:016x}'
+
+
+def distance(first: str, second: str) -> int:
+    return (int(first, 16) ^ int(second, 16)).bit_count()
+
+
+def _sha256(file) -> str:
+    digest = hashlib.sha256()
+    for chunk in file.chunks(CHUNK_SIZE):
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _widths(width: int) -> list[int]:
+    sizes = sorted(settings.TERM_IMAGE_SIZES)
+    return [size for size in sizes if size < width] + [min(width, sizes[-1])]
+
+
+def _encode(image: Image.Image, image_format: str) -> bytes:
+    if image_format == 'jpeg' and image.mode != 'RGB':
+        background = Image.new('RGB', image.size, 'white')
+        if 'A' in image.getbands():
+            background.paste(image, mask=image.getchannel('A'))
+        else:
+            background.paste(image.convert('RGB'))
+        image = background
+    buffer = io.BytesIO()
+    # Sem exif/icc_profile/xmp nos parâmetros, o Pillow não grava metadados.
+    image.save(buffer, image_format, quality=settings.TERM_IMAGE_QUALITY, optimize=True)
+    return buffer.getvalue()
+
+
+def generate_variants(image: Image.Image, sha256: str) -> list[dict]:
+    """Grava as variantes de image e retorna a descrição de cada uma."""
+    if image.mode not in ['RGB', 'RGBA']:
+        alpha = 'A' in image.getbands() or 'transparency' in image.info
+        image = image.convert('RGBA' if alpha else 'RGB')
+
+    variants = []
+    # Da maior para a menor: cada redução parte da anterior, já menor.
+    for width in reversed(_widths(image.width)):
+        image = image.copy()
+        image.thumbnail((width, image.height), Image.Resampling.LANCZOS)
+        for image_format in settings.TERM_IMAGE_FORMATS:
+            data = _encode(image, image_format)
+            name = f'term/variants/{sha256}-{width}.{EXTENSIONS[image_format]}'
+            if not default_storage.exists(name):
+                name = default_storage.save(name, ContentFile(data))
+            variants.append(
+                {
+                    'format': image_format,
+                    'width': image.width,
+                    'height': image.height,
+                    'name': name,
+                    'size': len(data),
+                }
+            )
+    return variants
+
+
+def _bands(phash: str, max_distance: int) -> list[tuple[int, str]]:
+    """
+    Divide o dhash em max_distance + 1 faixas, como (posição, trecho). Dois
+    hashes a no máximo max_distance bits de distância têm ao menos uma faixa
+    igual, então basta buscar candidatos que compartilhem alguma delas.
+    """
+    count = min(max_distance + 1, len(phash))
+    size, extra = divmod(len(phash), count)
+    bands, start = [], 0
+    for index in range(count):
+        end = start + size + (index < extra)
+        bands.append((start, phash[start:end]))
+        start = end
+    return bands
+
+
+def _similar(queryset, phash: str):
+    """Restringe queryset às imagens com alguma faixa do dhash igual à de phash."""
+    max_distance = settings.TERM_IMAGE_PHASH_DISTANCE
+    # Com mais faixas que dígitos hexadecimais, a faixa de um dígito já não
+    # garante o casamento: nesse caso todas as imagens são candidatas.
+    if max_distance >= len(phash):
+        return queryset
+    condition = Q()
+    for start, band in _bands(phash, max_distance):
+        alias = f'phash_band_{start}'
+        queryset = queryset.annotate(**{alias: Substr('phash', start + 1, len(band))})
+        condition |= Q(**{alias: band})
+    return queryset.filter(condition)
+
+
+def _duplicate(term_image: TermImage, sha256: str, phash: str | None = None):
+    processed = TermImage.objects.filter(processed_at__isnull=False).exclude(
+        pk=term_image.pk
+    )
+    duplicate = processed.filter(sha256=sha256).first()
+    if duplicate is not None or phash is None:
+        return duplicate
+    candidates = _similar(processed.exclude(phash=''), phash)
+    for candidate in candidates.only('image', 'sha256', 'phash', 'variants'):
+        if distance(candidate.phash, phash) <= settings.TERM_IMAGE_PHASH_DISTANCE:
+            return candidate
+    return None
+
+
+def _reuse(term_image: TermImage, duplicate: TermImage):
+    """Usa o arquivo e as variantes de duplicate, que tem o mesmo conteúdo."""
+    name = term_image.image.name
+    shared = TermImage.objects.filter(image=name).exclude(pk=term_image.pk).exists()
+    if name != duplicate.image.name and not shared:
+        term_image.image.delete(save=False)
+    term_image.image = duplicate.image.name
+    term_image.sha256 = duplicate.sha256
+    term_image.phash = duplicate.phash
+    term_image.variants = duplicate.variants
+
+
+def process(term_image_id) -> TermImage:
+    """Gera as variantes da imagem, reaproveitando as de imagens repetidas."""
+    term_image = TermImage.objects.get(pk=term_image_id)
+    with term_image.image.open('rb') as file:
+        sha256 = _sha256(file)
+        duplicate = _duplicate(term_image, sha256)
+        if duplicate is None:
+            file.seek(0)
+            with Image.open(file) as image:
+                image.draft('RGB', (max(settings.TERM_IMAGE_SIZES),) * 2)
+                image = ImageOps.exif_transpose(image)
+                phash = dhash(image)
+                similar = _duplicate(term_image, sha256, phash)
+                term_image.sha256 = sha256
+                term_image.phash = phash
+                # Só parecida: o upload mantém o próprio arquivo, que pode
+                # diferir do da outra imagem, e compartilha as variantes.
+                if similar is not None:
+                    term_image.variants = similar.variants
+                else:
+                    term_image.variants = generate_variants(image, sha256)
+
+    if duplicate is not None:
+        _reuse(term_image, duplicate)
+    term_image.processed_at = timezone.now()
+    term_image.save(
+        update_fields=['image', 'sha256', 'phash', 'variants', 'processed_at']
+    )
+    return term_image
+
+
+def _process_safely(term_image_id):
+    try:
+        process(term_image_id)
+    except Exception:
+        logger.exception('Failed to process term image %s.', term_image_id)
+
+
+def _run(term_image_id):
+    try:
+        _process_safely(term_image_id)
+    finally:
+        close_old_connections()
+
+
+def schedule(term_image: TermImage):
+    """
+    Processa a imagem depois do commit, em segundo plano, ou na hora quando
+    TERM_IMAGE_ASYNC está desligado.
+    """
+    if not settings.TERM_IMAGE_ASYNC:
+        _process_safely(term_image.pk)
+        return
+    transaction.on_commit(lambda: get_executor().submit(_run, term_image.pk))
+
+
+def process_pending(reprocess: bool = False) -> int:
+    """Processa as imagens ainda sem variantes, ou todas com reprocess."""
+    queryset = TermImage.objects.all()
+    if not reprocess:
+        queryset = queryset.filter(processed_at__isnull=True)
+    term_image_ids = list(queryset.values_list('pk', flat=True))
+    for term_image_id in term_image_ids:
+        _process_safely(term_image_id)
+    return len(term_image_ids)
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from exako.apps.term import audio
+from exako.apps.term.models import TermPronunciation
+
+
+class Command(BaseCommand):
+    help = 'Baixa e guarda localmente os áudios das pronúncias dos termos.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--language',
+            help='Processar apenas os termos deste idioma.',
+        )
+
+    def handle(self, *args, **options):
+        queryset = TermPronunciation.objects.all()
+        if options['language']:
+            language = options['language']
+            queryset = queryset.filter(
+                Q(term__language=language)
+                | Q(term_example__language=language)
+                | Q(term_lexical__term__language=language)
+            )
+        result = audio.cache_pronunciations(queryset)
+        self.stdout.write(
+            f'{result["cached"]} pronúncias com áudio local, '
+            f'{result["failed"]} URLs com falha.'
+        )
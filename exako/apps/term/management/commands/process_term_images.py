@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from exako.apps.term import images
+
+
+class Command(BaseCommand):
+    help = 'Gera as variantes redimensionadas das imagens dos termos.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Processar novamente também as imagens que já têm variantes.',
+        )
+
+    def handle(self, *args, **options):
+        count = images.process_pending(reprocess=options['all'])
+        self.stdout.write(f'{count} imagens processadas.')
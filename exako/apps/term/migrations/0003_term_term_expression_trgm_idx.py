@@ -0,0 +1,33 @@
+# Generated by Django 5.0.14 on 2026-10-18 23:12
+
+import django.contrib.postgres.indexes
+import django.db.models.functions.text
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_add_unaccent_extension_and_function'),
+        ('term', '0002_delete_termexampletranslationlink'),
+    ]
+
+    operations = [
+        # O Django envolve a expressão em parênteses extras, o que o Postgres
+        # não aceita junto com a classe de operadores.
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunSQL(
+                    'CREATE INDEX term_expression_trgm_idx ON term_term '
+                    'USING gist (lower(expression) gist_trgm_ops);',
+                    reverse_sql='DROP INDEX IF EXISTS term_expression_trgm_idx;',
+                ),
+            ],
+            state_operations=[
+                migrations.AddIndex(
+                    model_name='term',
+                    index=django.contrib.postgres.indexes.GistIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Lower('expression'), name='gist_trgm_ops'), name='term_expression_trgm_idx'),
+                ),
+            ],
+        ),
+    ]
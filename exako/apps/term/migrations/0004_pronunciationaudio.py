@@ -0,0 +1,31 @@
+# Generated by Django 5.0.14 on 2026-10-18 23:51
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('term', '0003_term_term_expression_trgm_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PronunciationAudio',
+            fields=[
+                ('sha256', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('file', models.FileField(upload_to='audio')),
+                ('source_url', models.URLField()),
+                ('content_type', models.CharField(max_length=50)),
+                ('size', models.PositiveIntegerField()),
+                ('duration', models.FloatField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='termpronunciation',
+            name='audio',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='pronunciations', to='term.pronunciationaudio'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.0.14 on 2026-10-18 23:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('term', '0004_pronunciationaudio'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='termimage',
+            name='phash',
+            field=models.CharField(blank=True, max_length=16),
+        ),
+        migrations.AddField(
+            model_name='termimage',
+            name='processed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='termimage',
+            name='sha256',
+            field=models.CharField(blank=True, db_index=True, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='termimage',
+            name='variants',
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
@@ -1,8 +1,12 @@
+from django.conf import settings
 from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GistIndex, OpClass
+from django.core.files.storage import default_storage
 from django.db import models
 from django.db.models import functions
 from django.db.models.base import pre_save
 from django.dispatch import receiver
+from django.urls import reverse
 
 from exako.apps.core.models import CustomManager
 from exako.apps.term import constants
@@ -18,12 +22,8 @@ class TermBase(models.Model):
 
 
 class TermManager(models.Manager):
-    def get(
-        self,
-        expression,
-        language,
-    ):
-        term_query = (
+    def _lookup(self, expression, language):
+        return (
             super()
             .get_queryset()
             .filter(
@@ -43,9 +43,17 @@ class TermManager(models.Manager):
                     ),
                 )
             )
-            .first()
         )
-        return term_query
+
+    def get(
+        self,
+        expression,
+        language,
+    ):
+        return self._lookup(expression, language).first()
+
+    async def aget(self, expression, language):
+        return await self._lookup(expression, language).afirst()
 
     def search(self, expression, language):
         return (
@@ -107,7 +115,11 @@ class Term(TermBase):
                 functions.Lower('expression'),
                 functions.Lower('language'),
                 name='term_inex_db',
-            )
+            ),
+            GistIndex(
+                OpClass(functions.Lower('expression'), name='gist_trgm_ops'),
+                name='term_expression_trgm_idx',
+            ),
         ]
 
 
@@ -127,6 +139,29 @@ class TermLexical(TermBase):
 class TermImage(TermBase):
     term = models.OneToOneField(Term, on_delete=models.CASCADE)
     image = models.ImageField(upload_to='term')
+    sha256 = models.CharField(max_length=64, blank=True, db_index=True)
+    phash = models.CharField(max_length=16, blank=True)
+    variants = models.JSONField(default=list, blank=True)
+    processed_at = models.DateTimeField(blank=True, null=True)
+
+    def variant_url(self, width: int, image_format: str | None = None) -> str:
+        """
+        URL da menor variante com largura maior ou igual a width, ou da maior
+        variante quando nenhuma chega a width. Sem variantes geradas, retorna
+        a URL da imagem original.
+        """
+        image_format = image_format or settings.TERM_IMAGE_FORMATS[0]
+        variants = sorted(
+            (variant['width'], variant['name'])
+            for variant in self.variants
+            if variant['format'] == image_format
+        )
+        if not variants:
+            return self.image.url
+        for variant_width, name in variants:
+            if variant_width >= width:
+                break
+        return default_storage.url(name)
 
 
 class TermExample(TermBase):
@@ -198,11 +233,42 @@ class TermDefinitionTranslation(TermBase):
         ]
 
 
+class PronunciationAudio(models.Model):
+    """
+    Cópia local de um áudio de pronúncia, endereçada pelo sha256 do conteúdo.
+    Criada por term.audio a partir de TermPronunciation.audio_file; áudios
+    iguais em URLs diferentes são guardados uma única vez.
+    """
+
+    sha256 = models.CharField(max_length=64, primary_key=True)
+    file = models.FileField(upload_to='audio')
+    source_url = models.URLField()
+    content_type = models.CharField(max_length=50)
+    size = models.PositiveIntegerField()
+    duration = models.FloatField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    @staticmethod
+    def url_for(sha256):
+        return reverse('term:audio', kwargs={'sha256': sha256})
+
+    @property
+    def url(self):
+        return self.url_for(self.sha256)
+
+
 class TermPronunciation(TermBase):
     description = models.CharField(max_length=255, blank=True, null=True)
     phonetic = models.CharField(max_length=255)
     text = models.CharField(max_length=255, blank=True, null=True)
     audio_file = models.URLField(blank=True, null=True)
+    audio = models.ForeignKey(
+        PronunciationAudio,
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        related_name='pronunciations',
+    )
     term = models.OneToOneField(
         Term,
         on_delete=models.CASCADE,
@@ -222,6 +288,13 @@ class TermPronunciation(TermBase):
         null=True,
     )
 
+    @property
+    def audio_url(self):
+        """URL do áudio em cache local ou, enquanto não houver cópia, a de origem."""
+        if self.audio_id:
+            return PronunciationAudio.url_for(self.audio_id)
+        return self.audio_file
+
 
 class TermExampleLink(TermBase):
     highlight = ArrayField(
@@ -271,6 +344,40 @@ def register_validators(sender, instance, **kwargs):
     validate_term(sender.__name__, instance=instance)
 
 
+@receiver(pre_save, sender=TermPronunciation)
+def reset_pronunciation_audio(sender, instance, **kwargs):
+    if instance.audio_id is None or instance.pk is None:
+        return
+    audio_file = (
+        TermPronunciation.objects.filter(pk=instance.pk)
+        .values_list('audio_file', flat=True)
+        .first()
+    )
+    if audio_file != instance.audio_file:
+        instance.audio = None
+
+
+@receiver(pre_save, sender=TermImage)
+def reset_term_image_variants(sender, instance, **kwargs):
+    if instance.processed_at is None or instance.pk is None:
+        return
+    # Uma troca de imagem feita fora do pipeline (sem novo processed_at)
+    # invalida as variantes geradas para a imagem anterior.
+    current = (
+        TermImage.objects.filter(pk=instance.pk)
+        .values_list('image', 'processed_at')
+        .first()
+    )
+    if current is None:
+        return
+    image, processed_at = current
+    if image != instance.image.name and processed_at == instance.processed_at:
+        instance.sha256 = ''
+        instance.phash = ''
+        instance.variants = []
+        instance.processed_at = None
+
+
 @models.CharField.register_lookup
 @models.TextField.register_lookup
 class CleanText(models.Lookup):
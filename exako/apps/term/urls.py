@@ -11,6 +11,15 @@ urlpatterns = [
     path('partial/search', views.search_term_partial, name='search'),
     path('partial/search/reverse', views.search_reverse_partial, name='search_reverse'),
     path('partial/index', views.index_term_partial, name='index'),
-    path('partial/term_examples/<str:language>', views.term_examples_partial, name='term_examples'),
-    path('partial/term_lexicals/<int:term_id>', views.term_lexicals_partial, name='term_lexicals'),
+    path(
+        'partial/term_examples/<str:language>',
+        views.term_examples_partial,
+        name='term_examples',
+    ),
+    path(
+        'partial/term_lexicals/<int:term_id>',
+        views.term_lexicals_partial,
+        name='term_lexicals',
+    ),
+    path('audio/<str:sha256>', views.pronunciation_audio, name='audio'),
 ]
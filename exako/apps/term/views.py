@@ -1,9 +1,12 @@
 import re
 
+from django.conf import settings
 from django.core.paginator import Paginator
 from django.shortcuts import HttpResponse, get_object_or_404, redirect, render
 from django.urls import reverse_lazy
+from django.views.decorators.http import require_safe
 
+from exako.apps.core.http import file_response
 from exako.apps.term.constants import (
     Language,
     TermLexicalType,
@@ -11,6 +14,7 @@ from exako.apps.term.constants import (
     language_emoji_map,
 )
 from exako.apps.term.models import (
+    PronunciationAudio,
     Term,
     TermDefinition,
     TermExampleLink,
@@ -246,3 +250,16 @@ def term_lexicals_partial(request, term_id):
             'lexical_type': TermLexicalType(int(lexical_type)),
         },
     )
+
+
+@require_safe
+def pronunciation_audio(request, sha256):
+    audio = get_object_or_404(PronunciationAudio, sha256=sha256)
+    return file_response(
+        request,
+        audio.file.open('rb'),
+        size=audio.size,
+        content_type=audio.content_type,
+        etag=audio.sha256,
+        max_age=settings.TERM_AUDIO_CACHE_TIMEOUT,
+    )
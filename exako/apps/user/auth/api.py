@@ -19,12 +19,15 @@ auth_router = Router()
         401: NotAuthenticated,
     },
 )
-def create_access_token(request, email: str = Form(...), password: str = Form(...)):
-    user = User.objects.filter(email=email).first()
+async def create_access_token(
+    request, email: str = Form(...), password: str = Form(...)
+):
+    user = await User.objects.filter(email=email).afirst()
     if user is None:
         raise InvalidToken
 
-    if not user.check_password(password):
+    # acheck_password() calcula o hash em uma thread, fora do event loop.
+    if not await user.acheck_password(password):
         raise InvalidToken
 
     return {
@@ -0,0 +1,94 @@
+"""
+Cache da verificação dos tokens JWT.
+
+AuthBearer decodifica o token e busca o usuário só na primeira requisição;
+as seguintes usam os campos do usuário guardados sob o sha256 do token, até
+o exp do token (limitado a TOKEN_CACHE_TIMEOUT). Cada e-mail tem uma versão
+no cache, trocada quando a senha, o e-mail ou is_active do usuário mudam ou
+quando ele é removido; entradas gravadas com uma versão anterior são
+ignoradas.
+"""
+
+import hashlib
+import time
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+TOKEN_KEY = 'auth:token:{digest}'
+VERSION_KEY = 'auth:version:{digest}'
+USER_FIELDS = [
+    'id',
+    'email',
+    'name',
+    'native_language',
+    'is_superuser',
+    'is_staff',
+    'is_active',
+]
+
+
+def _digest(value: str) -> str:
+    return hashlib.sha256(value.encode()).hexdigest()
+
+
+def _version_key(email: str) -> str:
+    return VERSION_KEY.format(digest=_digest(email.lower()))
+
+
+def version(email: str) -> str:
+    key = _version_key(email)
+    cache.add(key, uuid4().hex, timeout=None)
+    return cache.get(key)
+
+
+def cached_user(token: str) -> dict | None:
+    """Campos do usuário do token, se a verificação ainda for válida."""
+    entry = cache.get(TOKEN_KEY.format(digest=_digest(token)))
+    if entry is None:
+        return None
+    if cache.get(_version_key(entry['fields']['email'])) != entry['version']:
+        return None
+    return entry['fields']
+
+
+async def acached_user(token: str) -> dict | None:
+    entry = await cache.aget(TOKEN_KEY.format(digest=_digest(token)))
+    if entry is None:
+        return None
+    if await cache.aget(_version_key(entry['fields']['email'])) != entry['version']:
+        return None
+    return entry['fields']
+
+
+def cache_user(token: str, fields: dict, user_version: str, expires_at=None):
+    """
+    Guarda os campos do usuário do token. user_version deve ser lida antes
+    de o usuário ser buscado no banco, para que uma alteração concorrente
+    não fique mascarada no cache.
+    """
+    timeout = settings.TOKEN_CACHE_TIMEOUT
+    if expires_at is not None:
+        timeout = min(timeout, expires_at - time.time())
+    if timeout < 1:
+        return
+    cache.set(
+        TOKEN_KEY.format(digest=_digest(token)),
+        {'fields': fields, 'version': user_version},
+        timeout=int(timeout),
+    )
+
+
+def forget(token: str):
+    """Descarta a verificação em cache de token."""
+    cache.delete(TOKEN_KEY.format(digest=_digest(token)))
+
+
+def invalidate(*emails: str):
+    """Descarta, após o commit, as verificações em cache dos e-mails."""
+    keys = [_version_key(email) for email in emails]
+    transaction.on_commit(
+        lambda: cache.set_many({key: uuid4().hex for key in keys}, timeout=None)
+    )
@@ -1,11 +1,13 @@
 from typing import Any, Optional
 
+from asgiref.sync import sync_to_async
 from django.conf import settings
 from django.http import HttpRequest
 from django.utils import timezone
 from jose import JWTError, jwt
 from ninja.security import HttpBearer
 
+from exako.apps.user.auth import cache as token_cache
 from exako.apps.user.auth.exception import InvalidToken
 from exako.apps.user.models import User
 
@@ -31,6 +33,28 @@ class AuthBearer(HttpBearer):
         return token
 
     def authenticate(self, request, token):
+        fields = token_cache.cached_user(token)
+        if fields is None:
+            fields = self.verify(token)
+        self.login(request, fields)
+        return token
+
+    def login(self, request, fields: dict):
+        # from_db espera os valores na ordem dos campos do modelo.
+        field_names = [
+            field.attname
+            for field in User._meta.concrete_fields
+            if field.attname in fields
+        ]
+        user = User.from_db(
+            User.objects.db, field_names, [fields[name] for name in field_names]
+        )
+
+        setattr(request, 'user', user)
+        setattr(request, 'is_authenticated', True)
+
+    def verify(self, token) -> dict:
+        """Decodifica o token e busca o usuário, guardando o resultado no cache."""
         try:
             payload = jwt.decode(
                 token,
@@ -42,10 +66,33 @@ class AuthBearer(HttpBearer):
         except JWTError:
             raise InvalidToken
 
-        user = User.objects.filter(email=email).first()
-        if user is None:
+        user_version = token_cache.version(email)
+        fields = (
+            User.objects.filter(email=email, is_active=True)
+            .values(*token_cache.USER_FIELDS)
+            .first()
+        )
+        if fields is None:
             raise InvalidToken
 
-        setattr(request, 'user', user)
-        setattr(request, 'is_authenticated', True)
+        token_cache.cache_user(token, fields, user_version, payload.get('exp'))
+        return fields
+
+
+class AsyncAuthBearer(AuthBearer):
+    """
+    AuthBearer para endpoints assíncronos. Com o token em cache não há
+    consulta ao banco; sem ele, a verificação roda em uma thread.
+    """
+
+    is_async = True
+
+    async def __call__(self, request: HttpRequest) -> Optional[Any]:
+        return await super().__call__(request)
+
+    async def authenticate(self, request, token):
+        fields = await token_cache.acached_user(token)
+        if fields is None:
+            fields = await sync_to_async(self.verify)(token)
+        self.login(request, fields)
         return token
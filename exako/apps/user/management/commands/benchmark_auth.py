@@ -0,0 +1,50 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+
+from exako.apps.user.auth import cache as token_cache
+from exako.apps.user.auth.token import AuthBearer, create_jwt_access_token
+from exako.apps.user.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        'Mede o custo da autenticação por requisição, com e sem o cache de '
+        'verificação dos tokens.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('email', help='E-mail de um usuário existente.')
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=1000,
+            help='Quantidade de requisições simuladas em cada cenário.',
+        )
+
+    def handle(self, *args, **options):
+        user = User.objects.filter(email=options['email']).first()
+        if user is None:
+            raise CommandError(f'user {options["email"]} not found.')
+
+        token = create_jwt_access_token(user)
+        request = RequestFactory().get('/', HTTP_AUTHORIZATION=f'Bearer {token}')
+        auth = AuthBearer()
+        count = options['requests']
+
+        for label, cold in [('sem cache', True), ('com cache', False)]:
+            auth(request)
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                for _ in range(count):
+                    if cold:
+                        token_cache.forget(token)
+                    auth(request)
+                elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f'{label}: {elapsed / count * 1_000_000:.1f} µs/requisição, '
+                f'{len(queries) / count:.2f} consultas/requisição'
+            )
@@ -1,8 +1,11 @@
 from django.contrib.auth.models import AbstractUser, BaseUserManager
 from django.db import models
+from django.db.models.signals import post_delete, pre_save
+from django.dispatch import receiver
 from django.utils.translation import gettext_lazy as _
 
 from exako.apps.term import constants
+from exako.apps.user.auth import cache as token_cache
 
 
 class UserManager(BaseUserManager):
@@ -48,3 +51,22 @@ class User(AbstractUser):
 
     def __str__(self):
         return f'User({self.username})'
+
+
+@receiver(pre_save, sender=User)
+def invalidate_cached_tokens(sender, instance, update_fields=None, **kwargs):
+    fields = ['email', 'password', 'is_active']
+    if instance.pk is None or (
+        update_fields is not None and not set(fields) & set(update_fields)
+    ):
+        return
+    current = User.objects.filter(pk=instance.pk).values(*fields).first()
+    if current is None:
+        return
+    if any(current[field] != getattr(instance, field) for field in fields):
+        token_cache.invalidate(current['email'], instance.email)
+
+
+@receiver(post_delete, sender=User)
+def invalidate_deleted_user_tokens(sender, instance, **kwargs):
+    token_cache.invalidate(instance.email)
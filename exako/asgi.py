@@ -9,8 +9,11 @@ https://docs.djangoproject.com/en/5.0/howto/deployment/asgi/
 
 import os
 
-from django.core.asgi import get_asgi_application
+import django
+
+from exako.apps.core.asgi import SendfileASGIHandler
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'exako.settings')
 
-application = get_asgi_application()
+django.setup(set_prefix=False)
+application = SendfileASGIHandler()
@@ -1,3 +1,10 @@
 from ._base import *
 
 DEBUG = False
+
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {
+        'BACKEND': 'exako.apps.core.storage.CompressedManifestStaticFilesStorage'
+    },
+}
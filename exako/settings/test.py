@@ -7,3 +7,10 @@ PASSWORD_HASHERS = [
 ]
 
 DATABASES['default'] = {**DATABASES['default'], 'NAME': 'exako_test'}
+
+CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+EXERCISE_HISTORY_WRITE_BEHIND = False
+EXERCISE_SPEECH_ASYNC = False
+EXERCISE_DISTRACTORS_ASYNC = False
+TERM_IMAGE_ASYNC = False
@@ -1,13 +1,22 @@
+import time
 from datetime import datetime
+from io import StringIO
 
+from asgiref.sync import async_to_sync
 from django.conf import settings
+from django.core.management import call_command
 from django.http import HttpRequest
 from django.utils import timezone
 from jose import jwt
 from pytest import mark, raises
 
+from exako.apps.user.auth import cache as token_cache
 from exako.apps.user.auth.exception import InvalidToken
-from exako.apps.user.auth.token import AuthBearer, create_jwt_access_token
+from exako.apps.user.auth.token import (
+    AsyncAuthBearer,
+    AuthBearer,
+    create_jwt_access_token,
+)
 from exako.tests.factories.user import UserFactory
 
 pytestmark = mark.django_db
@@ -64,3 +73,125 @@ def test_auth_bearer_token_authentication_with_invalid_user():
 
     with raises(InvalidToken):
         auth.authenticate(request, token)
+
+
+def test_auth_bearer_cached_verification(django_assert_num_queries):
+    auth = AuthBearer()
+    user = UserFactory(is_superuser=True)
+    token = create_jwt_access_token(user)
+    auth.authenticate(HttpRequest(), token)
+    request = HttpRequest()
+
+    with django_assert_num_queries(0):
+        auth.authenticate(request, token)
+
+    assert request.user == user
+    assert request.user.email == user.email
+    assert request.user.is_superuser is True
+    assert request.user.native_language == user.native_language
+    assert request.user.username == user.username
+
+
+def test_async_auth_bearer(django_assert_num_queries):
+    auth = AsyncAuthBearer()
+    user = UserFactory()
+    token = create_jwt_access_token(user)
+    request = HttpRequest()
+    request.META['HTTP_AUTHORIZATION'] = f'Bearer {token}'
+
+    assert async_to_sync(auth)(request) == token
+    assert request.user == user
+
+    request = HttpRequest()
+    request.META['HTTP_AUTHORIZATION'] = f'Bearer {token}'
+    with django_assert_num_queries(0):
+        async_to_sync(auth)(request)
+    assert request.user == user
+
+
+def test_async_auth_bearer_invalid_token():
+    request = HttpRequest()
+    request.META['HTTP_AUTHORIZATION'] = 'Bearer token'
+
+    with raises(InvalidToken):
+        async_to_sync(AsyncAuthBearer())(request)
+
+
+def test_auth_bearer_inactive_user():
+    user = UserFactory(is_active=False)
+
+    with raises(InvalidToken):
+        AuthBearer().authenticate(HttpRequest(), create_jwt_access_token(user))
+
+
+@mark.parametrize(
+    'field, value',
+    [('password', 'new-password'), ('is_active', False), ('email', 'new@x.com')],
+)
+def test_auth_bearer_cache_invalidation(
+    django_capture_on_commit_callbacks, field, value
+):
+    auth = AuthBearer()
+    user = UserFactory()
+    token = create_jwt_access_token(user)
+    auth.authenticate(HttpRequest(), token)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        setattr(user, field, value)
+        user.save()
+
+    assert token_cache.cached_user(token) is None
+    if field == 'password':
+        auth.authenticate(HttpRequest(), token)
+    else:
+        with raises(InvalidToken):
+            auth.authenticate(HttpRequest(), token)
+
+
+def test_auth_bearer_cache_unrelated_change(django_capture_on_commit_callbacks):
+    auth = AuthBearer()
+    user = UserFactory()
+    token = create_jwt_access_token(user)
+    auth.authenticate(HttpRequest(), token)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        user.name = 'other name'
+        user.save()
+
+    assert token_cache.cached_user(token) is not None
+
+
+def test_auth_bearer_cache_deleted_user(django_capture_on_commit_callbacks):
+    auth = AuthBearer()
+    user = UserFactory()
+    token = create_jwt_access_token(user)
+    auth.authenticate(HttpRequest(), token)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        user.delete()
+
+    with raises(InvalidToken):
+        auth.authenticate(HttpRequest(), token)
+
+
+def test_token_cache_bounded_by_expiration():
+    user = UserFactory()
+    fields = {'id': user.id, 'email': user.email}
+
+    token_cache.cache_user('token', fields, token_cache.version(user.email), 0)
+    assert token_cache.cached_user('token') is None
+
+    expires_at = time.time() + 60
+    token_cache.cache_user('token', fields, token_cache.version(user.email), expires_at)
+    assert token_cache.cached_user('token') == fields
+
+
+def test_benchmark_auth_command():
+    user = UserFactory()
+    stdout = StringIO()
+
+    call_command('benchmark_auth', user.email, requests=5, stdout=stdout)
+
+    assert 'sem cache' in stdout.getvalue()
+    assert 'com cache: ' in stdout.getvalue()
+    assert '0.00 consultas' in stdout.getvalue()
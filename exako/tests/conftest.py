@@ -4,6 +4,7 @@ from itertools import chain
 
 import pytest
 from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
 from django.db.models import ForeignKey, ManyToManyField, OneToOneField
 from django.test import Client
 from django.urls import reverse_lazy
@@ -87,3 +88,9 @@ def delete_term_media_dir(settings):
     yield
     if os.path.exists(settings.MEDIA_ROOT / 'term'):
         shutil.rmtree(settings.MEDIA_ROOT / 'term')
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    yield
+    cache.clear()
@@ -0,0 +1,47 @@
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+
+@pytest.fixture
+def server():
+    statuses = iter([200, 200, 500])
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            self.send_response(next(statuses, 200))
+            self.send_header('Content-Length', '2')
+            self.end_headers()
+            self.wfile.write(b'ok')
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_port}/'
+    server.shutdown()
+    server.server_close()
+
+
+def test_benchmark_http_command(server):
+    stdout = StringIO()
+
+    call_command(
+        'benchmark_http',
+        server,
+        requests=3,
+        concurrency=1,
+        header=['Authorization: Bearer token'],
+        stdout=stdout,
+    )
+
+    assert '3 requisições, concorrência 1' in stdout.getvalue()
+    assert '1 erros' in stdout.getvalue()
+    assert 'p95' in stdout.getvalue()
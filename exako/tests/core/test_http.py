@@ -0,0 +1,249 @@
+import asyncio
+import gzip
+
+import pytest
+from django.core.management import call_command
+from django.core.signals import request_finished
+from django.urls import reverse
+
+from exako.apps.core.asgi import PATHSEND, ZEROCOPYSEND, SendfileASGIHandler
+from exako.apps.core.storage import CompressedManifestStaticFilesStorage
+
+CONTENT = b'0123456789' * 100
+SHA256 = 'a' * 64
+
+
+@pytest.fixture(autouse=True)
+def media_root(settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+    (tmp_path / 'term').mkdir()
+    (tmp_path / 'term' / 'image.txt').write_bytes(CONTENT)
+    (tmp_path / 'term' / f'{SHA256}-320.txt').write_bytes(CONTENT)
+    return tmp_path
+
+
+def media_url(path):
+    return reverse('media', kwargs={'path': path})
+
+
+def test_media(client, settings):
+    response = client.get(media_url('term/image.txt'))
+
+    assert response.status_code == 200
+    assert b''.join(response.streaming_content) == CONTENT
+    assert response['Content-Type'].startswith('text/plain')
+    assert response['Content-Length'] == str(len(CONTENT))
+    assert response['Accept-Ranges'] == 'bytes'
+    assert response['Cache-Control'] == (
+        f'public, max-age={int(settings.MEDIA_MAX_AGE)}'
+    )
+
+
+def test_media_content_addressed(client):
+    response = client.get(media_url(f'term/{SHA256}-320.txt'))
+
+    assert response.status_code == 200
+    assert 'immutable' in response['Cache-Control']
+    assert 'max-age=31536000' in response['Cache-Control']
+
+
+def test_media_range(client):
+    response = client.get(media_url('term/image.txt'), headers={'Range': 'bytes=10-19'})
+
+    assert response.status_code == 206
+    assert b''.join(response.streaming_content) == CONTENT[10:20]
+    assert response['Content-Range'] == f'bytes 10-19/{len(CONTENT)}'
+
+
+def test_media_not_modified(client):
+    etag = client.get(media_url('term/image.txt'))['ETag']
+
+    response = client.get(media_url('term/image.txt'), headers={'If-None-Match': etag})
+
+    assert response.status_code == 304
+
+
+def test_media_precompressed(client, media_root):
+    (media_root / 'term' / 'image.txt.gz').write_bytes(gzip.compress(CONTENT))
+
+    response = client.get(
+        media_url('term/image.txt'), headers={'Accept-Encoding': 'gzip, deflate'}
+    )
+    identity = client.get(media_url('term/image.txt'))
+
+    assert response['Content-Encoding'] == 'gzip'
+    assert response['Vary'] == 'Accept-Encoding'
+    assert gzip.decompress(b''.join(response.streaming_content)) == CONTENT
+    assert response['ETag'] != identity['ETag']
+    assert not identity.has_header('Content-Encoding')
+    assert identity['Vary'] == 'Accept-Encoding'
+
+
+def test_media_precompressed_refused(client, media_root):
+    (media_root / 'term' / 'image.txt.gz').write_bytes(gzip.compress(CONTENT))
+
+    response = client.get(
+        media_url('term/image.txt'), headers={'Accept-Encoding': 'gzip;q=0, br'}
+    )
+
+    assert not response.has_header('Content-Encoding')
+    assert b''.join(response.streaming_content) == CONTENT
+
+
+@pytest.mark.parametrize(
+    'accel, header, value',
+    [
+        ('x-accel-redirect', 'X-Accel-Redirect', '/internal/media/term/image.txt'),
+        ('x-sendfile', 'X-Sendfile', 'term/image.txt'),
+    ],
+)
+def test_media_accel(client, settings, media_root, accel, header, value):
+    settings.FILE_ACCEL = accel
+
+    response = client.get(media_url('term/image.txt'))
+
+    assert response.status_code == 200
+    assert response.content == b''
+    assert response[header].endswith(value)
+    assert response['ETag']
+
+
+@pytest.mark.parametrize('path', ['../secret.txt', 'term/missing.txt'])
+def test_media_not_found(client, path):
+    response = client.get(media_url(path))
+
+    assert response.status_code == 404
+
+
+def test_media_method_not_allowed(client):
+    response = client.post(media_url('term/image.txt'))
+
+    assert response.status_code == 405
+
+
+def test_static_debug(client, settings):
+    settings.DEBUG = True
+
+    response = client.get(reverse('static', kwargs={'path': 'hs/exercise._hs'}))
+
+    assert response.status_code == 200
+    assert response['Cache-Control'] == 'public, max-age=0'
+
+
+def test_static_manifest(client, settings, tmp_path):
+    settings.STATIC_ROOT = tmp_path / 'static'
+    settings.STORAGES = {
+        **settings.STORAGES,
+        'staticfiles': {
+            'BACKEND': 'exako.apps.core.storage.CompressedManifestStaticFilesStorage'
+        },
+    }
+    call_command('collectstatic', interactive=False, verbosity=0)
+    hashed_name = CompressedManifestStaticFilesStorage(
+        location=settings.STATIC_ROOT
+    ).stored_name('hs/exercise._hs')
+
+    response = client.get(
+        reverse('static', kwargs={'path': hashed_name}),
+        headers={'Accept-Encoding': 'gzip'},
+    )
+
+    assert hashed_name != 'hs/exercise._hs'
+    assert (settings.STATIC_ROOT / f'{hashed_name}.gz').exists()
+    assert response.status_code == 200
+    assert response['Content-Encoding'] == 'gzip'
+    assert 'immutable' in response['Cache-Control']
+
+
+def asgi_get(path, extensions, headers=(), fail_on=None):
+    messages = []
+    requests = [{'type': 'http.request', 'body': b'', 'more_body': False}]
+
+    async def receive():
+        if requests:
+            return requests.pop()
+        await asyncio.Event().wait()
+
+    async def send(message):
+        messages.append(message)
+        if message['type'] == fail_on:
+            raise OSError('connection reset.')
+
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': 'GET',
+        'scheme': 'http',
+        'path': path,
+        'query_string': b'',
+        'headers': [(b'host', b'testserver'), *headers],
+        'server': ('testserver', 80),
+        'extensions': extensions,
+    }
+    try:
+        asyncio.run(SendfileASGIHandler()(scope, receive, send))
+    except OSError:
+        pass
+    return messages
+
+
+@pytest.fixture
+def allowed_hosts(settings):
+    settings.ALLOWED_HOSTS = ['testserver']
+
+
+def test_asgi_pathsend(allowed_hosts, media_root):
+    start, body = asgi_get(media_url('term/image.txt'), {PATHSEND: {}})
+
+    assert start['status'] == 200
+    assert body == {
+        'type': PATHSEND,
+        'path': str(media_root / 'term' / 'image.txt'),
+    }
+
+
+def test_asgi_zerocopysend_range(allowed_hosts):
+    start, body = asgi_get(
+        media_url('term/image.txt'),
+        {ZEROCOPYSEND: {}},
+        headers=[(b'range', b'bytes=10-19')],
+    )
+
+    assert start['status'] == 206
+    assert body['type'] == ZEROCOPYSEND
+    assert (body['offset'], body['count']) == (10, 10)
+
+
+def test_asgi_without_extensions(allowed_hosts):
+    messages = asgi_get(media_url('term/image.txt'), {})
+
+    assert messages[0]['status'] == 200
+    body = b''.join(message.get('body', b'') for message in messages[1:])
+    assert body == CONTENT
+
+
+@pytest.fixture
+def finished():
+    calls = []
+
+    def receiver(**kwargs):
+        calls.append(kwargs)
+
+    request_finished.connect(receiver)
+    yield calls
+    request_finished.disconnect(receiver)
+
+
+@pytest.mark.parametrize('fail_on', [None, ZEROCOPYSEND])
+def test_asgi_zerocopysend_closes_response(allowed_hosts, finished, fail_on):
+    messages = asgi_get(
+        media_url('term/image.txt'),
+        {ZEROCOPYSEND: {}},
+        headers=[(b'range', b'bytes=10-19')],
+        fail_on=fail_on,
+    )
+
+    assert messages[-1]['type'] == ZEROCOPYSEND
+    assert messages[-1]['file'].closed
+    assert len(finished) == 1
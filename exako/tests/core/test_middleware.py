@@ -0,0 +1,39 @@
+import asyncio
+
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.test import RequestFactory
+
+from exako.apps.core.middleware import (
+    RequestContextMiddleware,
+    get_current_request,
+    get_current_user,
+)
+
+
+def test_request_context_middleware():
+    request = RequestFactory().get('/')
+    request.user = 'user'
+    middleware = RequestContextMiddleware(
+        lambda request: (get_current_request(), get_current_user())
+    )
+
+    assert middleware(request) == (request, 'user')
+    assert get_current_request() is None
+
+
+def test_request_context_middleware_async():
+    async def get_response(request):
+        await asyncio.sleep(0)
+        return get_current_request()
+
+    middleware = RequestContextMiddleware(get_response)
+    assert iscoroutinefunction(middleware)
+
+    async def concurrent():
+        requests = [RequestFactory().get(f'/{index}') for index in range(5)]
+        return requests, await asyncio.gather(*map(middleware, requests))
+
+    requests, responses = async_to_sync(concurrent)()
+
+    assert responses == requests
+    assert get_current_request() is None
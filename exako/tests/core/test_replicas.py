@@ -0,0 +1,201 @@
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import pytest
+from django.conf import settings as django_settings
+from django.db import DatabaseError, connections
+from django.http import HttpResponse
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse_lazy
+
+from exako.apps.core import replicas
+from exako.apps.core.middleware import RequestContextMiddleware
+from exako.apps.term.models import Term
+from exako.apps.user.models import User
+from exako.tests.factories.term import TermFactory
+from exako.tests.factories.user import UserFactory
+
+pytestmark = pytest.mark.django_db
+
+router = replicas.ReplicaRouter()
+
+
+@pytest.fixture
+def replica_lag(settings, monkeypatch):
+    """Configura a réplica replica_1, com o atraso definido pelo teste."""
+    settings.DATABASE_REPLICAS = ['replica_1']
+    lags = {'replica_1': 0}
+
+    def lag(alias):
+        if isinstance(lags[alias], Exception):
+            raise lags[alias]
+        return lags[alias]
+
+    monkeypatch.setattr(replicas, 'lag', lag)
+    monkeypatch.setattr(replicas, '_health', {})
+    monkeypatch.setattr(
+        replicas,
+        'connections',
+        {'default': SimpleNamespace(in_atomic_block=False), 'replica_1': MagicMock()},
+    )
+    return lags
+
+
+def db_for_read(request, model=Term):
+    middleware = RequestContextMiddleware(
+        lambda request: router.db_for_read(model) or 'default'
+    )
+    return middleware(request)
+
+
+def test_db_for_read(replica_lag):
+    factory = RequestFactory()
+
+    assert db_for_read(factory.get('/')) == 'replica_1'
+    assert db_for_read(factory.head('/')) == 'replica_1'
+    assert db_for_read(factory.get('/'), model=User) == 'default'
+    assert db_for_read(factory.post('/')) == 'default'
+    assert router.db_for_read(Term) is None
+    assert router.db_for_write(Term) == 'default'
+
+
+def test_db_for_read_without_replicas(settings):
+    settings.DATABASE_REPLICAS = []
+
+    assert db_for_read(RequestFactory().get('/')) == 'default'
+
+
+def test_db_for_read_use_primary(replica_lag):
+    with replicas.use_primary():
+        assert db_for_read(RequestFactory().get('/')) == 'default'
+
+
+def test_db_for_read_in_transaction(replica_lag):
+    replicas.connections['default'].in_atomic_block = True
+
+    assert db_for_read(RequestFactory().get('/')) == 'default'
+
+
+def test_db_for_read_lagging_replica(replica_lag, settings):
+    replica_lag['replica_1'] = settings.DATABASE_REPLICA_MAX_LAG + 1
+
+    assert db_for_read(RequestFactory().get('/')) == 'default'
+
+
+def test_db_for_read_unavailable_replica(replica_lag):
+    replica_lag['replica_1'] = DatabaseError('connection refused')
+
+    assert db_for_read(RequestFactory().get('/')) == 'default'
+    replicas.connections['replica_1'].close.assert_called_once()
+
+
+def test_health_check_interval(replica_lag, settings, monkeypatch):
+    now = 1000
+    monkeypatch.setattr(replicas.time, 'monotonic', lambda: now)
+    assert replicas.is_healthy('replica_1')
+
+    replica_lag['replica_1'] = settings.DATABASE_REPLICA_MAX_LAG + 1
+    assert replicas.is_healthy('replica_1')
+
+    now += settings.DATABASE_REPLICA_CHECK_INTERVAL
+    assert not replicas.is_healthy('replica_1')
+
+
+def test_lag_on_primary():
+    assert replicas.lag('default') == 0
+
+
+@pytest.fixture
+def standby():
+    """
+    Simula, na conexão de teste, as funções e a view de uma réplica em
+    recuperação, que têm precedência sobre o pg_catalog no search_path.
+    """
+    with connections['default'].cursor() as cursor:
+        cursor.execute(
+            """
+            CREATE SCHEMA standby;
+            CREATE TABLE standby.pg_stat_wal_receiver (status text);
+            CREATE FUNCTION standby.pg_is_in_recovery() RETURNS boolean
+                AS 'SELECT true' LANGUAGE sql;
+            CREATE FUNCTION standby.pg_last_wal_receive_lsn() RETURNS pg_lsn
+                AS 'SELECT ''0/3000000''::pg_lsn' LANGUAGE sql;
+            CREATE FUNCTION standby.pg_last_wal_replay_lsn() RETURNS pg_lsn
+                AS 'SELECT ''0/3000000''::pg_lsn' LANGUAGE sql;
+            SET LOCAL search_path = standby, pg_catalog, public;
+            """
+        )
+        yield cursor
+
+
+def test_lag_on_standby_in_sync(standby):
+    standby.execute("INSERT INTO standby.pg_stat_wal_receiver VALUES ('streaming')")
+
+    assert replicas.lag('default') == 0
+
+
+@pytest.mark.parametrize('receiver', [None, 'waiting'])
+def test_lag_on_standby_receiver_down(standby, receiver):
+    if receiver is not None:
+        standby.execute(
+            'INSERT INTO standby.pg_stat_wal_receiver VALUES (%s)', [receiver]
+        )
+
+    assert replicas.lag('default') == float('inf')
+
+
+def test_pin_after_write(replica_lag):
+    user = UserFactory()
+    request = RequestFactory().post('/')
+    request.user = user
+    middleware = replicas.PrimaryPinMiddleware(lambda request: HttpResponse())
+
+    response = middleware(request)
+
+    cookie = response.cookies[replicas.PIN_COOKIE]
+    assert cookie['max-age'] == django_settings.DATABASE_REPLICA_STICKY
+
+    request = RequestFactory().get('/', headers={'Cookie': cookie.OutputString()})
+    assert db_for_read(request) == 'default'
+
+    request = RequestFactory().get('/')
+    request.user = user
+    assert db_for_read(request) == 'default'
+
+    request = RequestFactory().get('/')
+    request.user = UserFactory()
+    assert db_for_read(request) == 'replica_1'
+
+
+def test_no_pin_after_read(replica_lag):
+    middleware = replicas.PrimaryPinMiddleware(lambda request: HttpResponse())
+
+    response = middleware(RequestFactory().get('/'))
+
+    assert replicas.PIN_COOKIE not in response.cookies
+
+
+def test_allow_migrate(replica_lag):
+    assert router.allow_migrate('replica_1', 'term') is False
+    assert router.allow_migrate('default', 'term') is None
+
+
+@pytest.mark.skipif(
+    not django_settings.DATABASE_REPLICAS,
+    reason='configure DATABASE_REPLICA_URLS para testar com uma réplica real.',
+)
+@pytest.mark.django_db(transaction=True, databases='__all__')
+def test_get_reads_from_replica(client):
+    term = TermFactory()
+    alias = django_settings.DATABASE_REPLICAS[0]
+    replicas._health.clear()
+
+    with CaptureQueriesContext(connections[alias]) as queries:
+        response = client.get(
+            reverse_lazy('api-1.0.0:get_term_id', kwargs={'term_id': term.id})
+        )
+
+    assert response.status_code == 200
+    assert response.json()['id'] == term.id
+    assert any('term_term' in query['sql'] for query in queries)
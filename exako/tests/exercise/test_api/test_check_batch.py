@@ -0,0 +1,310 @@
+import pytest
+from django.urls import reverse_lazy
+
+from exako.apps.exercise import constants, exercises
+from exako.apps.exercise.models import ExerciseHistory, ExerciseProgress, UserProgress
+from exako.apps.term.constants import Language
+from exako.tests.factories import exercise as exercise_factory
+
+pytestmark = pytest.mark.django_db
+
+
+check_batch_router = reverse_lazy('api-1.0.0:check_batch')
+
+
+def test_check_batch(client, user, token_header):
+    order_sentence = exercise_factory.OrderSentenceFactory()
+    listen_term = exercise_factory.ListenTermFactory()
+    term_mchoice = exercise_factory.TermMChoiceFactory()
+    listen_term_answer = exercises.ListenTermExercise(listen_term.id).correct_answer
+    payload = {
+        'answers': [
+            {
+                'type': constants.ExerciseType.ORDER_SENTENCE,
+                'exercise_id': order_sentence.id,
+                'answer': {'sentence': order_sentence.term_example.example},
+                'time_to_answer': 10,
+            },
+            {
+                'type': constants.ExerciseType.LISTEN_TERM,
+                'exercise_id': listen_term.id,
+                'answer': {'expression': listen_term_answer + 'a'},
+                'time_to_answer': 5,
+            },
+            {
+                'type': constants.ExerciseType.TERM_MCHOICE,
+                'exercise_id': term_mchoice.id,
+                'answer': {'term_id': term_mchoice.term.id},
+                'time_to_answer': 3,
+            },
+        ]
+    }
+
+    response = client.post(
+        check_batch_router,
+        payload,
+        headers=token_header,
+        content_type='application/json',
+    )
+
+    assert response.status_code == 200
+    assert [(item['exercise_id'], item['correct']) for item in response.json()] == [
+        (order_sentence.id, True),
+        (listen_term.id, False),
+        (term_mchoice.id, True),
+    ]
+    assert response.json()[1]['correct_answer'] == listen_term_answer
+    assert ExerciseHistory.objects.filter(user=user).count() == 3
+    history = ExerciseHistory.objects.get(exercise=listen_term)
+    assert history.request == {'time_to_answer': 5}
+
+
+def test_check_batch_num_queries(client, token_header, django_assert_max_num_queries):
+    exercises_db = exercise_factory.ListenTermFactory.create_batch(
+        5, language=Language.PORTUGUESE_BRASILIAN
+    )
+    payload = {
+        'answers': [
+            {
+                'type': constants.ExerciseType.LISTEN_TERM,
+                'exercise_id': exercise.id,
+                'answer': {'expression': 'expression'},
+                'time_to_answer': 10,
+            }
+            for exercise in exercises_db
+        ]
+    }
+
+    client.post(
+        check_batch_router,
+        payload,
+        headers=token_header,
+        content_type='application/json',
+    )
+
+    with django_assert_max_num_queries(11):
+        response = client.post(
+            check_batch_router,
+            payload,
+            headers=token_header,
+            content_type='application/json',
+        )
+
+    assert response.status_code == 200
+    assert len(response.json()) == 5
+
+
+def test_check_batch_exercise_not_found(client, user, token_header):
+    exercise = exercise_factory.ListenTermFactory()
+    payload = {
+        'answers': [
+            {
+                'type': constants.ExerciseType.LISTEN_TERM,
+                'exercise_id': exercise.id,
+                'answer': {'expression': 'expression'},
+                'time_to_answer': 10,
+            },
+            {
+                'type': constants.ExerciseType.ORDER_SENTENCE,
+                'exercise_id': exercise.id,
+                'answer': {'sentence': 'sentence'},
+                'time_to_answer': 10,
+            },
+        ]
+    }
+
+    response = client.post(
+        check_batch_router,
+        payload,
+        headers=token_header,
+        content_type='application/json',
+    )
+
+    assert response.status_code == 404
+    assert not ExerciseHistory.objects.filter(user=user).exists()
+
+
+def test_check_batch_invalid_answer(client, token_header):
+    exercise = exercise_factory.ListenTermFactory()
+    payload = {
+        'answers': [
+            {
+                'type': constants.ExerciseType.LISTEN_TERM,
+                'exercise_id': exercise.id,
+                'answer': {'sentence': 'sentence'},
+                'time_to_answer': 10,
+            },
+        ]
+    }
+
+    response = client.post(
+        check_batch_router,
+        payload,
+        headers=token_header,
+        content_type='application/json',
+    )
+
+    assert response.status_code == 422
+
+
+def test_check_batch_speak_exercise(client, token_header):
+    exercise = exercise_factory.SpeakTermFactory()
+    payload = {
+        'answers': [
+            {
+                'type': constants.ExerciseType.SPEAK_TERM,
+                'exercise_id': exercise.id,
+                'answer': {},
+                'time_to_answer': 10,
+            },
+        ]
+    }
+
+    response = client.post(
+        check_batch_router,
+        payload,
+        headers=token_header,
+        content_type='application/json',
+    )
+
+    assert response.status_code == 422
+
+
+def test_check_batch_updates_progress(client, user, token_header):
+    exercises_db = exercise_factory.ListenTermFactory.create_batch(4)
+    answers = ['expression', 'expression', 'wrong', 'expression']
+    payload = {
+        'answers': [
+            {
+                'type': constants.ExerciseType.LISTEN_TERM,
+                'exercise_id': exercise.id,
+                'answer': {
+                    'expression': exercises.ListenTermExercise(
+                        exercise.id
+                    ).correct_answer
+                    if answer == 'expression'
+                    else answer
+                },
+                'time_to_answer': 10,
+            }
+            for exercise, answer in zip(exercises_db, answers)
+        ]
+    }
+
+    client.post(
+        check_batch_router,
+        payload,
+        headers=token_header,
+        content_type='application/json',
+    )
+
+    progress = UserProgress.objects.get(user=user)
+    assert (progress.total, progress.correct) == (4, 3)
+    assert (progress.current_streak, progress.best_streak) == (1, 2)
+    exercise_progress = ExerciseProgress.objects.filter(user=user)
+    assert sum(item.total for item in exercise_progress) == 4
+    assert sum(item.time_to_answer_sum for item in exercise_progress) == 40
+
+
+@pytest.mark.parametrize('choices', [[], [1]])
+def test_check_batch_connection_answer_size(client, user, token_header, choices):
+    exercise = exercise_factory.TermConnectionFactory()
+    payload = {
+        'answers': [
+            {
+                'type': constants.ExerciseType.TERM_CONNECTION,
+                'exercise_id': exercise.id,
+                'answer': {'choices': choices},
+                'time_to_answer': 10,
+            },
+        ]
+    }
+
+    response = client.post(
+        check_batch_router,
+        payload,
+        headers=token_header,
+        content_type='application/json',
+    )
+
+    assert response.status_code == 422
+    assert response.json()['detail'][0]['loc'] == [
+        'body',
+        'batch',
+        'answers',
+        0,
+        'answer',
+        'choices',
+    ]
+    assert not ExerciseHistory.objects.filter(user=user).exists()
+
+
+def test_check_batch_connection_repeated_choice(client, token_header):
+    exercise = exercise_factory.TermConnectionFactory()
+    connection = exercises.TermConnectionExercise(exercise.id).correct_answer[0]
+    payload = {
+        'answers': [
+            {
+                'type': constants.ExerciseType.TERM_CONNECTION,
+                'exercise_id': exercise.id,
+                'answer': {'choices': [connection] * 4},
+                'time_to_answer': 10,
+            },
+        ]
+    }
+
+    response = client.post(
+        check_batch_router,
+        payload,
+        headers=token_header,
+        content_type='application/json',
+    )
+
+    assert response.status_code == 200
+    assert response.json()[0]['correct'] is False
+
+
+@pytest.mark.parametrize(
+    'exercise_type,factory,answer',
+    [
+        (
+            constants.ExerciseType.ORDER_SENTENCE,
+            exercise_factory.OrderSentenceFactory,
+            {'sentence': 1},
+        ),
+        (
+            constants.ExerciseType.LISTEN_TERM,
+            exercise_factory.ListenTermFactory,
+            {'expression': ['expression']},
+        ),
+        (
+            constants.ExerciseType.TERM_MCHOICE,
+            exercise_factory.TermMChoiceFactory,
+            {'term_id': 'term'},
+        ),
+    ],
+)
+def test_check_batch_answer_wrong_type(
+    client, user, token_header, exercise_type, factory, answer
+):
+    exercise = factory()
+    payload = {
+        'answers': [
+            {
+                'type': exercise_type,
+                'exercise_id': exercise.id,
+                'answer': answer,
+                'time_to_answer': 10,
+            },
+        ]
+    }
+
+    response = client.post(
+        check_batch_router,
+        payload,
+        headers=token_header,
+        content_type='application/json',
+    )
+
+    assert response.status_code == 422
+    assert not ExerciseHistory.objects.filter(user=user).exists()
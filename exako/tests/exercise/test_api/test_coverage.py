@@ -0,0 +1,72 @@
+import pytest
+from django.urls import reverse_lazy
+
+from exako.apps.exercise import coverage
+from exako.apps.exercise.constants import ExerciseType
+from exako.apps.term.constants import Language
+from exako.tests.factories import exercise as exercise_factory
+from exako.tests.factories.term import TermFactory, TermPronunciationFactory
+
+pytestmark = pytest.mark.django_db
+
+
+list_term_coverage_router = reverse_lazy('api-1.0.0:list_term_coverage')
+
+
+@pytest.mark.parametrize('user', [{'is_superuser': True}], indirect=True)
+def test_list_term_coverage(client, token_header):
+    exercise = exercise_factory.ListenTermMChoiceFactory()
+    coverage.refresh_all()
+
+    response = client.get(
+        list_term_coverage_router,
+        {'exercise_type': ExerciseType.LISTEN_TERM_MCHOICE},
+        headers=token_header,
+    )
+
+    assert response.status_code == 200
+    assert response.json()['count'] == 1
+    item = response.json()['items'][0]
+    assert item['term_id'] == exercise.term_id
+    assert item['expression'] == exercise.term.expression
+    assert item['has_audio'] is True
+    assert item['rhyme_with_audio_count'] == 6
+    assert item['exercise_types'] == [ExerciseType.LISTEN_TERM_MCHOICE]
+
+
+@pytest.mark.parametrize('user', [{'is_superuser': True}], indirect=True)
+def test_list_term_coverage_filters(client, token_header):
+    with_audio = TermFactory(language=Language.PORTUGUESE_BRASILIAN)
+    TermPronunciationFactory(term=with_audio)
+    TermFactory(language=Language.PORTUGUESE_BRASILIAN)
+    TermFactory(language=Language.ENGLISH_USA)
+    coverage.refresh_all()
+
+    response = client.get(
+        list_term_coverage_router,
+        {
+            'language': Language.PORTUGUESE_BRASILIAN,
+            'ready_for': ExerciseType.SPEAK_TERM,
+        },
+        headers=token_header,
+    )
+
+    assert response.status_code == 200
+    assert [item['term_id'] for item in response.json()['items']] == [with_audio.id]
+
+
+@pytest.mark.parametrize('user', [{'is_superuser': True}], indirect=True)
+def test_list_term_coverage_ready_for_invalid_type(client, token_header):
+    response = client.get(
+        list_term_coverage_router,
+        {'ready_for': ExerciseType.ORDER_SENTENCE},
+        headers=token_header,
+    )
+
+    assert response.status_code == 422
+
+
+def test_list_term_coverage_user_not_admin(client, token_header):
+    response = client.get(list_term_coverage_router, headers=token_header)
+
+    assert response.status_code == 403
@@ -0,0 +1,249 @@
+import pytest
+from django.urls import reverse_lazy
+
+from exako.apps.exercise import bulk, distractors
+from exako.apps.exercise.models import Exercise, ExerciseAnswerKey
+from exako.apps.term.constants import Language
+from exako.apps.term.models import TermExample
+from exako.tests.factories import exercise as exercise_factories
+from exako.tests.factories.term import TermDefinitionFactory, TermFactory
+
+pytestmark = pytest.mark.django_db
+
+
+create_exercise_bulk_router = reverse_lazy('api-1.0.0:create_exercise_bulk')
+
+all_factories = [
+    exercise_factories.OrderSentenceFactory,
+    exercise_factories.ListenTermFactory,
+    exercise_factories.ListenTermLexicalFactory,
+    exercise_factories.ListenTermLexicalTermRefFactory,
+    exercise_factories.ListenSentenceFactory,
+    exercise_factories.ListenTermMChoiceFactory,
+    exercise_factories.SpeakTermFactory,
+    exercise_factories.SpeakTermLexicalFactory,
+    exercise_factories.SpeakTermLexicalTermRefFactory,
+    exercise_factories.SpeakSentenceFactory,
+    exercise_factories.TermMChoiceFactory,
+    exercise_factories.TermMChoiceLexicalFactory,
+    exercise_factories.TermMChoiceLexicalTermRefFactory,
+    exercise_factories.TermDefinitionMChoiceFactory,
+    exercise_factories.TermImageMChoiceFactory,
+    exercise_factories.TermImageMChoiceTextFactory,
+    exercise_factories.TermConnectionFactory,
+]
+
+
+@pytest.mark.parametrize('user', [{'is_superuser': True}], indirect=True)
+def test_create_exercise_bulk(client, generate_payload, token_header):
+    payload = {'exercises': [generate_payload(factory) for factory in all_factories]}
+
+    response = client.post(
+        create_exercise_bulk_router,
+        payload,
+        headers=token_header,
+        content_type='application/json',
+    )
+
+    assert response.status_code == 200
+    assert [item['status'] for item in response.json()] == ['created'] * len(
+        all_factories
+    )
+    ids = [item['id'] for item in response.json()]
+    assert Exercise.objects.filter(id__in=ids).count() == len(all_factories)
+    assert ExerciseAnswerKey.objects.filter(exercise_id__in=ids).count() == len(
+        all_factories
+    )
+
+
+@pytest.mark.parametrize('user', [{'is_superuser': True}], indirect=True)
+def test_create_exercise_bulk_without_distractors(
+    client, generate_payload, token_header
+):
+    with_candidates = generate_payload(exercise_factories.TermConnectionFactory)
+    without_candidates = generate_payload(exercise_factories.TermConnectionFactory)
+    for item in [with_candidates, without_candidates]:
+        item['additional_content'].pop('distractors')
+        del item['additional_content']['connections']['term'][4:]
+    distractors.refresh([with_candidates['term']])
+
+    response = client.post(
+        create_exercise_bulk_router,
+        {'exercises': [with_candidates, without_candidates]},
+        headers=token_header,
+        content_type='application/json',
+    )
+
+    assert response.status_code == 200
+    assert [item['status'] for item in response.json()] == ['created', 'invalid']
+    exercise = Exercise.objects.get(id=response.json()[0]['id'])
+    assert exercise.additional_content['distractors']['term'] == []
+
+
+@pytest.mark.parametrize('user', [{'is_superuser': True}], indirect=True)
+def test_create_exercise_bulk_exists(client, generate_payload, token_header):
+    exercise = exercise_factories.TermConnectionFactory()
+    existing = generate_payload(exercise_factories.TermConnectionFactory)
+    existing['term'] = exercise.term_id
+    existing['language'] = exercise.language
+    new = generate_payload(exercise_factories.TermConnectionFactory)
+    payload = {'exercises': [existing, new, new]}
+
+    response = client.post(
+        create_exercise_bulk_router,
+        payload,
+        headers=token_header,
+        content_type='application/json',
+    )
+
+    assert response.status_code == 200
+    assert [item['status'] for item in response.json()] == [
+        'exists',
+        'created',
+        'exists',
+    ]
+    assert Exercise.objects.count() == 2
+
+
+@pytest.mark.parametrize('user', [{'is_superuser': True}], indirect=True)
+def test_create_exercise_bulk_created_concurrently(
+    client, generate_payload, token_header, monkeypatch
+):
+    exercise = exercise_factories.TermConnectionFactory()
+    existing = generate_payload(exercise_factories.TermConnectionFactory)
+    existing['term'] = exercise.term_id
+    existing['language'] = exercise.language
+    new = generate_payload(exercise_factories.TermConnectionFactory)
+    existing_keys = bulk._existing_keys
+    calls = []
+
+    def created_after_check(items):
+        # A primeira verificação não vê o exercício, criado logo depois por
+        # outra requisição.
+        calls.append(items)
+        return existing_keys(items) if len(calls) > 1 else set()
+
+    monkeypatch.setattr(bulk, '_existing_keys', created_after_check)
+
+    response = client.post(
+        create_exercise_bulk_router,
+        {'exercises': [existing, new]},
+        headers=token_header,
+        content_type='application/json',
+    )
+
+    assert response.status_code == 200
+    assert [item['status'] for item in response.json()] == ['exists', 'created']
+    assert Exercise.objects.filter(id=response.json()[1]['id']).exists()
+    assert Exercise.objects.count() == 2
+
+
+@pytest.mark.parametrize('user', [{'is_superuser': True}], indirect=True)
+def test_create_exercise_bulk_invalid_items(client, generate_payload, token_header):
+    valid = generate_payload(exercise_factories.OrderSentenceFactory)
+    invalid_reference = generate_payload(
+        exercise_factories.TermDefinitionMChoiceFactory,
+        term_definition=TermDefinitionFactory(),
+    )
+    few_distractors = generate_payload(exercise_factories.TermImageMChoiceTextFactory)
+    few_distractors['additional_content']['distractors']['term'] = [
+        TermFactory(language=few_distractors['language']).id
+    ]
+    missing_reference = generate_payload(exercise_factories.ListenTermMChoiceFactory)
+    missing_reference['term'] = 0
+    payload = {
+        'exercises': [
+            valid,
+            invalid_reference,
+            few_distractors,
+            missing_reference,
+            {'type': 99},
+        ]
+    }
+
+    response = client.post(
+        create_exercise_bulk_router,
+        payload,
+        headers=token_header,
+        content_type='application/json',
+    )
+
+    assert response.status_code == 200
+    statuses = response.json()
+    assert [item['status'] for item in statuses] == [
+        'created',
+        'invalid',
+        'invalid',
+        'invalid',
+        'invalid',
+    ]
+    assert statuses[1]['detail'] == (
+        'term_id reference in term_definition_id does not match.'
+    )
+    assert 'at least 3 additional_content[distractors]' in statuses[2]['detail']
+    assert statuses[3]['detail'] == 'term 0 does not exist.'
+    assert Exercise.objects.count() == 1
+
+
+@pytest.mark.parametrize('user', [{'is_superuser': True}], indirect=True)
+def test_create_exercise_bulk_filters_distractors_by_language(
+    client, generate_payload, token_header
+):
+    payload = generate_payload(exercise_factories.OrderSentenceFactory)
+    distractors = payload['additional_content']['distractors']['term']
+    term_example = TermExample.objects.get(id=payload['term_example'])
+    other_language = TermFactory(
+        language=next(
+            language for language in Language if language != term_example.language
+        )
+    )
+    payload['additional_content']['distractors']['term'] = [
+        *distractors,
+        other_language.id,
+    ]
+
+    response = client.post(
+        create_exercise_bulk_router,
+        {'exercises': [payload]},
+        headers=token_header,
+        content_type='application/json',
+    )
+
+    exercise = Exercise.objects.get(id=response.json()[0]['id'])
+    assert other_language.id not in exercise.additional_content['distractors']['term']
+
+
+@pytest.mark.parametrize('user', [{'is_superuser': True}], indirect=True)
+def test_create_exercise_bulk_num_queries(
+    client, generate_payload, token_header, django_assert_max_num_queries
+):
+    payload = {
+        'exercises': [
+            generate_payload(factory) for factory in all_factories for _ in range(3)
+        ]
+    }
+
+    with django_assert_max_num_queries(47):
+        response = client.post(
+            create_exercise_bulk_router,
+            payload,
+            headers=token_header,
+            content_type='application/json',
+        )
+
+    assert response.status_code == 200
+    assert {item['status'] for item in response.json()} == {'created'}
+
+
+def test_create_exercise_bulk_user_not_admin(client, generate_payload, token_header):
+    payload = {'exercises': [generate_payload(exercise_factories.OrderSentenceFactory)]}
+
+    response = client.post(
+        create_exercise_bulk_router,
+        payload,
+        headers=token_header,
+        content_type='application/json',
+    )
+
+    assert response.status_code == 403
+    assert not Exercise.objects.exists()
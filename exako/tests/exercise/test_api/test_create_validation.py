@@ -1,7 +1,9 @@
 import pytest
 from django.urls import reverse_lazy
 
+from exako.apps.exercise import distractors
 from exako.apps.exercise.constants import ExerciseSubType, ExerciseType
+from exako.apps.exercise.models import Exercise
 from exako.apps.term.constants import TermLexicalType
 from exako.apps.term.models import TermExampleLink, TermLexical
 from exako.tests.factories import exercise as exercise_factories
@@ -367,7 +369,6 @@ def test_create_order_sentence_exercise_invalid_distractor_format_is_not_a_list(
 @pytest.mark.parametrize(
     'factory, additional_content',
     [
-        (exercise_factories.TermMChoiceFactory, {'sub_type': ExerciseSubType.TERM}),
         (
             exercise_factories.TermMChoiceLexicalFactory,
             {'sub_type': ExerciseSubType.TERM_LEXICAL_VALUE},
@@ -378,16 +379,6 @@ def test_create_order_sentence_exercise_invalid_distractor_format_is_not_a_list(
         ),
         (exercise_factories.TermDefinitionMChoiceFactory, {}),
         (exercise_factories.TermImageMChoiceFactory, {}),
-        (exercise_factories.TermImageMChoiceTextFactory, {}),
-        (exercise_factories.TermConnectionFactory, {}),
-        (
-            exercise_factories.TermMChoiceFactory,
-            {'sub_type': ExerciseSubType.TERM, 'distractors': {}},
-        ),
-        (
-            exercise_factories.TermMChoiceFactory,
-            {'sub_type': ExerciseSubType.TERM, 'distractors': {'term_lexical': []}},
-        ),
         (
             exercise_factories.TermMChoiceLexicalFactory,
             {'sub_type': ExerciseSubType.TERM_LEXICAL_VALUE, 'distractors': {}},
@@ -412,8 +403,6 @@ def test_create_order_sentence_exercise_invalid_distractor_format_is_not_a_list(
         ),
         (exercise_factories.TermDefinitionMChoiceFactory, {'distractors': {}}),
         (exercise_factories.TermImageMChoiceFactory, {'distractors': {}}),
-        (exercise_factories.TermImageMChoiceTextFactory, {'distractors': {}}),
-        (exercise_factories.TermConnectionFactory, {'distractors': {}}),
     ],
 )
 def test_create_exercise_invalid_distractor_format(
@@ -497,7 +486,11 @@ def test_create_exercise_invalid_distractor_format_is_not_a_list(
 
 @pytest.mark.parametrize(
     'additional_content',
-    [{'distractors': {'term': []}}, {'distractors': {'term': []}, 'connections': {}}],
+    [
+        {},
+        {'distractors': {'term': []}},
+        {'distractors': {'term': []}, 'connections': {}},
+    ],
 )
 def test_create_term_connection_exercise_invalid_connection_format(
     client, token_header, generate_payload, additional_content
@@ -597,6 +590,61 @@ def test_create_exercise_invalid_distractor(
     assert 'exercise needs at least' in response.json()['detail']
 
 
+@pytest.mark.parametrize(
+    'factory',
+    [
+        exercise_factories.TermMChoiceFactory,
+        exercise_factories.TermImageMChoiceTextFactory,
+        exercise_factories.TermConnectionFactory,
+    ],
+)
+def test_create_exercise_without_distractors_uses_candidates(
+    client, token_header, generate_payload, factory
+):
+    payload = generate_payload(factory)
+    payload['additional_content'].pop('distractors')
+    if 'connections' in payload['additional_content']:
+        # Os candidatos que também são conexões não contam.
+        connections = payload['additional_content']['connections']['term']
+        del connections[4:]
+    distractors.refresh([payload['term']])
+
+    response = client.post(
+        create_exercise_router,
+        payload,
+        headers=token_header,
+        content_type='application/json',
+    )
+
+    assert response.status_code == 201
+    exercise = Exercise.objects.get(id=response.json()['id'])
+    assert exercise.additional_content['distractors']['term'] == []
+
+
+@pytest.mark.parametrize(
+    'factory',
+    [
+        exercise_factories.TermImageMChoiceTextFactory,
+        exercise_factories.TermConnectionFactory,
+    ],
+)
+def test_create_exercise_without_distractors_or_candidates(
+    client, token_header, generate_payload, factory
+):
+    payload = generate_payload(factory)
+    payload['additional_content'].pop('distractors')
+
+    response = client.post(
+        create_exercise_router,
+        payload,
+        headers=token_header,
+        content_type='application/json',
+    )
+
+    assert response.status_code == 422
+    assert 'exercise needs at least' in response.json()['detail']
+
+
 def test_create_term_connection_exercise_invalid_distractor(
     client, token_header, generate_payload
 ):
@@ -0,0 +1,88 @@
+import pytest
+
+from exako.apps.exercise import exercises
+from exako.apps.exercise.api.schema import ExerciseView
+from exako.tests.factories import exercise as exercise_factory
+
+pytestmark = pytest.mark.django_db
+
+
+seed_parametrize = pytest.mark.parametrize(
+    'ExerciseClass, ExerciseFactory',
+    [
+        (exercises.OrderSentenceExercise, exercise_factory.OrderSentenceFactory),
+        (
+            exercises.ListenTermMChoiceExercise,
+            exercise_factory.ListenTermMChoiceFactory,
+        ),
+        (exercises.TermMChoiceExercise, exercise_factory.TermMChoiceFactory),
+        (exercises.TermConnectionExercise, exercise_factory.TermConnectionFactory),
+    ],
+)
+
+
+@seed_parametrize
+def test_build_same_seed(ExerciseClass, ExerciseFactory):
+    exercise = ExerciseFactory()
+
+    assert (
+        ExerciseClass(exercise.id, seed=7).build()
+        == ExerciseClass(exercise.id, seed=7).build()
+    )
+
+
+@pytest.mark.parametrize(
+    'ExerciseFactory',
+    [
+        exercise_factory.OrderSentenceFactory,
+        exercise_factory.TermMChoiceFactory,
+        exercise_factory.TermConnectionFactory,
+    ],
+)
+def test_build_seed_etag(client, token_header, ExerciseFactory):
+    exercise = ExerciseFactory()
+    url = ExerciseView(id=exercise.id, type=exercise.type).url
+
+    first = client.get(url, {'seed': 7}, headers=token_header)
+    second = client.get(url, {'seed': 7}, headers=token_header)
+
+    assert first.status_code == 200
+    assert first.json() == second.json()
+    assert first['ETag'] == second['ETag']
+    assert 'private' in first['Cache-Control']
+    assert 'public' not in first['Cache-Control']
+    assert 'max-age=300' in first['Cache-Control']
+
+
+def test_build_seed_not_modified(client, token_header):
+    exercise = exercise_factory.TermConnectionFactory()
+    url = ExerciseView(id=exercise.id, type=exercise.type).url
+    etag = client.get(url, {'seed': 7}, headers=token_header)['ETag']
+
+    response = client.get(
+        url, {'seed': 7}, headers={**token_header, 'If-None-Match': etag}
+    )
+
+    assert response.status_code == 304
+    assert response['ETag'] == etag
+    assert not response.content
+
+
+def test_build_without_seed(client, token_header):
+    exercise = exercise_factory.TermConnectionFactory()
+    url = ExerciseView(id=exercise.id, type=exercise.type).url
+
+    response = client.get(url, headers=token_header)
+
+    assert response.status_code == 200
+    assert not response.has_header('ETag')
+    assert not response.has_header('Cache-Control')
+
+
+def test_build_seed_invalid(client, token_header):
+    exercise = exercise_factory.TermConnectionFactory()
+    url = ExerciseView(id=exercise.id, type=exercise.type).url
+
+    response = client.get(url, {'seed': -1}, headers=token_header)
+
+    assert response.status_code == 422
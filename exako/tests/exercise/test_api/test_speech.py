@@ -0,0 +1,139 @@
+import json
+
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.urls import reverse
+
+from exako.apps.exercise import exercises
+from exako.apps.exercise.constants import SpeechJobStatus
+from exako.apps.exercise.models import ExerciseHistory, SpeechJob
+from exako.tests.factories import exercise as exercise_factory
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(autouse=True)
+def speech_upload_dir(settings, tmp_path):
+    settings.EXERCISE_SPEECH_UPLOAD_DIR = tmp_path
+    return tmp_path
+
+
+def speech_job_router(job_id):
+    return reverse('api-1.0.0:speech_job', kwargs={'job_id': job_id})
+
+
+def check_speak(client, token_header, exercise, audio=b'RIFF....WAVE'):
+    exercise_class = exercises.get_exercise_class(exercise.type)
+    build = exercise_class(exercise.id).build()
+    answer = {
+        'header': build['header'],
+        'audio_file': build['audio_file'],
+        'phonetic': build['phonetic'],
+        'time_to_answer': 3,
+    }
+    return client.post(
+        reverse(
+            f'api-1.0.0:check_{exercises._camel_to_snake(exercise_class.__name__)}',
+            kwargs={'exercise_id': exercise.id},
+        ),
+        {
+            'answer': json.dumps(answer),
+            'audio': SimpleUploadedFile('recording.wav', audio, 'audio/wav'),
+        },
+        headers=token_header,
+    )
+
+
+@pytest.mark.parametrize(
+    'ExerciseFactory',
+    [exercise_factory.SpeakTermFactory, exercise_factory.SpeakSentenceFactory],
+)
+def test_check_speak_exercise(
+    client, user, token_header, speech_upload_dir, ExerciseFactory
+):
+    exercise = ExerciseFactory()
+
+    response = check_speak(client, token_header, exercise)
+
+    assert response.status_code == 202
+    job = SpeechJob.objects.get(id=response.json()['id'])
+    assert response.json()['url'] == speech_job_router(job.id)
+    assert job.status == SpeechJobStatus.DONE
+    assert job.result['correct'] is True
+    assert job.queue_time is not None
+    assert job.scoring_time is not None
+    assert not list(speech_upload_dir.iterdir())
+    assert ExerciseHistory.objects.filter(user=user, exercise=exercise).exists()
+
+
+def test_check_speak_exercise_empty_audio(client, user, token_header):
+    exercise = exercise_factory.SpeakTermFactory()
+
+    response = check_speak(client, token_header, exercise, audio=b'')
+
+    assert response.status_code == 202
+    assert response.json()['score'] == 0
+    assert response.json()['result']['correct'] is False
+
+
+def test_speech_job(client, token_header):
+    exercise = exercise_factory.SpeakSentenceFactory()
+    job_id = check_speak(client, token_header, exercise).json()['id']
+
+    response = client.get(speech_job_router(job_id), headers=token_header)
+
+    assert response.status_code == 200
+    assert response.json()['status'] == SpeechJobStatus.DONE
+    assert response.json()['result']['correct_answer'] == (
+        exercise.term_example.example
+    )
+
+
+def test_speech_job_other_user(client, token_header, user):
+    exercise = exercise_factory.SpeakTermFactory()
+    job_id = check_speak(client, token_header, exercise).json()['id']
+    SpeechJob.objects.filter(id=job_id).update(
+        user=type(user).objects.create(
+            name='other', email='other@example.com', password='secret'
+        )
+    )
+
+    response = client.get(speech_job_router(job_id), headers=token_header)
+
+    assert response.status_code == 404
+
+
+def test_speech_job_wait(client, token_header, settings):
+    settings.EXERCISE_SPEECH_POLL_INTERVAL = 0.01
+    exercise = exercise_factory.SpeakTermFactory()
+    job_id = check_speak(client, token_header, exercise).json()['id']
+    SpeechJob.objects.filter(id=job_id).update(status=SpeechJobStatus.PENDING)
+
+    response = client.get(
+        speech_job_router(job_id), {'wait': 0.05}, headers=token_header
+    )
+
+    assert response.status_code == 200
+    assert response.json()['status'] == SpeechJobStatus.PENDING
+
+
+def test_speech_job_wait_limit(client, token_header, settings):
+    exercise = exercise_factory.SpeakTermFactory()
+    job_id = check_speak(client, token_header, exercise).json()['id']
+
+    response = client.get(
+        speech_job_router(job_id),
+        {'wait': settings.EXERCISE_SPEECH_MAX_WAIT + 1},
+        headers=token_header,
+    )
+
+    assert response.status_code == 422
+
+
+def test_speech_job_user_not_authenticated(client, token_header):
+    exercise = exercise_factory.SpeakTermFactory()
+    job_id = check_speak(client, token_header, exercise).json()['id']
+
+    response = client.get(speech_job_router(job_id))
+
+    assert response.status_code == 401
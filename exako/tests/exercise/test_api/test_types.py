@@ -0,0 +1,56 @@
+import pytest
+from django.urls import reverse_lazy
+
+from exako.apps.exercise import exercises
+from exako.apps.exercise.api.schema import ExerciseView
+from exako.apps.exercise.constants import ExerciseType
+from exako.tests.factories import exercise as exercise_factory
+
+pytestmark = pytest.mark.django_db
+
+
+list_exercise_types_router = reverse_lazy('api-1.0.0:list_exercise_types')
+
+
+def test_list_exercise_types(client):
+    response = client.get(list_exercise_types_router)
+
+    assert response.status_code == 200
+    assert 'public' in response['Cache-Control']
+    assert 'max-age=86400' in response['Cache-Control']
+    types = {item['type']: item for item in response.json()}
+    assert sorted(types) == sorted(
+        exercise.exercise_type for exercise in exercises.exercises_map
+    )
+    listen_term = types[ExerciseType.LISTEN_TERM]
+    assert listen_term['title'] == exercises.ListenTermExercise.title
+    assert listen_term['description'] == exercises.ListenTermExercise.description
+    assert listen_term['header_template'] == (
+        exercises.ListenTermExercise.header_template
+    )
+    assert listen_term['icon'] == 'fa-headphones'
+
+
+@pytest.mark.parametrize(
+    'ExerciseFactory',
+    [
+        exercise_factory.OrderSentenceFactory,
+        exercise_factory.ListenTermFactory,
+        exercise_factory.TermImageMChoiceTextFactory,
+        exercise_factory.TermConnectionFactory,
+    ],
+)
+def test_build_compact(client, token_header, ExerciseFactory):
+    exercise = ExerciseFactory()
+    url = ExerciseView(id=exercise.id, type=exercise.type).url
+
+    full = client.get(url, headers=token_header)
+    compact = client.get(url, {'compact': True}, headers=token_header)
+
+    assert compact.status_code == 200
+    assert compact.json()['type'] == int(exercise.type)
+    assert 'title' not in compact.json()
+    assert 'description' not in compact.json()
+    assert 'type' not in full.json()
+    assert compact.json()['header'] == full.json()['header']
+    assert len(compact.content) < len(full.content)
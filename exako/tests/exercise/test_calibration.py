@@ -0,0 +1,132 @@
+from io import StringIO
+
+import numpy as np
+import pytest
+from django.core.management import call_command
+
+from exako.apps.exercise import calibration
+from exako.apps.exercise.constants import ExerciseType
+from exako.apps.exercise.models import Exercise, ExerciseHistory, UserProgress
+from exako.apps.term.constants import Language
+from exako.tests.factories import exercise as factory
+from exako.tests.factories.user import UserFactory
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def users():
+    users = UserFactory.create_batch(25)
+    UserProgress.objects.bulk_create([UserProgress(user=user) for user in users])
+    return users
+
+
+def _history(exercise, users, corrects, time_to_answer=10):
+    ExerciseHistory.objects.bulk_create(
+        [
+            ExerciseHistory(
+                exercise=exercise,
+                user=user,
+                correct=correct,
+                request={'time_to_answer': time_to_answer},
+            )
+            for user, correct in zip(users, corrects)
+        ]
+    )
+
+
+def _list(**kwargs):
+    return list(
+        Exercise.objects.list(
+            language=[Language.PORTUGUESE_BRASILIAN],
+            exercise_type=[ExerciseType.RANDOM],
+            level=None,
+            cardset_id=None,
+            seed=0.5,
+            user=None,
+            **kwargs,
+        )
+    )
+
+
+def test_calibrate_orders_exercises_by_difficulty(users):
+    easy, medium, hard = factory.ListenTermFactory.create_batch(3)
+    _history(easy, users, [True] * 23 + [False] * 2, time_to_answer=4)
+    _history(medium, users, [True, False] * 12 + [True], time_to_answer=20)
+    _history(hard, users, [True] * 3 + [False] * 22, time_to_answer=60)
+
+    result = calibration.calibrate()
+
+    assert result == {'exercises': 3, 'users': 25}
+    easy.refresh_from_db()
+    medium.refresh_from_db()
+    hard.refresh_from_db()
+    assert easy.difficulty < medium.difficulty < hard.difficulty
+    assert easy.time_to_answer_p50 == pytest.approx(4, rel=0.2)
+    assert hard.time_to_answer_p90 == pytest.approx(60, rel=0.2)
+
+
+def test_calibrate_user_ability(users):
+    exercises = factory.ListenTermFactory.create_batch(20)
+    strong, weak = users[0], users[1]
+    for index, exercise in enumerate(exercises):
+        _history(exercise, [strong, weak], [True, index % 4 == 0])
+
+    calibration.calibrate()
+
+    assert (
+        UserProgress.objects.get(user=strong).ability
+        > UserProgress.objects.get(user=weak).ability
+    )
+
+
+def test_calibrate_requires_min_answers(users):
+    exercise = factory.ListenTermFactory()
+    exercise.difficulty = 2.0
+    exercise.save()
+    _history(exercise, users[: calibration.MIN_ANSWERS - 1], [True] * 25)
+
+    result = calibration.calibrate()
+
+    exercise.refresh_from_db()
+    assert result['exercises'] == 0
+    assert exercise.difficulty is None
+    assert exercise.time_to_answer_p50 is not None
+
+
+def test_fit_does_not_depend_on_chunk_size(users):
+    exercises = factory.ListenTermFactory.create_batch(3)
+    for index, exercise in enumerate(exercises):
+        _history(exercise, users, [(i + index) % 3 != 0 for i in range(25)], 7)
+
+    whole = calibration.fit(chunk_size=1000)
+    chunked = calibration.fit(chunk_size=7)
+
+    for expected, value in zip(whole, chunked):
+        np.testing.assert_allclose(value, expected)
+
+
+def test_list_filter_and_order_by_difficulty():
+    easy, hard, uncalibrated = factory.ListenTermFactory.create_batch(
+        3, language=Language.PORTUGUESE_BRASILIAN
+    )
+    Exercise.objects.filter(id=easy.id).update(difficulty=-1.5)
+    Exercise.objects.filter(id=hard.id).update(difficulty=2.0)
+
+    assert [item['id'] for item in _list(difficulty_max=0)] == [easy.id]
+    assert [item['id'] for item in _list(difficulty_min=0)] == [hard.id]
+    assert [item['id'] for item in _list(order_by_difficulty=True)] == [
+        easy.id,
+        hard.id,
+        uncalibrated.id,
+    ]
+
+
+def test_calibrate_command(users):
+    exercise = factory.ListenTermFactory()
+    _history(exercise, users, [True] * 25)
+
+    out = StringIO()
+    call_command('calibrate_exercises', '--chunk-size', '10', stdout=out)
+
+    assert '1 exercícios e 25 usuários calibrados.' in out.getvalue()
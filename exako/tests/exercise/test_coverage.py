@@ -0,0 +1,104 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+from exako.apps.exercise import coverage
+from exako.apps.exercise.constants import ExerciseType
+from exako.apps.exercise.models import TermCoverage
+from exako.apps.term.constants import TermLexicalType
+from exako.apps.term.models import TermExampleLink
+from exako.tests.factories import exercise as exercise_factory
+from exako.tests.factories.term import (
+    TermDefinitionFactory,
+    TermExampleFactory,
+    TermFactory,
+    TermImageFactory,
+    TermLexicalFactory,
+    TermPronunciationFactory,
+)
+
+pytestmark = pytest.mark.django_db
+
+
+def test_refresh_on_commit(django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks(execute=True):
+        term = TermFactory()
+
+    term_coverage = TermCoverage.objects.get(term=term)
+    assert term_coverage.language == term.language
+    assert not term_coverage.has_pronunciation
+    assert not term_coverage.has_image
+    assert term_coverage.example_count == 0
+    assert term_coverage.exercise_types == []
+
+    with django_capture_on_commit_callbacks(execute=True):
+        TermPronunciationFactory(term=term, audio_file=None)
+        TermImageFactory(term=term)
+        TermDefinitionFactory.create_batch(2, term=term)
+        TermExampleLink.objects.create(
+            highlight=[[0, 1]], term_example=TermExampleFactory(), term=term
+        )
+
+    term_coverage.refresh_from_db()
+    assert term_coverage.has_pronunciation
+    assert not term_coverage.has_audio
+    assert term_coverage.has_image
+    assert term_coverage.definition_count == 2
+    assert term_coverage.example_count == 1
+
+
+def test_refresh_rhymes_on_pronunciation(django_capture_on_commit_callbacks):
+    term = TermFactory()
+    rhymes = TermFactory.create_batch(3)
+    for rhyme in rhymes:
+        TermLexicalFactory(term=term, type=TermLexicalType.RHYME, term_value_ref=rhyme)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        for rhyme in rhymes:
+            TermPronunciationFactory(term=rhyme)
+
+    assert TermCoverage.objects.get(term=term).rhyme_with_audio_count == 3
+
+
+def test_refresh_exercise_types(django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks(execute=True):
+        exercise = exercise_factory.ListenTermMChoiceFactory()
+
+    term_coverage = TermCoverage.objects.get(term=exercise.term)
+    assert term_coverage.exercise_types == [ExerciseType.LISTEN_TERM_MCHOICE]
+    assert term_coverage.has_audio
+    assert term_coverage.rhyme_with_audio_count == 6
+
+    with django_capture_on_commit_callbacks(execute=True):
+        exercise.delete()
+
+    term_coverage.refresh_from_db()
+    assert term_coverage.exercise_types == []
+
+
+def test_ready_for():
+    ready = TermFactory()
+    TermImageFactory(term=ready)
+    exercise = exercise_factory.TermImageMChoiceTextFactory()
+    TermFactory()
+    coverage.refresh_all()
+
+    terms = TermCoverage.objects.filter(
+        coverage.ready_for(ExerciseType.TERM_IMAGE_MCHOICE_TEXT)
+    ).values_list('term_id', flat=True)
+
+    assert ready.id in terms
+    assert exercise.term_id not in terms
+    assert len(terms) == 1
+
+
+def test_refresh_coverage_command():
+    TermFactory.create_batch(3)
+    TermCoverage.objects.all().delete()
+
+    out = StringIO()
+    call_command('refresh_coverage', stdout=out)
+
+    assert TermCoverage.objects.count() == 3
+    assert 'Cobertura de 3 termos recalculada.' in out.getvalue()
@@ -0,0 +1,213 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+from exako.apps.exercise import distractors, exercises, generator
+from exako.apps.exercise.constants import ExerciseType
+from exako.apps.exercise.models import DistractorCandidate, Exercise
+from exako.apps.term.constants import Language, Level, PartOfSpeech
+from exako.apps.term.models import Term, TermExampleLink
+from exako.tests.factories import exercise as exercise_factory
+from exako.tests.factories.term import (
+    TermDefinitionFactory,
+    TermExampleFactory,
+    TermFactory,
+    TermImageFactory,
+)
+
+pytestmark = pytest.mark.django_db
+
+
+def _candidates(term):
+    return list(
+        DistractorCandidate.objects.filter(term=term)
+        .order_by('rank')
+        .values_list('candidate_id', flat=True)
+    )
+
+
+def test_refresh_ranks_by_similarity():
+    term = TermFactory(expression='casamento')
+    similar = TermFactory(expression='casamentos')
+    less_similar = TermFactory(expression='casa')
+    different = TermFactory(expression='xylofone')
+
+    distractors.refresh([term.id])
+
+    candidates = _candidates(term)
+    assert candidates.index(similar.id) < candidates.index(less_similar.id)
+    assert candidates.index(less_similar.id) < candidates.index(different.id)
+    assert term.id not in candidates
+
+
+def test_refresh_prefers_part_of_speech_and_level():
+    term = TermFactory(expression='correr')
+    same_profile = TermFactory(expression='pular')
+    other_profile = TermFactory(expression='pulas')
+    for item in [term, same_profile]:
+        TermDefinitionFactory(
+            term=item, part_of_speech=PartOfSpeech.VERB, level=Level.BEGINNER
+        )
+    TermDefinitionFactory(
+        term=other_profile,
+        part_of_speech=PartOfSpeech.NOUN,
+        level=Level.UPPER_INTERMEDIATE,
+    )
+
+    distractors.refresh([term.id])
+
+    candidates = _candidates(term)
+    assert candidates.index(same_profile.id) < candidates.index(other_profile.id)
+
+
+def test_refresh_same_language():
+    term = TermFactory(expression='casa', language=Language.PORTUGUESE_BRASILIAN)
+    TermFactory(expression='casas', language=Language.SPANISH)
+
+    distractors.refresh([term.id])
+
+    assert not DistractorCandidate.objects.filter(term=term).exists()
+
+
+def test_refresh_limits_candidates():
+    term, *_ = TermFactory.create_batch(distractors.CANDIDATES + 5)
+
+    distractors.refresh([term.id])
+
+    assert len(_candidates(term)) == distractors.CANDIDATES
+    assert DistractorCandidate.objects.filter(term=term).count() == (
+        distractors.CANDIDATES
+    )
+
+
+def test_refresh_reciprocal():
+    TermFactory(expression='casamento')
+    other = TermFactory(expression='casamentos')
+    distractors.refresh([other.id])
+    new = TermFactory(expression='casamenteiro')
+
+    distractors.refresh([new.id], reciprocal=True)
+
+    assert new.id in _candidates(other)
+
+
+def test_refresh_on_term_save(django_capture_on_commit_callbacks):
+    term = TermFactory(expression='casamento')
+
+    with django_capture_on_commit_callbacks(execute=True):
+        other = TermFactory(expression='casamentos')
+
+    assert _candidates(other) == [term.id]
+    assert _candidates(term) == [other.id]
+
+
+def test_refresh_on_term_save_async(
+    settings, monkeypatch, django_capture_on_commit_callbacks
+):
+    settings.EXERCISE_DISTRACTORS_ASYNC = True
+    submitted = []
+
+    class Executor:
+        def submit(self, function, *args):
+            submitted.append(args)
+
+    monkeypatch.setattr(distractors, 'get_executor', Executor)
+    term = TermFactory(expression='casamento')
+
+    with django_capture_on_commit_callbacks(execute=True):
+        other = TermFactory(expression='casamentos')
+
+    assert (other.id,) in submitted
+    assert _candidates(other) == []
+    assert _candidates(term) == []
+
+
+def test_refresh_all_command():
+    TermFactory.create_batch(3)
+
+    out = StringIO()
+    call_command('refresh_distractors', stdout=out)
+
+    assert DistractorCandidate.objects.count() == 6
+    assert '6 candidatos' in out.getvalue()
+
+
+def test_compile_completes_missing_distractors():
+    exercise = exercise_factory.TermImageMChoiceTextFactory(
+        language=Language.PORTUGUESE_BRASILIAN
+    )
+    Term.objects.filter(
+        id__in=exercise.additional_content['distractors']['term']
+    ).delete()
+    TermFactory.create_batch(3, language=Language.PORTUGUESE_BRASILIAN)
+    distractors.refresh([exercise.term_id])
+
+    payload = exercises.TermImageMChoiceTextExercise(exercise.id).build()
+
+    assert len(payload['choices']) == 4
+
+
+def test_refresh_invalidates_compiled(django_capture_on_commit_callbacks):
+    exercise = exercise_factory.TermImageMChoiceTextFactory(
+        language=Language.PORTUGUESE_BRASILIAN
+    )
+    Term.objects.filter(
+        id__in=exercise.additional_content['distractors']['term']
+    ).delete()
+    payload = exercises.TermImageMChoiceTextExercise(exercise.id).build()
+    assert len(payload['choices']) == 1
+
+    TermFactory.create_batch(3, language=Language.PORTUGUESE_BRASILIAN)
+    with django_capture_on_commit_callbacks(execute=True):
+        distractors.refresh([exercise.term_id])
+
+    payload = exercises.TermImageMChoiceTextExercise(exercise.id).build()
+    assert len(payload['choices']) == 4
+
+
+def test_generate_uses_candidates():
+    term = TermFactory(expression='casamento')
+    TermFactory.create_batch(10)
+    similar = [
+        TermFactory(expression=expression)
+        for expression in ['casamentos', 'casamenteiro', 'casamentar']
+    ]
+    TermImageFactory(term=term)
+    distractors.refresh([term.id])
+
+    generator.generate(
+        ExerciseType.TERM_IMAGE_MCHOICE_TEXT,
+        Language.PORTUGUESE_BRASILIAN,
+        term.id,
+        term.id + 1,
+    )
+
+    exercise = Exercise.objects.get(type=ExerciseType.TERM_IMAGE_MCHOICE_TEXT)
+    assert set(exercise.additional_content['distractors']['term'][:3]) == {
+        item.id for item in similar
+    }
+
+
+def test_generate_order_sentence_uses_linked_term_candidates():
+    term = TermFactory(expression='casamento')
+    TermFactory.create_batch(10)
+    similar = [
+        TermFactory(expression=expression)
+        for expression in ['casamentos', 'casamenteiro', 'casamentar']
+    ]
+    example = TermExampleFactory()
+    TermExampleLink.objects.create(highlight=[[0, 1]], term_example=example, term=term)
+    distractors.refresh([term.id])
+
+    generator.generate(
+        ExerciseType.ORDER_SENTENCE,
+        Language.PORTUGUESE_BRASILIAN,
+        example.id,
+        example.id + 1,
+    )
+
+    exercise = Exercise.objects.get(type=ExerciseType.ORDER_SENTENCE)
+    distractor_ids = exercise.additional_content['distractors']['term']
+    assert set(distractor_ids[:3]) == {item.id for item in similar}
+    assert term.id not in distractor_ids
@@ -1,11 +1,15 @@
+from io import StringIO
+
 import pytest
+from asgiref.sync import async_to_sync
+from django.core.management import call_command
 from django.db.models import OuterRef, Subquery
 from django.db.models.functions import Random
 from django.http.response import Http404
 
 from exako.apps.exercise import constants, exercises
 from exako.apps.exercise.exercises import _camel_to_snake
-from exako.apps.exercise.models import ExerciseHistory
+from exako.apps.exercise.models import ExerciseAnswerKey, ExerciseHistory
 from exako.apps.term.constants import TermLexicalType
 from exako.apps.term.models import (
     Term,
@@ -81,6 +85,253 @@ def test_get_exercise_model_not_found(ExerciseClass, ExerciseFactory):
         ExerciseClass(51903)
 
 
+@pytest.mark.parametrize(
+    'ExerciseClass, ExerciseFactory, num_queries',
+    [
+        (exercises.OrderSentenceExercise, factory.OrderSentenceFactory, 2),
+        (exercises.ListenTermExercise, factory.ListenTermFactory, 1),
+        (exercises.ListenTermExercise, factory.ListenTermLexicalFactory, 1),
+        (exercises.ListenTermExercise, factory.ListenTermLexicalTermRefFactory, 1),
+        (exercises.ListenTermMChoiceExercise, factory.ListenTermMChoiceFactory, 2),
+        (exercises.ListenSentenceExercise, factory.ListenSentenceFactory, 1),
+        (exercises.SpeakTermExercise, factory.SpeakTermFactory, 1),
+        (exercises.SpeakTermExercise, factory.SpeakTermLexicalFactory, 1),
+        (exercises.SpeakTermExercise, factory.SpeakTermLexicalTermRefFactory, 1),
+        (exercises.SpeakSentenceExercise, factory.SpeakSentenceFactory, 1),
+        (exercises.TermMChoiceExercise, factory.TermMChoiceFactory, 3),
+        (exercises.TermMChoiceExercise, factory.TermMChoiceLexicalFactory, 3),
+        (
+            exercises.TermMChoiceExercise,
+            factory.TermMChoiceLexicalTermRefFactory,
+            3,
+        ),
+        (
+            exercises.TermDefinitionMChoiceExercise,
+            factory.TermDefinitionMChoiceFactory,
+            2,
+        ),
+        (exercises.TermImageMChoiceExercise, factory.TermImageMChoiceFactory, 2),
+        (
+            exercises.TermImageMChoiceTextExercise,
+            factory.TermImageMChoiceTextFactory,
+            2,
+        ),
+        (exercises.TermConnectionExercise, factory.TermConnectionFactory, 2),
+    ],
+)
+def test_build_num_queries(
+    ExerciseClass,
+    ExerciseFactory,
+    num_queries,
+    django_assert_num_queries,
+    monkeypatch,
+):
+    monkeypatch.setattr(exercises.Random, 'randint', lambda self, start, end: end)
+    exercise_db = ExerciseFactory()
+
+    with django_assert_num_queries(num_queries):
+        ExerciseClass(exercise_db.id).build()
+
+
+@exercise_parametrize
+def test_build_compiled_num_queries(
+    ExerciseClass, ExerciseFactory, django_assert_num_queries
+):
+    exercise_db = ExerciseFactory()
+    ExerciseClass(exercise_db.id).build()
+
+    with django_assert_num_queries(1):
+        ExerciseClass(exercise_db.id).build()
+
+
+@exercise_parametrize
+def test_aload_build(ExerciseClass, ExerciseFactory, django_assert_num_queries):
+    exercise_db = ExerciseFactory()
+    expected = ExerciseClass(exercise_db.id, seed=1).build()
+
+    with django_assert_num_queries(1):
+        exercise = async_to_sync(ExerciseClass.aload)(exercise_db.id, seed=1)
+        build = exercise.build()
+
+    assert build == expected
+
+
+def test_aload_not_found():
+    with pytest.raises(Http404):
+        async_to_sync(exercises.OrderSentenceExercise.aload)(0)
+
+
+def test_compiled_invalidated_on_dependency_change(
+    django_capture_on_commit_callbacks,
+):
+    exercise_db = factory.TermConnectionFactory()
+    exercise = exercises.TermConnectionExercise(exercise_db.id)
+    term_id = exercise.exercise.additional_content['connections']['term'][0]
+    assert exercise.compiled['connections'][term_id] != 'nova expressão'
+
+    term = Term.objects.filter(id=term_id).first()
+    term.expression = 'nova expressão'
+    with django_capture_on_commit_callbacks(execute=True):
+        term.save()
+
+    exercise = exercises.TermConnectionExercise(exercise_db.id)
+    assert exercise.compiled['connections'][term_id] == 'nova expressão'
+
+
+def test_compiled_not_invalidated_without_changes():
+    exercise_db = factory.TermConnectionFactory()
+    exercise = exercises.TermConnectionExercise(exercise_db.id)
+    term_id = exercise.exercise.additional_content['connections']['term'][0]
+    expression = exercise.compiled['connections'][term_id]
+
+    Term.objects.filter(id=term_id).update(expression='nova expressão')
+
+    exercise = exercises.TermConnectionExercise(exercise_db.id)
+    assert exercise.compiled['connections'][term_id] == expression
+
+
+@exercise_parametrize
+def test_correct_answer_num_queries(
+    ExerciseClass, ExerciseFactory, django_assert_num_queries
+):
+    exercise_db = ExerciseFactory()
+
+    with django_assert_num_queries(1):
+        ExerciseClass(exercise_db.id).correct_answer
+
+
+check_parametrize = pytest.mark.parametrize(
+    'ExerciseClass, ExerciseFactory',
+    [
+        (exercises.OrderSentenceExercise, factory.OrderSentenceFactory),
+        (exercises.ListenTermExercise, factory.ListenTermFactory),
+        (exercises.ListenTermMChoiceExercise, factory.ListenTermMChoiceFactory),
+        (exercises.ListenSentenceExercise, factory.ListenSentenceFactory),
+        (exercises.TermMChoiceExercise, factory.TermMChoiceFactory),
+        (exercises.TermDefinitionMChoiceExercise, factory.TermDefinitionMChoiceFactory),
+        (exercises.TermImageMChoiceExercise, factory.TermImageMChoiceFactory),
+        (exercises.TermImageMChoiceTextExercise, factory.TermImageMChoiceTextFactory),
+    ],
+)
+
+
+@check_parametrize
+def test_check_from_answer_key_num_queries(
+    user, ExerciseClass, ExerciseFactory, django_assert_num_queries
+):
+    exercise_db = ExerciseFactory()
+    correct_answer = ExerciseClass(exercise_db.id).correct_answer
+
+    with django_assert_num_queries(1):
+        exercise = ExerciseClass.from_answer_key(exercise_db.id)
+    response = exercise.check(user, {ExerciseClass.answer_field: correct_answer}, {})
+
+    assert response['correct'] is True
+    assert response['correct_answer'] == correct_answer
+
+
+def test_check_from_answer_key_normalizes_answer(user):
+    exercise_db = factory.OrderSentenceFactory()
+    exercise = exercises.OrderSentenceExercise.from_answer_key(exercise_db.id)
+    answer = f'  {exercise.correct_answer.upper()}!!'
+
+    assert exercise.check(user, {'sentence': answer}, {})['correct'] is True
+
+
+def test_check_from_answer_key_without_key(user):
+    exercise_db = factory.ListenTermFactory()
+    ExerciseAnswerKey.objects.filter(exercise=exercise_db).delete()
+
+    exercise = exercises.ListenTermExercise.from_answer_key(exercise_db.id)
+
+    assert exercise.check(user, {'expression': exercise.correct_answer}, {})['correct']
+    assert ExerciseAnswerKey.objects.filter(exercise=exercise_db).exists()
+
+
+def test_term_image_mchoice_text_checks_answer_key():
+    exercise_db = factory.TermImageMChoiceTextFactory()
+    ExerciseAnswerKey.objects.filter(exercise=exercise_db).update(answer_hash='')
+
+    exercise = exercises.TermImageMChoiceTextExercise.from_answer_key(exercise_db.id)
+
+    assert exercise.assert_answer({'term_id': exercise_db.term_id}) is False
+
+
+def test_answer_key_refreshed_on_term_example_change():
+    exercise_db = factory.OrderSentenceFactory()
+    term_example = exercise_db.term_example
+    term_example.example = 'Uma nova frase.'
+    term_example.save()
+
+    answer_key = ExerciseAnswerKey.objects.get(exercise=exercise_db)
+    assert answer_key.correct_answer == 'Uma nova frase.'
+    assert answer_key.normalized_answer == 'uma nova frase'
+
+
+def test_rescore_exercises_command(user):
+    exercise_db = factory.ListenTermFactory()
+    exercise = exercises.ListenTermExercise(exercise_db.id)
+    history = ExerciseHistory.objects.create(
+        exercise=exercise_db,
+        user=user,
+        correct=False,
+        response={'expression': exercise.correct_answer},
+    )
+    ExerciseAnswerKey.objects.filter(exercise=exercise_db).update(
+        answer_hash='', normalization_version=0
+    )
+
+    call_command('rescore_exercises', '--history', stdout=StringIO())
+
+    answer_key = ExerciseAnswerKey.objects.get(exercise=exercise_db)
+    assert answer_key.answer_hash == exercise.answer_key.answer_hash
+    assert answer_key.normalization_version == constants.ANSWER_NORMALIZATION_VERSION
+    history.refresh_from_db()
+    assert history.correct is True
+
+
+def _history(user, exercise_db, correct, response):
+    return ExerciseHistory.objects.create(
+        exercise=exercise_db, user=user, correct=correct, response=response
+    )
+
+
+def test_rescore_history_sql(user, settings):
+    mchoice = factory.TermImageMChoiceTextFactory()
+    connection = factory.TermConnectionFactory()
+    connection_ids = connection.additional_content['connections']['term']
+    speak = factory.SpeakTermFactory()
+    settings.EXERCISE_SPEECH_THRESHOLD = 0.5
+    histories = [
+        _history(user, mchoice, False, {'term_id': mchoice.term_id}),
+        _history(user, mchoice, True, {'term_id': 0}),
+        _history(user, mchoice, True, {}),
+        _history(user, connection, False, {'choices': connection_ids}),
+        _history(user, connection, True, {'choices': connection_ids[:1] * 2}),
+        _history(user, speak, False, {'score': 0.6}),
+        _history(user, speak, True, {'score': 0.4}),
+    ]
+
+    count = exercises.rescore_history(ExerciseHistory.objects.all())
+
+    assert count == 6
+    assert [
+        ExerciseHistory.objects.get(id=history.id).correct for history in histories
+    ] == [True, False, True, True, False, True, False]
+
+
+def test_rescore_history_scope(user):
+    exercise_db = factory.TermImageMChoiceTextFactory()
+    inside = _history(user, exercise_db, False, {'term_id': exercise_db.term_id})
+    outside = _history(user, exercise_db, False, {'term_id': exercise_db.term_id})
+
+    exercises.rescore_history(ExerciseHistory.objects.filter(id=inside.id))
+
+    inside.refresh_from_db()
+    outside.refresh_from_db()
+    assert (inside.correct, outside.correct) == (True, False)
+
+
 class TestOrderSentenceExercise:
     @pytest.fixture
     def exercise(self):
@@ -320,6 +571,17 @@ class TestListenTermMChoiceExercise:
     def test_assert_answer_incorrect(self, exercise):
         assert not exercise.assert_answer({'term_id': exercise.correct_answer + 1})
 
+    def test_build_few_rhymes(self, exercise):
+        rhymes = TermLexical.objects.filter(
+            term_id=exercise.exercise.term_id, type=TermLexicalType.RHYME
+        ).values_list('term_value_ref_id', flat=True)
+        Term.objects.filter(id__in=list(rhymes)[1:]).delete()
+
+        build = exercises.ListenTermMChoiceExercise(exercise.exercise.id).build()
+
+        assert len(build['choices']) == 2
+        assert exercise.correct_answer in build['choices']
+
     def test_check_correct(self, exercise, user):
         exercise_request = exercise.build()
         answer = {'term_id': exercise.correct_answer}
@@ -469,7 +731,8 @@ class TestSpeakTermExercise:
 
     def test_assert_answer(self, get_exercise, get_answer):
         exercise = get_exercise()
-        assert exercise.assert_answer({})  # TODO: SpeechToText API
+        assert exercise.assert_answer({'score': 1.0})
+        assert not exercise.assert_answer({'score': 0.0})
 
 
 class TestSpeakSentenceExercise:
@@ -493,7 +756,8 @@ class TestSpeakSentenceExercise:
         assert exercise.correct_answer == exercise.exercise.term_example.example
 
     def test_assert_answer(self, exercise):
-        assert exercise.assert_answer({})  # TODO: SpeechToText API
+        assert exercise.assert_answer({'score': 1.0})
+        assert not exercise.assert_answer({'score': 0.0})
 
 
 class TestTermMChoiceExercise:
@@ -0,0 +1,101 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+from exako.apps.exercise import exercises, generator
+from exako.apps.exercise.constants import ExerciseType
+from exako.apps.exercise.models import Exercise
+from exako.apps.term.constants import Language, TermLexicalType
+from exako.apps.term.models import TermExampleLink
+from exako.tests.factories.term import (
+    TermDefinitionFactory,
+    TermExampleFactory,
+    TermFactory,
+    TermImageFactory,
+    TermLexicalFactory,
+    TermPronunciationFactory,
+)
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def terms():
+    terms = TermFactory.create_batch(16)
+    term, *others = terms
+    example = TermExampleFactory()
+    TermPronunciationFactory(term=term)
+    TermPronunciationFactory(term=None, term_example=example)
+    TermExampleLink.objects.create(highlight=[[0, 1]], term_example=example, term=term)
+    for other in others[:4]:
+        TermDefinitionFactory(term=other)
+        TermLexicalFactory(
+            term=term, term_value_ref=other, type=TermLexicalType.SYNONYM
+        )
+    for other in others[4:7]:
+        TermLexicalFactory(term=term, term_value_ref=other, type=TermLexicalType.RHYME)
+        TermPronunciationFactory(term=other)
+    for other in [term, *others[7:10]]:
+        TermImageFactory(term=other)
+    return terms
+
+
+def _count(exercise_type):
+    return Exercise.objects.filter(type=exercise_type).count()
+
+
+def test_generate(terms):
+    created = generator.run(languages=[Language.PORTUGUESE_BRASILIAN])
+
+    assert _count(ExerciseType.ORDER_SENTENCE) == 1
+    assert _count(ExerciseType.LISTEN_TERM) == 4
+    assert _count(ExerciseType.SPEAK_TERM) == 4
+    assert _count(ExerciseType.LISTEN_SENTENCE) == 1
+    assert _count(ExerciseType.SPEAK_SENTENCE) == 1
+    assert _count(ExerciseType.LISTEN_TERM_MCHOICE) == 1
+    assert _count(ExerciseType.TERM_MCHOICE) == 1
+    assert _count(ExerciseType.TERM_DEFINITION_MCHOICE) == 4
+    assert _count(ExerciseType.TERM_IMAGE_MCHOICE) == 1
+    assert _count(ExerciseType.TERM_IMAGE_MCHOICE_TEXT) == 4
+    assert _count(ExerciseType.TERM_CONNECTION) == 1
+    assert created == Exercise.objects.count()
+
+
+def test_generate_is_idempotent(terms):
+    generator.run(languages=[Language.PORTUGUESE_BRASILIAN])
+
+    assert generator.run(languages=[Language.PORTUGUESE_BRASILIAN]) == 0
+
+
+def test_generate_other_language(terms):
+    assert generator.run(languages=[Language.DEUTSCH]) == 0
+
+
+def test_generated_exercises_build(terms):
+    generator.run(languages=[Language.PORTUGUESE_BRASILIAN], chunk_size=3)
+
+    for exercise in Exercise.objects.all():
+        exercise_class = exercises.get_exercise_class(exercise.type)
+        assert exercise_class(exercise.id).build()
+
+
+def test_generated_term_connection(terms):
+    term, *others = terms
+    generator.run(exercise_types=[ExerciseType.TERM_CONNECTION])
+
+    exercise = Exercise.objects.get(type=ExerciseType.TERM_CONNECTION)
+    connections = exercise.additional_content['connections']['term']
+    distractors = exercise.additional_content['distractors']['term']
+    assert sorted(connections) == sorted(other.id for other in others[:4])
+    assert len(distractors) == 11
+    assert not set(distractors) & {term.id, *connections}
+
+
+def test_generate_exercises_command(terms):
+    stdout = StringIO()
+    call_command('generate_exercises', '--type=1', '--language=pt-BR', stdout=stdout)
+
+    assert _count(ExerciseType.LISTEN_TERM) == 4
+    assert Exercise.objects.count() == 4
+    assert '4' in stdout.getvalue()
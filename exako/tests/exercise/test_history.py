@@ -0,0 +1,124 @@
+import time
+
+import pytest
+from django.db import DatabaseError
+
+from exako.apps.exercise.history import HistoryRecorder
+from exako.apps.exercise.models import ExerciseHistory
+from exako.tests.factories import exercise as factory
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def recorder(tmp_path):
+    return HistoryRecorder(
+        spill_path=tmp_path / 'history.spill',
+        max_size=1,
+        batch_size=10,
+        put_timeout=0,
+    )
+
+
+@pytest.fixture
+def histories(user):
+    exercise = factory.ListenTermFactory()
+    return [
+        ExerciseHistory(exercise=exercise, user=user, correct=bool(i % 2))
+        for i in range(3)
+    ]
+
+
+def test_flush(recorder, histories):
+    recorder.flush(histories)
+
+    assert ExerciseHistory.objects.count() == 3
+    assert recorder.metrics()['flushed'] == 3
+
+
+def test_flush_spills_on_database_error(recorder, histories, monkeypatch):
+    def bulk_create(*args, **kwargs):
+        raise DatabaseError
+
+    with monkeypatch.context() as patch:
+        patch.setattr(ExerciseHistory.objects, 'bulk_create', bulk_create)
+        recorder.flush(histories)
+
+    assert ExerciseHistory.objects.count() == 0
+    assert recorder.spill_path.exists()
+    assert recorder.metrics()['spilled'] == 3
+
+    recorder.flush(histories[:1])
+
+    assert ExerciseHistory.objects.count() == 4
+    assert not recorder.spill_path.exists()
+    assert recorder.metrics()['replayed'] == 3
+
+
+def test_record_full_queue_writes_synchronously(recorder, histories, monkeypatch):
+    monkeypatch.setattr(recorder, 'start', lambda: None)
+
+    for history in histories:
+        recorder.record(history)
+
+    assert recorder.metrics()['queue_depth'] == 1
+    assert recorder.metrics()['overflow'] == 2
+    assert ExerciseHistory.objects.count() == 2
+
+    recorder.close()
+
+    assert ExerciseHistory.objects.count() == 2
+    assert recorder.metrics()['queue_depth'] == 0
+    assert recorder.metrics()['spilled'] == 1
+
+    recorder.replay()
+
+    assert ExerciseHistory.objects.count() == 3
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+@pytest.mark.django_db(transaction=True)
+def test_flusher_thread(tmp_path, histories, monkeypatch):
+    recorder = HistoryRecorder(
+        spill_path=tmp_path / 'history.spill', batch_size=10, flush_interval=0.01
+    )
+    bulk_create = ExerciseHistory.objects.bulk_create
+    failures = []
+
+    def fail_once(batch, **kwargs):
+        if not failures:
+            failures.append(batch)
+            raise ValueError
+        return bulk_create(batch, **kwargs)
+
+    monkeypatch.setattr(ExerciseHistory.objects, 'bulk_create', fail_once)
+
+    recorder.record(histories[0])
+    wait_for(lambda: recorder.metrics()['dropped'] == 1)
+    for history in histories[1:]:
+        recorder.record(history)
+    wait_for(lambda: recorder.metrics()['flushed'] == 2)
+
+    assert recorder._thread.is_alive()
+    assert ExerciseHistory.objects.count() == 2
+    assert recorder.metrics()['queue_depth'] == 0
+
+
+@pytest.mark.django_db(transaction=True)
+def test_flusher_thread_replays_spill(tmp_path, histories):
+    recorder = HistoryRecorder(
+        spill_path=tmp_path / 'history.spill', flush_interval=0.01
+    )
+    recorder._spill(histories)
+
+    recorder.start()
+    wait_for(lambda: recorder.metrics()['replayed'] == 3)
+
+    assert ExerciseHistory.objects.count() == 3
+    assert not recorder.spill_path.exists()
@@ -0,0 +1,84 @@
+from datetime import datetime, timezone
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from freezegun import freeze_time
+
+from exako.apps.exercise import partitions
+from exako.apps.exercise.models import ExerciseHistory
+from exako.tests.factories import exercise as factory
+
+pytestmark = pytest.mark.django_db
+
+
+def _count(table):
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT COUNT(*) FROM {table}')
+        return cursor.fetchone()[0]
+
+
+@pytest.fixture
+def histories(user):
+    exercise = factory.ListenTermFactory()
+    return ExerciseHistory.objects.bulk_create(
+        [
+            ExerciseHistory(
+                exercise=exercise,
+                user=user,
+                correct=True,
+                created_at=datetime(2026, month, 15, tzinfo=timezone.utc),
+            )
+            for month in [7, 8, 10]
+        ]
+    )
+
+
+def test_create_partition_moves_default_rows(histories):
+    assert partitions.create_partition(datetime(2026, 8, 1)) is True
+
+    assert _count('exercise_exercisehistory_p2026_08') == 1
+    assert _count(partitions.DEFAULT_PARTITION) == 2
+    assert ExerciseHistory.objects.count() == 3
+
+
+def test_create_partition_already_exists():
+    partitions.create_partition(datetime(2026, 8, 1))
+
+    assert partitions.create_partition(datetime(2026, 8, 1)) is False
+
+
+@freeze_time('2026-10-18')
+def test_partition_history_command(histories, tmp_path):
+    call_command(
+        'partition_history',
+        '--ahead=1',
+        '--archive-after=2',
+        f'--archive-dir={tmp_path}',
+        stdout=StringIO(),
+    )
+
+    assert sorted(partitions.list_partitions()) == [
+        datetime(2026, 8, 1).date(),
+        datetime(2026, 9, 1).date(),
+        datetime(2026, 10, 1).date(),
+        datetime(2026, 11, 1).date(),
+    ]
+    assert _count(partitions.DEFAULT_PARTITION) == 0
+    assert ExerciseHistory.objects.count() == 2
+
+    archived = list(
+        partitions.read_archive(tmp_path / 'exercise_exercisehistory_p2026_07.jsonl.gz')
+    )
+    assert [history.id for history in archived] == [histories[0].id]
+    assert archived[0].created_at == histories[0].created_at
+    assert archived[0].user_id == histories[0].user_id
+
+
+def test_read_archive_filters(histories, user, tmp_path):
+    partitions.create_partition(datetime(2026, 7, 1))
+    path = partitions.archive_partition(datetime(2026, 7, 1), tmp_path)
+
+    assert list(partitions.read_archive(path, user_id=user.id + 1)) == []
+    assert len(list(partitions.read_archive(path, user_id=user.id))) == 1
@@ -0,0 +1,105 @@
+import pytest
+from django.core.cache import cache
+from django.urls import reverse
+
+from exako.apps.exercise import prefetch
+from exako.tests.factories import exercise as exercise_factory
+
+pytestmark = pytest.mark.django_db
+
+
+def view_url(exercise):
+    return reverse(
+        'exercise:view',
+        kwargs={'exercise_id': exercise.id, 'exercise_type': exercise.type},
+    )
+
+
+def prefetch_url(*exercises):
+    query = '&'.join(f'next={exercise.id}:{exercise.type}' for exercise in exercises)
+    return f'{reverse("exercise:prefetch")}?{query}'
+
+
+def test_media():
+    assert prefetch.media(
+        {
+            'audio_file': 'https://cdn.example.com/audio/house.mp3?v=1',
+            'choices': {1: '/media/term/house.png', 2: 'casa'},
+            'header': 'Escute o áudio',
+        }
+    ) == [
+        {'url': 'https://cdn.example.com/audio/house.mp3?v=1', 'as': 'audio'},
+        {'url': '/media/term/house.png', 'as': 'image'},
+    ]
+
+
+def test_prefetch_partial(client, user, token_header):
+    exercise = exercise_factory.TermImageMChoiceTextFactory()
+
+    response = client.get(prefetch_url(exercise), headers=token_header)
+
+    assert response.status_code == 200
+    assert 'rel="preload"' in response.content.decode()
+    assert exercise.term_image.image.url in response.content.decode()
+    assert cache.get(prefetch._key(user, exercise.id)) is not None
+
+
+def test_view_partial_prefetched(
+    client, user, token_header, django_assert_max_num_queries
+):
+    exercise = exercise_factory.TermConnectionFactory()
+    client.get(prefetch_url(exercise), headers=token_header)
+    content = cache.get(prefetch._key(user, exercise.id))['content']
+
+    with django_assert_max_num_queries(1):
+        response = client.get(view_url(exercise), headers=token_header)
+
+    assert response.status_code == 200
+    assert response.content.decode() == content
+    assert cache.get(prefetch._key(user, exercise.id)) is None
+
+
+def test_prefetch_size(client, user, token_header, settings):
+    settings.EXERCISE_PREFETCH_SIZE = 2
+    exercises = exercise_factory.OrderSentenceFactory.create_batch(3)
+
+    client.get(prefetch_url(*exercises), headers=token_header)
+
+    assert [
+        cache.get(prefetch._key(user, exercise.id)) is not None
+        for exercise in exercises
+    ] == [True, True, False]
+
+
+def test_prefetch_skips_missing_exercise(client, user, token_header):
+    exercise = exercise_factory.OrderSentenceFactory()
+    exercise_type = exercise.type
+    missing_id = exercise.id
+    exercise.delete()
+
+    response = client.get(
+        f'{reverse("exercise:prefetch")}?next={missing_id}:{exercise_type}&next=x',
+        headers=token_header,
+    )
+
+    assert response.status_code == 200
+    assert cache.get(prefetch._key(user, missing_id)) is None
+
+
+def test_pop_type_mismatch(client, user, token_header):
+    exercise = exercise_factory.OrderSentenceFactory()
+    client.get(prefetch_url(exercise), headers=token_header)
+
+    assert prefetch.pop(user, int(exercise.type) + 1, exercise.id) is None
+    assert prefetch.pop(user, exercise.type, exercise.id) is not None
+    assert prefetch.pop(user, exercise.type, exercise.id) is None
+
+
+def test_home_renders_prefetch_options(client, settings):
+    settings.EXERCISE_PREFETCH_SIZE = 5
+
+    response = client.get(reverse('exercise:home'))
+
+    content = response.content.decode()
+    assert f'data-url="{reverse("exercise:prefetch")}"' in content
+    assert 'data-size="5"' in content
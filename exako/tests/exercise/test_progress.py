@@ -0,0 +1,120 @@
+from datetime import datetime, timezone
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+from exako.apps.exercise import exercises, progress
+from exako.apps.exercise.models import ExerciseHistory, ExerciseProgress, UserProgress
+from exako.tests.factories import exercise as factory
+
+pytestmark = pytest.mark.django_db
+
+
+def _answers(exercise, corrects):
+    return [{'exercise': exercise, 'correct': correct} for correct in corrects]
+
+
+@pytest.mark.parametrize(
+    'batches, current_streak, best_streak',
+    [
+        ([[True, True, True]], 3, 3),
+        ([[True, True], [False, True]], 1, 2),
+        ([[True], [True, False, True, True, True, False]], 0, 3),
+        ([[True, True], [True, True, False]], 0, 4),
+        ([[False], [False]], 0, 0),
+    ],
+)
+def test_update_streak(user, batches, current_streak, best_streak):
+    exercise = factory.ListenTermFactory()
+    for batch in batches:
+        progress.update(user, _answers(exercise, batch))
+
+    user_progress = UserProgress.objects.get(user=user)
+    assert user_progress.current_streak == current_streak
+    assert user_progress.best_streak == best_streak
+
+
+def test_update_groups_by_type_language_and_level(user):
+    listen_term = factory.ListenTermFactory()
+    order_sentence = factory.OrderSentenceFactory()
+
+    progress.update(
+        user,
+        [
+            {'exercise': listen_term, 'correct': True, 'time_to_answer': 10},
+            {'exercise': listen_term, 'correct': False, 'time_to_answer': 20},
+            {'exercise': order_sentence, 'correct': True},
+        ],
+    )
+
+    listen_progress = ExerciseProgress.objects.get(user=user, type=listen_term.type)
+    assert (listen_progress.total, listen_progress.correct) == (2, 1)
+    assert listen_progress.accuracy == 0.5
+    assert listen_progress.average_time_to_answer == 15
+    order_progress = ExerciseProgress.objects.get(user=user, type=order_sentence.type)
+    assert order_progress.average_time_to_answer is None
+
+
+def test_update_num_queries(user, django_assert_num_queries):
+    exercise = factory.ListenTermFactory()
+    progress.update(user, _answers(exercise, [True]))
+
+    # savepoint, UserProgress, ExerciseProgress, release savepoint
+    with django_assert_num_queries(4):
+        progress.update(user, _answers(exercise, [True, False, True]))
+
+
+def test_rebuild_progress_command(user):
+    exercise = factory.ListenTermFactory()
+    ExerciseHistory.objects.bulk_create(
+        [
+            ExerciseHistory(
+                exercise=exercise,
+                user=user,
+                correct=correct,
+                created_at=datetime(2026, 10, day, tzinfo=timezone.utc),
+                request={'time_to_answer': 5},
+            )
+            for day, correct in enumerate([True, True, False, True], start=1)
+        ]
+    )
+    UserProgress.objects.create(user=user, total=100, ability=1.5)
+
+    call_command('rebuild_progress', stdout=StringIO())
+
+    user_progress = UserProgress.objects.get(user=user)
+    assert (user_progress.total, user_progress.correct) == (4, 3)
+    assert (user_progress.current_streak, user_progress.best_streak) == (1, 2)
+    assert user_progress.ability == 1.5
+    exercise_progress = ExerciseProgress.objects.get(user=user)
+    assert exercise_progress.time_to_answer_sum == 20
+    assert exercise_progress.time_to_answer_count == 4
+
+
+def test_rebuild_resets_users_without_history(user):
+    UserProgress.objects.create(user=user, total=10, correct=5, ability=-0.5)
+
+    progress.rebuild([user.id])
+
+    user_progress = UserProgress.objects.get(user=user)
+    assert (user_progress.total, user_progress.correct) == (0, 0)
+    assert user_progress.ability == -0.5
+
+
+def test_rescore_history_rebuilds_progress(user):
+    exercise = factory.ListenTermFactory()
+    answer_key = exercises.ListenTermExercise(exercise.id).answer_key
+    ExerciseHistory.objects.create(
+        exercise=exercise,
+        user=user,
+        correct=False,
+        response={'expression': answer_key.correct_answer},
+    )
+    progress.update(user, _answers(exercise, [False]))
+
+    exercises.rescore_history(ExerciseHistory.objects.all())
+
+    user_progress = UserProgress.objects.get(user=user)
+    assert (user_progress.total, user_progress.correct) == (1, 1)
+    assert ExerciseProgress.objects.get(user=user).correct == 1
@@ -0,0 +1,104 @@
+import pytest
+
+from exako.apps.card.models import Card, CardSet
+from exako.apps.exercise import recent
+from exako.apps.exercise.constants import ExerciseType
+from exako.apps.exercise.exercises import ListenTermExercise
+from exako.apps.exercise.models import Exercise
+from exako.apps.term.constants import Language
+from exako.tests.factories import exercise as exercise_factory
+
+pytestmark = pytest.mark.django_db
+
+
+def _list(user, cardset_id=None):
+    return [
+        item['id']
+        for item in Exercise.objects.list(
+            language=[Language.PORTUGUESE_BRASILIAN],
+            exercise_type=[ExerciseType.RANDOM],
+            level=None,
+            cardset_id=cardset_id,
+            seed=0.5,
+            user=user,
+        )
+    ]
+
+
+def test_add_and_seen(user):
+    recent.add(user, [1, 2])
+    recent.add(user, [2, 3])
+
+    assert recent.seen(user) == {1, 2, 3}
+
+
+def test_seen_expires_after_window(user, settings, monkeypatch):
+    settings.EXERCISE_RECENT_WINDOW = 60
+    settings.EXERCISE_RECENT_BUCKETS = 6
+    monkeypatch.setattr(recent.time, 'time', lambda: 1000.0)
+    recent.add(user, [1])
+    monkeypatch.setattr(recent.time, 'time', lambda: 1030.0)
+    recent.add(user, [2])
+
+    assert recent.seen(user) == {1, 2}
+    monkeypatch.setattr(recent.time, 'time', lambda: 1065.0)
+    assert recent.seen(user) == {2}
+
+
+def test_add_keeps_most_recent_ids(user, settings):
+    settings.EXERCISE_RECENT_LIMIT = 3
+
+    recent.add(user, [1, 2, 3])
+    recent.add(user, [4, 1])
+
+    assert recent.seen(user) == {3, 4, 1}
+
+
+def test_add_interleaved(user, monkeypatch):
+    set_many = recent.cache.set_many
+
+    def interleaved(data, **kwargs):
+        # Outra resposta do mesmo usuário chega entre a reserva e a gravação.
+        monkeypatch.setattr(recent.cache, 'set_many', set_many)
+        recent.add(user, [2, 3])
+        set_many(data, **kwargs)
+
+    monkeypatch.setattr(recent.cache, 'set_many', interleaved)
+    recent.add(user, [1])
+
+    assert recent.seen(user) == {1, 2, 3}
+
+
+def test_list_excludes_recent(user):
+    exercises = exercise_factory.OrderSentenceFactory.create_batch(
+        3, language=Language.PORTUGUESE_BRASILIAN
+    )
+
+    recent.add(user, [exercises[0].id])
+
+    assert sorted(_list(user)) == [exercises[1].id, exercises[2].id]
+
+
+def test_list_cardset_excludes_recent(user):
+    cardset = CardSet.objects.create(
+        user=user, name='cardset', language=Language.PORTUGUESE_BRASILIAN
+    )
+    exercise, other = exercise_factory.ListenTermFactory.create_batch(
+        2, language=Language.PORTUGUESE_BRASILIAN
+    )
+    Card.objects.create(cardset=cardset, term=exercise.term)
+    Card.objects.create(cardset=cardset, term=other.term)
+
+    recent.add(user, [exercise.id])
+
+    assert _list(user, cardset_id=[cardset.id]) == [other.id]
+
+
+def test_check_marks_recent(user):
+    exercise = exercise_factory.ListenTermFactory()
+
+    ListenTermExercise(exercise.id).check(
+        user, answer={'expression': ''}, exercise_request={}
+    )
+
+    assert recent.seen(user) == {exercise.id}
@@ -0,0 +1,183 @@
+import importlib
+
+import pytest
+from django.db import connection
+from ninja.errors import HttpError
+
+from exako.apps.exercise import exercises, generator, relations
+from exako.apps.exercise.constants import ExerciseType
+from exako.apps.exercise.models import (
+    Exercise,
+    ExerciseAnswerKey,
+    ExerciseConnection,
+    ExerciseDistractor,
+)
+from exako.apps.term.constants import Language
+from exako.apps.term.models import Term
+from exako.tests.factories import exercise as exercise_factory
+from exako.tests.factories.term import TermFactory, TermImageFactory
+
+pytestmark = pytest.mark.django_db
+
+
+def _distractor_ids(exercise, field='term'):
+    return list(
+        ExerciseDistractor.objects.filter(exercise=exercise).values_list(
+            f'{field}_id', flat=True
+        )
+    )
+
+
+def _connection_ids(exercise):
+    return list(
+        ExerciseConnection.objects.filter(exercise=exercise).values_list(
+            'term_id', flat=True
+        )
+    )
+
+
+@pytest.mark.parametrize(
+    'ExerciseFactory, field',
+    [
+        (exercise_factory.OrderSentenceFactory, 'term'),
+        (exercise_factory.TermMChoiceFactory, 'term'),
+        (exercise_factory.TermMChoiceLexicalFactory, 'term_lexical'),
+        (exercise_factory.TermDefinitionMChoiceFactory, 'term_definition'),
+        (exercise_factory.TermImageMChoiceFactory, 'term_image'),
+        (exercise_factory.TermImageMChoiceTextFactory, 'term'),
+        (exercise_factory.TermConnectionFactory, 'term'),
+    ],
+)
+def test_sync_on_save(ExerciseFactory, field):
+    exercise = ExerciseFactory()
+
+    assert (
+        _distractor_ids(exercise, field)
+        == (exercise.additional_content['distractors'][field])
+    )
+
+
+def test_sync_connections_on_save():
+    exercise = exercise_factory.TermConnectionFactory()
+
+    assert (
+        _connection_ids(exercise) == exercise.additional_content['connections']['term']
+    )
+
+
+def test_sync_skips_missing_ids():
+    exercise = exercise_factory.TermImageMChoiceTextFactory()
+    term_ids = exercise.additional_content['distractors']['term']
+    Exercise.objects.filter(id=exercise.id).update(
+        additional_content={'distractors': {'term': [*term_ids, 0, 'a', None]}}
+    )
+
+    relations.sync([exercise.id])
+
+    assert _distractor_ids(exercise) == term_ids
+
+
+def test_save_validates_relation_rows():
+    exercise = exercise_factory.TermImageMChoiceTextFactory()
+    term_ids = exercise.additional_content['distractors']['term']
+    other_language = TermFactory(
+        language=next(
+            language for language in Language if language != exercise.term.language
+        )
+    )
+    exercise.additional_content['distractors']['term'] = [
+        *term_ids,
+        term_ids[0],
+        other_language.id,
+    ]
+
+    exercise.save()
+
+    assert _distractor_ids(exercise) == term_ids
+    exercise.refresh_from_db()
+    assert exercise.additional_content['distractors']['term'] == term_ids
+
+
+def test_save_rejects_missing_relation_rows():
+    exercise = exercise_factory.TermImageMChoiceTextFactory()
+    term_ids = exercise.additional_content['distractors']['term']
+    Term.objects.filter(id__in=term_ids[2:]).delete()
+    exercise.level = None
+
+    with pytest.raises(HttpError, match='at least 3'):
+        exercise.save()
+
+    exercise.refresh_from_db()
+    assert exercise.additional_content['distractors']['term'] == term_ids
+
+
+def test_reverse_lookup():
+    exercise = exercise_factory.TermImageMChoiceTextFactory()
+    term_id = exercise.additional_content['distractors']['term'][0]
+
+    assert list(Exercise.objects.filter(distractors__term_id=term_id)) == [exercise]
+
+
+def test_delete_term_removes_distractor():
+    exercise = exercise_factory.TermConnectionFactory()
+    term_id = exercise.additional_content['distractors']['term'][0]
+
+    Term.objects.filter(id=term_id).delete()
+
+    assert term_id not in _distractor_ids(exercise)
+    assert (
+        term_id
+        not in exercises.TermConnectionExercise(exercise.id).compiled['distractors']
+    )
+
+
+def test_delete_connection_refreshes_answer_key(django_capture_on_commit_callbacks):
+    exercise = exercise_factory.TermConnectionFactory()
+    term_id = exercise.additional_content['connections']['term'][0]
+
+    with django_capture_on_commit_callbacks(execute=True):
+        Term.objects.filter(id=term_id).delete()
+
+    answer_key = ExerciseAnswerKey.objects.get(exercise=exercise)
+    assert term_id not in answer_key.normalized_answer
+    assert term_id not in exercises.TermConnectionExercise(exercise.id).correct_answer
+
+
+def test_generate_syncs_relations():
+    term = TermFactory(language=Language.PORTUGUESE_BRASILIAN)
+    TermFactory.create_batch(6, language=Language.PORTUGUESE_BRASILIAN)
+    TermImageFactory(term=term)
+
+    generator.generate(
+        ExerciseType.TERM_IMAGE_MCHOICE_TEXT,
+        Language.PORTUGUESE_BRASILIAN,
+        term.id,
+        term.id + 1,
+    )
+
+    exercise = Exercise.objects.get(type=ExerciseType.TERM_IMAGE_MCHOICE_TEXT)
+    assert (
+        _distractor_ids(exercise) == exercise.additional_content['distractors']['term']
+    )
+
+
+def test_backfill_migration():
+    exercise = exercise_factory.TermConnectionFactory()
+    ExerciseDistractor.objects.all().delete()
+    ExerciseConnection.objects.all().delete()
+    migration = importlib.import_module(
+        'exako.apps.exercise.migrations.'
+        '0010_exerciseconnection_exercisedistractor_and_more'
+    )
+
+    with connection.cursor() as cursor:
+        for target in migration.BACKFILL_TARGETS:
+            cursor.execute(migration._backfill_sql(*target))
+
+    assert (
+        _distractor_ids(exercise)
+        == (exercise.additional_content['distractors']['term'])
+    )
+    assert (
+        _connection_ids(exercise) == exercise.additional_content['connections']['term']
+    )
@@ -0,0 +1,88 @@
+from datetime import timedelta
+
+import pytest
+from django.urls import reverse_lazy
+from django.utils import timezone
+from freezegun import freeze_time
+
+from exako.apps.exercise import scheduler
+from exako.apps.exercise.models import ExerciseSchedule
+from exako.tests.factories import exercise as factory
+
+pytestmark = pytest.mark.django_db
+
+
+due_router = reverse_lazy('api-1.0.0:due_exercises')
+
+
+@pytest.mark.parametrize(
+    'corrects, interval, repetitions, lapses',
+    [
+        ([True], 1, 1, 0),
+        ([True, True], 6, 2, 0),
+        ([True, True, True], 15, 3, 0),
+        ([True, True, False], 1, 0, 1),
+        ([False, True], 1, 1, 1),
+    ],
+)
+def test_review(user, corrects, interval, repetitions, lapses):
+    exercise = factory.ListenTermFactory()
+    for correct in corrects:
+        scheduler.review(user, [{'exercise': exercise, 'correct': correct}])
+
+    state = ExerciseSchedule.objects.get(user=user, exercise=exercise)
+    assert state.interval == interval
+    assert state.repetitions == repetitions
+    assert state.lapses == lapses
+    assert state.due_at == state.last_review + timedelta(days=interval)
+
+
+def test_review_ease_lower_bound(user):
+    exercise = factory.ListenTermFactory()
+    scheduler.review(user, [{'exercise': exercise, 'correct': False}] * 10)
+
+    state = ExerciseSchedule.objects.get(user=user, exercise=exercise)
+    assert state.ease == scheduler.MIN_EASE
+    assert state.lapses == 10
+
+
+def test_review_num_queries(user, django_assert_num_queries):
+    exercises = factory.ListenTermFactory.create_batch(3)
+    scheduler.review(user, [{'exercise': exercises[0], 'correct': True}])
+
+    with django_assert_num_queries(2):
+        scheduler.review(
+            user,
+            [{'exercise': exercise, 'correct': True} for exercise in exercises],
+        )
+
+
+def test_due_exercises(client, user, token_header):
+    exercises = factory.ListenTermFactory.create_batch(3)
+    with freeze_time(timezone.now() - timedelta(days=3)):
+        scheduler.review(user, [{'exercise': exercises[1], 'correct': False}])
+    with freeze_time(timezone.now() - timedelta(days=2)):
+        scheduler.review(user, [{'exercise': exercises[0], 'correct': False}])
+    scheduler.review(user, [{'exercise': exercises[2], 'correct': False}])
+
+    response = client.get(due_router, {'limit': 5}, headers=token_header)
+
+    assert response.status_code == 200
+    assert [item['id'] for item in response.json()] == [
+        exercises[1].id,
+        exercises[0].id,
+    ]
+    assert response.json()[0]['type'] == exercises[1].type
+
+
+def test_due_exercises_limit(client, user, token_header):
+    exercises = factory.ListenTermFactory.create_batch(3)
+    with freeze_time(timezone.now() - timedelta(days=3)):
+        scheduler.review(
+            user,
+            [{'exercise': exercise, 'correct': False} for exercise in exercises],
+        )
+
+    response = client.get(due_router, {'limit': 2}, headers=token_header)
+
+    assert len(response.json()) == 2
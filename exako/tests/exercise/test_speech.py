@@ -0,0 +1,199 @@
+import threading
+import time
+from datetime import timedelta
+
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import close_old_connections
+from django.utils import timezone
+from ninja.errors import HttpError
+
+from exako.apps.exercise import exercises, speech
+from exako.apps.exercise.constants import SpeechJobStatus
+from exako.apps.exercise.models import ExerciseHistory, SpeechJob
+from exako.tests.factories import exercise as exercise_factory
+
+
+@pytest.fixture(autouse=True)
+def speech_upload_dir(settings, tmp_path):
+    settings.EXERCISE_SPEECH_UPLOAD_DIR = tmp_path
+    return tmp_path
+
+
+def submit(user, audio=b'RIFF....WAVE'):
+    exercise = exercises.SpeakTermExercise(exercise_factory.SpeakTermFactory().id)
+    return speech.submit(
+        exercise,
+        user=user,
+        audio=SimpleUploadedFile('recording.wav', audio, 'audio/wav'),
+        exercise_request={'time_to_answer': 3},
+    )
+
+
+class FailingScorer:
+    def score(self, audio_path, expected, language):
+        raise RuntimeError('scorer unavailable')
+
+
+def test_speech_worker_concurrency():
+    release = threading.Event()
+    running, peak = [], []
+    lock = threading.Lock()
+
+    def handler(job_id):
+        with lock:
+            running.append(job_id)
+            peak.append(len(running))
+        release.wait(timeout=5)
+        with lock:
+            running.remove(job_id)
+
+    worker = speech.SpeechWorker(handler, workers=2, max_pending=2)
+    assert all(worker.submit(job_id) for job_id in range(2))
+    while len(running) < 2:
+        time.sleep(0.01)
+    assert all(worker.submit(job_id) for job_id in range(2, 4))
+
+    assert worker.submit(4) is False
+    assert worker.metrics()['rejected'] == 1
+    assert worker.metrics()['running'] == 2
+    assert worker.metrics()['queue_depth'] == 2
+
+    release.set()
+    worker.close()
+    assert max(peak) == 2
+    assert worker.metrics()['processed'] == 4
+
+
+def test_speech_worker_handler_error():
+    def handler(job_id):
+        raise RuntimeError
+
+    worker = speech.SpeechWorker(handler, workers=1)
+    worker.submit(1)
+    worker.close()
+
+    assert worker.metrics()['failed'] == 1
+
+
+def test_speech_worker_close_timeout():
+    release = threading.Event()
+    handled = []
+
+    def handler(job_id):
+        handled.append(job_id)
+        release.wait(timeout=5)
+
+    worker = speech.SpeechWorker(handler, workers=1, max_pending=3)
+    assert all(worker.submit(job_id) for job_id in range(3))
+    while not handled:
+        time.sleep(0.01)
+
+    assert worker.close(timeout=0.05) is False
+    assert worker.metrics()['queue_depth'] == 0
+    release.set()
+    assert worker.close(timeout=5) is True
+    assert handled == [0]
+
+
+@pytest.mark.django_db
+def test_submit_busy(user, settings, monkeypatch):
+    settings.EXERCISE_SPEECH_ASYNC = True
+    monkeypatch.setattr(speech, '_worker', speech.SpeechWorker(speech.process))
+    monkeypatch.setattr(speech._worker, 'full', lambda: True)
+
+    with pytest.raises(HttpError) as error:
+        submit(user)
+
+    assert error.value.status_code == 503
+    assert not SpeechJob.objects.exists()
+
+
+@pytest.mark.django_db
+def test_process_failed(user, settings, speech_upload_dir):
+    settings.EXERCISE_SPEECH_SCORER = f'{__name__}.FailingScorer'
+
+    job = submit(user)
+
+    assert job.status == SpeechJobStatus.FAILED
+    assert job.error == 'scorer unavailable'
+    assert job.result is None
+    assert not list(speech_upload_dir.iterdir())
+
+
+@pytest.mark.django_db
+def test_process_pending(user, monkeypatch):
+    with monkeypatch.context() as patch:
+        patch.setattr(speech, 'process', lambda job_id: None)
+        job = submit(user)
+    assert job.status == SpeechJobStatus.PENDING
+
+    assert speech.process_pending() == 1
+
+    job.refresh_from_db()
+    assert job.status == SpeechJobStatus.DONE
+    assert job.correct is True
+    assert speech.process_pending() == 0
+
+
+@pytest.mark.django_db
+def test_process_claimed_job(user, monkeypatch):
+    with monkeypatch.context() as patch:
+        patch.setattr(speech, 'process', lambda job_id: None)
+        job = submit(user)
+    SpeechJob.objects.filter(id=job.id).update(status=SpeechJobStatus.RUNNING)
+
+    speech.process(job.id)
+
+    job.refresh_from_db()
+    assert job.status == SpeechJobStatus.RUNNING
+    assert not ExerciseHistory.objects.filter(user=user).exists()
+    assert speech.process_pending() == 0
+
+
+@pytest.mark.django_db
+def test_process_pending_reclaims_stale_job(user, monkeypatch, settings):
+    settings.EXERCISE_SPEECH_RUNNING_TIMEOUT = 60
+    with monkeypatch.context() as patch:
+        patch.setattr(speech, 'process', lambda job_id: None)
+        job = submit(user)
+        other = submit(user)
+    SpeechJob.objects.filter(id=job.id).update(
+        status=SpeechJobStatus.RUNNING,
+        started_at=timezone.now() - timedelta(minutes=2),
+    )
+    SpeechJob.objects.filter(id=other.id).update(
+        status=SpeechJobStatus.RUNNING, started_at=timezone.now()
+    )
+
+    assert speech.process_pending() == 1
+
+    job.refresh_from_db()
+    other.refresh_from_db()
+    assert job.status == SpeechJobStatus.DONE
+    assert other.status == SpeechJobStatus.RUNNING
+
+
+@pytest.mark.django_db(transaction=True)
+def test_process_concurrent(user, monkeypatch):
+    with monkeypatch.context() as patch:
+        patch.setattr(speech, 'process', lambda job_id: None)
+        job = submit(user)
+    barrier = threading.Barrier(2)
+
+    def run():
+        barrier.wait(timeout=5)
+        try:
+            speech.process(job.id)
+        finally:
+            close_old_connections()
+
+    threads = [threading.Thread(target=run) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    job.refresh_from_db()
+    assert job.status == SpeechJobStatus.DONE
+    assert ExerciseHistory.objects.filter(user=user).count() == 1
@@ -0,0 +1,226 @@
+import hashlib
+import io
+import threading
+import wave
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+from django.core.management import call_command
+from django.urls import reverse
+
+from exako.apps.exercise import exercises
+from exako.apps.term import audio
+from exako.apps.term.models import PronunciationAudio, TermPronunciation
+from exako.tests.factories import exercise as exercise_factory
+from exako.tests.factories.term import TermPronunciationFactory
+
+pytestmark = pytest.mark.django_db
+
+
+def wav(seconds=1, rate=8000):
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as file:
+        file.setnchannels(1)
+        file.setsampwidth(1)
+        file.setframerate(rate)
+        file.writeframes(b'\x80' * rate * seconds)
+    return buffer.getvalue()
+
+
+def mp3(frames=10):
+    # MPEG-1 Layer III, 128 kbps, 44.1 kHz, sem padding: 417 bytes por quadro.
+    frame = b'\xff\xfb\x90\x00' + b'\x00' * 413
+    return b'ID3\x03\x00\x00\x00\x00\x00\x00' + frame * frames
+
+
+@pytest.fixture(autouse=True)
+def media_root(settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+    return tmp_path
+
+
+@pytest.fixture
+def origin():
+    """Servidor local que faz as vezes do host original dos áudios."""
+    files = {'/house.wav': wav(), '/copy.wav': wav()}
+    requests = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            requests.append(self.path)
+            if self.path not in files:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/octet-stream')
+            self.end_headers()
+            self.wfile.write(files[self.path])
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_port}', files, requests
+    server.shutdown()
+    server.server_close()
+
+
+def test_detect():
+    assert audio.detect(wav()) == ('wav', 'audio/wav')
+    assert audio.detect(mp3()) == ('mp3', 'audio/mpeg')
+    assert audio.detect(b'OggS\x00') == ('ogg', 'audio/ogg')
+    with pytest.raises(audio.AudioError):
+        audio.detect(b'<html></html>')
+
+
+def test_duration():
+    assert audio.duration(wav(seconds=2), 'wav') == 2
+    assert audio.duration(mp3(frames=10), 'mp3') == pytest.approx(10 * 1152 / 44100)
+    assert audio.duration(b'OggS\x00', 'ogg') is None
+
+
+def test_cache_pronunciations(origin):
+    url, files, requests = origin
+    first = TermPronunciationFactory(audio_file=f'{url}/house.wav')
+    second = TermPronunciationFactory(audio_file=f'{url}/house.wav')
+    copy = TermPronunciationFactory(audio_file=f'{url}/copy.wav')
+
+    result = audio.cache_pronunciations()
+
+    assert result == {'cached': 3, 'failed': 0}
+    assert sorted(requests) == ['/copy.wav', '/house.wav']
+    assert PronunciationAudio.objects.count() == 1
+    cached = PronunciationAudio.objects.get()
+    assert cached.sha256 == hashlib.sha256(files['/house.wav']).hexdigest()
+    assert cached.content_type == 'audio/wav'
+    assert cached.size == len(files['/house.wav'])
+    assert cached.duration == 1
+    for pronunciation in [first, second, copy]:
+        pronunciation.refresh_from_db()
+        assert pronunciation.audio_url == cached.url
+
+    assert audio.cache_pronunciations() == {'cached': 0, 'failed': 0}
+    assert len(requests) == 2
+
+
+def test_cache_pronunciations_failed(origin):
+    url, _, _ = origin
+    pronunciation = TermPronunciationFactory(audio_file=f'{url}/missing.wav')
+
+    call_command('cache_pronunciation_audio', stdout=io.StringIO())
+
+    pronunciation.refresh_from_db()
+    assert pronunciation.audio is None
+    assert pronunciation.audio_url == pronunciation.audio_file
+
+
+def test_cache_pronunciations_too_large(origin, settings):
+    url, _, _ = origin
+    settings.TERM_AUDIO_MAX_SIZE = 100
+    TermPronunciationFactory(audio_file=f'{url}/house.wav')
+
+    assert audio.cache_pronunciations() == {'cached': 0, 'failed': 1}
+    assert not PronunciationAudio.objects.exists()
+
+
+def test_audio_file_change_resets_cache(origin):
+    url, _, _ = origin
+    pronunciation = TermPronunciationFactory(audio_file=f'{url}/house.wav')
+    audio.cache_pronunciations()
+    pronunciation.refresh_from_db()
+
+    pronunciation.audio_file = f'{url}/copy.wav'
+    pronunciation.save()
+
+    assert TermPronunciation.objects.get(id=pronunciation.id).audio is None
+
+
+def test_exercise_build_uses_cached_audio(origin):
+    url, _, _ = origin
+    exercise = exercise_factory.ListenTermFactory()
+    TermPronunciation.objects.filter(id=exercise.term_pronunciation_id).update(
+        audio_file=f'{url}/house.wav'
+    )
+    audio.cache_pronunciations()
+
+    build = exercises.ListenTermExercise(exercise.id).build()
+
+    assert build['audio_file'] == PronunciationAudio.objects.get().url
+
+
+@pytest.fixture
+def cached_audio(origin):
+    url, files, _ = origin
+    TermPronunciationFactory(audio_file=f'{url}/house.wav')
+    audio.cache_pronunciations()
+    return PronunciationAudio.objects.get(), files['/house.wav']
+
+
+def test_pronunciation_audio(client, cached_audio):
+    cached, data = cached_audio
+
+    response = client.get(cached.url)
+
+    assert response.status_code == 200
+    assert b''.join(response.streaming_content) == data
+    assert response['Content-Type'] == 'audio/wav'
+    assert response['Content-Length'] == str(len(data))
+    assert response['ETag'] == f'"{cached.sha256}"'
+    assert response['Accept-Ranges'] == 'bytes'
+    assert 'immutable' in response['Cache-Control']
+    assert 'public' in response['Cache-Control']
+
+
+@pytest.mark.parametrize(
+    'header, start, end',
+    [('bytes=0-99', 0, 99), ('bytes=100-', 100, None), ('bytes=-50', -50, None)],
+)
+def test_pronunciation_audio_range(client, cached_audio, header, start, end):
+    cached, data = cached_audio
+    expected = data[start : end + 1 if end is not None else None]
+
+    response = client.get(cached.url, headers={'Range': header})
+
+    assert response.status_code == 206
+    assert b''.join(response.streaming_content) == expected
+    assert response['Content-Length'] == str(len(expected))
+    first = start if start >= 0 else len(data) + start
+    assert response['Content-Range'] == (
+        f'bytes {first}-{first + len(expected) - 1}/{len(data)}'
+    )
+
+
+def test_pronunciation_audio_range_not_satisfiable(client, cached_audio):
+    cached, data = cached_audio
+
+    response = client.get(cached.url, headers={'Range': f'bytes={len(data)}-'})
+
+    assert response.status_code == 416
+    assert response['Content-Range'] == f'bytes */{len(data)}'
+
+
+def test_pronunciation_audio_if_range_mismatch(client, cached_audio):
+    cached, data = cached_audio
+
+    response = client.get(
+        cached.url, headers={'Range': 'bytes=0-9', 'If-Range': '"stale"'}
+    )
+
+    assert response.status_code == 200
+    assert b''.join(response.streaming_content) == data
+
+
+def test_pronunciation_audio_not_modified(client, cached_audio):
+    cached, _ = cached_audio
+
+    response = client.get(cached.url, headers={'If-None-Match': f'"{cached.sha256}"'})
+
+    assert response.status_code == 304
+
+
+def test_pronunciation_audio_not_found(client):
+    response = client.get(reverse('term:audio', kwargs={'sha256': 'missing'}))
+
+    assert response.status_code == 404
@@ -0,0 +1,202 @@
+import io
+import json
+
+import pytest
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.urls import reverse_lazy
+from PIL import Image, ImageDraw, ImageOps
+
+from exako.apps.exercise import exercises
+from exako.apps.term import images
+from exako.apps.term.models import TermImage
+from exako.tests.factories import exercise as exercise_factory
+from exako.tests.factories.term import TermFactory, TermImageFactory
+
+pytestmark = pytest.mark.django_db
+
+
+def picture(width=1000, height=600, image_format='JPEG', color='blue', exif=True):
+    gradient = Image.linear_gradient('L').rotate(90).resize((width, height))
+    image = ImageOps.colorize(gradient, black=color, white='white')
+    ImageDraw.Draw(image).ellipse(
+        (width // 4, height // 4, width // 2, height // 2), fill='black'
+    )
+    buffer = io.BytesIO()
+    kwargs = {}
+    if exif:
+        metadata = Image.Exif()
+        metadata[0x010F] = 'Camera'
+        kwargs['exif'] = metadata
+    image.save(buffer, image_format, **kwargs)
+    return buffer.getvalue()
+
+
+@pytest.fixture(autouse=True)
+def media_root(settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+    return tmp_path
+
+
+def create(data, name='image.jpg'):
+    return TermImageFactory(image=ContentFile(data, name=name))
+
+
+def test_dhash_distance():
+    first = Image.open(io.BytesIO(picture()))
+    resized = first.resize((500, 300))
+    other = Image.open(io.BytesIO(picture(color='red'))).transpose(
+        Image.Transpose.FLIP_LEFT_RIGHT
+    )
+
+    assert images.distance(images.dhash(first), images.dhash(resized)) <= 4
+    assert images.distance(images.dhash(first), images.dhash(other)) > 4
+
+
+def test_process(settings):
+    term_image = create(picture())
+
+    term_image = images.process(term_image.id)
+
+    assert term_image.processed_at is not None
+    assert len(term_image.sha256) == 64
+    assert len(term_image.phash) == 16
+    widths = {(variant['format'], variant['width']) for variant in term_image.variants}
+    assert widths == {
+        (image_format, width)
+        for image_format in settings.TERM_IMAGE_FORMATS
+        for width in [160, 320, 640, 1000]
+    }
+    for variant in term_image.variants:
+        with Image.open(settings.MEDIA_ROOT / variant['name']) as image:
+            assert image.format == variant['format'].upper()
+            assert image.width == variant['width']
+            assert image.height == variant['height']
+            assert not image.getexif()
+
+
+def test_process_large_image(settings):
+    term_image = images.process(create(picture(width=3000, height=1000)).id)
+
+    assert max(variant['width'] for variant in term_image.variants) == max(
+        settings.TERM_IMAGE_SIZES
+    )
+
+
+def test_process_transparent_png():
+    image = Image.new('RGBA', (400, 400), (255, 0, 0, 0))
+    buffer = io.BytesIO()
+    image.save(buffer, 'PNG')
+
+    term_image = images.process(create(buffer.getvalue(), name='image.png').id)
+
+    assert {variant['format'] for variant in term_image.variants} == {'webp', 'jpeg'}
+
+
+def test_process_duplicate():
+    data = picture()
+    first = images.process(create(data).id)
+
+    second = images.process(create(data).id)
+
+    assert second.image.name == first.image.name
+    assert second.variants == first.variants
+
+
+def test_process_near_duplicate(media_root):
+    first = images.process(create(picture(exif=False)).id)
+    recompressed = Image.open(io.BytesIO(picture(exif=False)))
+    buffer = io.BytesIO()
+    recompressed.save(buffer, 'JPEG', quality=30)
+    second = create(buffer.getvalue())
+    upload = second.image.name
+
+    second = images.process(second.id)
+
+    assert second.sha256 != first.sha256
+    assert second.image.name == upload
+    assert (media_root / upload).exists()
+    assert second.variants == first.variants
+
+
+def test_bands_cover_distance(settings):
+    phash = 'f0f0f0f0f0f0f0f0'
+    bands = images._bands(phash, settings.TERM_IMAGE_PHASH_DISTANCE)
+
+    assert len(bands) == settings.TERM_IMAGE_PHASH_DISTANCE + 1
+    assert ''.join(band for _, band in bands) == phash
+
+
+def test_similar_skips_other_buckets(settings):
+    settings.TERM_IMAGE_PHASH_DISTANCE = 1
+    near = TermImageFactory(phash='00000000000000ff')
+    TermImageFactory(phash='ffffffffffffff00')
+
+    candidates = images._similar(TermImage.objects.all(), '00000000000000fe')
+
+    assert list(candidates) == [near]
+
+
+def test_variant_url(settings):
+    term_image = images.process(create(picture()).id)
+
+    assert term_image.variant_url(300).endswith('-320.webp')
+    assert term_image.variant_url(320).endswith('-320.webp')
+    assert term_image.variant_url(2000).endswith('-1000.webp')
+    assert term_image.variant_url(100, 'jpeg').endswith('-160.jpg')
+
+
+def test_variant_url_not_processed():
+    term_image = create(picture())
+
+    assert term_image.variant_url(320) == term_image.image.url
+
+
+def test_image_change_resets_variants():
+    term_image = images.process(create(picture()).id)
+
+    term_image.image = ContentFile(picture(color='red'), name='other.jpg')
+    term_image.save()
+
+    term_image.refresh_from_db()
+    assert term_image.processed_at is None
+    assert term_image.variants == []
+
+
+def test_process_term_images_command():
+    create(picture())
+    create(picture(color='red'))
+
+    call_command('process_term_images', stdout=io.StringIO())
+
+    assert not TermImage.objects.filter(processed_at__isnull=True).exists()
+
+
+def test_exercise_payload_uses_variants(settings):
+    exercise = exercise_factory.TermImageMChoiceTextFactory()
+    TermImage.objects.filter(id=exercise.term_image_id).update(
+        image=create(picture()).image.name
+    )
+    images.process(exercise.term_image_id)
+
+    build = exercises.TermImageMChoiceTextExercise(exercise.id).build()
+
+    assert build['image'].endswith(f'-{settings.TERM_IMAGE_WIDTH}.webp')
+
+
+@pytest.mark.parametrize('user', [{'is_superuser': True}], indirect=True)
+def test_create_term_image_processes_variants(client, token_header):
+    response = client.post(
+        reverse_lazy('api-1.0.0:create_term_image'),
+        data={
+            'exercise_schema': json.dumps({'term': TermFactory().id}),
+            'image': SimpleUploadedFile('image.jpg', picture(), 'image/jpeg'),
+        },
+        headers=token_header,
+    )
+
+    assert response.status_code == 201
+    term_image = TermImage.objects.get(id=response.json()['id'])
+    assert term_image.processed_at is not None
+    assert term_image.variants
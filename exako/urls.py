@@ -17,12 +17,12 @@ Including another URLconf
 
 from django.contrib import admin
 from django.http import Http404
-from django.urls import include, path
+from django.urls import include, path, re_path
 from django.conf import settings
-from django.conf.urls.static import static
 from ninja import NinjaAPI
 
 from exako.apps.card.api.routers import card_router
+from exako.apps.core import views as core_views
 from exako.apps.term.api.routers.term import term_router
 from exako.apps.user.auth.api import auth_router
 from exako.apps.user.auth.exception import InvalidToken
@@ -33,18 +33,24 @@ api.add_router('term/', term_router)
 api.add_router('auth/', auth_router)
 api.add_router('card/', card_router)
 
-urlpatterns = (
-    [
-        path('admin/', admin.site.urls),
-        path('api/', api.urls),
-        path('', include('exako.apps.term.urls')),
-        path('cardset/', include('exako.apps.card.urls')),
-        path('auth/', include('exako.apps.user.urls')),
-        path('exercise/', include('exako.apps.exercise.urls')),
-    ]
-    + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
-    + static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
-)
+urlpatterns = [
+    path('admin/', admin.site.urls),
+    path('api/', api.urls),
+    re_path(
+        rf'^{settings.MEDIA_URL.strip("/")}/(?P<path>.+)$',
+        core_views.media,
+        name='media',
+    ),
+    re_path(
+        rf'^{settings.STATIC_URL.strip("/")}/(?P<path>.+)$',
+        core_views.static,
+        name='static',
+    ),
+    path('', include('exako.apps.term.urls')),
+    path('cardset/', include('exako.apps.card.urls')),
+    path('auth/', include('exako.apps.user.urls')),
+    path('exercise/', include('exako.apps.exercise.urls')),
+]
 
 
 @api.exception_handler(InvalidToken)